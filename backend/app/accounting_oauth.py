@@ -13,13 +13,13 @@ import secrets
 import httpx
 import asyncio
 from datetime import datetime, UTC, timedelta
-from typing import Optional, Any, Callable, TypeVar
+from typing import Optional, Any, Callable, Dict, List, TypeVar
 from urllib.parse import urlencode
 import base64
 import json
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 
 logger = logging.getLogger(__name__)
 
@@ -131,7 +131,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from .database import get_db
-from .models import User, AccountingConnection
+from .models import User, AccountingConnection, AccountingSummarySnapshot
 from .auth import get_current_user
 
 router = APIRouter()
@@ -163,6 +163,12 @@ ZOHO_CLIENT_SECRET = os.getenv("ZOHO_CLIENT_SECRET", "")
 ZOHO_REDIRECT_URI = f"{BACKEND_URL}/api/accounting/zoho/callback"
 ZOHO_ACCOUNTS_URL = os.getenv("ZOHO_ACCOUNTS_URL", "https://accounts.zoho.com")  # .com, .eu, .in, etc.
 
+# Cached financial summaries
+ACCOUNTING_SUMMARY_TTL = int(os.getenv("ACCOUNTING_SUMMARY_TTL", "3600"))  # seconds before a snapshot is stale
+ACCOUNTING_MIN_REFRESH_INTERVAL = int(os.getenv("ACCOUNTING_MIN_REFRESH_INTERVAL", "60"))
+ACCOUNTING_FETCH_CONCURRENCY = int(os.getenv("ACCOUNTING_FETCH_CONCURRENCY", "5"))
+SCHEDULER_API_KEY = os.getenv("SCHEDULER_API_KEY", "")
+
 # State tokens storage (use Redis in production)
 oauth_states: dict[str, dict] = {}
 
@@ -228,6 +234,26 @@ class FinancialSummary(BaseModel):
     period_end: Optional[datetime] = None
 
 
+SUMMARY_AMOUNT_FIELDS = (
+    "revenue", "expenses", "profit", "outstanding_invoices", "overdue_invoices",
+    "cash_balance", "accounts_payable", "accounts_receivable",
+)
+
+
+class ProviderSummaryStatus(BaseModel):
+    provider: str
+    company_name: Optional[str] = None
+    fetched_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class CachedFinancialSummary(FinancialSummary):
+    """Sum of the latest snapshots of all active connections."""
+    as_of: Optional[datetime] = None  # Oldest snapshot in the sum
+    is_stale: bool = True
+    providers: List[ProviderSummaryStatus] = []
+
+
 # ============ CONNECTED ACCOUNTS ============
 
 @router.get("/accounts", response_model=ConnectedAccountingResponse)
@@ -710,42 +736,80 @@ async def sync_accounting_data(
     if not connection:
         raise HTTPException(status_code=404, detail=f"No active {provider} connection found")
 
-    # Check if token needs refresh
-    if connection.token_expires_at and connection.token_expires_at < datetime.now(UTC):
-        await refresh_token(connection, db)
-
-    # Perform sync based on provider
-    summary = await fetch_financial_summary(connection)
-
-    # Update last sync time
-    connection.last_sync_at = datetime.now(UTC)
-    db.commit()
+    await refresh_connection_summaries(db, [connection])
+    snapshot = db.query(AccountingSummarySnapshot).filter(
+        AccountingSummarySnapshot.connection_id == connection.id
+    ).first()
 
-    return {"status": "synced", "provider": provider, "summary": summary}
+    return {
+        "status": "error" if snapshot.error else "synced",
+        "provider": provider,
+        "summary": FinancialSummary(**{
+            field: getattr(snapshot, field) or 0.0 for field in SUMMARY_AMOUNT_FIELDS
+        }, period_start=snapshot.period_start, period_end=snapshot.period_end),
+    }
 
 
-@router.get("/summary", response_model=FinancialSummary)
+@router.get("/summary", response_model=CachedFinancialSummary)
 async def get_financial_summary(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Get aggregated financial summary from all connected accounting providers."""
-    connections = db.query(AccountingConnection).filter(
-        AccountingConnection.organization_id == current_user.organization_id,
-        AccountingConnection.is_active == True,
-    ).all()
+    """
+    Get aggregated financial summary from all connected accounting providers.
 
-    if not connections:
-        return FinancialSummary()
+    Served from stored snapshots without calling any provider; is_stale
+    tells the client a refresh is due.
+    """
+    return get_cached_summary(db, current_user.organization_id)
 
-    # Use the first active connection for now (could aggregate multiple)
-    connection = connections[0]
 
-    try:
-        return await fetch_financial_summary(connection)
-    except Exception as e:
-        print(f"Error fetching financial summary: {e}")
-        return FinancialSummary()
+@router.post("/summary/refresh", response_model=CachedFinancialSummary)
+async def refresh_financial_summary(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Pull fresh summaries from every connected provider.
+
+    Concurrent requests for the same organization share one refresh, and
+    snapshots younger than ACCOUNTING_MIN_REFRESH_INTERVAL are reused.
+    """
+    org_id = current_user.organization_id
+    cached = get_cached_summary(db, org_id)
+    recent = cached.as_of and _as_utc(cached.as_of) > datetime.now(UTC) - timedelta(seconds=ACCOUNTING_MIN_REFRESH_INTERVAL)
+    if cached.providers and not recent:
+        await summary_refresher.refresh(db, org_id)
+        cached = get_cached_summary(db, org_id)
+    return cached
+
+
+def verify_scheduler_key(x_api_key: str = Header(None)):
+    """Verify the scheduler API key."""
+    if not SCHEDULER_API_KEY:
+        raise HTTPException(status_code=500, detail="Scheduler API key not configured")
+    if not x_api_key or not secrets.compare_digest(x_api_key, SCHEDULER_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    return True
+
+
+@router.post("/summary/refresh-all")
+async def refresh_all_financial_summaries(
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_scheduler_key),
+):
+    """Refresh stale summaries for every organization (called by scheduler)."""
+    stale_before = datetime.now(UTC) - timedelta(seconds=ACCOUNTING_SUMMARY_TTL)
+    org_ids = [org_id for (org_id,) in db.query(AccountingConnection.organization_id).outerjoin(
+        AccountingSummarySnapshot, AccountingSummarySnapshot.connection_id == AccountingConnection.id
+    ).filter(
+        AccountingConnection.is_active == True,
+        (AccountingSummarySnapshot.id == None) | (AccountingSummarySnapshot.fetched_at == None)
+        | (AccountingSummarySnapshot.fetched_at < stale_before)
+    ).distinct().all()]
+
+    await asyncio.gather(*(summary_refresher.refresh(db, org_id) for org_id in org_ids))
+    return {"refreshed_organizations": len(org_ids)}
 
 
 async def refresh_token(connection: AccountingConnection, db: Session):
@@ -849,20 +913,180 @@ async def fetch_financial_summary(connection: AccountingConnection) -> Financial
 
     try:
         async with httpx.AsyncClient() as client:
-            if connection.provider == "quickbooks":
-                summary = await fetch_quickbooks_summary(client, connection)
-            elif connection.provider == "xero":
-                summary = await fetch_xero_summary(client, connection)
-            elif connection.provider == "freshbooks":
-                summary = await fetch_freshbooks_summary(client, connection)
-            elif connection.provider == "zoho":
-                summary = await fetch_zoho_summary(client, connection)
+            summary = await fetch_provider_summary(client, connection)
     except Exception as e:
         print(f"Error fetching summary from {connection.provider}: {e}")
 
     return summary
 
 
+async def fetch_provider_summary(client: httpx.AsyncClient, connection: AccountingConnection) -> FinancialSummary:
+    """Fetch a summary with the provider's fetcher; errors propagate."""
+    if connection.provider == "quickbooks":
+        return await fetch_quickbooks_summary(client, connection)
+    elif connection.provider == "xero":
+        return await fetch_xero_summary(client, connection)
+    elif connection.provider == "freshbooks":
+        return await fetch_freshbooks_summary(client, connection)
+    elif connection.provider == "zoho":
+        return await fetch_zoho_summary(client, connection)
+    raise ValueError(f"Unsupported accounting provider: {connection.provider}")
+
+
+# ============ CACHED SUMMARIES ============
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite returns naive datetimes; they are stored as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def _store_snapshot(
+    db: Session,
+    connection: AccountingConnection,
+    snapshot: Optional[AccountingSummarySnapshot],
+    summary: Optional[FinancialSummary] = None,
+    error: Optional[str] = None,
+) -> AccountingSummarySnapshot:
+    """Record a pull result. A failed pull keeps the last good figures."""
+    now = datetime.now(UTC)
+    if snapshot is None:
+        snapshot = AccountingSummarySnapshot(
+            connection_id=connection.id,
+            organization_id=connection.organization_id,
+            provider=connection.provider,
+        )
+        db.add(snapshot)
+
+    snapshot.attempted_at = now
+    snapshot.error = error
+    if summary is not None:
+        for field in SUMMARY_AMOUNT_FIELDS:
+            setattr(snapshot, field, getattr(summary, field))
+        snapshot.period_start = summary.period_start
+        snapshot.period_end = summary.period_end
+        snapshot.fetched_at = now
+        connection.last_sync_at = now
+    return snapshot
+
+
+async def refresh_connection_summaries(db: Session, connections: List[AccountingConnection]) -> None:
+    """
+    Pull summaries from several connections concurrently and store them.
+
+    Expired tokens are refreshed first, one at a time, since refreshing
+    writes to the session. The provider calls then run concurrently over
+    one client, at most ACCOUNTING_FETCH_CONCURRENCY at a time.
+    """
+    if not connections:
+        return
+
+    snapshots = {
+        snapshot.connection_id: snapshot
+        for snapshot in db.query(AccountingSummarySnapshot).filter(
+            AccountingSummarySnapshot.connection_id.in_([c.id for c in connections])
+        ).all()
+    }
+
+    ready = []
+    for connection in connections:
+        expires_at = _as_utc(connection.token_expires_at)
+        if expires_at and expires_at < datetime.now(UTC):
+            try:
+                await refresh_token(connection, db)
+            except HTTPException as e:
+                _store_snapshot(db, connection, snapshots.get(connection.id), error=e.detail)
+                continue
+        ready.append(connection)
+
+    semaphore = asyncio.Semaphore(ACCOUNTING_FETCH_CONCURRENCY)
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async def fetch(connection: AccountingConnection):
+            async with semaphore:
+                try:
+                    return await fetch_provider_summary(client, connection), None
+                except Exception as e:
+                    logger.error(f"Error fetching summary from {connection.provider}: {e}")
+                    return None, str(e) or type(e).__name__
+
+        results = await asyncio.gather(*(fetch(c) for c in ready))
+
+    for connection, (summary, error) in zip(ready, results):
+        _store_snapshot(db, connection, snapshots.get(connection.id), summary, error)
+    db.commit()
+
+
+def get_cached_summary(db: Session, organization_id: int) -> CachedFinancialSummary:
+    """Aggregate the stored snapshots of an organization's active connections."""
+    rows = db.query(AccountingConnection, AccountingSummarySnapshot).outerjoin(
+        AccountingSummarySnapshot, AccountingSummarySnapshot.connection_id == AccountingConnection.id
+    ).filter(
+        AccountingConnection.organization_id == organization_id,
+        AccountingConnection.is_active == True,
+    ).order_by(AccountingConnection.id).all()
+
+    result = CachedFinancialSummary()
+    if not rows:
+        result.is_stale = False
+        return result
+
+    fetched = []
+    for connection, snapshot in rows:
+        result.providers.append(ProviderSummaryStatus(
+            provider=connection.provider,
+            company_name=connection.company_name,
+            fetched_at=snapshot.fetched_at if snapshot else None,
+            error=snapshot.error if snapshot else None,
+        ))
+        if snapshot is None or snapshot.fetched_at is None:
+            continue
+        fetched.append(snapshot.fetched_at)
+        for field in SUMMARY_AMOUNT_FIELDS:
+            setattr(result, field, getattr(result, field) + (getattr(snapshot, field) or 0.0))
+        if snapshot.period_start and (result.period_start is None or snapshot.period_start < result.period_start):
+            result.period_start = snapshot.period_start
+        if snapshot.period_end and (result.period_end is None or snapshot.period_end > result.period_end):
+            result.period_end = snapshot.period_end
+
+    if len(fetched) == len(rows):
+        result.as_of = min(fetched)
+        result.is_stale = _as_utc(result.as_of) < datetime.now(UTC) - timedelta(seconds=ACCOUNTING_SUMMARY_TTL)
+    return result
+
+
+class SummaryRefreshCoalescer:
+    """
+    At most one summary refresh in flight per organization.
+
+    Callers arriving while a refresh runs await the same task instead of
+    calling the providers again.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[int, asyncio.Task] = {}
+
+    async def refresh(self, db: Session, organization_id: int) -> None:
+        task = self._inflight.get(organization_id)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(db, organization_id))
+            self._inflight[organization_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(organization_id, None))
+        await task
+
+    async def _refresh(self, db: Session, organization_id: int) -> None:
+        connections = db.query(AccountingConnection).filter(
+            AccountingConnection.organization_id == organization_id,
+            AccountingConnection.is_active == True,
+        ).all()
+        await refresh_connection_summaries(db, connections)
+
+
+# Global coalescer instance
+summary_refresher = SummaryRefreshCoalescer()
+
+
 async def fetch_quickbooks_summary(client: httpx.AsyncClient, connection: AccountingConnection) -> FinancialSummary:
     """Fetch financial data from QuickBooks."""
     base_url = "https://sandbox-quickbooks.api.intuit.com" if QUICKBOOKS_ENVIRONMENT == "sandbox" else "https://quickbooks.api.intuit.com"
@@ -20,7 +20,7 @@ from .captcha import verify_captcha, get_captcha_config
 from .email_service import send_verification_email, send_password_reset_email
 from .session_manager import (
     create_session, is_token_revoked, get_user_sessions, get_session_by_id,
-    revoke_session, revoke_all_sessions, parse_device_info
+    revoke_session, revoke_all_sessions, parse_device_info, load_principal
 )
 
 # Security constants
@@ -121,7 +121,7 @@ def get_current_user(
     if token_id and is_token_revoked(db, token_id):
         raise HTTPException(status_code=401, detail="Token has been revoked")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = load_principal(db, email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     if not user.is_active:
@@ -157,7 +157,7 @@ def get_current_user_optional(
     if token_id and is_token_revoked(db, token_id):
         return None
 
-    user = db.query(User).filter(User.email == email).first()
+    user = load_principal(db, email)
     if not user or not user.is_active:
         return None
 
@@ -406,7 +406,7 @@ def login_with_mfa(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired MFA token")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = load_principal(db, email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
@@ -458,7 +458,7 @@ def refresh_token(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = load_principal(db, email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
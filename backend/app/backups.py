@@ -2,24 +2,41 @@
 Automated backup service for database and uploads.
 
 Supports:
-- Scheduled database backups to S3
+- Scheduled database backups to S3 (or a local directory)
+- Incremental, compressed, content-deduplicated snapshots
 - Configurable retention policy
-- Manual backup/restore endpoints (admin only)
+- Manual backup/restore endpoints (admin only), including point-in-time
+
+Snapshot layout under BACKUP_PREFIX:
+- chunks/<sha[:2]>/<sha>.gz: gzip-compressed BACKUP_CHUNK_SIZE slices of
+  the database file, named by the SHA-256 of their uncompressed bytes.
+  A chunk is stored once and shared by every snapshot that contains it,
+  so a backup only uploads the slices whose pages changed.
+- manifests/<timestamp>.json: the ordered chunk list of one snapshot.
+  Every BACKUP_FULL_INTERVAL_DAYS a full snapshot re-uploads all of its
+  chunks, so no restore depends on chunks older than that.
+
+Older single-file .db backups are still listed and restorable.
 
 Endpoints:
 - POST /api/backups/create (requires API key or admin)
 - GET /api/backups/list (admin only)
 - POST /api/backups/restore/{backup_id} (admin only)
+- POST /api/backups/restore-point-in-time (admin only)
 - DELETE /api/backups/{backup_id} (admin only)
 """
 import os
+import gzip
+import json
+import hashlib
 import logging
 import shutil
+import sqlite3
 import tempfile
 from datetime import datetime, UTC, timedelta
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
@@ -36,8 +53,18 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 BACKUP_BUCKET = os.getenv("BACKUP_S3_BUCKET", "")
 BACKUP_PREFIX = os.getenv("BACKUP_S3_PREFIX", "backups/made4founders/")
 BACKUP_RETENTION_DAYS = int(os.getenv("BACKUP_RETENTION_DAYS", "30"))
+# Back up to this directory instead of S3 (e.g. a mounted volume)
+BACKUP_LOCAL_DIR = os.getenv("BACKUP_LOCAL_DIR", "")
+BACKUP_FULL_INTERVAL_DAYS = int(os.getenv("BACKUP_FULL_INTERVAL_DAYS", "7"))
+# A multiple of the SQLite page size, so a changed page dirties one chunk
+BACKUP_CHUNK_SIZE = int(os.getenv("BACKUP_CHUNK_SIZE", str(1024 * 1024)))
 SCHEDULER_API_KEY = os.getenv("SCHEDULER_API_KEY", "")
 
+MANIFEST_DIR = "manifests/"
+CHUNK_DIR = "chunks/"
+# Unreferenced chunks younger than this may belong to a backup in progress
+CHUNK_GC_GRACE = timedelta(days=1)
+
 # Lazy S3 client
 _s3_client = None
 
@@ -55,6 +82,126 @@ def get_s3_client():
     return _s3_client
 
 
+class StoredObject(BaseModel):
+    """An object in the backup store."""
+    key: str
+    size: int
+    last_modified: datetime
+
+
+class S3BackupStore:
+    """Backup objects in an S3 bucket."""
+
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except Exception as e:
+            status = getattr(e, "response", {}).get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if status == 404:
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        """Every object under prefix, across all list_objects_v2 pages."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield StoredObject(
+                    key=obj["Key"],
+                    size=obj["Size"],
+                    last_modified=obj["LastModified"].astimezone(UTC)
+                )
+
+    def download_file(self, key: str, path: str) -> None:
+        self.client.download_file(self.bucket, key, path)
+
+
+class LocalBackupStore:
+    """Backup objects as files under a directory."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError("Invalid backup key")
+        return path
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    stat = os.stat(path)
+                    yield StoredObject(
+                        key=key,
+                        size=stat.st_size,
+                        last_modified=datetime.fromtimestamp(stat.st_mtime, UTC)
+                    )
+
+    def download_file(self, key: str, path: str) -> None:
+        shutil.copyfile(self._path(key), path)
+
+
+def get_backup_store():
+    """The configured backup store, or None if backups aren't configured."""
+    if BACKUP_LOCAL_DIR:
+        return LocalBackupStore(BACKUP_LOCAL_DIR)
+    s3 = get_s3_client()
+    if not s3 or not BACKUP_BUCKET:
+        return None
+    return S3BackupStore(s3, BACKUP_BUCKET)
+
+
+def require_backup_store():
+    store = get_backup_store()
+    if store is None:
+        raise HTTPException(
+            status_code=500,
+            detail="BACKUP_S3_BUCKET (or BACKUP_LOCAL_DIR) not configured"
+        )
+    return store
+
+
 class BackupInfo(BaseModel):
     """Backup metadata."""
     key: str
@@ -62,6 +209,8 @@ class BackupInfo(BaseModel):
     size_bytes: int
     created_at: datetime
     age_days: int
+    kind: str = "full"  # full, incremental, or legacy (single .db file)
+    stored_bytes: Optional[int] = None  # compressed bytes uploaded by this backup
 
 
 class BackupResponse(BaseModel):
@@ -70,6 +219,10 @@ class BackupResponse(BaseModel):
     message: str
     backup_key: Optional[str] = None
     backup_size: Optional[int] = None
+    kind: Optional[str] = None
+    chunks_total: Optional[int] = None
+    chunks_uploaded: Optional[int] = None
+    uploaded_bytes: Optional[int] = None
 
 
 def verify_scheduler_key(x_api_key: str = Header(None)):
@@ -90,12 +243,13 @@ def require_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-def create_database_backup() -> tuple[str, int]:
+def create_database_backup(database_path: str = None) -> tuple[str, int]:
     """
-    Create a backup of the SQLite database.
+    Create a consistent copy of the SQLite database in a temp directory.
     Returns: (backup_file_path, size_bytes)
     """
-    if not os.path.exists(DATABASE_PATH):
+    database_path = database_path or DATABASE_PATH
+    if not os.path.exists(database_path):
         raise HTTPException(status_code=500, detail="Database file not found")
 
     # Create timestamped backup filename
@@ -108,8 +262,7 @@ def create_database_backup() -> tuple[str, int]:
 
     try:
         # Use SQLite backup API for consistency
-        import sqlite3
-        source = sqlite3.connect(DATABASE_PATH)
+        source = sqlite3.connect(database_path)
         dest = sqlite3.connect(backup_path)
         source.backup(dest)
         source.close()
@@ -122,161 +275,287 @@ def create_database_backup() -> tuple[str, int]:
         raise HTTPException(status_code=500, detail=f"Backup creation failed: {str(e)}")
 
 
-def upload_to_s3(local_path: str, s3_key: str) -> bool:
-    """Upload a file to S3."""
-    s3 = get_s3_client()
-    if not s3 or not BACKUP_BUCKET:
-        logger.warning("S3 not configured, skipping upload")
-        return False
+def _chunk_key(digest: str) -> str:
+    return f"{BACKUP_PREFIX}{CHUNK_DIR}{digest[:2]}/{digest}.gz"
+
+
+def _manifest_created_at(key: str) -> datetime:
+    stamp = key.rsplit("/", 1)[-1].removesuffix(".json")
+    return datetime.strptime(stamp, "%Y%m%dT%H%M%S%fZ").replace(tzinfo=UTC)
 
+
+def _list_manifests(store) -> List[StoredObject]:
+    """Snapshot manifests, oldest first."""
+    manifests = [
+        obj for obj in store.list(f"{BACKUP_PREFIX}{MANIFEST_DIR}")
+        if obj.key.endswith(".json")
+    ]
+    manifests.sort(key=lambda obj: obj.key)
+    return manifests
+
+
+def _load_manifest(store, key: str) -> dict:
+    return json.loads(store.get(key))
+
+
+def _iter_chunks(path: str, chunk_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def create_incremental_backup(
+    store,
+    database_path: str = None,
+    force_full: bool = False,
+    now: Optional[datetime] = None,
+) -> BackupResponse:
+    """
+    Snapshot the database into the store, uploading only new chunks.
+
+    Chunks already referenced by the latest snapshot are skipped. Other
+    chunks are checked for existence before uploading. A full snapshot
+    (forced, or when the last one is older than BACKUP_FULL_INTERVAL_DAYS)
+    uploads every chunk again.
+    """
+    now = now or datetime.now(UTC)
+    manifests = _list_manifests(store)
+    previous = _load_manifest(store, manifests[-1].key) if manifests else None
+
+    last_full = previous.get("last_full_at") if previous else None
+    full = (
+        force_full
+        or last_full is None
+        or now - datetime.fromisoformat(last_full) >= timedelta(days=BACKUP_FULL_INTERVAL_DAYS)
+    )
+    known: Set[str] = set() if full or previous is None else set(previous["chunks"])
+
+    snapshot_path, size = create_database_backup(database_path)
+    chunks: List[str] = []
+    uploaded = 0
+    uploaded_bytes = 0
     try:
-        s3.upload_file(local_path, BACKUP_BUCKET, s3_key)
-        logger.info(f"Uploaded backup to s3://{BACKUP_BUCKET}/{s3_key}")
-        return True
-    except Exception as e:
-        logger.error(f"S3 upload failed: {e}")
-        raise HTTPException(status_code=500, detail=f"S3 upload failed: {str(e)}")
+        for chunk in _iter_chunks(snapshot_path, BACKUP_CHUNK_SIZE):
+            digest = hashlib.sha256(chunk).hexdigest()
+            chunks.append(digest)
+            if digest in known:
+                continue
+            known.add(digest)
+            key = _chunk_key(digest)
+            if not full and store.exists(key):
+                continue
+            data = gzip.compress(chunk, mtime=0)
+            store.put(key, data)
+            uploaded += 1
+            uploaded_bytes += len(data)
+    finally:
+        shutil.rmtree(os.path.dirname(snapshot_path), ignore_errors=True)
+
+    manifest_key = f"{BACKUP_PREFIX}{MANIFEST_DIR}{now.strftime('%Y%m%dT%H%M%S%fZ')}.json"
+    kind = "full" if full else "incremental"
+    store.put(manifest_key, json.dumps({
+        "version": 1,
+        "kind": kind,
+        "created_at": now.isoformat(),
+        "last_full_at": now.isoformat() if full else last_full,
+        "size": size,
+        "chunk_size": BACKUP_CHUNK_SIZE,
+        "compression": "gzip",
+        "chunks": chunks,
+        "uploaded_bytes": uploaded_bytes,
+    }).encode())
+    logger.info(f"{kind.title()} backup {manifest_key}: {uploaded}/{len(chunks)} chunks uploaded ({uploaded_bytes:,} bytes)")
+
+    return BackupResponse(
+        success=True,
+        message=f"{kind.title()} backup created ({size:,} bytes, {uploaded_bytes:,} uploaded)",
+        backup_key=manifest_key,
+        backup_size=size,
+        kind=kind,
+        chunks_total=len(chunks),
+        chunks_uploaded=uploaded,
+        uploaded_bytes=uploaded_bytes,
+    )
+
+
+def restore_snapshot(store, manifest_key: str, dest_path: str) -> dict:
+    """
+    Rebuild the database file described by a manifest into dest_path.
+
+    Every chunk is checked against its hash, and the result must pass
+    SQLite's quick_check.
+    """
+    manifest = _load_manifest(store, manifest_key)
+    with open(dest_path, "wb") as f:
+        for digest in manifest["chunks"]:
+            chunk = gzip.decompress(store.get(_chunk_key(digest)))
+            if hashlib.sha256(chunk).hexdigest() != digest:
+                raise HTTPException(status_code=500, detail=f"Backup chunk {digest} is corrupt")
+            f.write(chunk)
+
+    if os.path.getsize(dest_path) != manifest["size"]:
+        raise HTTPException(status_code=500, detail="Restored database has the wrong size")
+    conn = sqlite3.connect(dest_path)
+    try:
+        (result,) = conn.execute("PRAGMA quick_check").fetchone()
+    finally:
+        conn.close()
+    if result != "ok":
+        raise HTTPException(status_code=400, detail="Invalid backup file")
+    return manifest
+
+
+def find_snapshot_at(store, at: datetime) -> Optional[str]:
+    """Key of the latest snapshot taken at or before at."""
+    candidates = [m.key for m in _list_manifests(store) if _manifest_created_at(m.key) <= at]
+    return candidates[-1] if candidates else None
+
+
+def list_backups_in_store(store) -> List[BackupInfo]:
+    """List snapshots and legacy single-file backups, newest first."""
+    backups = []
+    now = datetime.now(UTC)
+
+    for obj in store.list(BACKUP_PREFIX):
+        key = obj.key
+        if key.startswith(f"{BACKUP_PREFIX}{MANIFEST_DIR}") and key.endswith(".json"):
+            manifest = _load_manifest(store, key)
+            created = _manifest_created_at(key)
+            backups.append(BackupInfo(
+                key=key,
+                filename=key.split('/')[-1],
+                size_bytes=manifest["size"],
+                created_at=created,
+                age_days=(now - created).days,
+                kind=manifest["kind"],
+                stored_bytes=manifest.get("uploaded_bytes"),
+            ))
+        elif key.endswith('.db'):
+            backups.append(BackupInfo(
+                key=key,
+                filename=key.split('/')[-1],
+                size_bytes=obj.size,
+                created_at=obj.last_modified,
+                age_days=(now - obj.last_modified).days,
+                kind="legacy",
+                stored_bytes=obj.size,
+            ))
+
+    # Sort by date, newest first
+    backups.sort(key=lambda x: x.created_at, reverse=True)
+    return backups
 
 
 def list_s3_backups() -> List[BackupInfo]:
-    """List all backups in S3."""
-    s3 = get_s3_client()
-    if not s3 or not BACKUP_BUCKET:
+    """List all backups in the configured store."""
+    store = get_backup_store()
+    if store is None:
         return []
 
     try:
-        response = s3.list_objects_v2(
-            Bucket=BACKUP_BUCKET,
-            Prefix=BACKUP_PREFIX
-        )
-
-        backups = []
-        now = datetime.now(UTC)
-
-        for obj in response.get('Contents', []):
-            key = obj['Key']
-            if key.endswith('.db'):
-                filename = key.split('/')[-1]
-                created = obj['LastModified'].replace(tzinfo=None)
-                age = (now - created).days
-
-                backups.append(BackupInfo(
-                    key=key,
-                    filename=filename,
-                    size_bytes=obj['Size'],
-                    created_at=created,
-                    age_days=age
-                ))
-
-        # Sort by date, newest first
-        backups.sort(key=lambda x: x.created_at, reverse=True)
-        return backups
+        return list_backups_in_store(store)
     except Exception as e:
-        logger.error(f"Failed to list S3 backups: {e}")
+        logger.error(f"Failed to list backups: {e}")
         return []
 
 
 def delete_s3_backup(s3_key: str) -> bool:
-    """Delete a backup from S3."""
-    s3 = get_s3_client()
-    if not s3 or not BACKUP_BUCKET:
+    """Delete a backup (a manifest or legacy file) from the store."""
+    store = get_backup_store()
+    if store is None:
         return False
 
     try:
-        s3.delete_object(Bucket=BACKUP_BUCKET, Key=s3_key)
-        logger.info(f"Deleted backup: s3://{BACKUP_BUCKET}/{s3_key}")
+        store.delete(s3_key)
+        logger.info(f"Deleted backup: {s3_key}")
         return True
     except Exception as e:
         logger.error(f"Failed to delete backup: {e}")
         return False
 
 
-def cleanup_old_backups() -> int:
-    """Delete backups older than retention period. Returns count deleted."""
-    backups = list_s3_backups()
+def cleanup_store(store, now: Optional[datetime] = None) -> Tuple[int, int]:
+    """
+    Apply the retention policy.
+
+    Deletes backups older than BACKUP_RETENTION_DAYS (always keeping the
+    newest snapshot). Every manifest lists all of its chunks, so no
+    snapshot depends on another; chunks that no remaining snapshot
+    references are then removed.
+
+    Returns:
+        (backups_deleted, chunks_deleted)
+    """
+    now = now or datetime.now(UTC)
+    cutoff = now - timedelta(days=BACKUP_RETENTION_DAYS)
     deleted = 0
 
-    for backup in backups:
-        if backup.age_days > BACKUP_RETENTION_DAYS:
-            if delete_s3_backup(backup.key):
-                deleted += 1
+    manifests = _list_manifests(store)
+    loaded: Dict[str, dict] = {m.key: _load_manifest(store, m.key) for m in manifests}
+    for manifest in manifests[:-1]:
+        if _manifest_created_at(manifest.key) < cutoff:
+            store.delete(manifest.key)
+            del loaded[manifest.key]
+            deleted += 1
+
+    for obj in store.list(BACKUP_PREFIX):
+        if obj.key.endswith(".db") and obj.last_modified < cutoff:
+            store.delete(obj.key)
+            deleted += 1
+
+    referenced = {digest for manifest in loaded.values() for digest in manifest["chunks"]}
+    chunks_deleted = 0
+    for obj in store.list(f"{BACKUP_PREFIX}{CHUNK_DIR}"):
+        digest = obj.key.rsplit("/", 1)[-1].removesuffix(".gz")
+        if digest not in referenced and obj.last_modified < now - CHUNK_GC_GRACE:
+            store.delete(obj.key)
+            chunks_deleted += 1
 
+    return deleted, chunks_deleted
+
+
+def cleanup_old_backups() -> int:
+    """Delete backups older than retention period. Returns count deleted."""
+    store = get_backup_store()
+    if store is None:
+        return 0
+    deleted, _ = cleanup_store(store)
     return deleted
 
 
 @router.post("/create", response_model=BackupResponse)
 async def create_backup(
+    full: bool = Query(False, description="Force a full snapshot"),
     _: bool = Depends(verify_scheduler_key),
 ):
     """
-    Create a database backup and upload to S3.
+    Create a database backup and upload it to the backup store.
 
-    Should be called daily by a scheduler (e.g., cron, CloudWatch).
-    Also cleans up backups older than retention period.
+    Should be called daily (or more often) by a scheduler (e.g., cron,
+    CloudWatch). Only chunks that changed since the last snapshot are
+    uploaded. Also cleans up backups older than retention period.
     """
-    if not BACKUP_BUCKET:
-        raise HTTPException(
-            status_code=500,
-            detail="BACKUP_S3_BUCKET environment variable not configured"
-        )
+    store = require_backup_store()
+    result = create_incremental_backup(store, force_full=full)
 
-    # Create backup
-    backup_path, size = create_database_backup()
+    deleted, _ = cleanup_store(store)
+    if deleted > 0:
+        result.message += f", deleted {deleted} old backup(s)"
 
-    try:
-        # Generate S3 key
-        filename = os.path.basename(backup_path)
-        s3_key = f"{BACKUP_PREFIX}{filename}"
-
-        # Upload to S3
-        upload_to_s3(backup_path, s3_key)
-
-        # Cleanup old backups
-        deleted = cleanup_old_backups()
-
-        message = f"Backup created successfully ({size:,} bytes)"
-        if deleted > 0:
-            message += f", deleted {deleted} old backup(s)"
-
-        return BackupResponse(
-            success=True,
-            message=message,
-            backup_key=s3_key,
-            backup_size=size
-        )
-    finally:
-        # Clean up temp file
-        temp_dir = os.path.dirname(backup_path)
-        shutil.rmtree(temp_dir, ignore_errors=True)
+    return result
 
 
 @router.post("/create-admin", response_model=BackupResponse)
 async def create_backup_admin(
+    full: bool = Query(False, description="Force a full snapshot"),
     current_user: User = Depends(require_admin),
 ):
     """Create a backup (admin only, no API key needed)."""
-    if not BACKUP_BUCKET:
-        raise HTTPException(
-            status_code=500,
-            detail="BACKUP_S3_BUCKET environment variable not configured"
-        )
-
-    backup_path, size = create_database_backup()
-
-    try:
-        filename = os.path.basename(backup_path)
-        s3_key = f"{BACKUP_PREFIX}{filename}"
-        upload_to_s3(backup_path, s3_key)
-
-        return BackupResponse(
-            success=True,
-            message=f"Backup created successfully ({size:,} bytes)",
-            backup_key=s3_key,
-            backup_size=size
-        )
-    finally:
-        temp_dir = os.path.dirname(backup_path)
-        shutil.rmtree(temp_dir, ignore_errors=True)
+    store = require_backup_store()
+    return create_incremental_backup(store, force_full=full)
 
 
 @router.get("/list", response_model=List[BackupInfo])
@@ -284,12 +563,7 @@ async def list_backups(
     current_user: User = Depends(require_admin),
 ):
     """List all available backups (admin only)."""
-    if not BACKUP_BUCKET:
-        raise HTTPException(
-            status_code=500,
-            detail="BACKUP_S3_BUCKET not configured"
-        )
-
+    require_backup_store()
     return list_s3_backups()
 
 
@@ -308,50 +582,38 @@ async def delete_backup(
         raise HTTPException(status_code=500, detail="Failed to delete backup")
 
 
-@router.post("/restore/{backup_key:path}")
-async def restore_backup(
-    backup_key: str,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db),
-):
-    """
-    Restore database from a backup (admin only).
+def _replace_database(restore_path: str) -> str:
+    """Swap in a restored database, keeping a copy of the current one."""
+    pre_restore_backup = f"{DATABASE_PATH}.pre_restore_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}"
+    shutil.copy2(DATABASE_PATH, pre_restore_backup)
 
-    WARNING: This will replace the current database!
-    The current database is backed up before restore.
-    """
-    s3 = get_s3_client()
-    if not s3 or not BACKUP_BUCKET:
-        raise HTTPException(status_code=500, detail="S3 not configured")
+    # Replace database
+    # Note: In production, you'd want to stop the app, replace, and restart
+    shutil.copy2(restore_path, DATABASE_PATH)
+    return pre_restore_backup
 
-    if not backup_key.startswith(BACKUP_PREFIX):
-        raise HTTPException(status_code=400, detail="Invalid backup key")
 
-    # Download backup to temp location
+def _restore(store, backup_key: str) -> dict:
     temp_dir = tempfile.mkdtemp()
     restore_path = os.path.join(temp_dir, "restore.db")
 
     try:
-        # Download from S3
-        s3.download_file(BACKUP_BUCKET, backup_key, restore_path)
-
-        # Verify it's a valid SQLite database
-        import sqlite3
-        conn = sqlite3.connect(restore_path)
-        cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        conn.close()
+        if backup_key.endswith(".json"):
+            restore_snapshot(store, backup_key, restore_path)
+        else:
+            # Legacy single-file backup
+            store.download_file(backup_key, restore_path)
 
-        if not tables:
-            raise HTTPException(status_code=400, detail="Invalid backup file")
+            # Verify it's a valid SQLite database
+            conn = sqlite3.connect(restore_path)
+            cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = cursor.fetchall()
+            conn.close()
 
-        # Backup current database first
-        pre_restore_backup = f"{DATABASE_PATH}.pre_restore_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}"
-        shutil.copy2(DATABASE_PATH, pre_restore_backup)
+            if not tables:
+                raise HTTPException(status_code=400, detail="Invalid backup file")
 
-        # Replace database
-        # Note: In production, you'd want to stop the app, replace, and restart
-        shutil.copy2(restore_path, DATABASE_PATH)
+        pre_restore_backup = _replace_database(restore_path)
 
         return {
             "success": True,
@@ -368,16 +630,60 @@ async def restore_backup(
         shutil.rmtree(temp_dir, ignore_errors=True)
 
 
+@router.post("/restore-point-in-time")
+async def restore_point_in_time(
+    at: datetime = Query(..., description="Restore the latest backup taken at or before this time"),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Restore the database as of a point in time (admin only).
+
+    WARNING: This will replace the current database!
+    The current database is backed up before restore.
+    """
+    store = require_backup_store()
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=UTC)
+
+    manifest_key = find_snapshot_at(store, at)
+    if manifest_key is None:
+        raise HTTPException(status_code=404, detail="No backup found at or before that time")
+    return _restore(store, manifest_key)
+
+
+@router.post("/restore/{backup_key:path}")
+async def restore_backup(
+    backup_key: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Restore database from a backup (admin only).
+
+    WARNING: This will replace the current database!
+    The current database is backed up before restore.
+    """
+    store = require_backup_store()
+
+    if not backup_key.startswith(BACKUP_PREFIX):
+        raise HTTPException(status_code=400, detail="Invalid backup key")
+
+    return _restore(store, backup_key)
+
+
 @router.get("/health")
 async def backup_health():
     """Health check for backup service."""
-    s3 = get_s3_client()
-    s3_configured = bool(s3 and BACKUP_BUCKET)
+    store = get_backup_store()
+    s3_configured = isinstance(store, S3BackupStore)
 
     return {
-        "status": "healthy" if s3_configured else "degraded",
+        "status": "healthy" if store is not None else "degraded",
         "s3_configured": s3_configured,
         "bucket": BACKUP_BUCKET if BACKUP_BUCKET else None,
+        "local_dir": BACKUP_LOCAL_DIR or None,
         "retention_days": BACKUP_RETENTION_DAYS,
+        "full_interval_days": BACKUP_FULL_INTERVAL_DAYS,
         "scheduler_key_configured": bool(SCHEDULER_API_KEY),
     }
@@ -0,0 +1,361 @@
+"""
+Incremental Google Calendar sync into a local event cache.
+
+Calendar views read CalendarEventCache instead of calling Google on every
+page view. The cache is kept current with Google's sync tokens:
+
+- The first pull lists every event and stores the nextSyncToken
+- Later pulls pass syncToken and only receive events changed since then,
+  including cancellations (which are removed from the cache)
+- If Google answers 410 Gone the token has expired: the cache is rebuilt
+  with a full pull
+
+A background worker (CalendarSyncWorker) pulls every active connection
+every CALENDAR_SYNC_INTERVAL seconds and refreshes access tokens that
+expire within CALENDAR_TOKEN_REFRESH_MARGIN, so neither a sync nor a
+push ever has to wait on a token refresh.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, UTC, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import GoogleCalendarConnection, CalendarEventCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
+GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "")
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+GOOGLE_CALENDAR_API = "https://www.googleapis.com/calendar/v3"
+
+CALENDAR_SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "300"))
+CALENDAR_TOKEN_REFRESH_MARGIN = timedelta(seconds=int(os.getenv("CALENDAR_TOKEN_REFRESH_MARGIN", "900")))
+# Events that ended longer ago than this are dropped from the cache
+CALENDAR_CACHE_PAST_DAYS = int(os.getenv("CALENDAR_CACHE_PAST_DAYS", "30"))
+EVENTS_PAGE_SIZE = 250
+
+
+def _google_client() -> httpx.AsyncClient:
+    """HTTP client for Google OAuth and Calendar calls."""
+    return httpx.AsyncClient(timeout=20.0)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite returns naive datetimes; they are stored as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value
+
+
+def token_expires_soon(connection: GoogleCalendarConnection, margin: timedelta = CALENDAR_TOKEN_REFRESH_MARGIN) -> bool:
+    """True if the access token is expired or expires within margin."""
+    expires_at = _as_utc(connection.token_expires_at)
+    return expires_at is None or expires_at <= datetime.now(UTC) + margin
+
+
+async def refresh_access_token(connection: GoogleCalendarConnection, db: Session, client: httpx.AsyncClient) -> bool:
+    """
+    Exchange the refresh token for a new access token.
+
+    A rejected refresh token deactivates the connection (the user has to
+    reconnect).
+
+    Returns:
+        True if the connection now has a fresh access token
+    """
+    if not connection.refresh_token:
+        return False
+
+    response = await client.post(
+        GOOGLE_TOKEN_URL,
+        data={
+            "client_id": GOOGLE_CLIENT_ID,
+            "client_secret": GOOGLE_CLIENT_SECRET,
+            "refresh_token": connection.refresh_token,
+            "grant_type": "refresh_token",
+        }
+    )
+
+    if response.status_code != 200:
+        logger.warning(f"Google token refresh failed for calendar connection {connection.id}")
+        connection.is_active = False
+        db.commit()
+        return False
+
+    tokens = response.json()
+    connection.access_token = tokens.get("access_token")
+    connection.token_expires_at = datetime.now(UTC) + timedelta(seconds=tokens.get("expires_in", 3600))
+    db.commit()
+    return True
+
+
+def _parse_event_time(value: dict) -> Tuple[Optional[datetime], bool]:
+    """Parse a Google start/end object into (naive UTC datetime, all_day)."""
+    if value.get("dateTime"):
+        return _naive_utc(datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))), False
+    if value.get("date"):
+        return datetime.fromisoformat(value["date"]), True
+    return None, False
+
+
+def _event_fields(item: dict) -> Optional[dict]:
+    """Cache columns for a Google event resource, or None if it has no usable times."""
+    try:
+        start_at, all_day = _parse_event_time(item.get("start", {}))
+        end_at, _ = _parse_event_time(item.get("end", {}))
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Failed to parse event {item.get('id')}: {e}")
+        return None
+    if start_at is None or end_at is None:
+        return None
+
+    private = item.get("extendedProperties", {}).get("private", {})
+    m4f_id = private.get("m4f_id")
+    updated = item.get("updated")
+
+    return {
+        "title": item.get("summary", "Untitled"),
+        "description": item.get("description"),
+        "location": item.get("location"),
+        "start_at": start_at,
+        "end_at": end_at,
+        "all_day": all_day,
+        "m4f_type": private.get("m4f_type"),
+        "m4f_id": int(m4f_id) if m4f_id and str(m4f_id).isdigit() else None,
+        "google_updated_at": _naive_utc(datetime.fromisoformat(updated.replace("Z", "+00:00"))) if updated else None,
+    }
+
+
+async def _list_events(
+    connection: GoogleCalendarConnection,
+    client: httpx.AsyncClient,
+    sync_token: Optional[str],
+) -> Tuple[Optional[List[dict]], Optional[str]]:
+    """
+    Page through events.list.
+
+    Returns:
+        (items, next_sync_token), or (None, None) if the sync token expired
+    """
+    url = f"{GOOGLE_CALENDAR_API}/calendars/{quote(connection.calendar_id or 'primary', safe='@.')}/events"
+    headers = {"Authorization": f"Bearer {connection.access_token}"}
+    # singleEvents must match between the full pull and every syncToken pull
+    base_params = {"singleEvents": "true", "maxResults": EVENTS_PAGE_SIZE}
+    if sync_token:
+        base_params["syncToken"] = sync_token
+
+    items: List[dict] = []
+    page_token = None
+    while True:
+        params = dict(base_params)
+        if page_token:
+            params["pageToken"] = page_token
+        response = await client.get(url, headers=headers, params=params)
+
+        if response.status_code == 410 and sync_token:
+            return None, None
+        if response.status_code != 200:
+            raise RuntimeError(f"Google Calendar events.list failed ({response.status_code})")
+
+        data = response.json()
+        items.extend(data.get("items", []))
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            return items, data.get("nextSyncToken")
+
+
+async def pull_calendar_events(connection: GoogleCalendarConnection, db: Session, client: httpx.AsyncClient) -> int:
+    """
+    Bring the connection's event cache up to date.
+
+    Uses the stored sync token when there is one, otherwise (or when
+    Google expired it) rebuilds the cache from a full listing.
+
+    Returns:
+        Number of changed events received
+    """
+    if token_expires_soon(connection, margin=timedelta(0)):
+        if not await refresh_access_token(connection, db, client):
+            raise RuntimeError("Calendar connection expired, please reconnect")
+
+    full = connection.sync_token is None
+    items, next_sync_token = await _list_events(connection, client, connection.sync_token)
+    if items is None:
+        logger.info(f"Sync token expired for calendar connection {connection.id}, running full sync")
+        full = True
+        items, next_sync_token = await _list_events(connection, client, None)
+
+    cache = db.query(CalendarEventCache).filter(CalendarEventCache.connection_id == connection.id)
+    if full:
+        cache.delete(synchronize_session=False)
+        existing: Dict[str, CalendarEventCache] = {}
+    else:
+        event_ids = [item["id"] for item in items if item.get("id")]
+        existing = {
+            row.google_event_id: row
+            for row in cache.filter(CalendarEventCache.google_event_id.in_(event_ids)).all()
+        } if event_ids else {}
+
+    for item in items:
+        event_id = item.get("id")
+        if not event_id:
+            continue
+        row = existing.get(event_id)
+        fields = _event_fields(item) if item.get("status") != "cancelled" else None
+
+        if fields is None:
+            if row is not None:
+                db.delete(row)
+                del existing[event_id]
+            continue
+
+        if row is None:
+            row = CalendarEventCache(
+                connection_id=connection.id,
+                organization_id=connection.organization_id,
+                google_event_id=event_id,
+            )
+            db.add(row)
+            existing[event_id] = row
+        for key, value in fields.items():
+            setattr(row, key, value)
+
+    cutoff = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=CALENDAR_CACHE_PAST_DAYS)
+    db.flush()
+    cache.filter(CalendarEventCache.end_at < cutoff).delete(synchronize_session=False)
+
+    connection.sync_token = next_sync_token
+    connection.last_sync_at = datetime.now(UTC)
+    db.commit()
+    return len(items)
+
+
+def cache_pushed_event(connection: GoogleCalendarConnection, db: Session, event: dict) -> None:
+    """
+    Upsert an event we just created or updated into the cache (not committed).
+
+    Pushes are deduplicated against the cache, so the event ID has to be
+    recorded right away rather than on the next pull.
+    """
+    fields = _event_fields(event)
+    if not event.get("id") or fields is None:
+        return
+    table = CalendarEventCache.__table__
+    stmt = sqlite_insert(table).values(
+        connection_id=connection.id,
+        organization_id=connection.organization_id,
+        google_event_id=event["id"],
+        synced_at=datetime.now(UTC),
+        **fields,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.connection_id, table.c.google_event_id],
+        set_={**fields, "synced_at": datetime.now(UTC)},
+    ))
+
+
+def reset_event_cache(connection: GoogleCalendarConnection, db: Session):
+    """Forget the sync token and cached events (e.g. after switching calendars)."""
+    connection.sync_token = None
+    db.query(CalendarEventCache).filter(
+        CalendarEventCache.connection_id == connection.id
+    ).delete(synchronize_session=False)
+
+
+class CalendarSyncWorker:
+    """
+    Background thread that keeps tokens fresh and event caches current.
+
+    Every interval it refreshes access tokens close to expiry and runs an
+    incremental pull for each active connection.
+    """
+
+    def __init__(self, interval: float = CALENDAR_SYNC_INTERVAL):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def run_once(self, db: Optional[Session] = None) -> Dict[str, int]:
+        """
+        Refresh expiring tokens and pull every active connection.
+
+        Args:
+            db: Session to use (a new one is opened if not given)
+
+        Returns:
+            {"refreshed": n, "synced": n, "errors": n}
+        """
+        owns_session = db is None
+        if owns_session:
+            db = SessionLocal()
+        stats = {"refreshed": 0, "synced": 0, "errors": 0}
+        try:
+            connections = db.query(GoogleCalendarConnection).filter(
+                GoogleCalendarConnection.is_active == True
+            ).all()
+            async with _google_client() as client:
+                for connection in connections:
+                    try:
+                        if token_expires_soon(connection):
+                            if not await refresh_access_token(connection, db, client):
+                                stats["errors"] += 1
+                                continue
+                            stats["refreshed"] += 1
+                        await pull_calendar_events(connection, db, client)
+                        stats["synced"] += 1
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Calendar sync error for connection {connection.id}: {e}")
+                        connection.sync_error = str(e)
+                        db.commit()
+                        stats["errors"] += 1
+            return stats
+        finally:
+            if owns_session:
+                db.close()
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="calendar-sync", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            try:
+                asyncio.run(self.run_once())
+            except Exception as e:
+                logger.error(f"Calendar sync worker error: {e}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._thread = None
+
+
+# Global worker instance
+calendar_sync_worker = CalendarSyncWorker()
@@ -9,8 +9,8 @@ import re
 from typing import List, Optional
 from datetime import datetime, UTC, UTC
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, tuple_
 
 from .database import get_db
 from .models import User, Comment, Notification, Activity, EntityType, NotificationType, ActivityType
@@ -19,6 +19,7 @@ from .schemas import (
     CommentCountsRequest, CommentCountsResponse
 )
 from .auth import get_current_user
+from .mention_directory import mention_directory
 
 router = APIRouter(prefix="/api/comments", tags=["Comments"])
 
@@ -47,19 +48,21 @@ def extract_mentions(content: str, org_id: int, db: Session) -> List[int]:
     mention_pattern = r'@(?:"([^"]+)"|(\w+))'
     matches = re.findall(mention_pattern, content)
 
+    if not matches:
+        return []
+
+    # Every mention resolves against the same in-memory directory
+    directory = mention_directory.get(db, org_id)
+
     mentioned_user_ids = []
     for quoted_name, username in matches:
         name_to_find = quoted_name if quoted_name else username
 
-        # Search for user by name or email in the organization
-        user = db.query(User).filter(
-            User.organization_id == org_id,
-            User.is_active == True,
-            (User.name.ilike(f"%{name_to_find}%") | User.email.ilike(f"{name_to_find}%"))
-        ).first()
+        # Match user by name or email in the organization
+        user_id = directory.resolve(name_to_find)
 
-        if user and user.id not in mentioned_user_ids:
-            mentioned_user_ids.append(user.id)
+        if user_id and user_id not in mentioned_user_ids:
+            mentioned_user_ids.append(user_id)
 
     return mentioned_user_ids
 
@@ -134,50 +137,76 @@ def get_entity_title(entity_type: str, entity_id: int, org_id: int, db: Session)
     return f"{entity_type} #{entity_id}"
 
 
-def comment_to_response(comment: Comment, db: Session) -> CommentResponse:
-    """Convert Comment model to CommentResponse with user info."""
-    # Get user info
-    user_brief = None
-    if comment.user:
-        user_brief = UserBrief(
-            id=comment.user.id,
-            email=comment.user.email,
-            name=comment.user.name
-        )
+def hydrate_comments(comments: List[Comment], db: Session) -> List[CommentResponse]:
+    """
+    Convert comments to CommentResponses in a fixed number of queries.
 
-    # Get mentioned users
-    mentioned_users = None
-    if comment.mentioned_user_ids:
-        users = db.query(User).filter(
-            User.id.in_(comment.mentioned_user_ids)
-        ).all()
-        mentioned_users = [
-            UserBrief(id=u.id, email=u.email, name=u.name)
-            for u in users
-        ]
-
-    # Count replies
-    reply_count = db.query(func.count(Comment.id)).filter(
-        Comment.parent_id == comment.id
-    ).scalar() or 0
-
-    return CommentResponse(
-        id=comment.id,
-        organization_id=comment.organization_id,
-        entity_type=comment.entity_type,
-        entity_id=comment.entity_id,
-        user_id=comment.user_id,
-        user=user_brief,
-        content=comment.content,
-        is_edited=comment.is_edited,
-        mentioned_user_ids=comment.mentioned_user_ids,
-        mentioned_users=mentioned_users,
-        parent_id=comment.parent_id,
-        reply_count=reply_count,
-        created_at=comment.created_at,
-        updated_at=comment.updated_at
+    Authors not already loaded (see selectinload in list_comments) and
+    all mentioned users are fetched in one query, and reply counts in one
+    grouped query, however many comments there are.
+    """
+    if not comments:
+        return []
+
+    user_ids = set()
+    for comment in comments:
+        if "user" not in comment.__dict__:
+            user_ids.add(comment.user_id)
+        user_ids.update(comment.mentioned_user_ids or [])
+    users = {}
+    if user_ids:
+        users = {
+            u.id: UserBrief(id=u.id, email=u.email, name=u.name)
+            for u in db.query(User.id, User.email, User.name).filter(User.id.in_(user_ids))
+        }
+
+    reply_counts = dict(
+        db.query(Comment.parent_id, func.count(Comment.id))
+        .filter(Comment.parent_id.in_([c.id for c in comments]))
+        .group_by(Comment.parent_id)
+        .all()
     )
 
+    responses = []
+    for comment in comments:
+        # Get user info
+        author = comment.__dict__.get("user")
+        if author is not None:
+            user_brief = UserBrief(id=author.id, email=author.email, name=author.name)
+        else:
+            user_brief = users.get(comment.user_id)
+
+        # Get mentioned users
+        mentioned_users = None
+        if comment.mentioned_user_ids:
+            mentioned_users = [
+                users[user_id] for user_id in comment.mentioned_user_ids
+                if user_id in users
+            ]
+
+        responses.append(CommentResponse(
+            id=comment.id,
+            organization_id=comment.organization_id,
+            entity_type=comment.entity_type,
+            entity_id=comment.entity_id,
+            user_id=comment.user_id,
+            user=user_brief,
+            content=comment.content,
+            is_edited=comment.is_edited,
+            mentioned_user_ids=comment.mentioned_user_ids,
+            mentioned_users=mentioned_users,
+            parent_id=comment.parent_id,
+            reply_count=reply_counts.get(comment.id, 0),
+            created_at=comment.created_at,
+            updated_at=comment.updated_at
+        ))
+    return responses
+
+
+def comment_to_response(comment: Comment, db: Session) -> CommentResponse:
+    """Convert Comment model to CommentResponse with user info."""
+    return hydrate_comments([comment], db)[0]
+
 
 # ============ API Endpoints ============
 
@@ -197,8 +226,8 @@ async def list_comments(
     """
     org_id = current_user.organization_id
 
-    # Build query
-    query = db.query(Comment).filter(
+    # Build query (authors are loaded in one extra query)
+    query = db.query(Comment).options(selectinload(Comment.user)).filter(
         Comment.organization_id == org_id,
         Comment.entity_type == entity_type,
         Comment.entity_id == entity_id
@@ -209,7 +238,7 @@ async def list_comments(
 
     comments = query.order_by(Comment.created_at.asc()).all()
 
-    return [comment_to_response(c, db) for c in comments]
+    return hydrate_comments(comments, db)
 
 
 @router.post("", response_model=CommentResponse)
@@ -378,18 +407,23 @@ async def get_comment_counts(
     """
     org_id = current_user.organization_id
     counts = {}
+    keys = set()
 
     for entity in data.entities:
         entity_type = entity.get("entity_type")
         entity_id = entity.get("entity_id")
 
         if entity_type and entity_id:
-            count = db.query(func.count(Comment.id)).filter(
-                Comment.organization_id == org_id,
-                Comment.entity_type == entity_type,
-                Comment.entity_id == entity_id
-            ).scalar() or 0
+            counts[f"{entity_type}:{entity_id}"] = 0
+            keys.add((entity_type, entity_id))
+
+    if keys:
+        rows = db.query(Comment.entity_type, Comment.entity_id, func.count(Comment.id)).filter(
+            Comment.organization_id == org_id,
+            tuple_(Comment.entity_type, Comment.entity_id).in_(list(keys))
+        ).group_by(Comment.entity_type, Comment.entity_id).all()
 
+        for entity_type, entity_id, count in rows:
             counts[f"{entity_type}:{entity_id}"] = count
 
     return CommentCountsResponse(counts=counts)
@@ -409,11 +443,7 @@ async def search_users_for_mention(
     """
     org_id = current_user.organization_id
 
-    users = db.query(User).filter(
-        User.organization_id == org_id,
-        User.is_active == True,
-        (User.name.ilike(f"%{q}%") | User.email.ilike(f"%{q}%"))
-    ).limit(limit).all()
+    users = mention_directory.get(db, org_id).search(q, limit)
 
     return [
         UserBrief(id=u.id, email=u.email, name=u.name)
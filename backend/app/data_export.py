@@ -2,293 +2,534 @@
 Data export service for user data (GDPR compliance).
 
 Supports:
-- Export all user data as JSON
+- Export all organization data as a ZIP of NDJSON files (one per entity type)
+- Background export jobs for large organizations, with a downloadable artifact
 - Export specific data types as CSV
-- Download as zip archive
+
+Exports are streamed: rows are read in batches of EXPORT_BATCH_SIZE as
+plain column tuples (no ORM objects), so memory use doesn't grow with
+the size of the organization.
 
 Endpoints:
-- GET /api/export/all - Export all data as JSON
+- GET /api/export/all - Stream all data as a ZIP of NDJSON files
+- POST /api/export/jobs - Start (or resume) a background export
+- GET /api/export/jobs/{job_id} - Export job status
+- GET /api/export/jobs/{job_id}/download - Download a finished export
 - GET /api/export/contacts - Export contacts as CSV
 - GET /api/export/deadlines - Export deadlines as CSV
 - GET /api/export/tasks - Export tasks as CSV
-- GET /api/export/credentials - Export credentials (masked) as CSV
+- GET /api/export/metrics - Export metrics as CSV
 """
+import os
 import json
 import csv
-from io import StringIO, BytesIO
+import logging
+import shutil
+from io import StringIO
 import zipfile
-from datetime import datetime, UTC, UTC
-from typing import List, Dict, Any
+from datetime import datetime, UTC, UTC, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
 
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
 
-from .database import get_db
+from .database import get_db, SessionLocal
 from .auth import get_current_user
+from .zip_stream import ZipStream
 from .models import (
     User, Contact, Deadline, Task, TaskBoard, TaskColumn,
     Credential, Document, WebLink, ProductOffered, ProductUsed,
-    Service, Metric, BusinessInfo
+    Service, Metric, BusinessInfo, DataExportJob
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_BATCH_SIZE = 500
+EXPORT_JOB_TTL = timedelta(hours=int(os.getenv("EXPORT_JOB_TTL_HOURS", "24")))
+# A running job that hasn't recorded progress (a finished entity type or a
+# write to its part file) for this long is resumed
+EXPORT_JOB_STALL_TIMEOUT = timedelta(minutes=10)
+# Bytes buffered before a chunk is sent to the client
+STREAM_CHUNK_SIZE = 64 * 1024
 
-def model_to_dict(obj, exclude_fields: List[str] = None) -> Dict[str, Any]:
-    """Convert SQLAlchemy model to dict, excluding sensitive fields."""
-    exclude = set(exclude_fields or [])
-    exclude.update(['_sa_instance_state', 'password', 'hashed_password', 'encrypted_value'])
+SENSITIVE_FIELDS = {'password', 'hashed_password', 'encrypted_value'}
 
+
+def _serialize(row: Dict[str, Any], exclude: Iterable[str] = ()) -> Dict[str, Any]:
+    """Column mapping to JSON-ready dict, without sensitive fields."""
+    skip = SENSITIVE_FIELDS.union(exclude)
     result = {}
-    for column in obj.__table__.columns:
-        if column.name not in exclude:
-            value = getattr(obj, column.name)
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            result[column.name] = value
+    for name, value in row.items():
+        if name in skip:
+            continue
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        result[name] = value
     return result
 
 
-def create_csv(data: List[Dict], columns: List[str] = None) -> str:
-    """Create CSV string from list of dicts."""
-    if not data:
-        return ""
+def _stream_rows(db: Session, stmt, exclude: Iterable[str] = ()) -> Iterator[Dict[str, Any]]:
+    """Run stmt in batches and yield each row as a dict."""
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in result.mappings():
+        yield _serialize(row, exclude)
+
+
+def _org_table_rows(model, exclude: Iterable[str] = ()) -> Callable[[Session, int], Iterator[Dict[str, Any]]]:
+    def rows(db: Session, org_id: int) -> Iterator[Dict[str, Any]]:
+        table = model.__table__
+        stmt = select(table).where(table.c.organization_id == org_id).order_by(table.c.id)
+        return _stream_rows(db, stmt, exclude)
+    return rows
+
+
+def _task_rows(db: Session, org_id: int) -> Iterator[Dict[str, Any]]:
+    """Tasks with their board and column names, in one joined query."""
+    stmt = (
+        select(
+            Task.__table__,
+            TaskBoard.name.label("board_name"),
+            TaskColumn.name.label("column_name"),
+        )
+        .join(TaskBoard, Task.board_id == TaskBoard.id)
+        .outerjoin(TaskColumn, Task.column_id == TaskColumn.id)
+        .where(TaskBoard.organization_id == org_id)
+        .order_by(Task.id)
+    )
+    return _stream_rows(db, stmt)
+
+
+def _credential_rows(db: Session, org_id: int) -> Iterator[Dict[str, Any]]:
+    """Credential metadata; encrypted vault fields are never exported."""
+    stmt = select(
+        Credential.id, Credential.name, Credential.service_url,
+        Credential.category, Credential.created_at,
+    ).where(Credential.organization_id == org_id).order_by(Credential.id)
+    for row in _stream_rows(db, stmt):
+        row["password"] = "********"  # Never export actual passwords
+        yield row
+
+
+# Entity type -> row source, in export order
+EXPORT_ENTITIES: List[Tuple[str, Callable[[Session, int], Iterator[Dict[str, Any]]]]] = [
+    ("contacts", _org_table_rows(Contact)),
+    ("deadlines", _org_table_rows(Deadline)),
+    ("tasks", _task_rows),
+    # Documents: metadata only, not actual files
+    ("documents", _org_table_rows(Document, exclude=['file_path'])),
+    ("web_links", _org_table_rows(WebLink)),
+    ("products_offered", _org_table_rows(ProductOffered)),
+    ("products_used", _org_table_rows(ProductUsed)),
+    ("services", _org_table_rows(Service)),
+    ("metrics", _org_table_rows(Metric)),
+    ("credentials", _credential_rows),
+    ("business_info", _org_table_rows(BusinessInfo)),
+]
+
+
+def _export_info(user: User) -> Dict[str, Any]:
+    return {
+        "export_date": datetime.now(UTC).isoformat(),
+        "format": "ndjson",
+        "entities": [f"{name}.ndjson" for name, _ in EXPORT_ENTITIES],
+        "user": {
+            "email": user.email,
+            "name": user.name,
+            "role": user.role,
+            "created_at": user.created_at.isoformat() if user.created_at else None,
+        },
+    }
 
+
+def _ndjson_lines(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    for row in rows:
+        yield (json.dumps(row, default=str) + "\n").encode()
+
+
+def stream_export_zip(db: Session, org_id: int, info: Dict[str, Any]) -> Iterator[bytes]:
+    """Yield a ZIP of export.json plus one NDJSON file per entity type."""
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("export.json", json.dumps(info, indent=2))
+        for name, rows in EXPORT_ENTITIES:
+            with archive.open(f"{name}.ndjson", "w", force_zip64=True) as entry:
+                for line in _ndjson_lines(rows(db, org_id)):
+                    entry.write(line)
+                    if stream.buffered >= STREAM_CHUNK_SIZE:
+                        yield stream.drain()
+    yield stream.drain()
+
+
+def stream_csv(rows: Iterator[Dict[str, Any]], columns: List[str]) -> Iterator[str]:
+    """Yield a CSV document in chunks of rows."""
     output = StringIO()
-    fieldnames = columns or list(data[0].keys())
-    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
+    writer = csv.DictWriter(output, fieldnames=columns, extrasaction='ignore')
     writer.writeheader()
-    for row in data:
+    for row in rows:
         writer.writerow(row)
-    return output.getvalue()
+        if output.tell() >= STREAM_CHUNK_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+def _stream_with_session(stream: Callable[[Session], Iterator]) -> Iterator:
+    """
+    Run a streaming generator on its own session.
+
+    The request session is closed once the endpoint returns, before the
+    response body is sent, so streams open (and close) their own.
+    """
+    db = SessionLocal()
+    try:
+        yield from stream(db)
+    finally:
+        db.close()
+
+
+def _csv_response(
+    rows: Callable[[Session], Iterator[Dict[str, Any]]], columns: List[str], filename: str
+) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_with_session(lambda db: stream_csv(rows(db), columns)),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/all")
-async def export_all_data(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def export_all_data(current_user: User = Depends(get_current_user)):
     """
-    Export all user data as a JSON file (GDPR data portability).
+    Export all organization data as a ZIP file (GDPR data portability).
+
+    Contains export.json (export and user details) and one NDJSON file
+    per entity type, streamed as it is generated. For very large
+    organizations use POST /jobs instead.
     """
     org_id = current_user.organization_id
+    info = _export_info(current_user)
+    filename = f"made4founders_export_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}.zip"
 
-    # Gather all user data
-    export_data = {
-        "export_date": datetime.now(UTC).isoformat(),
-        "user": {
-            "email": current_user.email,
-            "name": current_user.name,
-            "role": current_user.role,
-            "created_at": current_user.created_at.isoformat() if current_user.created_at else None,
-        },
-        "contacts": [],
-        "deadlines": [],
-        "tasks": [],
-        "documents": [],
-        "web_links": [],
-        "products_offered": [],
-        "products_used": [],
-        "services": [],
-        "metrics": [],
-        "credentials": [],  # Masked
-        "business_info": [],
-    }
-
-    # Contacts
-    contacts = db.query(Contact).filter(Contact.organization_id == org_id).all()
-    export_data["contacts"] = [model_to_dict(c) for c in contacts]
-
-    # Deadlines
-    deadlines = db.query(Deadline).filter(Deadline.organization_id == org_id).all()
-    export_data["deadlines"] = [model_to_dict(d) for d in deadlines]
-
-    # Tasks (need to get through boards -> columns -> tasks)
-    boards = db.query(TaskBoard).filter(TaskBoard.organization_id == org_id).all()
-    for board in boards:
-        columns = db.query(TaskColumn).filter(TaskColumn.board_id == board.id).all()
-        for column in columns:
-            tasks = db.query(Task).filter(Task.column_id == column.id).all()
-            for task in tasks:
-                task_dict = model_to_dict(task)
-                task_dict["board_name"] = board.name
-                task_dict["column_name"] = column.name
-                export_data["tasks"].append(task_dict)
-
-    # Documents (metadata only, not actual files)
-    documents = db.query(Document).filter(Document.organization_id == org_id).all()
-    export_data["documents"] = [model_to_dict(d, exclude_fields=['file_path']) for d in documents]
-
-    # Web Links
-    web_links = db.query(WebLink).filter(WebLink.organization_id == org_id).all()
-    export_data["web_links"] = [model_to_dict(w) for w in web_links]
-
-    # Products Offered
-    products_offered = db.query(ProductOffered).filter(ProductOffered.organization_id == org_id).all()
-    export_data["products_offered"] = [model_to_dict(p) for p in products_offered]
-
-    # Products Used
-    products_used = db.query(ProductUsed).filter(ProductUsed.organization_id == org_id).all()
-    export_data["products_used"] = [model_to_dict(p) for p in products_used]
-
-    # Services
-    services = db.query(Service).filter(Service.organization_id == org_id).all()
-    export_data["services"] = [model_to_dict(s, exclude_fields=['password']) for s in services]
-
-    # Metrics
-    metrics = db.query(Metric).filter(Metric.organization_id == org_id).all()
-    export_data["metrics"] = [model_to_dict(m) for m in metrics]
-
-    # Credentials (masked values)
-    credentials = db.query(Credential).filter(Credential.organization_id == org_id).all()
-    for cred in credentials:
-        cred_dict = {
-            "id": cred.id,
-            "name": cred.name,
-            "username": cred.username,
-            "url": cred.url,
-            "category": cred.category,
-            "notes": cred.notes,
-            "created_at": cred.created_at.isoformat() if cred.created_at else None,
-            "password": "********",  # Never export actual passwords
-        }
-        export_data["credentials"].append(cred_dict)
-
-    # Business Info
-    business_info = db.query(BusinessInfo).filter(BusinessInfo.organization_id == org_id).all()
-    export_data["business_info"] = [model_to_dict(b) for b in business_info]
-
-    # Return as JSON file download
-    json_content = json.dumps(export_data, indent=2, default=str)
-    filename = f"made4founders_export_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}.json"
-
-    return Response(
-        content=json_content,
-        media_type="application/json",
+    return StreamingResponse(
+        _stream_with_session(lambda db: stream_export_zip(db, org_id, info)),
+        media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
-@router.get("/contacts")
-async def export_contacts_csv(
+# ============ Background Export Jobs ============
+
+def _job_dir(job: DataExportJob) -> str:
+    return os.path.join(EXPORT_DIR, f"org_{job.organization_id}", f"job_{job.id}")
+
+
+def _job_to_dict(job: DataExportJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "completed_entities": job.completed_entities or [],
+        "total_entities": len(EXPORT_ENTITIES),
+        "row_count": job.row_count or 0,
+        "size_bytes": job.size_bytes,
+        "error": job.error,
+        "created_at": job.created_at,
+        "completed_at": job.completed_at,
+        "expires_at": job.expires_at,
+    }
+
+
+def _assemble_archive(job_dir: str, info: Dict[str, Any], path: str) -> None:
+    """Combine the finished part files into the downloadable ZIP."""
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("export.json", json.dumps(info, indent=2))
+        for name, _ in EXPORT_ENTITIES:
+            with open(os.path.join(job_dir, f"{name}.ndjson"), "rb") as part, \
+                    archive.open(f"{name}.ndjson", "w", force_zip64=True) as entry:
+                shutil.copyfileobj(part, entry, STREAM_CHUNK_SIZE)
+    os.replace(tmp_path, path)
+
+
+def run_export_job(job_id: int, db: Optional[Session] = None) -> None:
+    """
+    Generate (or continue generating) an export job's archive.
+
+    Entity types already in completed_entities are skipped, so calling
+    this again after a crash only redoes the entity that was in progress.
+
+    Args:
+        job_id: DataExportJob to run
+        db: Session to use (a new one is opened if not given)
+    """
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+    job = None
+    try:
+        job = db.query(DataExportJob).filter(DataExportJob.id == job_id).first()
+        if job is None or job.status in ("completed", "expired"):
+            return
+        user = db.query(User).filter(User.id == job.user_id).first()
+        if user is None:
+            return
+
+        job.status = "running"
+        job.error = None
+        db.commit()
+
+        job_dir = _job_dir(job)
+        os.makedirs(job_dir, exist_ok=True)
+        completed = list(job.completed_entities or [])
+
+        for name, rows in EXPORT_ENTITIES:
+            if name in completed:
+                continue
+            part_path = os.path.join(job_dir, f"{name}.ndjson")
+            count = 0
+            with open(f"{part_path}.tmp", "wb") as part:
+                for line in _ndjson_lines(rows(db, job.organization_id)):
+                    part.write(line)
+                    count += 1
+            os.replace(f"{part_path}.tmp", part_path)
+
+            completed.append(name)
+            job.completed_entities = list(completed)
+            job.row_count = (job.row_count or 0) + count
+            db.commit()
+
+        archive_path = os.path.join(job_dir, "export.zip")
+        _assemble_archive(job_dir, _export_info(user), archive_path)
+        for name, _ in EXPORT_ENTITIES:
+            os.remove(os.path.join(job_dir, f"{name}.ndjson"))
+
+        now = datetime.now(UTC)
+        job.status = "completed"
+        job.file_path = archive_path
+        job.size_bytes = os.path.getsize(archive_path)
+        job.completed_at = now
+        job.expires_at = now + EXPORT_JOB_TTL
+        db.commit()
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {e}")
+        db.rollback()
+        if job is not None:
+            job.status = "failed"
+            job.error = str(e)
+            db.commit()
+    finally:
+        if owns_session:
+            db.close()
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite returns naive datetimes; they are stored as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def _last_progress(job: DataExportJob) -> datetime:
+    """
+    When the job last made progress.
+
+    updated_at only moves when an entity type finishes, so the part file
+    being written (its mtime) serves as the heartbeat in between.
+    """
+    latest = _as_utc(job.updated_at) or _as_utc(job.created_at)
+    try:
+        with os.scandir(_job_dir(job)) as entries:
+            for entry in entries:
+                modified = datetime.fromtimestamp(entry.stat().st_mtime, UTC)
+                latest = max(latest, modified)
+    except FileNotFoundError:
+        pass
+    return latest
+
+
+def _claim_job(db: Session, job: DataExportJob) -> bool:
+    """
+    Atomically mark a failed or stalled job as running.
+
+    Only one of several concurrent requests wins the claim, so a job is
+    never scheduled twice.
+    """
+    now = datetime.now(UTC)
+    claimed = db.query(DataExportJob).filter(
+        DataExportJob.id == job.id,
+        or_(DataExportJob.status == "failed", DataExportJob.updated_at < now - EXPORT_JOB_STALL_TIMEOUT)
+    ).update({
+        DataExportJob.status: "running",
+        DataExportJob.updated_at: now,
+    }, synchronize_session=False)
+    db.commit()
+    db.refresh(job)
+    return claimed == 1
+
+
+def purge_expired_exports(db: Session) -> int:
+    """
+    Delete the files of completed exports past their expiry.
+
+    The jobs are kept (marked "expired") so their status can still be
+    read. Called whenever an export job is started or an expired export
+    is requested.
+
+    Returns:
+        Number of jobs expired
+    """
+    expired = db.query(DataExportJob).filter(
+        DataExportJob.status == "completed",
+        DataExportJob.expires_at < datetime.now(UTC)
+    ).all()
+    for job in expired:
+        shutil.rmtree(_job_dir(job), ignore_errors=True)
+        job.status = "expired"
+        job.file_path = None
+        job.size_bytes = None
+    if expired:
+        db.commit()
+        logger.info(f"Removed {len(expired)} expired exports")
+    return len(expired)
+
+
+def _get_job(db: Session, job_id: int, user: User) -> DataExportJob:
+    job = db.query(DataExportJob).filter(
+        DataExportJob.id == job_id,
+        DataExportJob.user_id == user.id,
+        DataExportJob.organization_id == user.organization_id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("/jobs")
+def start_export_job(
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Export contacts as CSV."""
-    org_id = current_user.organization_id
-    contacts = db.query(Contact).filter(Contact.organization_id == org_id).all()
+    """
+    Start a background export of all organization data.
 
+    If the user already has an unfinished export, it is returned instead,
+    and resumed if it failed or stopped making progress.
+    """
+    if not current_user.organization_id:
+        raise HTTPException(status_code=403, detail="User does not belong to an organization")
+
+    purge_expired_exports(db)
+    job = db.query(DataExportJob).filter(
+        DataExportJob.user_id == current_user.id,
+        DataExportJob.organization_id == current_user.organization_id,
+        DataExportJob.status.notin_(("completed", "expired"))
+    ).order_by(DataExportJob.created_at.desc()).first()
+
+    if job is None:
+        job = DataExportJob(
+            organization_id=current_user.organization_id,
+            user_id=current_user.id,
+            status="pending",
+            completed_entities=[],
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        background_tasks.add_task(run_export_job, job.id)
+    else:
+        stalled = _last_progress(job) < datetime.now(UTC) - EXPORT_JOB_STALL_TIMEOUT
+        if (job.status == "failed" or stalled) and _claim_job(db, job):
+            background_tasks.add_task(run_export_job, job.id)
+
+    return _job_to_dict(job)
+
+
+@router.get("/jobs/{job_id}")
+def get_export_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Status of a background export."""
+    return _job_to_dict(_get_job(db, job_id, current_user))
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Download a finished background export."""
+    job = _get_job(db, job_id, current_user)
+    if job.status == "completed" and job.expires_at and _as_utc(job.expires_at) < datetime.now(UTC):
+        purge_expired_exports(db)
+    if job.status == "expired":
+        raise HTTPException(status_code=410, detail="Export has expired")
+    if job.status != "completed" or not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=409, detail="Export is not ready")
+
+    created = _as_utc(job.completed_at) or datetime.now(UTC)
+    return FileResponse(
+        job.file_path,
+        media_type="application/zip",
+        filename=f"made4founders_export_{created.strftime('%Y%m%d_%H%M%S')}.zip"
+    )
+
+
+@router.get("/contacts")
+def export_contacts_csv(current_user: User = Depends(get_current_user)):
+    """Export contacts as CSV."""
     columns = [
         "name", "email", "secondary_email", "phone", "mobile_phone",
         "company", "title", "city", "state", "country",
         "linkedin_url", "twitter_handle", "tags", "notes", "created_at"
     ]
-
-    data = [model_to_dict(c) for c in contacts]
-    csv_content = create_csv(data, columns)
-
-    filename = f"contacts_{datetime.now(UTC).strftime('%Y%m%d')}.csv"
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+    org_id = current_user.organization_id
+    rows = lambda db: _org_table_rows(Contact)(db, org_id)
+    return _csv_response(rows, columns, f"contacts_{datetime.now(UTC).strftime('%Y%m%d')}.csv")
 
 
 @router.get("/deadlines")
-async def export_deadlines_csv(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def export_deadlines_csv(current_user: User = Depends(get_current_user)):
     """Export deadlines as CSV."""
-    org_id = current_user.organization_id
-    deadlines = db.query(Deadline).filter(Deadline.organization_id == org_id).all()
-
     columns = [
-        "title", "description", "due_date", "category",
+        "title", "description", "due_date", "deadline_type",
         "is_completed", "completed_at", "reminder_days", "created_at"
     ]
-
-    data = [model_to_dict(d) for d in deadlines]
-    csv_content = create_csv(data, columns)
-
-    filename = f"deadlines_{datetime.now(UTC).strftime('%Y%m%d')}.csv"
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+    org_id = current_user.organization_id
+    rows = lambda db: _org_table_rows(Deadline)(db, org_id)
+    return _csv_response(rows, columns, f"deadlines_{datetime.now(UTC).strftime('%Y%m%d')}.csv")
 
 
 @router.get("/tasks")
-async def export_tasks_csv(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def export_tasks_csv(current_user: User = Depends(get_current_user)):
     """Export tasks as CSV."""
-    org_id = current_user.organization_id
-
-    # Get tasks through boards -> columns
-    boards = db.query(TaskBoard).filter(TaskBoard.organization_id == org_id).all()
-    tasks_data = []
-
-    for board in boards:
-        columns = db.query(TaskColumn).filter(TaskColumn.board_id == board.id).all()
-        for column in columns:
-            tasks = db.query(Task).filter(Task.column_id == column.id).all()
-            for task in tasks:
-                tasks_data.append({
-                    "board": board.name,
-                    "column": column.name,
-                    "title": task.title,
-                    "description": task.description,
-                    "status": task.status,
-                    "priority": task.priority,
-                    "due_date": task.due_date.isoformat() if task.due_date else None,
-                    "estimated_hours": task.estimated_hours,
-                    "actual_hours": task.actual_hours,
-                    "created_at": task.created_at.isoformat() if task.created_at else None,
-                })
-
     columns = [
         "board", "column", "title", "description", "status",
-        "priority", "due_date", "estimated_hours", "actual_hours", "created_at"
+        "priority", "due_date", "estimated_minutes", "completed_at", "created_at"
     ]
-
-    csv_content = create_csv(tasks_data, columns)
-
-    filename = f"tasks_{datetime.now(UTC).strftime('%Y%m%d')}.csv"
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    org_id = current_user.organization_id
+    rows = lambda db: (
+        {**row, "board": row["board_name"], "column": row["column_name"]}
+        for row in _task_rows(db, org_id)
     )
+    return _csv_response(rows, columns, f"tasks_{datetime.now(UTC).strftime('%Y%m%d')}.csv")
 
 
 @router.get("/metrics")
-async def export_metrics_csv(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def export_metrics_csv(current_user: User = Depends(get_current_user)):
     """Export metrics as CSV."""
-    org_id = current_user.organization_id
-    metrics = db.query(Metric).filter(Metric.organization_id == org_id).all()
-
     columns = [
         "name", "category", "value", "unit", "target",
         "trend", "frequency", "last_updated", "created_at"
     ]
-
-    data = [model_to_dict(m) for m in metrics]
-    csv_content = create_csv(data, columns)
-
-    filename = f"metrics_{datetime.now(UTC).strftime('%Y%m%d')}.csv"
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+    org_id = current_user.organization_id
+    rows = lambda db: _org_table_rows(Metric)(db, org_id)
+    return _csv_response(rows, columns, f"metrics_{datetime.now(UTC).strftime('%Y%m%d')}.csv")
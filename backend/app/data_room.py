@@ -8,16 +8,22 @@ Features:
 - Integration with shareholders
 """
 
+import os
+import re
 import secrets
+import zipfile
 from datetime import datetime, UTC, UTC
-from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
+from typing import Optional, List, Iterator, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 
 from .database import get_db
 from .auth import get_current_user
-from .security import pwd_context
+from .security import pwd_context, verify_password
+from .data_room_buffer import data_room_access_buffer, consume_link_access
+from .zip_stream import ZipStream
 from .models import (
     User, Document, Shareholder,
     DataRoomFolder, DataRoomDocument, ShareableLink, DataRoomAccess
@@ -31,6 +37,88 @@ from .schemas import (
 
 router = APIRouter(prefix="/api/data-room", tags=["Data Room"])
 
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+
+# Read size for copying files into a streamed ZIP archive
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Visibilities a shareable link may expose
+SHARED_VISIBILITIES = ["internal", "investors"]
+
+
+def _resolve_upload_path(file_path: Optional[str]) -> Optional[str]:
+    """Resolve a stored document path inside UPLOAD_DIR, or None if unsafe/missing."""
+    if not file_path:
+        return None
+    storage_name = os.path.basename(file_path)
+    if not storage_name or ".." in storage_name:
+        return None
+    full_path = os.path.join(UPLOAD_DIR, storage_name)
+    real_upload_dir = os.path.realpath(UPLOAD_DIR)
+    if not os.path.realpath(full_path).startswith(real_upload_dir + os.sep):
+        return None
+    if not os.path.isfile(full_path):
+        return None
+    return full_path
+
+
+def _zip_entries(docs: List[DataRoomDocument]) -> List[Tuple[str, str]]:
+    """Build (archive name, file path) pairs, skipping missing files and de-duplicating names."""
+    entries = []
+    used_names = set()
+    for doc in docs:
+        document = doc.document
+        if not document:
+            continue
+        path = _resolve_upload_path(document.file_path)
+        if not path:
+            continue
+
+        name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", doc.display_name or document.name) or os.path.basename(path)
+        base, ext = os.path.splitext(name)
+        counter = 2
+        while name in used_names:
+            name = f"{base} ({counter}){ext}"
+            counter += 1
+        used_names.add(name)
+        entries.append((name, path))
+    return entries
+
+
+def _stream_zip(entries: List[Tuple[str, str]]) -> Iterator[bytes]:
+    """Yield a ZIP archive of the given files without buffering it in memory or on disk."""
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for arcname, path in entries:
+            with open(path, "rb") as src, archive.open(arcname, mode="w", force_zip64=True) as dest:
+                while True:
+                    chunk = src.read(ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _zip_response(entries: List[Tuple[str, str]], folder_name: str) -> StreamingResponse:
+    filename = re.sub(r'[^A-Za-z0-9._-]+', "_", folder_name).strip("_") or "data-room"
+    return StreamingResponse(
+        _stream_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.zip"',
+            "X-Content-Type-Options": "nosniff",
+            "Cache-Control": "no-store"
+        }
+    )
+
 
 # ============================================
 # FOLDER ENDPOINTS
@@ -242,6 +330,59 @@ def get_folder(
     }
 
 
+@router.get("/folders/{folder_id}/download")
+def download_folder(
+    folder_id: int,
+    visibility: Optional[str] = Query(None),
+    request: Request = None,
+    x_verify_password: str = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download every document in a folder as a streamed ZIP archive.
+
+    Sensitive documents are only included when X-Verify-Password matches
+    the current user's password, the same rule as single downloads.
+    """
+    folder = db.query(DataRoomFolder).filter(
+        DataRoomFolder.id == folder_id,
+        DataRoomFolder.organization_id == current_user.organization_id
+    ).first()
+
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    query = db.query(DataRoomDocument).options(
+        joinedload(DataRoomDocument.document)
+    ).filter(
+        DataRoomDocument.folder_id == folder_id,
+        DataRoomDocument.organization_id == current_user.organization_id,
+        DataRoomDocument.is_active == True
+    )
+    if visibility:
+        query = query.filter(DataRoomDocument.visibility == visibility)
+    docs = query.order_by(DataRoomDocument.display_order).all()
+
+    include_sensitive = bool(x_verify_password) and verify_password(x_verify_password, current_user.hashed_password)
+    docs = [doc for doc in docs if include_sensitive or not (doc.document and doc.document.is_sensitive)]
+
+    entries = _zip_entries(docs)
+    if not entries:
+        raise HTTPException(status_code=404, detail="No downloadable files in this folder")
+
+    data_room_access_buffer.record_access(
+        organization_id=current_user.organization_id,
+        folder_id=folder.id,
+        user_id=current_user.id,
+        access_type="download",
+        ip_address=request.client.host if request and request.client else None,
+        user_agent=request.headers.get("user-agent") if request else None
+    )
+
+    return _zip_response(entries, folder.name)
+
+
 @router.patch("/folders/{folder_id}", response_model=DataRoomFolderResponse)
 def update_folder(
     folder_id: int,
@@ -764,7 +905,7 @@ def get_access_logs(
             "user_agent": log.user_agent,
             "created_at": log.created_at,
             "folder_name": folder.name if folder else None,
-            "document_name": doc.display_name or (doc.document.name if doc and doc.document else None),
+            "document_name": (doc.display_name or (doc.document.name if doc.document else None)) if doc else None,
             "user_email": user.email if user else None,
             "shareholder_name": shareholder.name if shareholder else None,
         })
@@ -830,7 +971,7 @@ def get_data_room_stats(
             "user_agent": log.user_agent,
             "created_at": log.created_at,
             "folder_name": folder.name if folder else None,
-            "document_name": doc.display_name or (doc.document.name if doc and doc.document else None),
+            "document_name": (doc.display_name or (doc.document.name if doc.document else None)) if doc else None,
             "user_email": user.email if user else None,
             "shareholder_name": shareholder.name if shareholder else None,
         })
@@ -891,21 +1032,21 @@ def access_shared_content(
         if not pwd_context.verify(password, link.password_hash):
             raise HTTPException(status_code=401, detail="Invalid password")
 
-    # Log access
-    access_log = DataRoomAccess(
+    # Count the access (atomic when the link has a limit)
+    if not consume_link_access(db, link):
+        raise HTTPException(status_code=410, detail="Link access limit reached")
+
+    # Log access (written behind by the access buffer)
+    data_room_access_buffer.record_access(
         organization_id=link.organization_id,
         folder_id=link.folder_id,
         document_id=link.document_id,
         shareable_link_id=link.id,
         shareholder_id=link.shareholder_id,
         access_type="view",
-        ip_address=request.client.host if request else None,
+        ip_address=request.client.host if request and request.client else None,
         user_agent=request.headers.get("user-agent") if request else None
     )
-    db.add(access_log)
-
-    # Increment access count
-    link.current_accesses += 1
 
     documents = []
     folder_name = None
@@ -918,12 +1059,12 @@ def access_shared_content(
         docs = db.query(DataRoomDocument).filter(
             DataRoomDocument.folder_id == link.folder_id,
             DataRoomDocument.is_active == True,
-            DataRoomDocument.visibility.in_(["internal", "investors"])
+            DataRoomDocument.visibility.in_(SHARED_VISIBILITIES)
         ).all()
 
+        data_room_access_buffer.increment_views([doc.id for doc in docs])
         for doc in docs:
             document = doc.document
-            doc.view_count += 1
             documents.append({
                 "id": doc.id,
                 "name": doc.display_name or document.name,
@@ -935,7 +1076,7 @@ def access_shared_content(
         doc = link.data_room_document
         if doc:
             document = doc.document
-            doc.view_count += 1
+            data_room_access_buffer.increment_views([doc.id])
             documents.append({
                 "id": doc.id,
                 "name": doc.display_name or document.name,
@@ -964,9 +1105,6 @@ def download_shared_document(
 ):
     """Download a document via shareable link."""
     from fastapi.responses import FileResponse
-    import os
-
-    UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 
     link = db.query(ShareableLink).filter(
         ShareableLink.token == token
@@ -1015,23 +1153,22 @@ def download_shared_document(
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found on server")
 
-    # Log download
-    access_log = DataRoomAccess(
+    if not consume_link_access(db, link):
+        raise HTTPException(status_code=410, detail="Link access limit reached")
+    db.commit()
+
+    # Log download and update stats (written behind by the access buffer)
+    data_room_access_buffer.record_access(
         organization_id=link.organization_id,
         folder_id=doc.folder_id,
         document_id=doc.id,
         shareable_link_id=link.id,
         shareholder_id=link.shareholder_id,
         access_type="download",
-        ip_address=request.client.host if request else None,
+        ip_address=request.client.host if request and request.client else None,
         user_agent=request.headers.get("user-agent") if request else None
     )
-    db.add(access_log)
-
-    # Update stats
-    doc.download_count += 1
-    link.current_accesses += 1
-    db.commit()
+    data_room_access_buffer.increment_download(doc.id)
 
     return FileResponse(
         path=file_path,
@@ -1043,3 +1180,67 @@ def download_shared_document(
             "Cache-Control": "no-store"
         }
     )
+
+
+@public_router.get("/{token}/download-all")
+def download_shared_folder(
+    token: str,
+    password: Optional[str] = Query(None),
+    request: Request = None,
+    db: Session = Depends(get_db)
+):
+    """Download every shared document in a folder link as a streamed ZIP archive."""
+    link = db.query(ShareableLink).filter(
+        ShareableLink.token == token
+    ).first()
+
+    if not link:
+        raise HTTPException(status_code=404, detail="Link not found")
+
+    if not link.is_active:
+        raise HTTPException(status_code=410, detail="Link has been revoked")
+
+    if link.expires_at and link.expires_at < datetime.now(UTC):
+        raise HTTPException(status_code=410, detail="Link has expired")
+
+    if link.access_limit and link.current_accesses >= link.access_limit:
+        raise HTTPException(status_code=410, detail="Link access limit reached")
+
+    if link.password_hash:
+        if not password or not pwd_context.verify(password, link.password_hash):
+            raise HTTPException(status_code=401, detail="Invalid password")
+
+    if not link.folder_id:
+        raise HTTPException(status_code=400, detail="Link does not share a folder")
+
+    docs = db.query(DataRoomDocument).options(
+        joinedload(DataRoomDocument.document)
+    ).filter(
+        DataRoomDocument.folder_id == link.folder_id,
+        DataRoomDocument.organization_id == link.organization_id,
+        DataRoomDocument.is_active == True,
+        DataRoomDocument.visibility.in_(SHARED_VISIBILITIES)
+    ).order_by(DataRoomDocument.display_order).all()
+
+    entries = _zip_entries(docs)
+    if not entries:
+        raise HTTPException(status_code=404, detail="No downloadable files in this folder")
+
+    if not consume_link_access(db, link):
+        raise HTTPException(status_code=410, detail="Link access limit reached")
+    db.commit()
+
+    # One aggregated log entry for the whole archive
+    data_room_access_buffer.record_access(
+        organization_id=link.organization_id,
+        folder_id=link.folder_id,
+        shareable_link_id=link.id,
+        shareholder_id=link.shareholder_id,
+        access_type="download",
+        ip_address=request.client.host if request and request.client else None,
+        user_agent=request.headers.get("user-agent") if request else None
+    )
+    for doc in docs:
+        data_room_access_buffer.increment_download(doc.id)
+
+    return _zip_response(entries, link.folder.name)
@@ -0,0 +1,312 @@
+"""
+Write-behind buffer for data room access tracking.
+
+Public data room views used to insert a DataRoomAccess row and bump
+view/download counters on every document inside the request transaction.
+On SQLite that serializes every investor hitting a hot link behind the
+single writer. This module keeps those writes in memory and flushes them
+periodically (and on shutdown):
+
+- Access log rows are inserted in one batch per flush
+- Counter increments are coalesced into one UPDATE per row per flush
+
+Access limits are NOT buffered: links with an access_limit are consumed
+with an atomic conditional UPDATE inside the request (see consume_link_access),
+so the limit stays exact under concurrency.
+"""
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import Dict, List, Optional
+
+from sqlalchemy import update, bindparam, insert
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import DataRoomAccess, DataRoomDocument, ShareableLink
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("DATA_ROOM_FLUSH_INTERVAL", "5"))
+MAX_PENDING_ACCESSES = int(os.getenv("DATA_ROOM_MAX_PENDING", "1000"))
+# Failed batch flushes before falling back to row-by-row writes
+MAX_FLUSH_ATTEMPTS = 2
+
+
+def consume_link_access(db: Session, link: ShareableLink) -> bool:
+    """
+    Count one access against a shareable link.
+
+    Links with an access_limit are incremented immediately with a single
+    conditional UPDATE, so two concurrent requests can never both take the
+    last remaining access. Unlimited links are only counted, so their
+    increment goes through the write-behind buffer.
+
+    Returns False if the access limit has been reached.
+    """
+    if not link.access_limit:
+        data_room_access_buffer.increment_link(link.id)
+        return True
+
+    result = db.execute(
+        update(ShareableLink)
+        .where(
+            ShareableLink.id == link.id,
+            ShareableLink.current_accesses < ShareableLink.access_limit,
+        )
+        .values(current_accesses=ShareableLink.current_accesses + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+class DataRoomAccessBuffer:
+    """
+    In-process buffer of pending access logs and counter increments.
+    Flushed by a single background thread every FLUSH_INTERVAL_SECONDS,
+    early when the pending log grows past MAX_PENDING_ACCESSES, and on
+    shutdown.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS, max_pending: int = MAX_PENDING_ACCESSES):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._accesses: List[dict] = []
+        self._doc_views: Dict[int, int] = defaultdict(int)
+        self._doc_downloads: Dict[int, int] = defaultdict(int)
+        self._link_accesses: Dict[int, int] = defaultdict(int)
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._failed_flushes = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- Recording ----------
+
+    def record_access(
+        self,
+        organization_id: int,
+        access_type: str,
+        folder_id: Optional[int] = None,
+        document_id: Optional[int] = None,
+        shareable_link_id: Optional[int] = None,
+        shareholder_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> None:
+        """Queue a DataRoomAccess row for the next flush."""
+        row = {
+            "organization_id": organization_id,
+            "folder_id": folder_id,
+            "document_id": document_id,
+            "shareable_link_id": shareable_link_id,
+            "shareholder_id": shareholder_id,
+            "user_id": user_id,
+            "access_type": access_type,
+            "ip_address": ip_address[:45] if ip_address else None,
+            "user_agent": user_agent,
+            "created_at": datetime.now(UTC),
+        }
+        with self._lock:
+            self._accesses.append(row)
+            should_flush = len(self._accesses) >= self._max_pending
+        self._ensure_started()
+        if should_flush:
+            self._request_flush()
+
+    def increment_views(self, doc_ids: List[int]) -> None:
+        """Queue a view_count increment for each data room document."""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._doc_views[doc_id] += 1
+        self._ensure_started()
+
+    def increment_download(self, doc_id: int) -> None:
+        """Queue a download_count increment for a data room document."""
+        with self._lock:
+            self._doc_downloads[doc_id] += 1
+        self._ensure_started()
+
+    def increment_link(self, link_id: int) -> None:
+        """Queue a current_accesses increment for an unlimited link."""
+        with self._lock:
+            self._link_accesses[link_id] += 1
+        self._ensure_started()
+
+    # ---------- Flushing ----------
+
+    def _drain(self):
+        with self._lock:
+            accesses = self._accesses
+            doc_views = dict(self._doc_views)
+            doc_downloads = dict(self._doc_downloads)
+            link_accesses = dict(self._link_accesses)
+            self._accesses = []
+            self._doc_views.clear()
+            self._doc_downloads.clear()
+            self._link_accesses.clear()
+        return accesses, doc_views, doc_downloads, link_accesses
+
+    def _restore(self, accesses, doc_views, doc_downloads, link_accesses) -> None:
+        """Put drained work back after a failed flush so nothing is lost."""
+        with self._lock:
+            self._accesses[:0] = accesses
+            for doc_id, n in doc_views.items():
+                self._doc_views[doc_id] += n
+            for doc_id, n in doc_downloads.items():
+                self._doc_downloads[doc_id] += n
+            for link_id, n in link_accesses.items():
+                self._link_accesses[link_id] += n
+
+    @staticmethod
+    def _write(db: Session, accesses, doc_views, doc_downloads, link_accesses) -> None:
+        if accesses:
+            db.execute(insert(DataRoomAccess), accesses)
+
+        doc_ids = set(doc_views) | set(doc_downloads)
+        if doc_ids:
+            docs_table = DataRoomDocument.__table__
+            db.execute(
+                update(docs_table)
+                .where(docs_table.c.id == bindparam("b_id"))
+                .values(
+                    view_count=docs_table.c.view_count + bindparam("b_views"),
+                    download_count=docs_table.c.download_count + bindparam("b_downloads"),
+                ),
+                [
+                    {
+                        "b_id": doc_id,
+                        "b_views": doc_views.get(doc_id, 0),
+                        "b_downloads": doc_downloads.get(doc_id, 0),
+                    }
+                    for doc_id in doc_ids
+                ],
+            )
+
+        if link_accesses:
+            links_table = ShareableLink.__table__
+            db.execute(
+                update(links_table)
+                .where(links_table.c.id == bindparam("b_id"))
+                .values(current_accesses=links_table.c.current_accesses + bindparam("b_count")),
+                [{"b_id": link_id, "b_count": n} for link_id, n in link_accesses.items()],
+            )
+
+    def _write_individually(self, db: Session, accesses, doc_views, doc_downloads, link_accesses) -> int:
+        """
+        Write each row and counter in its own savepoint, dropping (and
+        logging) the ones that fail, so one bad row can't block the buffer.
+        """
+        pieces = [("access", [row], {}, {}, {}) for row in accesses]
+        pieces += [
+            ("document counter", [], {doc_id: doc_views.get(doc_id, 0)}, {doc_id: doc_downloads.get(doc_id, 0)}, {})
+            for doc_id in set(doc_views) | set(doc_downloads)
+        ]
+        pieces += [("link counter", [], {}, {}, {link_id: n}) for link_id, n in link_accesses.items()]
+
+        written = 0
+        for kind, *work in pieces:
+            try:
+                with db.begin_nested():
+                    self._write(db, *work)
+            except Exception as e:
+                logger.error(f"Dropping data room {kind} that failed to write: {work}: {e}")
+                continue
+            written += len(work[0])
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Dropping {len(pieces)} data room writes after repeated flush failures: {e}")
+            return 0
+        return written
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        Write all pending work to the database in one transaction.
+
+        If the batch fails it is put back and retried on the next flush;
+        if it fails again, rows are written one by one and those that
+        still fail are dropped.
+
+        Args:
+            db: Session to use (a new one is opened if not given)
+
+        Returns:
+            Number of access log rows written
+        """
+        with self._flush_lock:
+            accesses, doc_views, doc_downloads, link_accesses = self._drain()
+            if not (accesses or doc_views or doc_downloads or link_accesses):
+                return 0
+
+            owns_session = db is None
+            if owns_session:
+                db = SessionLocal()
+            try:
+                self._write(db, accesses, doc_views, doc_downloads, link_accesses)
+                db.commit()
+                self._failed_flushes = 0
+                return len(accesses)
+            except Exception as e:
+                db.rollback()
+                self._failed_flushes += 1
+                if self._failed_flushes < MAX_FLUSH_ATTEMPTS:
+                    self._restore(accesses, doc_views, doc_downloads, link_accesses)
+                    logger.error(f"Data room access flush failed, will retry: {e}")
+                    return 0
+                logger.error(f"Data room access flush failed again, writing rows individually: {e}")
+                self._failed_flushes = 0
+                return self._write_individually(db, accesses, doc_views, doc_downloads, link_accesses)
+            finally:
+                if owns_session:
+                    db.close()
+
+    def _request_flush(self) -> None:
+        """Wake the flusher thread early (the pending log is full)."""
+        self._wake_event.set()
+
+    # ---------- Lifecycle ----------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._wake_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="data-room-access-flush", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake_event.wait(self._flush_interval)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                return
+            self.flush()
+
+    def stop(self, db: Optional[Session] = None) -> None:
+        """Stop the background thread and flush anything still pending."""
+        self._stop_event.set()
+        self._wake_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self._flush_interval + 1)
+        self._thread = None
+        self.flush(db)
+
+    def clear(self) -> None:
+        """Drop all pending work (for testing)."""
+        self._drain()
+
+
+# Global buffer instance
+data_room_access_buffer = DataRoomAccessBuffer()
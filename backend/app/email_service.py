@@ -7,8 +7,10 @@ Features:
 - Login notifications (future)
 """
 import os
+import asyncio
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -19,6 +21,9 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 APP_NAME = "Made4Founders"
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 
+# Stands in for "Hi <name>" in bodies rendered once for many recipients
+GREETING_PLACEHOLDER = "{{greeting}}"
+
 # Lazy import boto3 to handle missing dependency gracefully
 _ses_client = None
 
@@ -168,6 +173,29 @@ def _send_email(to: str, subject: str, html: str) -> bool:
         return False
 
 
+async def send_bulk(messages: List[Tuple[str, str, str]], concurrency: int = 8) -> List[bool]:
+    """
+    Send many emails through a bounded thread pool.
+
+    boto3 calls block, so they run in worker threads instead of on the
+    event loop, at most `concurrency` at a time.
+
+    Args:
+        messages: (to, subject, html) tuples
+
+    Returns:
+        Success flag per message, in order
+    """
+    if not messages:
+        return []
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(pool, _send_email, to, subject, html)
+            for to, subject, html in messages
+        )))
+
+
 async def send_verification_email(email: str, token: str, name: Optional[str] = None) -> bool:
     """
     Send email verification link to user.
@@ -270,29 +298,25 @@ async def send_password_reset_email(email: str, token: str, name: Optional[str]
     return success
 
 
-async def send_deadline_reminder_email(
-    email: str,
-    name: Optional[str] = None,
-    deadlines: list = None,
-    reminder_type: str = "today"  # "today", "tomorrow", "week"
-) -> bool:
+def personalize(html: str, name: Optional[str] = None) -> str:
+    """Fill the greeting of a body rendered with GREETING_PLACEHOLDER."""
+    return html.replace(GREETING_PLACEHOLDER, f"Hi {name}" if name else "Hi there")
+
+
+def render_deadline_reminder_email(deadlines: list, reminder_type: str = "today") -> Tuple[str, str]:
     """
-    Send deadline reminder email.
+    Render a deadline reminder without the recipient's name.
+
+    The body is the same for everyone in an organization, so schedulers
+    render it once and call personalize() per recipient.
 
     Args:
-        email: User's email address
-        name: User's name (optional)
         deadlines: List of deadline dicts with 'title', 'due_date', 'category'
         reminder_type: Type of reminder (today, tomorrow, week)
 
     Returns:
-        True if email sent successfully, False otherwise
+        (subject, html) with GREETING_PLACEHOLDER in the html
     """
-    if not deadlines:
-        return True  # Nothing to send
-
-    greeting = f"Hi {name}," if name else "Hi there,"
-
     # Determine subject and intro text
     if reminder_type == "today":
         subject = f"{len(deadlines)} deadline(s) due TODAY - {APP_NAME}"
@@ -327,7 +351,7 @@ async def send_deadline_reminder_email(
     Deadline Reminder
 </h1>
 <p style="margin: 0 0 16px; font-size: 16px; color: #9ca3af; line-height: 1.6;">
-    {greeting.replace(',', '')} {intro}
+    {GREETING_PLACEHOLDER} {intro}
 </p>
 <table style="width: 100%; border-collapse: collapse; background-color: #13151a; border-radius: 8px; overflow: hidden; margin-bottom: 16px;">
     {deadline_items}
@@ -335,35 +359,52 @@ async def send_deadline_reminder_email(
 {_button_html("View All Deadlines", f"{FRONTEND_URL}/app/deadlines")}
 """
 
-    html_content = _base_html_template(content, f"{len(deadlines)} deadline(s) need your attention")
-    success = _send_email(email, subject, html_content)
-    if success:
-        logger.info(f"Deadline reminder ({reminder_type}) sent to {email}")
-    else:
-        logger.error(f"Failed to send deadline reminder ({reminder_type}) to {email}")
-    return success
+    return subject, _base_html_template(content, f"{len(deadlines)} deadline(s) need your attention")
 
 
-async def send_weekly_digest_email(
+async def send_deadline_reminder_email(
     email: str,
     name: Optional[str] = None,
-    stats: dict = None
+    deadlines: list = None,
+    reminder_type: str = "today"  # "today", "tomorrow", "week"
 ) -> bool:
     """
-    Send weekly digest email with business summary.
+    Send deadline reminder email.
 
     Args:
         email: User's email address
         name: User's name (optional)
-        stats: Dict with 'tasks_completed', 'deadlines_met', 'upcoming_deadlines', etc.
+        deadlines: List of deadline dicts with 'title', 'due_date', 'category'
+        reminder_type: Type of reminder (today, tomorrow, week)
 
     Returns:
         True if email sent successfully, False otherwise
     """
+    if not deadlines:
+        return True  # Nothing to send
+
+    subject, html_content = render_deadline_reminder_email(deadlines, reminder_type)
+    success = _send_email(email, subject, personalize(html_content, name))
+    if success:
+        logger.info(f"Deadline reminder ({reminder_type}) sent to {email}")
+    else:
+        logger.error(f"Failed to send deadline reminder ({reminder_type}) to {email}")
+    return success
+
+
+def render_weekly_digest_email(stats: dict = None) -> Tuple[str, str]:
+    """
+    Render a weekly digest without the recipient's name.
+
+    Args:
+        stats: Dict with 'tasks_completed', 'deadlines_met', 'upcoming_deadlines', etc.
+
+    Returns:
+        (subject, html) with GREETING_PLACEHOLDER in the html
+    """
     if not stats:
         stats = {}
 
-    greeting = f"Hi {name}," if name else "Hi there,"
     tasks_completed = stats.get('tasks_completed', 0)
     deadlines_met = stats.get('deadlines_met', 0)
     upcoming_deadlines = stats.get('upcoming_deadlines', 0)
@@ -374,7 +415,7 @@ async def send_weekly_digest_email(
     Your Weekly Summary
 </h1>
 <p style="margin: 0 0 24px; font-size: 16px; color: #9ca3af; line-height: 1.6;">
-    {greeting.replace(',', '')} Here's how your week went.
+    {GREETING_PLACEHOLDER} Here's how your week went.
 </p>
 
 <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="margin-bottom: 24px;">
@@ -407,8 +448,27 @@ async def send_weekly_digest_email(
 """
 
     html_content = _base_html_template(content, f"Your weekly summary: {tasks_completed} tasks completed")
-    subject = f"Your {APP_NAME} Weekly Summary"
-    success = _send_email(email, subject, html_content)
+    return f"Your {APP_NAME} Weekly Summary", html_content
+
+
+async def send_weekly_digest_email(
+    email: str,
+    name: Optional[str] = None,
+    stats: dict = None
+) -> bool:
+    """
+    Send weekly digest email with business summary.
+
+    Args:
+        email: User's email address
+        name: User's name (optional)
+        stats: Dict with 'tasks_completed', 'deadlines_met', 'upcoming_deadlines', etc.
+
+    Returns:
+        True if email sent successfully, False otherwise
+    """
+    subject, html_content = render_weekly_digest_email(stats)
+    success = _send_email(email, subject, personalize(html_content, name))
     if success:
         logger.info(f"Weekly digest sent to {email}")
     else:
@@ -0,0 +1,392 @@
+"""
+Gamification event pipeline.
+
+User actions (task completed, document uploaded, quest claimed, ...) emit
+typed events into a GamificationPipeline. Nothing touches the database
+until flush(), which then:
+
+1. Loads every affected business in one query and applies XP, level and
+   streak changes once per business
+2. Builds an index of open quests, locked achievements and active
+   challenge participations for those businesses (one query each), keyed
+   by (business_id, action_type)
+3. Applies all progress updates from the index and commits once
+
+A request that awards XP and advances quests, achievements and challenges
+therefore costs a fixed number of queries and a single commit, however
+many events it emits.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, date, UTC
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, contains_eager
+
+from .models import (
+    User, Business, Quest, BusinessQuest, Achievement, BusinessAchievement,
+    Challenge, ChallengeParticipant
+)
+
+
+# Challenge type to action mapping (for progress tracking)
+CHALLENGE_ACTION_MAP = {
+    "task_sprint": "task_complete",
+    "xp_race": "xp_earned",
+    "streak_showdown": "streak_days",
+    "quest_champion": "quest_complete",
+    "checklist_blitz": "checklist_complete",
+    "document_dash": "document_upload",
+    "contact_collector": "contact_create",
+}
+
+# Titles that can be earned
+CHALLENGE_TITLES = {
+    "first_win": {"name": "Challenger", "description": "Win your first challenge", "wins_required": 1},
+    "five_wins": {"name": "Competitor", "description": "Win 5 challenges", "wins_required": 5},
+    "ten_wins": {"name": "Champion", "description": "Win 10 challenges", "wins_required": 10},
+    "twenty_five_wins": {"name": "Grand Champion", "description": "Win 25 challenges", "wins_required": 25},
+    "streak_3": {"name": "Hot Streak", "description": "Win 3 challenges in a row", "streak_required": 3},
+    "streak_5": {"name": "Unstoppable", "description": "Win 5 challenges in a row", "streak_required": 5},
+    "streak_10": {"name": "Legendary", "description": "Win 10 challenges in a row", "streak_required": 10},
+}
+
+def xp_for_level(level: int) -> int:
+    """XP needed to leave a level (500 * level^1.5)."""
+    return int(500 * (level ** 1.5))
+
+
+@dataclass
+class GamificationEvent:
+    """A single gamified action performed for a business."""
+    business_id: int
+    action_type: Optional[str] = None  # e.g. task_complete; None for a plain XP award
+    xp: int = 0
+    increment: int = 1
+
+
+class GamificationPipeline:
+    """
+    Collects gamification events for one request and applies them in a
+    single flush.
+
+    Usage:
+        events = GamificationPipeline(db, current_user.organization_id)
+        events.emit(business_id, "task_complete", xp=15)
+        events.flush()
+    """
+
+    def __init__(self, db: Session, organization_id: int, user: Optional[User] = None):
+        self.db = db
+        self.organization_id = organization_id
+        self.user = user
+        self._events: List[GamificationEvent] = []
+
+    def emit(self, business_id: Optional[int], action_type: Optional[str] = None, xp: int = 0, increment: int = 1) -> None:
+        """Queue an action (and optional XP award) for a business."""
+        if not business_id:
+            return
+        self._events.append(GamificationEvent(business_id, action_type, xp, increment))
+
+    def award_xp(self, business_id: Optional[int], xp: int) -> None:
+        """Queue a plain XP award."""
+        if xp > 0:
+            self.emit(business_id, xp=xp)
+
+    def flush(self, commit: bool = True) -> Dict[int, dict]:
+        """
+        Apply all queued events.
+
+        Args:
+            commit: Commit when done. Pass False to let the caller's own
+                commit cover the changes.
+
+        Returns:
+            XP stats per business that was awarded XP (same shape as the
+            old _award_xp result). Businesses with gamification disabled
+            are left out.
+        """
+        events, self._events = self._events, []
+        if not events:
+            return {}
+
+        business_ids = {e.business_id for e in events}
+        businesses = {
+            b.id: b for b in self.db.query(Business).filter(
+                Business.id.in_(business_ids),
+                Business.organization_id == self.organization_id
+            ).all()
+        }
+
+        # Sum per (business, action) and per business XP
+        counts: Dict[Tuple[int, str], int] = defaultdict(int)
+        xp_totals: Dict[int, int] = defaultdict(int)
+        for e in events:
+            if e.business_id not in businesses:
+                continue
+            if e.action_type:
+                counts[(e.business_id, e.action_type)] += e.increment
+            if e.xp > 0:
+                xp_totals[e.business_id] += e.xp
+
+        absolutes: Dict[Tuple[int, str], int] = {}
+        results: Dict[int, dict] = {}
+        user_enabled = not self.user or self.user.gamification_enabled
+        for business_id, xp_amount in xp_totals.items():
+            business = businesses[business_id]
+            if not business.gamification_enabled or not user_enabled:
+                continue
+            self._apply_xp(business, xp_amount)
+            counts[(business_id, "xp_earned")] += xp_amount
+            absolutes[(business_id, "xp_total")] = business.xp
+            absolutes[(business_id, "level_reach")] = business.level
+            absolutes[(business_id, "streak_days")] = business.current_streak
+            results[business_id] = {
+                "xp": business.xp,
+                "level": business.level,
+                "current_streak": business.current_streak,
+                "longest_streak": business.longest_streak,
+                "xp_awarded": xp_amount
+            }
+
+        if counts or absolutes:
+            self._apply_progress(businesses, counts, absolutes)
+
+        if commit:
+            self.db.commit()
+        return results
+
+    # ---------- XP ----------
+
+    @staticmethod
+    def _apply_xp(business: Business, xp_amount: int) -> None:
+        business.xp += xp_amount
+
+        while business.xp >= xp_for_level(business.level):
+            business.level += 1
+
+        today = date.today()
+        if business.last_activity_date:
+            days_diff = (today - business.last_activity_date).days
+            if days_diff == 1:
+                business.current_streak += 1
+                if business.current_streak > business.longest_streak:
+                    business.longest_streak = business.current_streak
+            elif days_diff > 1:
+                business.current_streak = 1
+        else:
+            business.current_streak = 1
+
+        business.last_activity_date = today
+
+    # ---------- Progress ----------
+
+    def _apply_progress(
+        self,
+        businesses: Dict[int, Business],
+        counts: Dict[Tuple[int, str], int],
+        absolutes: Dict[Tuple[int, str], int]
+    ) -> None:
+        keys = set(counts) | set(absolutes)
+        business_ids = {business_id for business_id, _ in keys}
+        action_types = {action for _, action in keys}
+        now = datetime.now(UTC)
+
+        def progress_for(business_id: int, action_type: str, current: int) -> Optional[int]:
+            key = (business_id, action_type)
+            if key in absolutes:
+                return absolutes[key]
+            if key in counts:
+                return current + counts[key]
+            return None
+
+        # Open quests: one query for all businesses and actions
+        quests = self.db.query(BusinessQuest).join(BusinessQuest.quest).options(
+            contains_eager(BusinessQuest.quest)
+        ).filter(
+            BusinessQuest.business_id.in_(business_ids),
+            BusinessQuest.is_completed == False,
+            Quest.action_type.in_(action_types),
+            (BusinessQuest.expires_at == None) | (BusinessQuest.expires_at > now)
+        ).all()
+        for bq in quests:
+            # Quests only count actions, never absolute values
+            increment = counts.get((bq.business_id, bq.quest.action_type))
+            if not increment:
+                continue
+            bq.current_count += increment
+            if bq.current_count >= bq.target_count:
+                bq.is_completed = True
+                bq.completed_at = now
+
+        # Locked achievements
+        achievements = self.db.query(BusinessAchievement).join(BusinessAchievement.achievement).options(
+            contains_eager(BusinessAchievement.achievement)
+        ).filter(
+            BusinessAchievement.business_id.in_(business_ids),
+            BusinessAchievement.is_unlocked == False,
+            Achievement.requirement_type.in_(action_types)
+        ).all()
+        for ba in achievements:
+            value = progress_for(ba.business_id, ba.achievement.requirement_type, ba.current_count)
+            if value is None:
+                continue
+            ba.current_count = value
+            if ba.current_count >= ba.target_count:
+                ba.is_unlocked = True
+                ba.unlocked_at = now
+                # Keep the leaderboard's denormalized count in step
+                business = businesses[ba.business_id]
+                business.achievements_count = (business.achievements_count or 0) + 1
+
+        # Active challenges
+        challenge_types = [t for t, action in CHALLENGE_ACTION_MAP.items() if action in action_types]
+        if not challenge_types:
+            return
+        participations = self.db.query(ChallengeParticipant).join(ChallengeParticipant.challenge).options(
+            contains_eager(ChallengeParticipant.challenge)
+        ).filter(
+            ChallengeParticipant.business_id.in_(business_ids),
+            ChallengeParticipant.has_accepted == True,
+            Challenge.status == "active",
+            Challenge.challenge_type.in_(challenge_types)
+        ).all()
+        for participation in participations:
+            challenge = participation.challenge
+            action_type = CHALLENGE_ACTION_MAP[challenge.challenge_type]
+            value = progress_for(participation.business_id, action_type, participation.current_count)
+            if value is None:
+                continue
+            participation.current_count = value
+            participation.progress = participation.current_count - participation.starting_count
+            # Apply handicap
+            participation.adjusted_progress = int(
+                participation.progress * (1 + participation.handicap_percent / 100)
+            )
+
+            # Check if target reached (if target_count set)
+            if challenge.target_count and participation.adjusted_progress >= challenge.target_count:
+                # Part of the pipeline's single commit
+                complete_challenge(self.db, challenge, participation.business_id,
+                                   commit=False, businesses=businesses)
+
+
+# ============ Challenge Completion ============
+
+def complete_challenge(
+    db: Session,
+    challenge: Challenge,
+    winner_id: int = None,
+    commit: bool = True,
+    businesses: Optional[Dict[int, Business]] = None
+):
+    """
+    Complete a challenge and determine winner.
+
+    Args:
+        commit: Commit when done. Pass False to let the caller's own
+            commit cover the changes.
+        businesses: Businesses already loaded by the caller (by id);
+            only the remaining participants are queried.
+    """
+    if challenge.status == "completed":
+        return
+
+    # Get all participants
+    participants = db.query(ChallengeParticipant).filter(
+        ChallengeParticipant.challenge_id == challenge.id,
+        ChallengeParticipant.has_accepted == True
+    ).all()
+
+    if not participants:
+        challenge.status = "cancelled"
+        if commit:
+            db.commit()
+        return
+
+    # Sort by adjusted progress (descending)
+    participants.sort(key=lambda p: p.adjusted_progress, reverse=True)
+
+    # Assign ranks
+    for rank, participant in enumerate(participants, 1):
+        participant.final_rank = rank
+
+    # Determine winner (highest adjusted progress, or provided winner_id for target-based)
+    if winner_id:
+        challenge.winner_id = winner_id
+    else:
+        if participants[0].adjusted_progress > 0:
+            # Check for tie
+            if len(participants) > 1 and participants[0].adjusted_progress == participants[1].adjusted_progress:
+                challenge.winner_id = None  # Tie
+            else:
+                challenge.winner_id = participants[0].business_id
+        else:
+            challenge.winner_id = None  # No one made progress
+
+    challenge.status = "completed"
+    challenge.completed_at = datetime.now(UTC)
+
+    # Distribute XP
+    total_wagered = sum(p.xp_wagered for p in participants)
+
+    businesses = dict(businesses or {})
+    missing = {p.business_id for p in participants} - set(businesses)
+    if missing:
+        businesses.update(
+            (b.id, b) for b in db.query(Business).filter(Business.id.in_(missing)).all()
+        )
+
+    for participant in participants:
+        business = businesses.get(participant.business_id)
+        if not business:
+            continue
+
+        if challenge.winner_id == participant.business_id:
+            # Winner gets: their wager back + opponent's wager + bonus
+            participant.xp_won = total_wagered + challenge.winner_bonus_xp
+            participant.xp_lost = 0
+            business.xp += participant.xp_won
+
+            # Update win stats
+            business.challenge_wins += 1
+            business.challenge_win_streak += 1
+            if business.challenge_win_streak > business.best_challenge_win_streak:
+                business.best_challenge_win_streak = business.challenge_win_streak
+
+            # Check for new titles
+            _check_and_award_titles(business)
+
+        elif challenge.winner_id is None:
+            # Draw - everyone gets their wager back
+            participant.xp_won = participant.xp_wagered
+            participant.xp_lost = 0
+            business.xp += participant.xp_wagered  # Return wager
+            business.challenge_draws += 1
+            business.challenge_win_streak = 0  # Reset streak on draw
+
+        else:
+            # Loser loses their wager
+            participant.xp_won = 0
+            participant.xp_lost = participant.xp_wagered
+            business.challenge_losses += 1
+            business.challenge_win_streak = 0  # Reset streak
+
+    if commit:
+        db.commit()
+
+
+def _check_and_award_titles(business: Business):
+    """Check if business earned any new titles."""
+    current_titles = list(business.titles or [])
+
+    for title_id, title_info in CHALLENGE_TITLES.items():
+        if title_id in current_titles:
+            continue
+
+        if "wins_required" in title_info and business.challenge_wins >= title_info["wins_required"]:
+            current_titles.append(title_id)
+        elif "streak_required" in title_info and business.challenge_win_streak >= title_info["streak_required"]:
+            current_titles.append(title_id)
+
+    business.titles = current_titles
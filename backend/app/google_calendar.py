@@ -16,8 +16,12 @@ from pydantic import BaseModel
 import httpx
 
 from .database import get_db
-from .models import User, GoogleCalendarConnection, Deadline, Meeting
+from .models import User, GoogleCalendarConnection, CalendarEventCache, Deadline, Meeting
 from .auth import get_current_user
+from .calendar_sync import (
+    _google_client, _as_utc, token_expires_soon, refresh_access_token,
+    pull_calendar_events, reset_event_cache, cache_pushed_event
+)
 
 logger = logging.getLogger(__name__)
 
@@ -200,6 +204,8 @@ async def oauth_callback(
             existing.access_token = access_token
             existing.refresh_token = refresh_token or existing.refresh_token
             existing.token_expires_at = datetime.now(UTC) + timedelta(seconds=expires_in)
+            if existing.calendar_id != calendar_id:
+                reset_event_cache(existing, db)
             existing.calendar_id = calendar_id
             existing.calendar_name = calendar_name
             existing.is_active = True
@@ -312,6 +318,8 @@ async def update_settings(
 
     connection.sync_deadlines = settings.sync_deadlines
     connection.sync_meetings = settings.sync_meetings
+    if connection.calendar_id != settings.calendar_id:
+        reset_event_cache(connection, db)
     connection.calendar_id = settings.calendar_id
     connection.updated_at = datetime.now(UTC)
     db.commit()
@@ -391,7 +399,12 @@ async def get_upcoming_events(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get upcoming events from Google Calendar."""
+    """
+    Get upcoming events from Google Calendar.
+
+    Served from the local event cache, which the background sync keeps
+    current; no call to Google is made here.
+    """
     connection = db.query(GoogleCalendarConnection).filter(
         GoogleCalendarConnection.organization_id == current_user.organization_id,
         GoogleCalendarConnection.is_active == True
@@ -400,69 +413,30 @@ async def get_upcoming_events(
     if not connection:
         raise HTTPException(status_code=404, detail="No Google Calendar connected")
 
-    access_token = await refresh_token_if_needed(connection, db)
-
-    now = datetime.now(UTC)
+    now = datetime.now(UTC).replace(tzinfo=None)
     time_max = now + timedelta(days=days)
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://www.googleapis.com/calendar/v3/calendars/{connection.calendar_id}/events",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params={
-                "timeMin": now.isoformat() + "Z",
-                "timeMax": time_max.isoformat() + "Z",
-                "singleEvents": "true",
-                "orderBy": "startTime",
-                "maxResults": 100,
-            }
+    cached = db.query(CalendarEventCache).filter(
+        CalendarEventCache.connection_id == connection.id,
+        CalendarEventCache.end_at >= now,
+        CalendarEventCache.start_at <= time_max
+    ).order_by(CalendarEventCache.start_at, CalendarEventCache.id).limit(100).all()
+
+    return [
+        CalendarEvent(
+            id=event.google_event_id,
+            title=event.title or "Untitled",
+            # All-day events are dates; timed events are UTC
+            start=event.start_at if event.all_day else _as_utc(event.start_at),
+            end=event.end_at if event.all_day else _as_utc(event.end_at),
+            description=event.description,
+            location=event.location,
+            source="m4f" if event.m4f_type else "google",
+            m4f_type=event.m4f_type,
+            m4f_id=event.m4f_id
         )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to fetch events")
-
-        data = response.json()
-        events = []
-
-        for item in data.get("items", []):
-            start = item.get("start", {})
-            end = item.get("end", {})
-
-            # Handle all-day events vs timed events
-            start_dt = start.get("dateTime") or start.get("date")
-            end_dt = end.get("dateTime") or end.get("date")
-
-            if start_dt and end_dt:
-                try:
-                    # Parse datetime
-                    if "T" in start_dt:
-                        start_parsed = datetime.fromisoformat(start_dt.replace("Z", "+00:00"))
-                        end_parsed = datetime.fromisoformat(end_dt.replace("Z", "+00:00"))
-                    else:
-                        start_parsed = datetime.fromisoformat(start_dt)
-                        end_parsed = datetime.fromisoformat(end_dt)
-
-                    # Check if this is from M4F
-                    extended_props = item.get("extendedProperties", {}).get("private", {})
-                    m4f_type = extended_props.get("m4f_type")
-                    m4f_id = extended_props.get("m4f_id")
-
-                    events.append(CalendarEvent(
-                        id=item.get("id"),
-                        title=item.get("summary", "Untitled"),
-                        start=start_parsed,
-                        end=end_parsed,
-                        description=item.get("description"),
-                        location=item.get("location"),
-                        source="m4f" if m4f_type else "google",
-                        m4f_type=m4f_type,
-                        m4f_id=int(m4f_id) if m4f_id else None
-                    ))
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Failed to parse event: {e}")
-                    continue
-
-        return events
+        for event in cached
+    ]
 
 
 @router.post("/push-deadline/{deadline_id}")
@@ -492,7 +466,8 @@ async def push_deadline_to_calendar(
 
     access_token = await refresh_token_if_needed(connection, db)
     event_id = await create_or_update_calendar_event(
-        connection, access_token, deadline, "deadline", db
+        connection, access_token, deadline, "deadline", db,
+        existing_event_id=_pushed_event_ids(connection, db, "deadline").get(deadline.id)
     )
 
     return {"status": "success", "event_id": event_id}
@@ -525,7 +500,8 @@ async def push_meeting_to_calendar(
 
     access_token = await refresh_token_if_needed(connection, db)
     event_id = await create_or_update_calendar_event(
-        connection, access_token, meeting, "meeting", db
+        connection, access_token, meeting, "meeting", db,
+        existing_event_id=_pushed_event_ids(connection, db, "meeting").get(meeting.id)
     )
 
     return {"status": "success", "event_id": event_id}
@@ -547,35 +523,32 @@ def cleanup_expired_states():
 
 
 async def refresh_token_if_needed(connection: GoogleCalendarConnection, db: Session) -> str:
-    """Refresh access token if expired."""
-    if connection.token_expires_at and connection.token_expires_at > datetime.now(UTC):
+    """
+    Return a valid access token, refreshing it only if it has (nearly) expired.
+
+    The background sync worker refreshes tokens well before expiry, so
+    this is normally a no-op.
+    """
+    if not token_expires_soon(connection, margin=timedelta(seconds=60)):
         return connection.access_token
 
     if not connection.refresh_token:
         raise HTTPException(status_code=401, detail="Calendar connection expired, please reconnect")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://oauth2.googleapis.com/token",
-            data={
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "refresh_token": connection.refresh_token,
-                "grant_type": "refresh_token",
-            }
-        )
-
-        if response.status_code != 200:
-            connection.is_active = False
-            db.commit()
+    async with _google_client() as client:
+        if not await refresh_access_token(connection, db, client):
             raise HTTPException(status_code=401, detail="Failed to refresh token, please reconnect")
 
-        tokens = response.json()
-        connection.access_token = tokens.get("access_token")
-        connection.token_expires_at = datetime.now(UTC) + timedelta(seconds=tokens.get("expires_in", 3600))
-        db.commit()
+    return connection.access_token
 
-        return connection.access_token
+
+def _pushed_event_ids(connection: GoogleCalendarConnection, db: Session, m4f_type: str) -> Dict[int, str]:
+    """Google event IDs of items already pushed, from the event cache (m4f_id -> event id)."""
+    rows = db.query(CalendarEventCache.m4f_id, CalendarEventCache.google_event_id).filter(
+        CalendarEventCache.connection_id == connection.id,
+        CalendarEventCache.m4f_type == m4f_type
+    ).all()
+    return {m4f_id: event_id for m4f_id, event_id in rows if m4f_id is not None}
 
 
 async def create_or_update_calendar_event(
@@ -583,9 +556,16 @@ async def create_or_update_calendar_event(
     access_token: str,
     item: Any,
     item_type: str,
-    db: Session
+    db: Session,
+    existing_event_id: Optional[str] = None
 ) -> str:
-    """Create or update a calendar event for a deadline or meeting."""
+    """
+    Create or update a calendar event for a deadline or meeting.
+
+    Pass existing_event_id (from the event cache) to update the event
+    pushed earlier instead of creating a duplicate. The pushed event is
+    written to the cache, so the next push finds it.
+    """
 
     if item_type == "deadline":
         # All-day event for deadline
@@ -634,10 +614,7 @@ async def create_or_update_calendar_event(
             }
         }
 
-    async with httpx.AsyncClient() as client:
-        # Check if event already exists
-        existing_event_id = getattr(item, 'google_event_id', None)
-
+    async with _google_client() as client:
         if existing_event_id:
             # Update existing event
             response = await client.put(
@@ -664,6 +641,9 @@ async def create_or_update_calendar_event(
             raise HTTPException(status_code=400, detail="Failed to create calendar event")
 
         event_data = response.json()
+        # Fill in anything the response leaves out from what we sent
+        cache_pushed_event(connection, db, {**event_body, **event_data})
+        db.commit()
         return event_data.get("id")
 
 
@@ -712,12 +692,21 @@ def sync_calendar_data(connection_id: int):
 
 
 async def sync_calendar_async(connection: GoogleCalendarConnection, db: Session):
-    """Async calendar sync logic."""
+    """
+    Async calendar sync logic.
+
+    Pulls changed events into the cache first, so deadlines and meetings
+    that were pushed before are updated in place rather than duplicated.
+    """
     access_token = await refresh_token_if_needed(connection, db)
     org_id = connection.organization_id
 
+    async with _google_client() as client:
+        await pull_calendar_events(connection, db, client)
+
     # Sync deadlines to Google Calendar
     if connection.sync_deadlines:
+        pushed = _pushed_event_ids(connection, db, "deadline")
         deadlines = db.query(Deadline).filter(
             Deadline.organization_id == org_id,
             Deadline.is_completed == False,
@@ -727,13 +716,15 @@ async def sync_calendar_async(connection: GoogleCalendarConnection, db: Session)
         for deadline in deadlines:
             try:
                 await create_or_update_calendar_event(
-                    connection, access_token, deadline, "deadline", db
+                    connection, access_token, deadline, "deadline", db,
+                    existing_event_id=pushed.get(deadline.id)
                 )
             except Exception as e:
                 logger.warning(f"Failed to sync deadline {deadline.id}: {e}")
 
     # Sync meetings to Google Calendar
     if connection.sync_meetings:
+        pushed = _pushed_event_ids(connection, db, "meeting")
         meetings = db.query(Meeting).filter(
             Meeting.organization_id == org_id,
             Meeting.meeting_date >= datetime.now(UTC)
@@ -742,7 +733,8 @@ async def sync_calendar_async(connection: GoogleCalendarConnection, db: Session)
         for meeting in meetings:
             try:
                 await create_or_update_calendar_event(
-                    connection, access_token, meeting, "meeting", db
+                    connection, access_token, meeting, "meeting", db,
+                    existing_event_id=pushed.get(meeting.id)
                 )
             except Exception as e:
                 logger.warning(f"Failed to sync meeting {meeting.id}: {e}")
@@ -0,0 +1,245 @@
+"""
+Business health scores.
+
+Scores are cached on Business.health_* and only recomputed when
+Business.health_dirty is set. The flag is raised automatically after any
+flush that writes checklist items, metrics, tasks or task columns, so
+viewing a business costs no aggregate queries unless something changed.
+
+Recomputation is batched: any number of businesses in an organization are
+scored with three grouped aggregate queries (checklist, metrics, tasks).
+The growth subscore comes from XP level and streak on the Business row, so
+it is refreshed on every read without touching the database.
+
+Note: bulk query.update()/delete() bypass the flush hook. Call
+mark_health_dirty() after those.
+"""
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import case, event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from .models import Business, ChecklistProgress, Metric, Task, TaskColumn
+
+
+def mark_health_dirty(db: Session, organization_id: Optional[int] = None, business_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Flag businesses for health recomputation.
+
+    Pass business_ids for specific businesses, or only organization_id to
+    flag every business in the organization (org-level items count toward
+    every business).
+    """
+    stmt = update(Business.__table__).values(health_dirty=True)
+    if business_ids is not None:
+        ids = [bid for bid in business_ids if bid]
+        if not ids:
+            return
+        stmt = stmt.where(Business.__table__.c.id.in_(ids))
+    elif organization_id is not None:
+        stmt = stmt.where(Business.__table__.c.organization_id == organization_id)
+    else:
+        return
+    db.connection().execute(stmt)
+
+
+def _history_values(obj, attr: str) -> Set:
+    """Current and previous values of an attribute on a pending object."""
+    history = inspect(obj).attrs[attr].history
+    values = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+    return {v for v in values if v is not None}
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_health_on_write(session: Session, flush_context) -> None:
+    """Raise health_dirty for businesses whose scoring inputs were just written."""
+    business_ids: Set[int] = set()
+    org_ids: Set[int] = set()
+    board_ids: Set[int] = set()
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (ChecklistProgress, Metric)):
+            ids = _history_values(obj, "business_id")
+            if ids:
+                business_ids |= ids
+            else:
+                # Org-level items count toward every business in the org
+                org_ids |= _history_values(obj, "organization_id")
+        elif isinstance(obj, Task):
+            business_ids |= _history_values(obj, "business_id")
+        elif isinstance(obj, TaskColumn):
+            # A renamed or deleted column can change which tasks count as
+            # done. Match tasks by board: a deleted column's tasks may
+            # already have had column_id cleared by the time this runs.
+            board_ids |= _history_values(obj, "board_id")
+
+    if not (business_ids or org_ids or board_ids):
+        return
+
+    businesses = Business.__table__
+    conditions = []
+    if business_ids:
+        conditions.append(businesses.c.id.in_(business_ids))
+    if org_ids:
+        conditions.append(businesses.c.organization_id.in_(org_ids))
+    if board_ids:
+        conditions.append(businesses.c.id.in_(
+            select(Task.__table__.c.business_id).where(Task.__table__.c.board_id.in_(board_ids))
+        ))
+    session.connection().execute(
+        update(businesses).where(or_(*conditions)).values(health_dirty=True)
+    )
+
+
+def _growth_score(business: Business) -> int:
+    # Level 1 = 20, each level adds 8 points up to 100
+    growth = min(100, 20 + ((business.level or 1) - 1) * 8)
+    # Add streak bonus
+    if business.current_streak and business.current_streak > 0:
+        growth = min(100, growth + min(20, business.current_streak * 2))
+    return growth
+
+
+def _overall_score(compliance: int, financial: int, operations: int, growth: int) -> int:
+    # Overall score: weighted average
+    return int(compliance * 0.3 + financial * 0.2 + operations * 0.25 + growth * 0.25)
+
+
+def compute_health_scores(db: Session, organization_id: int, businesses: List[Business]) -> Dict[int, dict]:
+    """
+    Calculate health scores for many businesses with grouped aggregates.
+
+    Returns:
+        Dict of business_id -> health fields
+    """
+    if not businesses:
+        return {}
+    business_ids = [b.id for b in businesses]
+
+    # Compliance: checklist completion per business (NULL = org-level)
+    checklist = defaultdict(lambda: (0, 0))
+    for business_id, total, completed in db.query(
+        ChecklistProgress.business_id,
+        func.count(ChecklistProgress.id),
+        func.sum(case((ChecklistProgress.is_completed == True, 1), else_=0))
+    ).filter(
+        ChecklistProgress.organization_id == organization_id,
+        or_(ChecklistProgress.business_id.in_(business_ids), ChecklistProgress.business_id == None)
+    ).group_by(ChecklistProgress.business_id).all():
+        checklist[business_id] = (total or 0, completed or 0)
+
+    # Financial: metrics tracked per business (NULL = org-level)
+    metrics = defaultdict(int)
+    for business_id, total in db.query(
+        Metric.business_id, func.count(Metric.id)
+    ).filter(
+        Metric.organization_id == organization_id,
+        or_(Metric.business_id.in_(business_ids), Metric.business_id == None)
+    ).group_by(Metric.business_id).all():
+        metrics[business_id] = total or 0
+
+    # Operations: tasks per business, done = column named like "done"
+    tasks = defaultdict(lambda: (0, 0))
+    for business_id, total, done in db.query(
+        Task.business_id,
+        func.count(Task.id),
+        func.sum(case((func.lower(TaskColumn.name).like('%done%'), 1), else_=0))
+    ).outerjoin(
+        TaskColumn, Task.column_id == TaskColumn.id
+    ).filter(
+        Task.business_id.in_(business_ids)
+    ).group_by(Task.business_id).all():
+        tasks[business_id] = (total or 0, done or 0)
+
+    org_checklist_total, org_checklist_done = checklist[None]
+    results = {}
+    for business in businesses:
+        total_checklist, completed_checklist = checklist[business.id]
+        total_checklist += org_checklist_total
+        completed_checklist += org_checklist_done
+
+        # Base compliance on required items (assume 20 required items as baseline)
+        if total_checklist > 0:
+            compliance = min(100, int((completed_checklist / max(20, total_checklist)) * 100))
+        else:
+            compliance = min(100, completed_checklist * 5)
+
+        # Each metric adds 10 points, max 100
+        financial = min(100, (metrics[business.id] + metrics[None]) * 10)
+
+        total_tasks, completed_tasks = tasks[business.id]
+        operations = int((completed_tasks / max(1, total_tasks)) * 100) if total_tasks > 0 else 50
+
+        growth = _growth_score(business)
+
+        results[business.id] = {
+            'health_score': _overall_score(compliance, financial, operations, growth),
+            'health_compliance': compliance,
+            'health_financial': financial,
+            'health_operations': operations,
+            'health_growth': growth
+        }
+    return results
+
+
+def refresh_health_scores(db: Session, organization_id: int, businesses: List[Business], force: bool = False) -> int:
+    """
+    Bring cached health scores up to date.
+
+    Dirty (or, with force, all) businesses are recomputed in one batch.
+    Clean ones only get their growth subscore refreshed. Changes are
+    flushed but not committed.
+
+    Returns:
+        Number of businesses that were fully recomputed
+    """
+    stale = [b for b in businesses if force or b.health_dirty or b.health_updated_at is None]
+    scores = compute_health_scores(db, organization_id, stale)
+    now = datetime.now(UTC)
+
+    for business in businesses:
+        if business.id in scores:
+            for key, value in scores[business.id].items():
+                setattr(business, key, value)
+            business.health_dirty = False
+            business.health_updated_at = now
+        else:
+            growth = _growth_score(business)
+            if growth != business.health_growth:
+                business.health_growth = growth
+                business.health_score = _overall_score(
+                    business.health_compliance or 0, business.health_financial or 0,
+                    business.health_operations or 0, growth
+                )
+
+    db.flush()
+    return len(scores)
+
+
+def recompute_org_health(db: Session, organization_id: int, root_business_id: Optional[int] = None) -> int:
+    """
+    Recompute health scores for every business in an organization,
+    or for one business and all of its descendants.
+
+    Returns:
+        Number of businesses recomputed
+    """
+    businesses = db.query(Business).filter(Business.organization_id == organization_id).all()
+
+    if root_business_id is not None:
+        children = defaultdict(list)
+        for b in businesses:
+            children[b.parent_id].append(b)
+        by_id = {b.id: b for b in businesses}
+        if root_business_id not in by_id:
+            return 0
+        subtree, stack = [], [by_id[root_business_id]]
+        while stack:
+            b = stack.pop()
+            subtree.append(b)
+            stack.extend(children[b.id])
+        businesses = subtree
+
+    return refresh_health_scores(db, organization_id, businesses, force=True)
@@ -18,8 +18,9 @@ from .database import get_db
 from .auth import get_current_user
 from .models import (
     User, InvestorUpdate, InvestorUpdateRecipient, Shareholder,
-    Metric, Organization
+    Organization
 )
+from .metric_series import latest_points
 from .schemas import (
     InvestorUpdateCreate, InvestorUpdateUpdate, InvestorUpdateResponse,
     InvestorUpdateWithRecipients, InvestorUpdatePreview, InvestorUpdateMetrics
@@ -71,24 +72,13 @@ def send_email(to: str, subject: str, html: str) -> bool:
         return False
 
 
-def get_latest_metrics(db: Session, org_id: int) -> dict:
-    """Get the latest value for each metric type."""
-    metric_types = ['mrr', 'arr', 'runway', 'cash', 'burn_rate', 'customers', 'revenue']
-    result = {}
-
-    for metric_type in metric_types:
-        metric = db.query(Metric).filter(
-            Metric.organization_id == org_id,
-            Metric.metric_type == metric_type
-        ).order_by(Metric.date.desc()).first()
+INVESTOR_METRIC_TYPES = ['mrr', 'arr', 'runway', 'cash', 'burn_rate', 'customers', 'revenue']
 
-        if metric:
-            try:
-                result[metric_type] = float(metric.value)
-            except (ValueError, TypeError):
-                result[metric_type] = metric.value
 
-    return result
+def get_latest_metrics(db: Session, org_id: int) -> dict:
+    """Get the latest value for each metric type."""
+    latest = latest_points(db, org_id, metric_types=INVESTOR_METRIC_TYPES)
+    return {metric_type: points[0].value for metric_type, points in latest.items()}
 
 
 def format_currency(value: float) -> str:
@@ -361,23 +351,18 @@ def get_available_metrics(
     db: Session = Depends(get_db)
 ):
     """Get latest metrics available for investor updates."""
-    metrics = get_latest_metrics(db, current_user.organization_id)
+    # Two latest points per type: the newest gives the values, MRR needs both
+    latest = latest_points(db, current_user.organization_id, n=2, metric_types=INVESTOR_METRIC_TYPES)
+    metrics = {metric_type: points[0].value for metric_type, points in latest.items()}
 
     # Calculate growth rate if we have historical MRR
     growth_rate = None
-    mrr_history = db.query(Metric).filter(
-        Metric.organization_id == current_user.organization_id,
-        Metric.metric_type == 'mrr'
-    ).order_by(Metric.date.desc()).limit(2).all()
-
+    mrr_history = latest.get('mrr', [])
     if len(mrr_history) >= 2:
-        try:
-            current = float(mrr_history[0].value)
-            previous = float(mrr_history[1].value)
-            if previous > 0:
-                growth_rate = ((current - previous) / previous) * 100
-        except (ValueError, TypeError):
-            pass
+        current = mrr_history[0].value
+        previous = mrr_history[1].value
+        if previous > 0:
+            growth_rate = ((current - previous) / previous) * 100
 
     return InvestorUpdateMetrics(
         mrr=metrics.get('mrr'),
@@ -19,6 +19,7 @@ from sqlalchemy import func
 from .database import get_db
 from .auth import get_current_user
 from .models import User, Contact, Invoice, InvoiceLineItem, InvoicePayment, ProductOffered
+from .sequences import next_value
 from .schemas import (
     InvoiceCreate, InvoiceUpdate, InvoiceResponse, InvoiceWithLineItems,
     InvoiceLineItemCreate, InvoiceLineItemResponse,
@@ -30,18 +31,24 @@ router = APIRouter(prefix="/api/invoices", tags=["Invoicing"])
 
 
 def generate_invoice_number(db: Session, org_id: int) -> str:
-    """Generate a unique invoice number."""
+    """Generate a unique invoice number from the organization's yearly sequence."""
     # Get current year
     year = datetime.now().year
+    prefix = f"INV-{year}-"
 
-    # Count existing invoices this year
-    count = db.query(Invoice).filter(
-        Invoice.organization_id == org_id,
-        Invoice.invoice_number.like(f"INV-{year}-%")
-    ).count()
+    def last_issued() -> int:
+        # Only runs once per organization and year, when the sequence is created
+        numbers = db.query(Invoice.invoice_number).filter(
+            Invoice.organization_id == org_id,
+            Invoice.invoice_number.like(f"{prefix}%")
+        ).all()
+        suffixes = [n[len(prefix):] for (n,) in numbers]
+        return max((int(x) for x in suffixes if x.isdigit()), default=0)
+
+    number = next_value(db, org_id, f"invoice:{year}", seed=last_issued)
 
     # Generate number: INV-2025-0001
-    return f"INV-{year}-{str(count + 1).zfill(4)}"
+    return f"{prefix}{str(number).zfill(4)}"
 
 
 def calculate_invoice_totals(line_items: List[dict], tax_rate: float) -> dict:
@@ -2,15 +2,39 @@
 Mailchimp API integration for email marketing campaigns.
 """
 
+import asyncio
+import io
+import json
+import logging
+import os
+import tarfile
 import httpx
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, UTC
 import hashlib
 
+logger = logging.getLogger(__name__)
+
+# Contacts are pushed through /batches in chunks of this many operations
+MAILCHIMP_BATCH_SIZE = 1000
+MAILCHIMP_BATCH_POLL_INTERVAL = float(os.getenv("MAILCHIMP_BATCH_POLL_INTERVAL", "2"))
+MAILCHIMP_BATCH_TIMEOUT = float(os.getenv("MAILCHIMP_BATCH_TIMEOUT", "300"))
+
+
+def _http_client(**kwargs) -> httpx.AsyncClient:
+    """HTTP client for Mailchimp calls (replaced in tests)."""
+    return httpx.AsyncClient(**kwargs)
+
 
 class MailchimpClient:
-    """Client for interacting with Mailchimp API v3."""
+    """
+    Client for interacting with Mailchimp API v3.
+
+    Requests share one keep-alive connection pool; close it with
+    aclose() or use the client as an async context manager.
+    """
 
     def __init__(self, api_key: str):
         """
@@ -27,6 +51,18 @@ class MailchimpClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "MailchimpClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def _request(
         self,
@@ -38,25 +74,29 @@ class MailchimpClient:
         """Make an authenticated request to the Mailchimp API."""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=url,
+        if self._client is None:
+            self._client = _http_client(
                 headers=self.headers,
-                json=data,
-                params=params,
-                timeout=30.0
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=10)
             )
 
-            if response.status_code >= 400:
-                error_detail = response.json() if response.content else {}
-                raise MailchimpAPIError(
-                    status_code=response.status_code,
-                    detail=error_detail.get('detail', 'Unknown error'),
-                    type=error_detail.get('type', 'error')
-                )
+        response = await self._client.request(
+            method=method,
+            url=url,
+            json=data,
+            params=params
+        )
 
-            return response.json() if response.content else {}
+        if response.status_code >= 400:
+            error_detail = response.json() if response.content else {}
+            raise MailchimpAPIError(
+                status_code=response.status_code,
+                detail=error_detail.get('detail', 'Unknown error'),
+                type=error_detail.get('type', 'error')
+            )
+
+        return response.json() if response.content else {}
 
     # ============ Account ============
 
@@ -306,6 +346,63 @@ class MailchimpClient:
         }
         await self._request("POST", f"/lists/{list_id}/members/{subscriber_hash}/tags", data=data)
 
+    # ============ Batch Operations ============
+
+    async def create_batch(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Submit operations to run asynchronously as one batch."""
+        return await self._request("POST", "/batches", data={"operations": operations})
+
+    async def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Get the status of a batch."""
+        return await self._request("GET", f"/batches/{batch_id}")
+
+    async def wait_for_batch(
+        self,
+        batch_id: str,
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Poll a batch until Mailchimp reports it finished or timeout passes.
+
+        Returns the last status seen; check its "status" for "finished".
+        """
+        poll_interval = MAILCHIMP_BATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+        timeout = MAILCHIMP_BATCH_TIMEOUT if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            batch = await self.get_batch(batch_id)
+            if batch.get("status") == "finished" or loop.time() >= deadline:
+                return batch
+            await asyncio.sleep(poll_interval)
+
+    async def get_batch_results(self, batch: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Download the per-operation results of a finished batch.
+
+        Mailchimp serves them as a gzipped tar of JSON arrays from a
+        pre-signed URL, which is fetched without the API credentials.
+        """
+        url = batch.get("response_body_url")
+        if not url:
+            return []
+        async with _http_client(timeout=60.0) as client:
+            response = await client.get(url)
+        if response.status_code >= 400:
+            raise MailchimpAPIError(
+                status_code=response.status_code,
+                detail="Could not download batch results",
+                type="error"
+            )
+
+        results = []
+        with tarfile.open(fileobj=io.BytesIO(response.content), mode="r:gz") as archive:
+            for member in archive.getmembers():
+                if member.isfile() and member.name.endswith(".json"):
+                    results.extend(json.load(archive.extractfile(member)))
+        return results
+
     # ============ Helpers ============
 
     @staticmethod
@@ -324,22 +421,268 @@ class MailchimpAPIError(Exception):
         super().__init__(f"Mailchimp API Error ({status_code}): {detail}")
 
 
-# ============ FastAPI Routes for Mailchimp ============
-
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
-from .database import get_db
-from .models import User, EmailIntegration
+from .database import get_db, SessionLocal
+from .models import User, Contact, EmailIntegration, MailchimpMemberState
 from .auth import get_current_user
+from .marketing import decrypt_api_key
+
+
+# ============ Bulk Audience Sync ============
+
+def _contact_member(name: Optional[str], phone: Optional[str], tags: Optional[str]) -> Tuple[Dict[str, str], List[str]]:
+    """Merge fields and tags for a contact, in Mailchimp's default audience fields."""
+    first, _, last = (name or "").strip().partition(" ")
+    merge_fields = {"FNAME": first, "LNAME": last.strip()}
+    if phone:
+        merge_fields["PHONE"] = phone
+    member_tags = sorted({tag.strip() for tag in (tags or "").split(",") if tag.strip()})
+    return merge_fields, member_tags
+
+
+def _member_content_hash(merge_fields: Dict[str, str], tags: List[str]) -> str:
+    canonical = json.dumps({"merge_fields": merge_fields, "tags": tags}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class _AudienceSyncPlan:
+    """Members of an audience that changed since their last successful sync."""
+    emails: set  # every contact email, to forget the state of deleted contacts
+    changed: Dict[str, Tuple[str, str, List[str]]]  # subscriber hash -> (email, content hash, tags)
+    member_ops: List[Dict[str, Any]]
+    tag_ops: Dict[str, Dict[str, Any]]  # subscriber hash -> tag changes operation
+
+
+def _plan_audience_sync(db: Session, organization_id: int, list_id: str) -> _AudienceSyncPlan:
+    """Compare contacts with their recorded state and build the operations to send."""
+    desired: Dict[str, Tuple[Dict[str, str], List[str]]] = {}
+    rows = db.query(Contact.email, Contact.name, Contact.phone, Contact.tags).filter(
+        Contact.organization_id == organization_id,
+        Contact.email != None,
+        Contact.email != ""
+    ).order_by(Contact.id)
+    for row in rows:
+        desired.setdefault(row.email.strip().lower(), _contact_member(row.name, row.phone, row.tags))
+
+    states = {
+        state.email: state
+        for state in db.query(MailchimpMemberState).filter(
+            MailchimpMemberState.organization_id == organization_id,
+            MailchimpMemberState.list_id == list_id
+        )
+    }
+
+    plan = _AudienceSyncPlan(emails=set(desired), changed={}, member_ops=[], tag_ops={})
+    for email, (merge_fields, tags) in desired.items():
+        content_hash = _member_content_hash(merge_fields, tags)
+        state = states.get(email)
+        if state is not None and state.content_hash == content_hash:
+            continue
+
+        subscriber_hash = MailchimpClient._get_subscriber_hash(email)
+        path = f"/lists/{list_id}/members/{subscriber_hash}"
+        plan.changed[subscriber_hash] = (email, content_hash, tags)
+        plan.member_ops.append({
+            "method": "PUT",
+            "path": path,
+            "operation_id": f"{subscriber_hash}:member",
+            "body": json.dumps({"email_address": email, "status_if_new": "subscribed", "merge_fields": merge_fields})
+        })
+
+        previous = set(state.tags or []) if state is not None else set()
+        tag_changes = (
+            [{"name": tag, "status": "active"} for tag in tags if tag not in previous]
+            + [{"name": tag, "status": "inactive"} for tag in sorted(previous - set(tags))]
+        )
+        if tag_changes:
+            plan.tag_ops[subscriber_hash] = {
+                "method": "POST",
+                "path": f"{path}/tags",
+                "operation_id": f"{subscriber_hash}:tags",
+                "body": json.dumps({"tags": tag_changes})
+            }
+    return plan
+
+
+async def _submit_batches(
+    client: MailchimpClient,
+    operations: List[Dict[str, Any]]
+) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """Submit operations as /batches, returning (batch id, operations) pairs."""
+    submitted = []
+    for start in range(0, len(operations), MAILCHIMP_BATCH_SIZE):
+        chunk = operations[start:start + MAILCHIMP_BATCH_SIZE]
+        batch = await client.create_batch(chunk)
+        submitted.append((batch["id"], chunk))
+    return submitted
+
+
+async def _wait_for_batches(
+    client: MailchimpClient,
+    submitted: List[Tuple[str, List[Dict[str, Any]]]],
+    poll_interval: Optional[float],
+    deadline: float
+) -> Tuple[set, set]:
+    """
+    Wait for submitted batches.
+
+    Returns:
+        (failed operation ids, operation ids of batches still running)
+    """
+    loop = asyncio.get_running_loop()
+    failed, pending = set(), set()
+    for batch_id, chunk in submitted:
+        batch = await client.wait_for_batch(
+            batch_id, poll_interval=poll_interval, timeout=max(deadline - loop.time(), 0)
+        )
+        if batch.get("status") != "finished":
+            pending.update(op["operation_id"] for op in chunk)
+        elif batch.get("errored_operations"):
+            for result in await client.get_batch_results(batch):
+                if result.get("status_code", 200) >= 400:
+                    failed.add(result.get("operation_id"))
+    return failed, pending
+
+
+async def _finish_audience_sync(
+    db: Session,
+    client: MailchimpClient,
+    organization_id: int,
+    list_id: str,
+    plan: _AudienceSyncPlan,
+    submitted: List[Tuple[str, List[Dict[str, Any]]]],
+    poll_interval: Optional[float] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """Wait for the member batches, send tag changes, and record member state."""
+    timeout = MAILCHIMP_BATCH_TIMEOUT if timeout is None else timeout
+    deadline = asyncio.get_running_loop().time() + timeout
+
+    failed, pending = await _wait_for_batches(client, submitted, poll_interval, deadline)
+    batch_ids = [batch_id for batch_id, _ in submitted]
+
+    upserted = [h for h in plan.changed if f"{h}:member" not in failed and f"{h}:member" not in pending]
+    tag_batch = [plan.tag_ops[h] for h in upserted if h in plan.tag_ops]
+    if tag_batch:
+        tag_submitted = await _submit_batches(client, tag_batch)
+        tag_failed, tag_pending = await _wait_for_batches(client, tag_submitted, poll_interval, deadline)
+        failed |= tag_failed
+        pending |= tag_pending
+        batch_ids += [batch_id for batch_id, _ in tag_submitted]
+
+    states = {
+        state.email: state
+        for state in db.query(MailchimpMemberState).filter(
+            MailchimpMemberState.organization_id == organization_id,
+            MailchimpMemberState.list_id == list_id
+        )
+    }
+
+    synced = 0
+    now = datetime.now(UTC)
+    for subscriber_hash in upserted:
+        if f"{subscriber_hash}:tags" in failed or f"{subscriber_hash}:tags" in pending:
+            continue
+        email, content_hash, tags = plan.changed[subscriber_hash]
+        state = states.get(email)
+        if state is None:
+            state = MailchimpMemberState(organization_id=organization_id, list_id=list_id, email=email)
+            db.add(state)
+        state.content_hash = content_hash
+        state.tags = tags
+        state.synced_at = now
+        synced += 1
+
+    # Forget contacts that no longer exist so the state table doesn't grow
+    for email, state in states.items():
+        if email not in plan.emails:
+            db.delete(state)
+    db.commit()
+
+    failed_members = {op_id.split(":")[0] for op_id in failed if op_id}
+    pending_members = {op_id.split(":")[0] for op_id in pending} - failed_members
+    return {
+        "contacts": len(plan.emails),
+        "changed": len(plan.changed),
+        "synced": synced,
+        "failed": len(failed_members),
+        "pending": len(pending_members),
+        "operations": len(plan.member_ops) + len(tag_batch),
+        "batch_ids": batch_ids
+    }
+
+
+async def sync_audience(
+    db: Session,
+    client: MailchimpClient,
+    organization_id: int,
+    list_id: str,
+    poll_interval: Optional[float] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Push the organization's contacts to a Mailchimp audience.
+
+    Each contact is compared with the state recorded at its last
+    successful sync, and only changed members are sent: one batch of
+    member upserts, then once those finish a batch of tag changes (a
+    member has to exist before it can be tagged). State is recorded only
+    for members whose operations all succeeded, so failed or unfinished
+    ones are retried by the next sync. Members of contacts deleted
+    locally are left in the audience.
+    """
+    plan = _plan_audience_sync(db, organization_id, list_id)
+    submitted = await _submit_batches(client, plan.member_ops)
+    return await _finish_audience_sync(
+        db, client, organization_id, list_id, plan, submitted, poll_interval, timeout
+    )
+
+
+async def complete_audience_sync(
+    integration_id: int,
+    list_id: str,
+    plan: _AudienceSyncPlan,
+    submitted: List[Tuple[str, List[Dict[str, Any]]]]
+) -> None:
+    """
+    Finish a sync started by the sync endpoint, as a background task.
+
+    Runs on its own session and client: the request's are closed once
+    the response has been sent.
+    """
+    db = SessionLocal()
+    try:
+        integration = db.query(EmailIntegration).filter(EmailIntegration.id == integration_id).first()
+        if integration is None:
+            return
+        async with MailchimpClient(decrypt_api_key(integration.api_key_encrypted)) as client:
+            result = await _finish_audience_sync(
+                db, client, integration.organization_id, list_id, plan, submitted
+            )
+        integration.last_synced_at = datetime.now(UTC)
+        db.commit()
+        logger.info(
+            f"Mailchimp sync of list {list_id}: {result['synced']} synced, "
+            f"{result['failed']} failed, {result['pending']} pending"
+        )
+    except MailchimpAPIError as e:
+        logger.error(f"Mailchimp sync of list {list_id} failed: {e}")
+    finally:
+        db.close()
+
+
+# ============ FastAPI Routes for Mailchimp ============
 
 mailchimp_router = APIRouter()
 
 
-async def get_mailchimp_client(
+def get_mailchimp_integration(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
-) -> MailchimpClient:
-    """Get an authenticated Mailchimp client for the user's organization."""
+) -> EmailIntegration:
+    """Get the organization's active Mailchimp integration."""
     if not current_user.organization_id:
         raise HTTPException(status_code=403, detail="No organization")
 
@@ -351,8 +694,18 @@ async def get_mailchimp_client(
 
     if not integration:
         raise HTTPException(status_code=404, detail="Mailchimp integration not configured")
+    return integration
 
-    return MailchimpClient(integration.api_key)
+
+async def get_mailchimp_client(
+    integration: EmailIntegration = Depends(get_mailchimp_integration)
+):
+    """Get an authenticated Mailchimp client for the user's organization."""
+    client = MailchimpClient(decrypt_api_key(integration.api_key_encrypted))
+    try:
+        yield client
+    finally:
+        await client.aclose()
 
 
 @mailchimp_router.get("/account")
@@ -505,3 +858,47 @@ async def get_campaign_report(
         return await client.get_campaign_report(campaign_id)
     except MailchimpAPIError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@mailchimp_router.post("/lists/{list_id}/sync")
+async def sync_mailchimp_audience(
+    list_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    integration: EmailIntegration = Depends(get_mailchimp_integration),
+    client: MailchimpClient = Depends(get_mailchimp_client),
+    db: Session = Depends(get_db)
+):
+    """
+    Push changed contacts to a Mailchimp audience in bulk.
+
+    The member batches are submitted and their ids returned right away;
+    tag changes and member state are handled in the background once they
+    finish. Use GET /batches/{batch_id} to follow their progress.
+    """
+    plan = _plan_audience_sync(db, current_user.organization_id, list_id)
+    try:
+        submitted = await _submit_batches(client, plan.member_ops)
+    except MailchimpAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    background_tasks.add_task(complete_audience_sync, integration.id, list_id, plan, submitted)
+    return {
+        "status": "submitted",
+        "contacts": len(plan.emails),
+        "changed": len(plan.changed),
+        "operations": len(plan.member_ops),
+        "batch_ids": [batch_id for batch_id, _ in submitted]
+    }
+
+
+@mailchimp_router.get("/batches/{batch_id}")
+async def get_mailchimp_batch(
+    batch_id: str,
+    client: MailchimpClient = Depends(get_mailchimp_client)
+):
+    """Get the status of a Mailchimp batch operation."""
+    try:
+        return await client.get_batch(batch_id)
+    except MailchimpAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
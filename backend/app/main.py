@@ -15,7 +15,8 @@ except ImportError:
 import re
 import secrets
 import mimetypes
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager
 from datetime import datetime, UTC, timedelta
 from typing import List, Optional
 import os
@@ -23,11 +24,11 @@ import shutil
 import logging
 import json
 
-from .database import engine, get_db, Base
+from .database import engine, get_db, Base, SessionLocal
 from .models import (
     Service, Document, Contact, Deadline, BusinessInfo, BusinessIdentifier,
     ChecklistProgress, User, VaultConfig, Credential, ProductOffered, ProductUsed, WebLink,
-    TaskBoard, TaskColumn, Task, TaskComment, TimeEntry, TaskActivity, Metric,
+    TaskBoard, TaskColumn, Task, TaskComment, TimeEntry, TaskActivity, Metric, MetricPoint,
     WebPresence, BankAccount, Organization, BrandColor, BrandFont, BrandAsset,
     BrandGuideline, EmailTemplate, MarketingCampaign, CampaignVersion,
     EmailAnalytics, SocialAnalytics, EmailIntegration, OAuthConnection, DocumentTemplate,
@@ -75,6 +76,14 @@ from .slack_integration import router as slack_router
 from .cap_table import router as cap_table_router
 from .investor_updates import router as investor_updates_router
 from .data_room import router as data_room_router, public_router as data_room_public_router
+from .data_room_buffer import data_room_access_buffer
+from .calendar_sync import calendar_sync_worker
+from .gamification import GamificationPipeline, complete_challenge
+from .health_scores import refresh_health_scores, recompute_org_health, mark_health_dirty
+from .sequences import allocate_invite_code
+from .metric_series import (
+    RESAMPLE_FORMATS, backfill_metric_points, compare_periods, latest_points, parse_metric_value, resample
+)
 from .budget import router as budget_router
 from .invoicing import router as invoicing_router
 from .team import router as team_router
@@ -264,12 +273,26 @@ try:
             ('primary_contact_id', 'ALTER TABLE businesses ADD COLUMN primary_contact_id INTEGER'),
             ('notes', 'ALTER TABLE businesses ADD COLUMN notes TEXT'),
             ('archived_at', 'ALTER TABLE businesses ADD COLUMN archived_at DATETIME'),
+            ('achievements_count', 'ALTER TABLE businesses ADD COLUMN achievements_count INTEGER DEFAULT 0'),
+            ('health_dirty', 'ALTER TABLE businesses ADD COLUMN health_dirty BOOLEAN DEFAULT 1'),
         ]
         with engine.connect() as conn:
             for col_name, sql in business_migrations:
                 if col_name not in business_columns:
                     conn.execute(text(sql))
                     logger.info(f"Added {col_name} column to businesses table")
+            if 'achievements_count' not in business_columns:
+                # Backfill denormalized leaderboard counts
+                conn.execute(text(
+                    'UPDATE businesses SET achievements_count = ('
+                    'SELECT COUNT(*) FROM business_achievements '
+                    'WHERE business_achievements.business_id = businesses.id '
+                    'AND business_achievements.is_unlocked = 1)'
+                ))
+            conn.execute(text(
+                'CREATE INDEX IF NOT EXISTS ix_business_leaderboard '
+                'ON businesses (gamification_enabled, is_active, is_archived, xp)'
+            ))
             conn.commit()
 
     # Brand colors table migrations
@@ -342,6 +365,83 @@ try:
                     logger.info(f"Added {col_name} column to organizations table")
             conn.commit()
 
+    # Metric time series: lookup index and numeric points for existing metrics
+    if 'metrics' in existing_tables:
+        with engine.connect() as conn:
+            conn.execute(text(
+                'CREATE INDEX IF NOT EXISTS ix_metrics_org_type_date '
+                'ON metrics (organization_id, metric_type, date)'
+            ))
+            conn.commit()
+        migration_db = SessionLocal()
+        try:
+            backfilled = backfill_metric_points(migration_db)
+            if backfilled:
+                logger.info(f"Backfilled {backfilled} metric points")
+        finally:
+            migration_db.close()
+
+    # Stripe revenue sync migrations (incremental sync)
+    if 'stripe_connections' in existing_tables:
+        stripe_columns = [col['name'] for col in inspector.get_columns('stripe_connections')]
+        with engine.connect() as conn:
+            if 'last_full_sync_at' not in stripe_columns:
+                conn.execute(text('ALTER TABLE stripe_connections ADD COLUMN last_full_sync_at DATETIME'))
+                logger.info("Added last_full_sync_at column to stripe_connections table")
+            conn.commit()
+        # Upserts are keyed on these: drop older duplicates (keeping the most
+        # recently updated row per Stripe object) before adding the index
+        for table, key_column, index_name in (
+            ('stripe_customers_sync', 'stripe_customer_id', 'uq_stripe_customers_sync_org_customer'),
+            ('stripe_subscriptions_sync', 'stripe_subscription_id', 'uq_stripe_subscriptions_sync_org_subscription'),
+        ):
+            if table not in existing_tables:
+                continue
+            table_columns = [col['name'] for col in inspector.get_columns(table)]
+            table_indexes = [index['name'] for index in inspector.get_indexes(table)]
+            try:
+                with engine.connect() as conn:
+                    if 'stripe_state_at' not in table_columns:
+                        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN stripe_state_at DATETIME'))
+                        logger.info(f"Added stripe_state_at column to {table} table")
+                    if index_name in table_indexes:
+                        conn.commit()
+                        continue
+                    removed = conn.execute(text(
+                        f'DELETE FROM {table} WHERE id IN ('
+                        f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                        f'PARTITION BY organization_id, {key_column} '
+                        f'ORDER BY updated_at DESC, id DESC) AS rn FROM {table}) '
+                        f'WHERE rn > 1)'
+                    )).rowcount
+                    if removed:
+                        logger.info(f"Removed {removed} duplicate rows from {table}")
+                    conn.execute(text(
+                        f'CREATE UNIQUE INDEX IF NOT EXISTS {index_name} '
+                        f'ON {table} (organization_id, {key_column})'
+                    ))
+                    conn.commit()
+            except Exception as e:
+                logger.error(f"Could not add unique index {index_name}: {e}")
+
+    # Google Calendar incremental sync
+    if 'google_calendar_connections' in existing_tables:
+        calendar_columns = [col['name'] for col in inspector.get_columns('google_calendar_connections')]
+        with engine.connect() as conn:
+            if 'sync_token' not in calendar_columns:
+                conn.execute(text('ALTER TABLE google_calendar_connections ADD COLUMN sync_token TEXT'))
+                logger.info("Added sync_token column to google_calendar_connections table")
+            conn.commit()
+
+    # Token revocation sync reads recent blacklist entries
+    if 'token_blacklist' in existing_tables:
+        with engine.connect() as conn:
+            conn.execute(text(
+                'CREATE INDEX IF NOT EXISTS ix_token_blacklist_revoked_at '
+                'ON token_blacklist (revoked_at)'
+            ))
+            conn.commit()
+
     # Meeting transcripts table (create if not exists)
     if 'meeting_transcripts' not in existing_tables:
         table = Base.metadata.tables.get('meeting_transcripts')
@@ -475,6 +575,24 @@ async def startup_validation():
     logger.info("Made4Founders API started with security middleware enabled")
 
 
+@app.on_event("startup")
+async def start_calendar_sync():
+    """Keep Google Calendar tokens and event caches fresh in the background."""
+    if os.getenv("GOOGLE_CLIENT_ID"):
+        calendar_sync_worker.start()
+
+
+@app.on_event("shutdown")
+async def flush_write_behind_buffers():
+    """Flush buffered writes so nothing is lost on shutdown."""
+    data_room_access_buffer.stop()
+
+
+@app.on_event("shutdown")
+async def stop_calendar_sync():
+    calendar_sync_worker.stop()
+
+
 # ============ Dashboard ============
 @app.get("/api/dashboard/stats", response_model=DashboardStats)
 def get_dashboard_stats(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -553,7 +671,12 @@ def get_businesses(
     query = db.query(Business).filter(Business.organization_id == current_user.organization_id)
     if not include_archived:
         query = query.filter(Business.is_archived == False)
-    return query.order_by(Business.parent_id.nullsfirst(), Business.name).all()
+    businesses = query.order_by(Business.parent_id.nullsfirst(), Business.name).all()
+
+    # Recompute stale health scores in one batch
+    refresh_health_scores(db, current_user.organization_id, businesses)
+    db.commit()
+    return businesses
 
 
 @app.get("/api/businesses/tree")
@@ -570,78 +693,6 @@ def get_businesses_tree(
     return build_business_tree(businesses)
 
 
-def calculate_health_scores(db: Session, business: Business, org_id: int) -> dict:
-    """Calculate health scores based on actual data"""
-
-    # Compliance: Based on checklist completion
-    total_checklist = db.query(ChecklistProgress).filter(
-        ChecklistProgress.organization_id == org_id,
-        ChecklistProgress.business_id == business.id
-    ).count()
-    completed_checklist = db.query(ChecklistProgress).filter(
-        ChecklistProgress.organization_id == org_id,
-        ChecklistProgress.business_id == business.id,
-        ChecklistProgress.is_completed == True
-    ).count()
-    # Also count org-level items
-    org_checklist = db.query(ChecklistProgress).filter(
-        ChecklistProgress.organization_id == org_id,
-        ChecklistProgress.business_id == None
-    ).count()
-    org_completed = db.query(ChecklistProgress).filter(
-        ChecklistProgress.organization_id == org_id,
-        ChecklistProgress.business_id == None,
-        ChecklistProgress.is_completed == True
-    ).count()
-    total_checklist += org_checklist
-    completed_checklist += org_completed
-
-    # Base compliance on required items (assume 20 required items as baseline)
-    compliance = min(100, int((completed_checklist / max(20, total_checklist)) * 100)) if total_checklist > 0 else min(100, completed_checklist * 5)
-
-    # Financial: Based on metrics tracked
-    metrics_count = db.query(Metric).filter(
-        Metric.organization_id == org_id,
-        Metric.business_id == business.id
-    ).count()
-    # Also org-level metrics
-    org_metrics = db.query(Metric).filter(
-        Metric.organization_id == org_id,
-        Metric.business_id == None
-    ).count()
-    metrics_count += org_metrics
-    # Each metric adds 10 points, max 100
-    financial = min(100, metrics_count * 10)
-
-    # Operations: Based on task completion
-    total_tasks = db.query(Task).filter(
-        Task.business_id == business.id
-    ).count()
-    completed_tasks = db.query(Task).join(TaskColumn).filter(
-        Task.business_id == business.id,
-        TaskColumn.name.ilike('%done%')
-    ).count()
-    operations = int((completed_tasks / max(1, total_tasks)) * 100) if total_tasks > 0 else 50
-
-    # Growth: Based on level and XP
-    # Level 1 = 20, each level adds 8 points up to 100
-    growth = min(100, 20 + (business.level - 1) * 8)
-    # Add streak bonus
-    if business.current_streak > 0:
-        growth = min(100, growth + min(20, business.current_streak * 2))
-
-    # Overall score: weighted average
-    overall = int(compliance * 0.3 + financial * 0.2 + operations * 0.25 + growth * 0.25)
-
-    return {
-        'health_score': overall,
-        'health_compliance': compliance,
-        'health_financial': financial,
-        'health_operations': operations,
-        'health_growth': growth
-    }
-
-
 @app.get("/api/businesses/current", response_model=BusinessResponse)
 def get_current_business(
     current_user: User = Depends(get_current_user),
@@ -657,18 +708,30 @@ def get_current_business(
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
 
-    # Calculate and update health scores
-    health = calculate_health_scores(db, business, current_user.organization_id)
-    business.health_score = health['health_score']
-    business.health_compliance = health['health_compliance']
-    business.health_financial = health['health_financial']
-    business.health_operations = health['health_operations']
-    business.health_growth = health['health_growth']
+    # Update health scores if their inputs changed since the last view
+    refresh_health_scores(db, current_user.organization_id, [business])
     db.commit()
 
     return business
 
 
+@app.post("/api/businesses/health/recompute")
+def recompute_business_health(
+    root_business_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Recompute health scores for the whole organization, or for one
+    business and all of its descendants.
+    """
+    count = recompute_org_health(db, current_user.organization_id, root_business_id)
+    if root_business_id is not None and count == 0:
+        raise HTTPException(status_code=404, detail="Business not found")
+    db.commit()
+    return {"recomputed": count}
+
+
 @app.post("/api/businesses/switch")
 def switch_business(
     request: BusinessSwitchRequest,
@@ -735,6 +798,8 @@ def get_business(
     ).first()
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
+    refresh_health_scores(db, current_user.organization_id, [business])
+    db.commit()
     return business
 
 
@@ -954,83 +1019,9 @@ def _award_xp(db: Session, business_id: int, xp_amount: int, organization_id: in
     if not business_id or xp_amount <= 0:
         return None
 
-    business = db.query(Business).filter(
-        Business.id == business_id,
-        Business.organization_id == organization_id
-    ).first()
-
-    if not business:
-        return None
-
-    # Check gamification toggle - skip if disabled
-    if not business.gamification_enabled:
-        return None
-
-    # Check user preference if provided
-    if user and not user.gamification_enabled:
-        return None
-
-    business.xp += xp_amount
-
-    # Level up logic (every 500 * level^1.5 XP)
-    xp_for_level = lambda lvl: int(500 * (lvl ** 1.5))
-    while business.xp >= xp_for_level(business.level):
-        business.level += 1
-
-    # Update streak
-    from datetime import date as date_type
-    today = date_type.today()
-    if business.last_activity_date:
-        days_diff = (today - business.last_activity_date).days
-        if days_diff == 1:
-            business.current_streak += 1
-            if business.current_streak > business.longest_streak:
-                business.longest_streak = business.current_streak
-        elif days_diff > 1:
-            business.current_streak = 1
-    else:
-        business.current_streak = 1
-
-    business.last_activity_date = today
-
-    db.commit()
-
-    # Update achievement progress for XP-based achievements
-    # (These need to be updated after XP changes)
-    _update_achievement_progress_internal(db, business_id, "xp_total", absolute_value=business.xp)
-    _update_achievement_progress_internal(db, business_id, "level_reach", absolute_value=business.level)
-    _update_achievement_progress_internal(db, business_id, "streak_days", absolute_value=business.current_streak)
-
-    return {
-        "xp": business.xp,
-        "level": business.level,
-        "current_streak": business.current_streak,
-        "longest_streak": business.longest_streak,
-        "xp_awarded": xp_amount
-    }
-
-
-def _update_achievement_progress_internal(db: Session, business_id: int, action_type: str, increment: int = 1, absolute_value: int = None):
-    """
-    Internal helper to update achievement progress.
-    Called from _award_xp and action-specific locations.
-    """
-    # Find all achievements matching this action type that aren't yet unlocked
-    business_achievements = db.query(BusinessAchievement).join(Achievement).filter(
-        BusinessAchievement.business_id == business_id,
-        BusinessAchievement.is_unlocked == False,
-        Achievement.requirement_type == action_type
-    ).all()
-
-    for ba in business_achievements:
-        if absolute_value is not None:
-            ba.current_count = absolute_value
-        else:
-            ba.current_count += increment
-
-        if ba.current_count >= ba.target_count:
-            ba.is_unlocked = True
-            ba.unlocked_at = datetime.now(UTC)
+    events = GamificationPipeline(db, organization_id, user)
+    events.award_xp(business_id, xp_amount)
+    return events.flush().get(business_id)
 
 
 def _calculate_task_xp(task, completed_early: bool = False) -> int:
@@ -1673,32 +1664,6 @@ def _get_weekly_quests_for_business(db: Session, business: Business, count: int
     return new_quests
 
 
-def _update_quest_progress(db: Session, business_id: int, action_type: str, increment: int = 1):
-    """
-    Update progress on all active quests matching the action type.
-    Called when an action is performed (task completed, metric logged, etc.)
-    """
-    from datetime import date as date_type
-    today = date_type.today()
-
-    # Find all uncompleted quests for this business matching the action type
-    active_quests = db.query(BusinessQuest).join(Quest).filter(
-        BusinessQuest.business_id == business_id,
-        BusinessQuest.is_completed == False,
-        Quest.action_type == action_type,
-        # Not expired
-        (BusinessQuest.expires_at == None) | (BusinessQuest.expires_at > datetime.now(UTC))
-    ).all()
-
-    for bq in active_quests:
-        bq.current_count += increment
-
-        # Check if quest is now complete
-        if bq.current_count >= bq.target_count:
-            bq.is_completed = True
-            bq.completed_at = datetime.now(UTC)
-
-
 # Quest API Endpoints
 
 @app.get("/api/quests/templates", response_model=List[QuestResponse])
@@ -1800,12 +1765,9 @@ def claim_quest_reward(
     bq.is_claimed = True
     bq.claimed_at = datetime.now(UTC)
 
-    result = _award_xp(db, business_id, bq.xp_reward, current_user.organization_id, current_user)
-
-    # Update achievement progress for quest completion
-    _update_achievement_progress_internal(db, business_id, "quest_complete")
-
-    db.commit()
+    events = GamificationPipeline(db, current_user.organization_id, current_user)
+    events.emit(business_id, "quest_complete", xp=bq.xp_reward)
+    result = events.flush().get(business_id)
 
     if result:
         return QuestClaimResponse(
@@ -1877,34 +1839,6 @@ def _get_or_create_business_achievements(db: Session, business: Business):
     db.commit()
 
 
-def _update_achievement_progress(db: Session, business_id: int, action_type: str, increment: int = 1, absolute_value: int = None):
-    """
-    Update progress on achievements based on action type.
-    Uses absolute_value for things like streak/level/xp that have a current value rather than increment.
-    """
-    # Find all achievements matching this action type that aren't yet unlocked
-    business_achievements = db.query(BusinessAchievement).join(Achievement).filter(
-        BusinessAchievement.business_id == business_id,
-        BusinessAchievement.is_unlocked == False,
-        Achievement.requirement_type == action_type
-    ).all()
-
-    for ba in business_achievements:
-        if absolute_value is not None:
-            # For things like streaks, level, XP - use the absolute value
-            ba.current_count = absolute_value
-        else:
-            # For countable things - increment
-            ba.current_count += increment
-
-        # Check if achievement is now complete
-        if ba.current_count >= ba.target_count:
-            ba.is_unlocked = True
-            ba.unlocked_at = datetime.now(UTC)
-
-    db.commit()
-
-
 @app.get("/api/achievements", response_model=List[AchievementResponse])
 def get_achievements(
     current_user: User = Depends(get_current_user),
@@ -2021,61 +1955,58 @@ def get_leaderboard(
     """
     Get the global leaderboard of businesses ranked by XP.
     Only includes businesses with gamification enabled.
+
+    Ranking is served from ix_business_leaderboard and the denormalized
+    Business.achievements_count, so this is two queries regardless of size.
     """
+    eligible = (
+        (Business.gamification_enabled == True) &
+        (Business.is_active == True) &
+        (Business.is_archived == False)
+    )
+
     # Query top businesses by XP
-    businesses = db.query(Business, Organization).join(
+    businesses = db.query(Business, Organization.name).join(
         Organization, Business.organization_id == Organization.id
-    ).filter(
-        Business.gamification_enabled == True,
-        Business.is_active == True,
-        Business.is_archived == False
-    ).order_by(
+    ).filter(eligible).order_by(
         Business.xp.desc()
     ).limit(limit).all()
 
-    entries = []
-    for rank, (business, org) in enumerate(businesses, 1):
-        # Count unlocked achievements for this business
-        achievements_count = db.query(BusinessAchievement).filter(
-            BusinessAchievement.business_id == business.id,
-            BusinessAchievement.is_unlocked == True
-        ).count()
-
-        entries.append(LeaderboardEntry(
+    entries = [
+        LeaderboardEntry(
             rank=rank,
             business_id=business.id,
             business_name=business.name,
             business_emoji=business.emoji,
             business_color=business.color,
-            organization_name=org.name,
+            organization_name=org_name,
             xp=business.xp,
             level=business.level,
             current_streak=business.current_streak,
             longest_streak=business.longest_streak,
-            achievements_count=achievements_count
-        ))
+            achievements_count=business.achievements_count or 0
+        )
+        for rank, (business, org_name) in enumerate(businesses, 1)
+    ]
 
-    # Find current user's rank if not in top results
+    # Total count and current user's rank in one query
+    total_count_q = db.query(func.count(Business.id)).filter(eligible).scalar_subquery()
     user_rank = None
     if current_user.current_business_id:
-        user_business = db.query(Business).filter(
-            Business.id == current_user.current_business_id
-        ).first()
-        if user_business and user_business.gamification_enabled:
-            # Count how many businesses have more XP
-            higher_xp_count = db.query(Business).filter(
-                Business.gamification_enabled == True,
-                Business.is_active == True,
-                Business.is_archived == False,
-                Business.xp > user_business.xp
-            ).count()
+        user_xp = db.query(Business.xp).filter(
+            Business.id == current_user.current_business_id,
+            Business.gamification_enabled == True
+        ).scalar_subquery()
+        higher_xp_q = db.query(func.count(Business.id)).filter(
+            eligible, Business.xp > user_xp
+        ).scalar_subquery()
+        total_count, higher_xp_count, has_rank = db.query(
+            total_count_q, higher_xp_q, user_xp.isnot(None)
+        ).one()
+        if has_rank:
             user_rank = higher_xp_count + 1
-
-    total_count = db.query(Business).filter(
-        Business.gamification_enabled == True,
-        Business.is_active == True,
-        Business.is_archived == False
-    ).count()
+    else:
+        total_count = db.query(total_count_q).scalar()
 
     return LeaderboardResponse(
         entries=entries,
@@ -2087,18 +2018,6 @@ def get_leaderboard(
 # ============ Challenge System ============
 
 import secrets
-import string
-
-# Challenge type to action mapping (for progress tracking)
-CHALLENGE_ACTION_MAP = {
-    "task_sprint": "task_complete",
-    "xp_race": "xp_earned",
-    "streak_showdown": "streak_days",
-    "quest_champion": "quest_complete",
-    "checklist_blitz": "checklist_complete",
-    "document_dash": "document_upload",
-    "contact_collector": "contact_create",
-}
 
 # Duration to timedelta mapping
 DURATION_MAP = {
@@ -2108,24 +2027,6 @@ DURATION_MAP = {
     "1_month": timedelta(days=30),
 }
 
-# Titles that can be earned
-CHALLENGE_TITLES = {
-    "first_win": {"name": "Challenger", "description": "Win your first challenge", "wins_required": 1},
-    "five_wins": {"name": "Competitor", "description": "Win 5 challenges", "wins_required": 5},
-    "ten_wins": {"name": "Champion", "description": "Win 10 challenges", "wins_required": 10},
-    "twenty_five_wins": {"name": "Grand Champion", "description": "Win 25 challenges", "wins_required": 25},
-    "streak_3": {"name": "Hot Streak", "description": "Win 3 challenges in a row", "streak_required": 3},
-    "streak_5": {"name": "Unstoppable", "description": "Win 5 challenges in a row", "streak_required": 5},
-    "streak_10": {"name": "Legendary", "description": "Win 10 challenges in a row", "streak_required": 10},
-}
-
-
-def _generate_invite_code(length: int = 8) -> str:
-    """Generate a unique invite code."""
-    chars = string.ascii_uppercase + string.digits
-    return ''.join(secrets.choice(chars) for _ in range(length))
-
-
 def _get_current_count_for_challenge_type(db: Session, business_id: int, challenge_type: str) -> int:
     """Get the current count for a specific challenge type."""
     business = db.query(Business).filter(Business.id == business_id).first()
@@ -2180,134 +2081,6 @@ def _calculate_handicap(level1: int, level2: int) -> tuple[int, int]:
         return (handicap, 0)  # Player 1 gets handicap
 
 
-def _update_challenge_progress(db: Session, business_id: int, action_type: str, increment: int = 1, absolute_value: int = None):
-    """Update progress for all active challenges this business is in."""
-    # Find active challenge participations for this business
-    participations = db.query(ChallengeParticipant).join(Challenge).filter(
-        ChallengeParticipant.business_id == business_id,
-        ChallengeParticipant.has_accepted == True,
-        Challenge.status == "active"
-    ).all()
-
-    for participation in participations:
-        challenge = participation.challenge
-        challenge_action = CHALLENGE_ACTION_MAP.get(challenge.challenge_type)
-
-        if challenge_action == action_type:
-            if absolute_value is not None:
-                participation.current_count = absolute_value
-            else:
-                participation.current_count += increment
-
-            participation.progress = participation.current_count - participation.starting_count
-            # Apply handicap
-            participation.adjusted_progress = int(
-                participation.progress * (1 + participation.handicap_percent / 100)
-            )
-
-            # Check if target reached (if target_count set)
-            if challenge.target_count and participation.adjusted_progress >= challenge.target_count:
-                _complete_challenge(db, challenge, participation.business_id)
-
-    db.commit()
-
-
-def _complete_challenge(db: Session, challenge: Challenge, winner_id: int = None):
-    """Complete a challenge and determine winner."""
-    if challenge.status == "completed":
-        return
-
-    # Get all participants
-    participants = db.query(ChallengeParticipant).filter(
-        ChallengeParticipant.challenge_id == challenge.id,
-        ChallengeParticipant.has_accepted == True
-    ).all()
-
-    if not participants:
-        challenge.status = "cancelled"
-        db.commit()
-        return
-
-    # Sort by adjusted progress (descending)
-    participants.sort(key=lambda p: p.adjusted_progress, reverse=True)
-
-    # Assign ranks
-    for rank, participant in enumerate(participants, 1):
-        participant.final_rank = rank
-
-    # Determine winner (highest adjusted progress, or provided winner_id for target-based)
-    if winner_id:
-        challenge.winner_id = winner_id
-    else:
-        if participants[0].adjusted_progress > 0:
-            # Check for tie
-            if len(participants) > 1 and participants[0].adjusted_progress == participants[1].adjusted_progress:
-                challenge.winner_id = None  # Tie
-            else:
-                challenge.winner_id = participants[0].business_id
-        else:
-            challenge.winner_id = None  # No one made progress
-
-    challenge.status = "completed"
-    challenge.completed_at = datetime.now(UTC)
-
-    # Distribute XP
-    total_wagered = sum(p.xp_wagered for p in participants)
-
-    for participant in participants:
-        business = db.query(Business).filter(Business.id == participant.business_id).first()
-        if not business:
-            continue
-
-        if challenge.winner_id == participant.business_id:
-            # Winner gets: their wager back + opponent's wager + bonus
-            participant.xp_won = total_wagered + challenge.winner_bonus_xp
-            participant.xp_lost = 0
-            business.xp += participant.xp_won
-
-            # Update win stats
-            business.challenge_wins += 1
-            business.challenge_win_streak += 1
-            if business.challenge_win_streak > business.best_challenge_win_streak:
-                business.best_challenge_win_streak = business.challenge_win_streak
-
-            # Check for new titles
-            _check_and_award_titles(db, business)
-
-        elif challenge.winner_id is None:
-            # Draw - everyone gets their wager back
-            participant.xp_won = participant.xp_wagered
-            participant.xp_lost = 0
-            business.xp += participant.xp_wagered  # Return wager
-            business.challenge_draws += 1
-            business.challenge_win_streak = 0  # Reset streak on draw
-
-        else:
-            # Loser loses their wager
-            participant.xp_won = 0
-            participant.xp_lost = participant.xp_wagered
-            business.challenge_losses += 1
-            business.challenge_win_streak = 0  # Reset streak
-
-    db.commit()
-
-
-def _check_and_award_titles(db: Session, business: Business):
-    """Check if business earned any new titles."""
-    current_titles = business.titles or []
-
-    for title_id, title_info in CHALLENGE_TITLES.items():
-        if title_id in current_titles:
-            continue
-
-        if "wins_required" in title_info and business.challenge_wins >= title_info["wins_required"]:
-            current_titles.append(title_id)
-        elif "streak_required" in title_info and business.challenge_win_streak >= title_info["streak_required"]:
-            current_titles.append(title_id)
-
-    business.titles = current_titles
-
-
 def _build_challenge_response(
     db: Session,
     challenge: Challenge,
@@ -2415,9 +2188,7 @@ def create_challenge(
         raise HTTPException(status_code=400, detail=f"Insufficient XP. You have {business.xp} XP")
 
     # Generate unique invite code
-    invite_code = _generate_invite_code()
-    while db.query(Challenge).filter(Challenge.invite_code == invite_code).first():
-        invite_code = _generate_invite_code()
+    invite_code = allocate_invite_code(db)
 
     # Create challenge
     challenge = Challenge(
@@ -2480,7 +2251,7 @@ def get_challenges(
         Challenge.ends_at < datetime.now(UTC)
     ).all()
     for challenge in expired_challenges:
-        _complete_challenge(db, challenge)
+        complete_challenge(db, challenge)
 
     # Get challenges where this business is a participant
     my_participations = db.query(ChallengeParticipant).filter(
@@ -3270,11 +3041,9 @@ async def upload_document(
 
     # Award XP for uploading a document
     if doc_business_id:
-        _award_xp(db, doc_business_id, XP_DOCUMENT_UPLOAD, current_user.organization_id)
-        # Update quest and achievement progress
-        _update_quest_progress(db, doc_business_id, "document_upload")
-        _update_achievement_progress_internal(db, doc_business_id, "document_upload")
-        db.commit()
+        events = GamificationPipeline(db, current_user.organization_id)
+        events.emit(doc_business_id, "document_upload", xp=XP_DOCUMENT_UPLOAD)
+        events.flush()
 
     logger.info(f"User {current_user.email} uploaded document {db_document.id}: {safe_name}")
 
@@ -3706,10 +3475,9 @@ def create_contact(contact: ContactCreate, current_user: User = Depends(get_curr
     # Award XP for creating a contact (use first business or current)
     xp_business_id = business_ids[0] if business_ids else current_user.current_business_id
     if xp_business_id:
-        _award_xp(db, xp_business_id, XP_CONTACT_CREATED, current_user.organization_id)
-        _update_quest_progress(db, xp_business_id, "contact_create")
-        _update_achievement_progress_internal(db, xp_business_id, "contact_create")
-        db.commit()
+        events = GamificationPipeline(db, current_user.organization_id)
+        events.emit(xp_business_id, "contact_create", xp=XP_CONTACT_CREATED)
+        events.flush()
 
     return _serialize_contact(db_contact, db)
 
@@ -4860,10 +4628,9 @@ def create_or_update_checklist_item(progress: ChecklistProgressCreate, current_u
             existing.completed_at = datetime.now(UTC)
             # Award XP for newly completing checklist item
             if not was_completed and existing.business_id:
-                _award_xp(db, existing.business_id, XP_CHECKLIST_COMPLETE, current_user.organization_id)
-                # Update quest and achievement progress
-                _update_quest_progress(db, existing.business_id, "checklist_complete")
-                _update_achievement_progress_internal(db, existing.business_id, "checklist_complete")
+                events = GamificationPipeline(db, current_user.organization_id)
+                events.emit(existing.business_id, "checklist_complete", xp=XP_CHECKLIST_COMPLETE)
+                events.flush(commit=False)
         elif not progress.is_completed:
             existing.completed_at = None
         db.commit()
@@ -4881,11 +4648,9 @@ def create_or_update_checklist_item(progress: ChecklistProgressCreate, current_u
         db.refresh(db_item)
         # Award XP for completing checklist item on creation
         if progress.is_completed and db_item.business_id:
-            _award_xp(db, db_item.business_id, XP_CHECKLIST_COMPLETE, current_user.organization_id)
-            # Update quest and achievement progress
-            _update_quest_progress(db, db_item.business_id, "checklist_complete")
-            _update_achievement_progress_internal(db, db_item.business_id, "checklist_complete")
-            db.commit()
+            events = GamificationPipeline(db, current_user.organization_id)
+            events.emit(db_item.business_id, "checklist_complete", xp=XP_CHECKLIST_COMPLETE)
+            events.flush()
         return db_item
 
 
@@ -4911,10 +4676,9 @@ def update_checklist_item(item_id: str, progress: ChecklistProgressUpdate, curre
 
     # Award XP for newly completing checklist item
     if update_data.get("is_completed") and not was_completed and db_item.business_id:
-        _award_xp(db, db_item.business_id, XP_CHECKLIST_COMPLETE, current_user.organization_id)
-        # Update quest and achievement progress
-        _update_quest_progress(db, db_item.business_id, "checklist_complete")
-        _update_achievement_progress_internal(db, db_item.business_id, "checklist_complete")
+        events = GamificationPipeline(db, current_user.organization_id)
+        events.emit(db_item.business_id, "checklist_complete", xp=XP_CHECKLIST_COMPLETE)
+        events.flush(commit=False)
 
     db.commit()
     db.refresh(db_item)
@@ -6119,6 +5883,9 @@ def delete_board(
     ).first()
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
+    # The board's tasks are removed by the database cascade, which the health flush hook can't see
+    affected = [row[0] for row in db.query(Task.business_id).filter(Task.board_id == board_id).distinct()]
+    mark_health_dirty(db, business_ids=affected)
     db.delete(board)
     db.commit()
     return {"ok": True}
@@ -6177,8 +5944,10 @@ def delete_column(
     ).first()
     if not column:
         raise HTTPException(status_code=404, detail="Column not found")
-    # Move tasks to null column
+    # Move tasks to null column (a bulk update, so flag their health scores here)
+    affected = [row[0] for row in db.query(Task.business_id).filter(Task.column_id == column_id).distinct()]
     db.query(Task).filter(Task.column_id == column_id).update({Task.column_id: None})
+    mark_health_dirty(db, business_ids=affected)
     db.delete(column)
     db.commit()
     return {"ok": True}
@@ -6357,10 +6126,9 @@ def update_task(
             if business_id:
                 completed_early = db_task.due_date and datetime.now(UTC) < db_task.due_date
                 xp_amount = _calculate_task_xp(db_task, completed_early)
-                _award_xp(db, business_id, xp_amount, current_user.organization_id)
-                # Update quest and achievement progress
-                _update_quest_progress(db, business_id, "task_complete")
-                _update_achievement_progress_internal(db, business_id, "task_complete")
+                events = GamificationPipeline(db, current_user.organization_id)
+                events.emit(business_id, "task_complete", xp=xp_amount)
+                events.flush(commit=False)
 
         elif update_data["status"] != "done":
             update_data["completed_at"] = None
@@ -6478,10 +6246,9 @@ def complete_task(
     if business_id:
         completed_early = db_task.due_date and datetime.now(UTC) < db_task.due_date
         xp_amount = _calculate_task_xp(db_task, completed_early)
-        _award_xp(db, business_id, xp_amount, current_user.organization_id)
-        # Update quest and achievement progress
-        _update_quest_progress(db, business_id, "task_complete")
-        _update_achievement_progress_internal(db, business_id, "task_complete")
+        events = GamificationPipeline(db, current_user.organization_id)
+        events.emit(business_id, "task_complete", xp=xp_amount)
+        events.flush(commit=False)
 
     db.commit()
     db.refresh(db_task)
@@ -6908,11 +6675,9 @@ def create_metric(
 
     # Award XP for logging a metric
     if db_metric.business_id:
-        _award_xp(db, db_metric.business_id, XP_METRIC_ENTRY, current_user.organization_id)
-        # Update quest and achievement progress
-        _update_quest_progress(db, db_metric.business_id, "metric_create")
-        _update_achievement_progress_internal(db, db_metric.business_id, "metric_create")
-        db.commit()
+        events = GamificationPipeline(db, current_user.organization_id)
+        events.emit(db_metric.business_id, "metric_create", xp=XP_METRIC_ENTRY)
+        events.flush()
 
     return db_metric
 
@@ -6979,54 +6744,33 @@ def get_latest_metrics_summary(
     db: Session = Depends(get_db)
 ):
     """Get the latest value for each metric type with change from previous."""
-    from sqlalchemy import func, desc
-
-    org_id = current_user.organization_id
-
-    # Get all unique metric types for this organization
-    metric_types = db.query(Metric.metric_type, Metric.name).filter(
-        Metric.organization_id == org_id
-    ).distinct().all()
-
     summaries = []
-    for metric_type, name in metric_types:
-        # Get the two most recent values for this metric type
-        recent = db.query(Metric).filter(
-            Metric.organization_id == org_id,
-            Metric.metric_type == metric_type
-        ).order_by(desc(Metric.date)).limit(2).all()
-
-        if recent:
-            current = recent[0]
-            previous = recent[1] if len(recent) > 1 else None
-
-            # Calculate change percent
-            change_percent = None
-            trend = None
-            if previous:
-                try:
-                    curr_val = float(current.value.replace(',', '').replace('$', '').replace('%', ''))
-                    prev_val = float(previous.value.replace(',', '').replace('$', '').replace('%', ''))
-                    if prev_val != 0:
-                        change_percent = ((curr_val - prev_val) / prev_val) * 100
-                        if change_percent > 0:
-                            trend = "up"
-                        elif change_percent < 0:
-                            trend = "down"
-                        else:
-                            trend = "flat"
-                except (ValueError, AttributeError):
-                    pass
-
-            summaries.append(MetricSummary(
-                metric_type=metric_type,
-                name=current.name,
-                current_value=current.value,
-                previous_value=previous.value if previous else None,
-                change_percent=round(change_percent, 1) if change_percent is not None else None,
-                unit=current.unit,
-                trend=trend
-            ))
+    # Two most recent points per metric type, in one query
+    for metric_type, points in latest_points(db, current_user.organization_id, n=2).items():
+        current = points[0]
+        previous = points[1] if len(points) > 1 else None
+
+        # Calculate change percent
+        change_percent = None
+        trend = None
+        if previous and previous.value != 0:
+            change_percent = ((current.value - previous.value) / previous.value) * 100
+            if change_percent > 0:
+                trend = "up"
+            elif change_percent < 0:
+                trend = "down"
+            else:
+                trend = "flat"
+
+        summaries.append(MetricSummary(
+            metric_type=metric_type,
+            name=current.metric.name,
+            current_value=current.metric.value,
+            previous_value=previous.metric.value if previous else None,
+            change_percent=round(change_percent, 1) if change_percent is not None else None,
+            unit=current.unit,
+            trend=trend
+        ))
 
     return summaries
 
@@ -7069,16 +6813,6 @@ from .schemas import (
 )
 
 
-def parse_metric_value(value: str) -> float:
-    """Parse a metric value string to float."""
-    try:
-        # Remove common formatting
-        cleaned = value.replace(',', '').replace('$', '').replace('%', '').strip()
-        return float(cleaned)
-    except (ValueError, AttributeError):
-        return 0.0
-
-
 def get_period_days(period: str) -> int:
     """Convert period string to days."""
     periods = {
@@ -7097,32 +6831,26 @@ def get_analytics_dashboard(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get comprehensive analytics dashboard data."""
-    from sqlalchemy import func, desc
+    """
+    Get comprehensive analytics dashboard data.
 
+    Runs a fixed number of queries on the metric time series, however many
+    metric types the organization tracks.
+    """
     org_id = current_user.organization_id
     days = get_period_days(period)
     start_date = datetime.now(UTC) - timedelta(days=days)
     prev_start = start_date - timedelta(days=days)
-    prev_end = start_date
 
-    # Get all metrics in period for this organization
-    current_metrics = db.query(Metric).filter(
-        Metric.organization_id == org_id,
-        Metric.date >= start_date
-    ).all()
+    # Latest point per metric type (also gives the list of types)
+    latest = latest_points(db, org_id)
+    metric_types = list(latest)
 
-    prev_metrics = db.query(Metric).filter(
-        Metric.organization_id == org_id,
-        Metric.date >= prev_start,
-        Metric.date < prev_end
-    ).all()
+    # Latest point per type in the current and previous period
+    periods = compare_periods(db, org_id, start_date, prev_start)
 
-    # Get unique metric types for this organization
-    metric_types = db.query(Metric.metric_type).filter(
-        Metric.organization_id == org_id
-    ).distinct().all()
-    metric_types = [m[0] for m in metric_types]
+    # Latest MRR and customer counts before the period
+    before_period = latest_points(db, org_id, metric_types=['mrr', 'customers'], before=start_date)
 
     # Calculate trends per metric type
     improving = 0
@@ -7131,24 +6859,12 @@ def get_analytics_dashboard(
     growth_metrics = []
 
     for mt in metric_types:
-        # Get latest value for current period
-        current = db.query(Metric).filter(
-            Metric.organization_id == org_id,
-            Metric.metric_type == mt,
-            Metric.date >= start_date
-        ).order_by(desc(Metric.date)).first()
-
-        # Get latest value for previous period
-        previous = db.query(Metric).filter(
-            Metric.organization_id == org_id,
-            Metric.metric_type == mt,
-            Metric.date >= prev_start,
-            Metric.date < prev_end
-        ).order_by(desc(Metric.date)).first()
+        current = periods.get(mt, {}).get("current")
+        previous = periods.get(mt, {}).get("previous")
 
         if current and previous:
-            curr_val = parse_metric_value(current.value)
-            prev_val = parse_metric_value(previous.value)
+            curr_val = current.value
+            prev_val = previous.value
 
             if prev_val != 0:
                 pct_change = ((curr_val - prev_val) / abs(prev_val)) * 100
@@ -7168,7 +6884,7 @@ def get_analytics_dashboard(
 
             growth_metrics.append(GrowthMetric(
                 metric_type=mt,
-                name=current.name,
+                name=current.metric.name,
                 current_value=curr_val,
                 previous_value=prev_val,
                 absolute_change=round(curr_val - prev_val, 2),
@@ -7180,20 +6896,15 @@ def get_analytics_dashboard(
 
     # Build financial health
     def get_latest_value(metric_type: str) -> float | None:
-        m = db.query(Metric).filter(
-            Metric.organization_id == org_id,
-            Metric.metric_type == metric_type
-        ).order_by(desc(Metric.date)).first()
-        return parse_metric_value(m.value) if m else None
+        points = latest.get(metric_type)
+        return points[0].value if points else None
+
+    def get_value_before_period(metric_type: str) -> float | None:
+        points = before_period.get(metric_type)
+        return points[0].value if points else None
 
     mrr = get_latest_value('mrr')
-    prev_mrr = None
-    prev_mrr_metric = db.query(Metric).filter(
-        Metric.metric_type == 'mrr',
-        Metric.date < start_date
-    ).order_by(desc(Metric.date)).first()
-    if prev_mrr_metric:
-        prev_mrr = parse_metric_value(prev_mrr_metric.value)
+    prev_mrr = get_value_before_period('mrr')
 
     mrr_growth = None
     if mrr and prev_mrr and prev_mrr > 0:
@@ -7211,11 +6922,7 @@ def get_analytics_dashboard(
 
     # Build customer health
     customers = get_latest_value('customers')
-    prev_customers_metric = db.query(Metric).filter(
-        Metric.metric_type == 'customers',
-        Metric.date < start_date
-    ).order_by(desc(Metric.date)).first()
-    prev_customers = parse_metric_value(prev_customers_metric.value) if prev_customers_metric else None
+    prev_customers = get_value_before_period('customers')
 
     customer_growth = None
     if customers and prev_customers and prev_customers > 0:
@@ -7239,6 +6946,7 @@ def get_analytics_dashboard(
 
     # Get goals with progress
     goals_db = db.query(MetricGoal).filter(
+        MetricGoal.organization_id == org_id,
         MetricGoal.is_achieved == False
     ).all()
 
@@ -7285,31 +6993,41 @@ def get_analytics_dashboard(
 def get_multi_metric_chart(
     metric_types: str,  # comma-separated
     period: str = "30d",
+    bucket: Optional[str] = None,  # day, week or month
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get chart data for multiple metrics at once."""
+    """
+    Get chart data for multiple metrics at once.
+
+    With bucket set, points are resampled per day, week or month (last
+    value of each bucket, plus avg/min/max/count).
+    """
     org_id = current_user.organization_id
     types = [t.strip() for t in metric_types.split(',')]
     days = get_period_days(period)
     start_date = datetime.now(UTC) - timedelta(days=days)
 
-    result = {}
-    for mt in types:
-        metrics = db.query(Metric).filter(
-            Metric.organization_id == org_id,
-            Metric.metric_type == mt,
-            Metric.date >= start_date
-        ).order_by(Metric.date).all()
+    if bucket:
+        if bucket not in RESAMPLE_FORMATS:
+            raise HTTPException(status_code=400, detail="bucket must be day, week or month")
+        return resample(db, org_id, types, start=start_date, bucket=bucket)
 
-        result[mt] = [
-            {
-                "date": m.date.isoformat(),
-                "value": parse_metric_value(m.value),
-                "formatted": m.value
-            }
-            for m in metrics
-        ]
+    points = db.query(MetricPoint).join(MetricPoint.metric).options(
+        contains_eager(MetricPoint.metric)
+    ).filter(
+        MetricPoint.organization_id == org_id,
+        MetricPoint.metric_type.in_(types),
+        MetricPoint.date >= start_date
+    ).order_by(MetricPoint.date).all()
+
+    result = {mt: [] for mt in types}
+    for point in points:
+        result[point.metric_type].append({
+            "date": point.date.isoformat(),
+            "value": point.value,
+            "formatted": point.metric.value
+        })
 
     return result
 
@@ -7329,15 +7047,12 @@ def get_metric_goals(
 
     goals = query.order_by(MetricGoal.target_date).all()
 
+    # Current values for all goal metric types in one query
+    latest = latest_points(db, org_id, metric_types={g.metric_type for g in goals}) if goals else {}
+
     result = []
     for g in goals:
-        # Get current value
-        latest = db.query(Metric).filter(
-            Metric.organization_id == org_id,
-            Metric.metric_type == g.metric_type
-        ).order_by(Metric.date.desc()).first()
-
-        current_val = parse_metric_value(latest.value) if latest else None
+        current_val = latest[g.metric_type][0].value if g.metric_type in latest else None
         progress = None
         if current_val is not None and g.target_value != 0:
             progress = round((current_val / g.target_value) * 100, 1)
@@ -0,0 +1,180 @@
+"""
+Per-organization directory of mentionable users.
+
+Comment @mentions and the mention autocomplete used to run a
+leading-wildcard ILIKE against users for every mention and keystroke.
+The directory loads an organization's active members once and answers
+both from memory: prefix lookups use a sorted index of lowercased full
+names, name words and emails (bisect, so O(log n) per lookup), and the
+substring matching the old queries allowed falls back to a scan of the
+in-memory members only when prefixes don't produce enough results.
+
+An organization's entry is dropped when one of its users is created,
+updated or deleted through the ORM in this process (see the session
+hooks below), and reloaded after MENTION_DIRECTORY_TTL seconds so that
+changes made by other workers are picked up.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .models import User
+
+MENTION_DIRECTORY_TTL = float(os.getenv("MENTION_DIRECTORY_TTL", "300"))
+
+_CHANGED_ORGS_KEY = "mention_directory_orgs"
+
+
+class Member:
+    """A mentionable user."""
+
+    __slots__ = ("id", "email", "name", "_name_key", "_email_key")
+
+    def __init__(self, user_id: int, email: str, name: Optional[str]):
+        self.id = user_id
+        self.email = email
+        self.name = name
+        self._name_key = (name or "").lower()
+        self._email_key = (email or "").lower()
+
+
+class OrgDirectory:
+    """Lookup structures for one organization's active members."""
+
+    def __init__(self, members: List[Member]):
+        self.members: Dict[int, Member] = {m.id: m for m in members}
+        self._ordered = sorted(members, key=lambda m: m.id)
+        self._by_name: Dict[str, int] = {}
+        entries = set()
+        for member in self._ordered:
+            if member._name_key:
+                self._by_name.setdefault(member._name_key, member.id)
+                entries.add((member._name_key, member.id))
+                for word in member._name_key.split()[1:]:
+                    entries.add((word, member.id))
+            if member._email_key:
+                entries.add((member._email_key, member.id))
+        entries = sorted(entries)
+        self._keys = [key for key, _ in entries]
+        self._ids = [member_id for _, member_id in entries]
+
+    def _prefix_ids(self, prefix: str) -> Iterator[int]:
+        """Member ids with a name, name word or email starting with prefix."""
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            yield self._ids[i]
+            i += 1
+
+    def resolve(self, token: str) -> Optional[int]:
+        """
+        Resolve one @mention to a user id.
+
+        Prefers an exact name, then the lowest id whose name, name word
+        or email starts with the token, then a name containing it.
+        """
+        token = token.lower()
+        if not token:
+            return None
+        if token in self._by_name:
+            return self._by_name[token]
+        prefix_match = min(self._prefix_ids(token), default=None)
+        if prefix_match is not None:
+            return prefix_match
+        for member in self._ordered:
+            if token in member._name_key:
+                return member.id
+        return None
+
+    def search(self, query: str, limit: int) -> List[Member]:
+        """Members matching query for autocomplete, prefix matches first."""
+        query = query.lower()
+        results: List[Member] = []
+        seen = set()
+        for member_id in self._prefix_ids(query):
+            if member_id not in seen:
+                seen.add(member_id)
+                results.append(self.members[member_id])
+                if len(results) >= limit:
+                    return results
+        for member in self._ordered:
+            if member.id not in seen and (query in member._name_key or query in member._email_key):
+                results.append(member)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class MentionDirectory:
+    """Per-process cache of OrgDirectory instances, keyed by organization."""
+
+    def __init__(self, ttl: float = MENTION_DIRECTORY_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[float, OrgDirectory]] = {}  # org_id -> (expires_at monotonic, directory)
+        self._generation = 0
+
+    def get(self, db: Session, organization_id: int) -> OrgDirectory:
+        """The organization's directory, loading it with one query if needed."""
+        with self._lock:
+            entry = self._entries.get(organization_id)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            generation = self._generation
+
+        rows = db.query(User.id, User.email, User.name).filter(
+            User.organization_id == organization_id,
+            User.is_active == True
+        ).all()
+        directory = OrgDirectory([Member(row.id, row.email, row.name) for row in rows])
+
+        with self._lock:
+            # Don't cache a load that raced with an invalidation
+            if generation == self._generation:
+                self._entries[organization_id] = (time.monotonic() + self._ttl, directory)
+        return directory
+
+    def invalidate(self, organization_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(organization_id, None)
+
+    def clear(self) -> None:
+        """Clear the cache (for testing)."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+# Global directory instance
+mention_directory = MentionDirectory()
+
+
+# ============ Session hooks ============
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_orgs(session: Session, flush_context) -> None:
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.organization_id)
+            # A user moved between organizations leaves the old one too
+            changed.update(inspect(obj).attrs.organization_id.history.deleted)
+    changed.discard(None)
+    if changed:
+        session.info.setdefault(_CHANGED_ORGS_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_orgs(session: Session) -> None:
+    for organization_id in session.info.pop(_CHANGED_ORGS_KEY, ()):
+        mention_directory.invalidate(organization_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_orgs(session: Session) -> None:
+    session.info.pop(_CHANGED_ORGS_KEY, None)
@@ -0,0 +1,236 @@
+"""
+Numeric time series for business metrics.
+
+Metric.value is free text ("$12,500", "4.5%") so users can type values the
+way they think of them. Every Metric has a MetricPoint twin holding the
+parsed float, unit and normalized day, indexed on
+(organization_id, metric_type, date). The twin is written by a
+before_flush hook whenever a Metric is added or changed, and removed with
+it through the relationship cascade.
+
+Analytics read MetricPoint through the helpers below. Each one is a single
+query whatever the number of metric types:
+
+- latest_points: latest N points per type (window function)
+- compare_periods: latest point per type in the current and previous window
+- resample: day/week/month buckets with last/avg/min/max/count
+
+Note: bulk query.update()/delete() on Metric bypass the hook.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, event, func, insert, select
+from sqlalchemy.orm import Session, contains_eager
+
+from .models import Metric, MetricPoint
+
+RESAMPLE_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+
+def parse_metric_value(value: str) -> float:
+    """Parse a metric value string to float."""
+    try:
+        # Remove common formatting
+        cleaned = value.replace(',', '').replace('$', '').replace('%', '').strip()
+        return float(cleaned)
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def _point_fields(metric: Metric) -> dict:
+    return {
+        "organization_id": metric.organization_id,
+        "business_id": metric.business_id,
+        "metric_type": metric.metric_type,
+        "value": parse_metric_value(metric.value),
+        "unit": metric.unit,
+        "date": metric.date,
+        "day": metric.date.date(),
+    }
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_metric_points(session: Session, flush_context, instances) -> None:
+    """Create or refresh the MetricPoint of every added or changed Metric."""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Metric) or obj in session.deleted:
+            continue
+        fields = _point_fields(obj)
+        if obj.point is None:
+            obj.point = MetricPoint(**fields)
+        else:
+            for key, value in fields.items():
+                setattr(obj.point, key, value)
+
+
+def backfill_metric_points(db: Session, batch_size: int = 1000) -> int:
+    """
+    Create points for metrics that have none (pre-existing data).
+
+    Returns:
+        Number of points created
+    """
+    created = 0
+    while True:
+        metrics = db.execute(
+            select(Metric.id, Metric.organization_id, Metric.business_id, Metric.metric_type,
+                   Metric.value, Metric.unit, Metric.date)
+            .outerjoin(MetricPoint, MetricPoint.metric_id == Metric.id)
+            .where(MetricPoint.id == None)
+            .limit(batch_size)
+        ).all()
+        if not metrics:
+            break
+        db.execute(insert(MetricPoint), [
+            {
+                "metric_id": m.id,
+                "organization_id": m.organization_id,
+                "business_id": m.business_id,
+                "metric_type": m.metric_type,
+                "value": parse_metric_value(m.value),
+                "unit": m.unit,
+                "date": m.date,
+                "day": m.date.date(),
+            }
+            for m in metrics
+        ])
+        db.commit()
+        created += len(metrics)
+    return created
+
+
+def latest_points(
+    db: Session,
+    organization_id: int,
+    n: int = 1,
+    metric_types: Optional[Iterable[str]] = None,
+    before: Optional[datetime] = None,
+) -> Dict[str, List[MetricPoint]]:
+    """
+    Latest n points per metric type, newest first.
+
+    Args:
+        metric_types: Limit to these types (default: all)
+        before: Only consider points dated strictly before this
+
+    Returns:
+        Dict of metric_type -> points (with .metric loaded)
+    """
+    rank = func.row_number().over(
+        partition_by=MetricPoint.metric_type,
+        order_by=(MetricPoint.date.desc(), MetricPoint.id.desc())
+    ).label("rank")
+    ranked = select(MetricPoint.id, rank).where(MetricPoint.organization_id == organization_id)
+    if metric_types is not None:
+        ranked = ranked.where(MetricPoint.metric_type.in_(list(metric_types)))
+    if before is not None:
+        ranked = ranked.where(MetricPoint.date < before)
+    ranked = ranked.subquery()
+
+    points = db.query(MetricPoint).join(
+        ranked, ranked.c.id == MetricPoint.id
+    ).join(MetricPoint.metric).options(
+        contains_eager(MetricPoint.metric)
+    ).filter(
+        ranked.c.rank <= n
+    ).order_by(MetricPoint.metric_type, ranked.c.rank).all()
+
+    result: Dict[str, List[MetricPoint]] = defaultdict(list)
+    for point in points:
+        result[point.metric_type].append(point)
+    return dict(result)
+
+
+def compare_periods(
+    db: Session,
+    organization_id: int,
+    start: datetime,
+    previous_start: datetime,
+) -> Dict[str, dict]:
+    """
+    Latest point per type in [start, now) and in [previous_start, start).
+
+    Returns:
+        Dict of metric_type -> {"current": point or None, "previous": point or None}
+    """
+    period = case((MetricPoint.date >= start, "current"), else_="previous")
+    rank = func.row_number().over(
+        partition_by=(MetricPoint.metric_type, period),
+        order_by=(MetricPoint.date.desc(), MetricPoint.id.desc())
+    ).label("rank")
+    ranked = select(MetricPoint.id, period.label("period"), rank).where(
+        MetricPoint.organization_id == organization_id,
+        MetricPoint.date >= previous_start
+    ).subquery()
+
+    rows = db.query(MetricPoint, ranked.c.period).join(
+        ranked, ranked.c.id == MetricPoint.id
+    ).join(MetricPoint.metric).options(
+        contains_eager(MetricPoint.metric)
+    ).filter(ranked.c.rank == 1).all()
+
+    result: Dict[str, dict] = defaultdict(lambda: {"current": None, "previous": None})
+    for point, period_name in rows:
+        result[point.metric_type][period_name] = point
+    return dict(result)
+
+
+def resample(
+    db: Session,
+    organization_id: int,
+    metric_types: Iterable[str],
+    start: Optional[datetime] = None,
+    bucket: str = "day",
+) -> Dict[str, List[dict]]:
+    """
+    Resample metric types into day, week or month buckets.
+
+    Each bucket reports its last value plus avg/min/max/count.
+
+    Returns:
+        Dict of metric_type -> buckets in chronological order
+    """
+    metric_types = list(metric_types)
+    fmt = RESAMPLE_FORMATS[bucket]
+    period = func.strftime(fmt, MetricPoint.date).label("period")
+    window = dict(partition_by=(MetricPoint.metric_type, period))
+    ranked = select(
+        MetricPoint.metric_type,
+        period,
+        MetricPoint.value,
+        MetricPoint.date,
+        func.row_number().over(order_by=(MetricPoint.date.desc(), MetricPoint.id.desc()), **window).label("rank"),
+        func.avg(MetricPoint.value).over(**window).label("avg"),
+        func.min(MetricPoint.value).over(**window).label("min"),
+        func.max(MetricPoint.value).over(**window).label("max"),
+        func.count(MetricPoint.id).over(**window).label("count"),
+    ).where(
+        MetricPoint.organization_id == organization_id,
+        MetricPoint.metric_type.in_(metric_types)
+    )
+    if start is not None:
+        ranked = ranked.where(MetricPoint.date >= start)
+    ranked = ranked.subquery()
+
+    rows = db.execute(
+        select(ranked).where(ranked.c.rank == 1).order_by(ranked.c.metric_type, ranked.c.period)
+    ).all()
+
+    result: Dict[str, List[dict]] = {t: [] for t in metric_types}
+    for row in rows:
+        result[row.metric_type].append({
+            "period": row.period,
+            "date": row.date,
+            "value": row.value,
+            "avg": row.avg,
+            "min": row.min,
+            "max": row.max,
+            "count": row.count,
+        })
+    return result
@@ -151,6 +151,22 @@ class Organization(Base):
     businesses = relationship("Business", back_populates="organization", foreign_keys="Business.organization_id")
 
 
+class OrgSequence(Base):
+    """
+    Per-organization counters for human-readable numbers (invoice numbers,
+    invite codes). Advanced atomically by sequences.next_value().
+    organization_id 0 holds global sequences.
+    """
+    __tablename__ = "org_sequences"
+    __table_args__ = (UniqueConstraint('organization_id', 'name', name='uq_org_sequence_name'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, nullable=False)
+    name = Column(String(100), nullable=False)  # e.g. "invoice:2025"
+    value = Column(Integer, nullable=False, default=0)  # Last allocated value
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+
 class Business(Base):
     """
     Fractal business/venture structure.
@@ -211,12 +227,15 @@ class Business(Base):
     health_operations = Column(Integer, default=0)  # Operations subscore
     health_growth = Column(Integer, default=0)  # Growth subscore
     health_updated_at = Column(DateTime, nullable=True)
+    health_dirty = Column(Boolean, default=True)  # Inputs changed since last calculation
 
     # Gamification toggle (for the sticklers who don't like fun)
     gamification_enabled = Column(Boolean, default=True)
 
     # Achievements (JSON array of earned achievement IDs)
     achievements = Column(JSON, nullable=True)
+    # Denormalized count of unlocked BusinessAchievements (for the leaderboard)
+    achievements_count = Column(Integer, default=0)
 
     # Daily quest progress (JSON, resets daily)
     daily_quests = Column(JSON, nullable=True)
@@ -243,6 +262,11 @@ class Business(Base):
     organization = relationship("Organization", back_populates="businesses", foreign_keys=[organization_id])
     parent = relationship("Business", remote_side=[id], backref="children")
 
+    __table_args__ = (
+        # Leaderboard: ranks eligible businesses by XP straight from the index
+        Index('ix_business_leaderboard', 'gamification_enabled', 'is_active', 'is_archived', 'xp'),
+    )
+
 
 # ============ QUEST SYSTEM ============
 
@@ -637,6 +661,36 @@ class AccountingConnection(Base):
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
 
+class AccountingSummarySnapshot(Base):
+    """
+    Latest financial summary pulled from an accounting connection.
+
+    Normalized across providers so the dashboard can sum snapshots of all
+    of an organization's connections without calling any provider.
+    """
+    __tablename__ = "accounting_summary_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    connection_id = Column(Integer, ForeignKey("accounting_connections.id", ondelete="CASCADE"), nullable=False, unique=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
+    provider = Column(String(50), nullable=False)
+
+    revenue = Column(Float, default=0.0)
+    expenses = Column(Float, default=0.0)
+    profit = Column(Float, default=0.0)
+    outstanding_invoices = Column(Float, default=0.0)
+    overdue_invoices = Column(Float, default=0.0)
+    cash_balance = Column(Float, default=0.0)
+    accounts_payable = Column(Float, default=0.0)
+    accounts_receivable = Column(Float, default=0.0)
+    period_start = Column(DateTime, nullable=True)
+    period_end = Column(DateTime, nullable=True)
+
+    fetched_at = Column(DateTime, nullable=True)  # Last successful pull
+    error = Column(Text, nullable=True)  # Error of the last attempt, if it failed
+    attempted_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+
 class ZoomConnection(Base):
     """Store OAuth connections for Zoom meeting integrations"""
     __tablename__ = "zoom_connections"
@@ -991,6 +1045,22 @@ class EmailIntegration(Base):
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
 
+class MailchimpMemberState(Base):
+    """Last state of a contact pushed to a Mailchimp audience, for diffing syncs"""
+    __tablename__ = "mailchimp_member_states"
+    __table_args__ = (UniqueConstraint('organization_id', 'list_id', 'email', name='uq_mailchimp_member_state'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
+    list_id = Column(String(255), nullable=False)
+    email = Column(String(255), nullable=False)  # Lowercased
+
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of the synced merge fields and tags
+    tags = Column(JSON, nullable=True)  # Tags as last synced, to compute removals
+
+    synced_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+
 # ============ DOCUMENT TEMPLATES ============
 
 class DocumentTemplate(Base):
@@ -1451,6 +1521,10 @@ class TokenBlacklist(Base):
     revoked_at = Column(DateTime, default=lambda: datetime.now(UTC))
     reason = Column(String(100), nullable=True)
 
+    __table_args__ = (
+        Index('ix_token_blacklist_revoked_at', 'revoked_at'),
+    )
+
 
 class VaultConfig(Base):
     """Vault master password configuration"""
@@ -1892,6 +1966,9 @@ class MetricType(str, enum.Enum):
 class Metric(Base):
     """Business metrics tracking over time"""
     __tablename__ = "metrics"
+    __table_args__ = (
+        Index('ix_metrics_org_type_date', 'organization_id', 'metric_type', 'date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=True)
@@ -1907,6 +1984,32 @@ class Metric(Base):
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
     created_by = relationship("User", backref="metrics")
+    point = relationship("MetricPoint", uselist=False, back_populates="metric", cascade="all, delete-orphan")
+
+
+class MetricPoint(Base):
+    """
+    Numeric time-series copy of a Metric.
+
+    Kept in sync with its Metric on flush (see metric_series.py) so
+    analytics can aggregate floats in SQL instead of parsing strings.
+    """
+    __tablename__ = "metric_points"
+    __table_args__ = (
+        Index('ix_metric_points_org_type_date', 'organization_id', 'metric_type', 'date'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    metric_id = Column(Integer, ForeignKey("metrics.id", ondelete="CASCADE"), nullable=False, unique=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=True)
+    business_id = Column(Integer, ForeignKey("businesses.id", ondelete="SET NULL"), nullable=True)
+    metric_type = Column(String(50), nullable=False)
+    value = Column(Float, nullable=False, default=0.0)
+    unit = Column(String(20), nullable=True)
+    date = Column(DateTime, nullable=False)  # Same timestamp as the metric
+    day = Column(Date, nullable=False)  # Normalized calendar day
+
+    metric = relationship("Metric", back_populates="point")
 
 
 class MetricGoal(Base):
@@ -2417,6 +2520,7 @@ class StripeConnection(Base):
 
     # Sync state
     last_sync_at = Column(DateTime, nullable=True)
+    last_full_sync_at = Column(DateTime, nullable=True)  # Last full reconcile; delta pulls in between
     sync_status = Column(String(50), default="pending")  # pending, syncing, synced, error
     sync_error = Column(Text, nullable=True)
 
@@ -2435,6 +2539,9 @@ class StripeConnection(Base):
 class StripeCustomerSync(Base):
     """Synced Stripe customer data."""
     __tablename__ = "stripe_customers_sync"
+    __table_args__ = (
+        Index('uq_stripe_customers_sync_org_customer', 'organization_id', 'stripe_customer_id', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
@@ -2449,6 +2556,7 @@ class StripeCustomerSync(Base):
 
     # Timestamps
     customer_created_at = Column(DateTime, nullable=True)
+    stripe_state_at = Column(DateTime, nullable=True)  # When Stripe had this state (event time or pull time)
 
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
@@ -2461,6 +2569,9 @@ class StripeCustomerSync(Base):
 class StripeSubscriptionSync(Base):
     """Synced Stripe subscription data for MRR/ARR calculation."""
     __tablename__ = "stripe_subscriptions_sync"
+    __table_args__ = (
+        Index('uq_stripe_subscriptions_sync_org_subscription', 'organization_id', 'stripe_subscription_id', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
@@ -2479,6 +2590,7 @@ class StripeSubscriptionSync(Base):
     subscription_created_at = Column(DateTime, nullable=True)
     current_period_end = Column(DateTime, nullable=True)
     canceled_at = Column(DateTime, nullable=True)
+    stripe_state_at = Column(DateTime, nullable=True)  # When Stripe had this state (event time or pull time)
 
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
@@ -2488,6 +2600,28 @@ class StripeSubscriptionSync(Base):
     connection = relationship("StripeConnection", back_populates="subscriptions")
 
 
+class StripeMRRDaily(Base):
+    """Precomputed daily MRR series, rebuilt after each Stripe sync."""
+    __tablename__ = "stripe_mrr_daily"
+    __table_args__ = (UniqueConstraint('organization_id', 'day', name='uq_stripe_mrr_daily_org_day'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+
+    # State at the start of the day
+    mrr = Column(Float, default=0.0)
+    active_subscriptions = Column(Integer, default=0)
+    paying_customers = Column(Integer, default=0)
+    customers = Column(Integer, default=0)  # All synced customers created so far
+
+    # MRR movements that took effect on this day
+    new_mrr = Column(Float, default=0.0)
+    expansion_mrr = Column(Float, default=0.0)
+    contraction_mrr = Column(Float, default=0.0)
+    churned_mrr = Column(Float, default=0.0)
+
+
 # ============================================================================
 # GOOGLE CALENDAR INTEGRATION MODEL
 # ============================================================================
@@ -2517,6 +2651,7 @@ class GoogleCalendarConnection(Base):
     last_sync_at = Column(DateTime, nullable=True)
     sync_status = Column(String(50), default="pending")  # pending, syncing, synced, error
     sync_error = Column(Text, nullable=True)
+    sync_token = Column(Text, nullable=True)  # Google nextSyncToken for incremental event pulls
 
     # Status
     is_active = Column(Boolean, default=True)
@@ -2529,6 +2664,42 @@ class GoogleCalendarConnection(Base):
     user = relationship("User", backref="google_calendar_connections")
 
 
+class CalendarEventCache(Base):
+    """
+    Local copy of a connected Google Calendar's events.
+
+    Maintained by incremental syncToken pulls (see calendar_sync.py) so
+    calendar views read from the database instead of calling Google.
+    Times are stored as naive UTC.
+    """
+    __tablename__ = "calendar_event_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    connection_id = Column(Integer, ForeignKey("google_calendar_connections.id", ondelete="CASCADE"), nullable=False)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    google_event_id = Column(String(255), nullable=False)
+
+    title = Column(String(500), nullable=True)
+    description = Column(Text, nullable=True)
+    location = Column(String(500), nullable=True)
+    start_at = Column(DateTime, nullable=False)
+    end_at = Column(DateTime, nullable=False)
+    all_day = Column(Boolean, default=False)
+
+    # Set for events pushed from Made4Founders (extendedProperties.private)
+    m4f_type = Column(String(20), nullable=True)  # deadline, meeting
+    m4f_id = Column(Integer, nullable=True)
+
+    google_updated_at = Column(DateTime, nullable=True)
+    synced_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        UniqueConstraint('connection_id', 'google_event_id', name='uq_calendar_event_cache_event'),
+        Index('ix_calendar_event_cache_start', 'connection_id', 'start_at'),
+        Index('ix_calendar_event_cache_m4f', 'connection_id', 'm4f_type', 'm4f_id'),
+    )
+
+
 # ============================================================================
 # SLACK INTEGRATION MODEL
 # ============================================================================
@@ -3899,6 +4070,48 @@ class Notification(Base):
     )
 
 
+class NotificationCounter(Base):
+    """
+    Per-user notification totals, kept in step with the notifications
+    table (see notification_events.py) so badges never need a COUNT.
+    """
+    __tablename__ = "notification_counters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    total_count = Column(Integer, nullable=False, default=0)
+    unread_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'organization_id', name='uq_notification_counter_user_org'),
+    )
+
+
+class NotificationSendLog(Base):
+    """
+    Ledger of scheduled emails already sent.
+
+    One row per (user, deadline, reminder type, period) so scheduler
+    reruns skip recipients that were already emailed. Weekly digests
+    use deadline_id 0 and the week's Monday as period.
+    """
+    __tablename__ = "notification_send_log"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deadline_id = Column(Integer, nullable=False, default=0)
+    reminder_type = Column(String(20), nullable=False)  # today, tomorrow, week, weekly_digest
+    period = Column(Date, nullable=False)  # due date of the deadline, or digest week
+    sent_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'deadline_id', 'reminder_type', 'period', name='uq_notification_send'),
+        Index('ix_notification_send_deadline', 'deadline_id', 'reminder_type'),
+    )
+
+
 class ActivityType(str, enum.Enum):
     """Types of activities tracked in the organization feed."""
     COMMENT_CREATED = "comment_created"
@@ -4085,3 +4298,31 @@ class WatchedStock(Base):
         UniqueConstraint('organization_id', 'symbol', name='uq_org_watched_stock'),
         Index('ix_watched_stock_org', 'organization_id'),
     )
+
+
+# ============ DATA EXPORT ============
+
+class DataExportJob(Base):
+    """
+    Background generation of a full organization export (data_export.py).
+
+    Each entity type is written to its own part file and recorded in
+    completed_entities, so an interrupted job resumes where it stopped.
+    """
+    __tablename__ = "data_export_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(String(20), default="pending")  # pending, running, completed, failed, expired
+    completed_entities = Column(JSON, default=list)
+    row_count = Column(Integer, default=0)
+    file_path = Column(String(500), nullable=True)
+    size_bytes = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    completed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
@@ -0,0 +1,291 @@
+"""
+Unread counters and server-push events for in-app notifications.
+
+Counters: NotificationCounter holds each user's total and unread counts.
+An after_flush hook applies the delta of every Notification added,
+deleted or marked read through the ORM, in the same transaction, so the
+badge is a primary-key read instead of a COUNT. A missing counter row is
+seeded from a COUNT once. Bulk query.update()/delete() bypass the hook;
+callers report those with record_bulk_change().
+
+Events: changes are queued on the session and published after commit
+(never for rolled-back work) through notification_broker. Each open
+/api/notifications/stream connection subscribes to its user's channel.
+The default backend delivers within this process. With several workers,
+install a backend that fans out over a shared bus (e.g. Redis pub/sub)
+and calls notification_broker.deliver() for each message it receives.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, event, func, inspect, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import Notification, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+_PENDING_KEY = "notification_events"
+
+
+# ============ Pub/sub ============
+
+class Subscription:
+    """One stream's queue, bound to the event loop that reads it."""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _put(self, message: dict) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A stalled client loses events; the next unread_count resyncs it
+            pass
+
+
+class LocalPubSub:
+    """Delivers published messages to subscribers in this process."""
+
+    def __init__(self, deliver: Callable[[int, dict], None]):
+        self._deliver = deliver
+
+    def publish(self, user_id: int, message: dict) -> None:
+        self._deliver(user_id, message)
+
+
+class NotificationBroker:
+    """Routes notification events to the streams of the user they belong to."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._backend = LocalPubSub(self.deliver)
+
+    def set_backend(self, factory: Callable[[Callable[[int, dict], None]], object]) -> None:
+        """Install a pub/sub backend; factory receives the local deliver callback."""
+        self._backend = factory(self.deliver)
+
+    def publish(self, user_id: int, message: dict) -> None:
+        try:
+            self._backend.publish(user_id, message)
+        except Exception as e:
+            logger.error(f"Failed to publish notification event: {e}")
+
+    def deliver(self, user_id: int, message: dict) -> None:
+        """Hand a message to every local subscriber of user_id (any thread)."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, message)
+            except RuntimeError:
+                # Loop already closed; the stream is going away
+                self.unsubscribe(subscription)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscriber_count(self, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscriptions.get(user_id, ()))
+            return sum(len(s) for s in self._subscriptions.values())
+
+
+# Global broker instance
+notification_broker = NotificationBroker()
+
+
+# ============ Counters ============
+
+def _seed_counter(conn: Connection, user_id: int, organization_id: int) -> Tuple[int, int]:
+    """Create a counter row from a COUNT of the user's notifications."""
+    total, unread = conn.execute(
+        select(
+            func.count(Notification.id),
+            func.coalesce(func.sum(case((Notification.is_read == False, 1), else_=0)), 0),
+        ).where(Notification.user_id == user_id, Notification.organization_id == organization_id)
+    ).one()
+    conn.execute(insert(NotificationCounter).values(
+        user_id=user_id, organization_id=organization_id,
+        total_count=total, unread_count=unread, updated_at=datetime.now(UTC),
+    ))
+    return total, unread
+
+
+def _apply_delta(conn: Connection, user_id: int, organization_id: int, total: int, unread: int) -> Tuple[int, int]:
+    """
+    Add to a user's counters (seeding them on first use).
+
+    Returns:
+        (total_count, unread_count) after the change
+    """
+    advance = (
+        update(NotificationCounter)
+        .where(NotificationCounter.user_id == user_id, NotificationCounter.organization_id == organization_id)
+        .values(
+            total_count=NotificationCounter.total_count + total,
+            unread_count=NotificationCounter.unread_count + unread,
+            updated_at=datetime.now(UTC),
+        )
+        .returning(NotificationCounter.total_count, NotificationCounter.unread_count)
+    )
+    row = conn.execute(advance).first()
+    if row is not None:
+        return row.total_count, row.unread_count
+
+    # The COUNT already includes the flushed change, so no delta is added
+    try:
+        with conn.begin_nested():
+            return _seed_counter(conn, user_id, organization_id)
+    except IntegrityError:
+        # Another transaction seeded it first
+        row = conn.execute(advance).one()
+        return row.total_count, row.unread_count
+
+
+def get_notification_counts(db: Session, user_id: int, organization_id: int) -> Tuple[int, int]:
+    """
+    Read a user's (total_count, unread_count).
+
+    Seeds and commits the counter row the first time it is read.
+    """
+    if organization_id is None:
+        # Notifications always belong to an organization
+        return 0, 0
+
+    row = db.query(NotificationCounter.total_count, NotificationCounter.unread_count).filter(
+        NotificationCounter.user_id == user_id,
+        NotificationCounter.organization_id == organization_id,
+    ).first()
+    if row is not None:
+        return row.total_count, row.unread_count
+
+    try:
+        counts = _seed_counter(db.connection(), user_id, organization_id)
+        db.commit()
+        return counts
+    except IntegrityError:
+        # Seeded concurrently by another request
+        db.rollback()
+        row = db.query(NotificationCounter.total_count, NotificationCounter.unread_count).filter(
+            NotificationCounter.user_id == user_id,
+            NotificationCounter.organization_id == organization_id,
+        ).one()
+        return row.total_count, row.unread_count
+
+
+def record_bulk_change(db: Session, user_id: int, organization_id: int, total: int = 0, unread: int = 0) -> None:
+    """Apply a counter delta for a bulk UPDATE/DELETE the flush hook can't see."""
+    if not total and not unread:
+        return
+    _, unread_count = _apply_delta(db.connection(), user_id, organization_id, total, unread)
+    _pending(db).append((user_id, {
+        "type": "unread_count",
+        "organization_id": organization_id,
+        "data": {"count": unread_count},
+    }))
+
+
+# ============ Session hooks ============
+
+def _pending(session: Session) -> List[Tuple[int, dict]]:
+    return session.info.setdefault(_PENDING_KEY, [])
+
+
+def _notification_payload(notification: Notification) -> dict:
+    return {
+        "id": notification.id,
+        "notification_type": notification.notification_type,
+        "title": notification.title,
+        "message": notification.message,
+        "entity_type": notification.entity_type,
+        "entity_id": notification.entity_id,
+        "actor_user_id": notification.actor_user_id,
+        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _track_notification_changes(session: Session, flush_context) -> None:
+    """Apply counter deltas for flushed notifications and queue their events."""
+    deltas: Dict[Tuple[int, int], List[int]] = defaultdict(lambda: [0, 0])  # -> [total, unread]
+    created: List[Notification] = []
+
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            delta = deltas[(obj.user_id, obj.organization_id)]
+            delta[0] += 1
+            delta[1] += 0 if obj.is_read else 1
+            created.append(obj)
+
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            delta = deltas[(obj.user_id, obj.organization_id)]
+            delta[0] -= 1
+            delta[1] -= 0 if obj.is_read else 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and obj not in session.deleted:
+            history = inspect(obj).attrs.is_read.history
+            if history.has_changes():
+                was_read = bool(history.deleted[0]) if history.deleted else False
+                if was_read != bool(obj.is_read):
+                    deltas[(obj.user_id, obj.organization_id)][1] += -1 if obj.is_read else 1
+
+    if not deltas:
+        return
+
+    conn = session.connection()
+    pending = _pending(session)
+    unread_counts = {}
+    for (user_id, organization_id), (total, unread) in deltas.items():
+        if total or unread:
+            _, unread_counts[(user_id, organization_id)] = _apply_delta(conn, user_id, organization_id, total, unread)
+
+    for notification in created:
+        key = (notification.user_id, notification.organization_id)
+        pending.append((notification.user_id, {
+            "type": "notification",
+            "organization_id": notification.organization_id,
+            "data": {**_notification_payload(notification), "unread_count": unread_counts.get(key)},
+        }))
+    for (user_id, organization_id), count in unread_counts.items():
+        pending.append((user_id, {
+            "type": "unread_count",
+            "organization_id": organization_id,
+            "data": {"count": count},
+        }))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_notification_events(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    for user_id, message in pending or ():
+        notification_broker.publish(user_id, message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_notification_events(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
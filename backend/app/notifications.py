@@ -9,18 +9,29 @@ Can be triggered by:
 Endpoints:
 - POST /api/notifications/send-deadline-reminders (requires API key)
 - POST /api/notifications/send-weekly-digest (requires API key)
+
+Each run loads deadlines, stats and recipients for every organization in
+a handful of set-based queries, renders each organization's email once,
+and sends through a bounded thread pool. Sends are claimed in
+NotificationSendLog before they go out, so rerunning a job (or two runs
+overlapping) never emails anyone twice.
 """
 import os
 import logging
-from datetime import datetime, UTC, timedelta
-from typing import Optional
+from collections import defaultdict
+from datetime import datetime, UTC, time, timedelta
+from typing import Dict, Iterable, List
 
 from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from .database import get_db
-from .models import User, Deadline, Organization, Task, TaskBoard, TaskColumn
-from .email_service import send_deadline_reminder_email, send_weekly_digest_email
+from .models import User, Deadline, Task, TaskBoard, NotificationSendLog
+from .email_service import (
+    personalize, render_deadline_reminder_email, render_weekly_digest_email, send_bulk
+)
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +40,11 @@ router = APIRouter()
 # API key for scheduler authentication (set in environment)
 SCHEDULER_API_KEY = os.getenv("SCHEDULER_API_KEY", "")
 
+# Maximum number of emails in flight at once
+SEND_CONCURRENCY = int(os.getenv("NOTIFICATION_SEND_CONCURRENCY", "8"))
+
+DIGEST_REMINDER_TYPE = "weekly_digest"
+
 
 def verify_scheduler_key(x_api_key: str = Header(None)):
     """Verify the scheduler API key using constant-time comparison."""
@@ -41,6 +57,97 @@ def verify_scheduler_key(x_api_key: str = Header(None)):
     return True
 
 
+def _recipients_by_org(db: Session, org_ids: Iterable[int]) -> Dict[int, List[User]]:
+    """Active, verified users of the given organizations, grouped by org."""
+    org_ids = list(org_ids)
+    recipients: Dict[int, List[User]] = defaultdict(list)
+    if not org_ids:
+        return recipients
+    users = db.query(User).filter(
+        User.is_active == True,
+        User.email_verified == True,
+        User.organization_id.in_(org_ids)
+    ).order_by(User.id).all()
+    for user in users:
+        recipients[user.organization_id].append(user)
+    return recipients
+
+
+def _ledger_key(row: dict) -> tuple:
+    return (row["user_id"], row["deadline_id"], row["reminder_type"], row["period"])
+
+
+def _claim(db: Session, outbox: List[tuple]) -> List[tuple]:
+    """
+    Insert the outbox's ledger rows before anything is sent.
+
+    Rows another run already holds are left alone (ON CONFLICT DO
+    NOTHING). A message is only sent if all of its rows were claimed here;
+    the rows of any other message are released again, so overlapping runs
+    never email anyone twice.
+
+    Returns:
+        The messages this run may send
+    """
+    rows = [row for message in outbox for row in message[3]]
+    if not rows:
+        return []
+    key_columns = [
+        NotificationSendLog.user_id, NotificationSendLog.deadline_id,
+        NotificationSendLog.reminder_type, NotificationSendLog.period,
+    ]
+    stmt = sqlite_insert(NotificationSendLog).on_conflict_do_nothing(
+        index_elements=[c.name for c in key_columns]
+    ).returning(*key_columns)
+    claimed = {tuple(row) for row in db.execute(stmt, rows)}
+
+    claimable, released = [], []
+    for message in outbox:
+        keys = [_ledger_key(row) for row in message[3]]
+        if all(key in claimed for key in keys):
+            claimable.append(message)
+        else:
+            released.extend(key for key in keys if key in claimed)
+    _release(db, released)
+    db.commit()
+    return claimable
+
+
+def _release(db: Session, keys: List[tuple]) -> None:
+    """Delete claimed ledger rows (not committed)."""
+    if keys:
+        db.query(NotificationSendLog).filter(tuple_(
+            NotificationSendLog.user_id, NotificationSendLog.deadline_id,
+            NotificationSendLog.reminder_type, NotificationSendLog.period
+        ).in_(keys)).delete(synchronize_session=False)
+
+
+async def _deliver(db: Session, outbox: List[tuple]) -> dict:
+    """
+    Send (email, subject, html, ledger_rows) messages.
+
+    The ledger rows are claimed first and released again for messages
+    that failed to send, so they are retried on the next run.
+
+    Returns:
+        {"sent": n, "errors": n, "skipped": n}
+    """
+    claimed = _claim(db, outbox)
+    results = await send_bulk([m[:3] for m in claimed], concurrency=SEND_CONCURRENCY)
+
+    failed = []
+    for (email, _, _, rows), success in zip(claimed, results):
+        if not success:
+            logger.error(f"Failed to send scheduled email to {email}")
+            failed.extend(_ledger_key(row) for row in rows)
+    if failed:
+        _release(db, failed)
+        db.commit()
+
+    sent = sum(1 for success in results if success)
+    return {"sent": sent, "errors": len(results) - sent, "skipped": len(outbox) - len(claimed)}
+
+
 @router.post("/send-deadline-reminders")
 async def send_deadline_reminders(
     db: Session = Depends(get_db),
@@ -53,91 +160,94 @@ async def send_deadline_reminders(
     Sends reminders for:
     - Deadlines due today
     - Deadlines due tomorrow
-    - Deadlines due in the next 7 days (once per deadline)
+    - Deadlines due in the next 7 days (Mondays only, once per deadline)
     """
     today = datetime.now(UTC).date()
     tomorrow = today + timedelta(days=1)
-    week_from_now = today + timedelta(days=7)
-
-    # Get all active users with their organization
-    users = db.query(User).filter(
-        User.is_active == True,
-        User.email_verified == True,
-        User.organization_id.isnot(None)
-    ).all()
-
-    sent_count = 0
-    error_count = 0
-
-    for user in users:
-        try:
-            # Get user's deadlines
-            deadlines = db.query(Deadline).filter(
-                Deadline.organization_id == user.organization_id,
-                Deadline.is_completed == False,
-                Deadline.due_date >= today,
-                Deadline.due_date <= week_from_now
-            ).order_by(Deadline.due_date).all()
-
-            if not deadlines:
-                continue
-
-            # Group by urgency
-            today_deadlines = []
-            tomorrow_deadlines = []
-            week_deadlines = []
-
-            for d in deadlines:
-                deadline_data = {
-                    'title': d.title,
-                    'due_date': d.due_date.strftime('%B %d, %Y') if d.due_date else 'Unknown',
-                    'category': d.category or ''
-                }
-
-                if d.due_date == today:
-                    today_deadlines.append(deadline_data)
-                elif d.due_date == tomorrow:
-                    tomorrow_deadlines.append(deadline_data)
-                else:
-                    week_deadlines.append(deadline_data)
-
-            # Send appropriate reminders
-            if today_deadlines:
-                await send_deadline_reminder_email(
-                    email=user.email,
-                    name=user.name,
-                    deadlines=today_deadlines,
-                    reminder_type="today"
-                )
-                sent_count += 1
-
-            if tomorrow_deadlines:
-                await send_deadline_reminder_email(
-                    email=user.email,
-                    name=user.name,
-                    deadlines=tomorrow_deadlines,
-                    reminder_type="tomorrow"
-                )
-                sent_count += 1
-
-            # Only send weekly reminder on Mondays to avoid spam
-            if datetime.now(UTC).weekday() == 0 and week_deadlines:
-                await send_deadline_reminder_email(
-                    email=user.email,
-                    name=user.name,
-                    deadlines=week_deadlines,
-                    reminder_type="week"
-                )
-                sent_count += 1
-
-        except Exception as e:
-            logger.error(f"Failed to send deadline reminders to {user.email}: {e}")
-            error_count += 1
-
+    window_start = datetime.combine(today, time.min)
+    window_end = window_start + timedelta(days=8)  # through 7 days from now
+    send_week = today.weekday() == 0
+
+    deadlines = db.query(Deadline).filter(
+        Deadline.organization_id.isnot(None),
+        Deadline.is_completed == False,
+        Deadline.due_date >= window_start,
+        Deadline.due_date < window_end
+    ).order_by(Deadline.organization_id, Deadline.due_date, Deadline.id).all()
+
+    # org -> reminder type -> deadlines
+    buckets: Dict[int, Dict[str, List[Deadline]]] = defaultdict(lambda: defaultdict(list))
+    for d in deadlines:
+        due = d.due_date.date()
+        if due == today:
+            reminder_type = "today"
+        elif due == tomorrow:
+            reminder_type = "tomorrow"
+        elif send_week:
+            reminder_type = "week"
+        else:
+            continue
+        buckets[d.organization_id][reminder_type].append(d)
+
+    recipients = _recipients_by_org(db, buckets.keys())
+
+    already_sent = set()
+    deadline_ids = [d.id for d in deadlines]
+    if deadline_ids:
+        already_sent = set(db.query(
+            NotificationSendLog.user_id,
+            NotificationSendLog.deadline_id,
+            NotificationSendLog.reminder_type,
+            NotificationSendLog.period
+        ).filter(
+            NotificationSendLog.deadline_id.in_(deadline_ids),
+            NotificationSendLog.reminder_type.in_(["today", "tomorrow", "week"])
+        ).all())
+
+    outbox = []
+    skipped = 0
+    for org_id, by_type in buckets.items():
+        # Everyone in an org usually gets the same deadlines, so each
+        # distinct list is rendered once
+        rendered = {}
+        for reminder_type, org_deadlines in by_type.items():
+            for user in recipients.get(org_id, []):
+                pending = [
+                    d for d in org_deadlines
+                    if (user.id, d.id, reminder_type, d.due_date.date()) not in already_sent
+                ]
+                if not pending:
+                    skipped += 1
+                    continue
+
+                key = (reminder_type, tuple(d.id for d in pending))
+                if key not in rendered:
+                    rendered[key] = render_deadline_reminder_email([
+                        {
+                            'title': d.title,
+                            'due_date': d.due_date.strftime('%B %d, %Y'),
+                            'category': (d.deadline_type or '').replace('_', ' ').title()
+                        }
+                        for d in pending
+                    ], reminder_type)
+                subject, html = rendered[key]
+
+                outbox.append((user.email, subject, personalize(html, user.name), [
+                    {
+                        "user_id": user.id,
+                        "deadline_id": d.id,
+                        "reminder_type": reminder_type,
+                        "period": d.due_date.date(),
+                    }
+                    for d in pending
+                ]))
+
+    result = await _deliver(db, outbox)
     return {
         "message": "Deadline reminders sent",
-        "sent": sent_count,
-        "errors": error_count,
+        "sent": result["sent"],
+        "errors": result["errors"],
+        "skipped": skipped + result["skipped"],
     }
 
 
@@ -150,86 +260,90 @@ async def send_weekly_digest(
     Send weekly digest emails to all users.
 
     Should be called once per week (e.g., Monday morning) by a scheduler.
+    At most one digest per user is sent for a given week.
     """
     today = datetime.now(UTC).date()
-    week_ago = today - timedelta(days=7)
-    week_from_now = today + timedelta(days=7)
+    week_start = today - timedelta(days=today.weekday())
+    midnight = datetime.combine(today, time.min)
+    week_ago = midnight - timedelta(days=7)
+    week_from_now = midnight + timedelta(days=8)
 
-    # Get all active users
     users = db.query(User).filter(
         User.is_active == True,
         User.email_verified == True,
         User.organization_id.isnot(None)
-    ).all()
-
-    sent_count = 0
-    error_count = 0
+    ).order_by(User.id).all()
+    org_ids = {u.organization_id for u in users}
+
+    already_sent = {
+        user_id for (user_id,) in db.query(NotificationSendLog.user_id).filter(
+            NotificationSendLog.reminder_type == DIGEST_REMINDER_TYPE,
+            NotificationSendLog.period == week_start
+        ).all()
+    }
 
+    tasks_completed: Dict[int, int] = {}
+    deadline_stats: Dict[int, tuple] = {}
+    if org_ids:
+        tasks_completed = dict(db.query(
+            TaskBoard.organization_id, func.count(Task.id)
+        ).join(
+            Task, Task.board_id == TaskBoard.id
+        ).filter(
+            TaskBoard.organization_id.in_(org_ids),
+            Task.status == "done",
+            Task.updated_at >= week_ago
+        ).group_by(TaskBoard.organization_id).all())
+
+        met = (Deadline.is_completed == True) & (Deadline.completed_at >= week_ago)
+        upcoming = (
+            (Deadline.is_completed == False)
+            & (Deadline.due_date >= midnight)
+            & (Deadline.due_date < week_from_now)
+        )
+        deadline_stats = {
+            row.organization_id: (row.met or 0, row.upcoming or 0)
+            for row in db.query(
+                Deadline.organization_id,
+                func.sum(case((met, 1), else_=0)).label("met"),
+                func.sum(case((upcoming, 1), else_=0)).label("upcoming"),
+            ).filter(
+                Deadline.organization_id.in_(org_ids)
+            ).group_by(Deadline.organization_id).all()
+        }
+
+    outbox = []
+    skipped = 0
+    rendered: Dict[int, tuple] = {}
     for user in users:
-        try:
-            org_id = user.organization_id
-
-            # Get boards for this org
-            boards = db.query(TaskBoard).filter(TaskBoard.organization_id == org_id).all()
-            board_ids = [b.id for b in boards]
-
-            # Count tasks completed this week
-            tasks_completed = 0
-            if board_ids:
-                # Get all column IDs for these boards
-                columns = db.query(TaskColumn).filter(TaskColumn.board_id.in_(board_ids)).all()
-                column_ids = [c.id for c in columns]
-
-                if column_ids:
-                    tasks_completed = db.query(Task).filter(
-                        Task.column_id.in_(column_ids),
-                        Task.status == "done",
-                        Task.updated_at >= week_ago
-                    ).count()
-
-            # Count deadlines completed this week
-            deadlines_met = db.query(Deadline).filter(
-                Deadline.organization_id == org_id,
-                Deadline.is_completed == True,
-                Deadline.completed_at >= week_ago
-            ).count()
-
-            # Count upcoming deadlines
-            upcoming_deadlines = db.query(Deadline).filter(
-                Deadline.organization_id == org_id,
-                Deadline.is_completed == False,
-                Deadline.due_date >= today,
-                Deadline.due_date <= week_from_now
-            ).count()
-
-            # Get XP earned (from organization)
-            org = db.query(Organization).filter(Organization.id == org_id).first()
-            # Note: Would need to track XP history to get weekly XP
-            # For now, just show total XP
-            xp_earned = 0  # TODO: Track weekly XP
-
-            stats = {
-                'tasks_completed': tasks_completed,
+        if user.id in already_sent:
+            skipped += 1
+            continue
+
+        org_id = user.organization_id
+        if org_id not in rendered:
+            deadlines_met, upcoming_deadlines = deadline_stats.get(org_id, (0, 0))
+            rendered[org_id] = render_weekly_digest_email({
+                'tasks_completed': tasks_completed.get(org_id, 0),
                 'deadlines_met': deadlines_met,
                 'upcoming_deadlines': upcoming_deadlines,
-                'xp_earned': xp_earned,
-            }
-
-            await send_weekly_digest_email(
-                email=user.email,
-                name=user.name,
-                stats=stats
-            )
-            sent_count += 1
-
-        except Exception as e:
-            logger.error(f"Failed to send weekly digest to {user.email}: {e}")
-            error_count += 1
-
+                'xp_earned': 0,  # TODO: Track weekly XP
+            })
+        subject, html = rendered[org_id]
+
+        outbox.append((user.email, subject, personalize(html, user.name), [{
+            "user_id": user.id,
+            "deadline_id": 0,
+            "reminder_type": DIGEST_REMINDER_TYPE,
+            "period": week_start,
+        }]))
+
+    result = await _deliver(db, outbox)
     return {
         "message": "Weekly digests sent",
-        "sent": sent_count,
-        "errors": error_count,
+        "sent": result["sent"],
+        "errors": result["errors"],
+        "skipped": skipped + result["skipped"],
     }
 
 
@@ -5,14 +5,20 @@ Provides endpoints for listing, reading, and managing notifications.
 Notifications are created by other parts of the system (comments, assignments, etc.).
 """
 
+import asyncio
+import json
+import os
+import time
 from typing import Optional
 from datetime import datetime, UTC, UTC
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from .database import get_db
 from .models import User, Notification
+from .notification_events import notification_broker, get_notification_counts, record_bulk_change
 from .schemas import (
     NotificationResponse, NotificationListResponse,
     MarkNotificationsReadRequest, UserBrief
@@ -21,6 +27,10 @@ from .auth import get_current_user
 
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
 
+# Streams are closed after this long so clients reconnect (and re-authenticate)
+NOTIFICATION_STREAM_MAX_SECONDS = float(os.getenv("NOTIFICATION_STREAM_MAX_SECONDS", "900"))
+NOTIFICATION_STREAM_KEEPALIVE = 20.0
+
 
 # ============ Helper Functions ============
 
@@ -62,6 +72,8 @@ def create_notification(
     Helper function to create a notification.
 
     Use this from other modules to create notifications for users.
+    The recipient's unread counter is updated when the session flushes,
+    and open notification streams receive it once the session commits.
     """
     notification = Notification(
         organization_id=organization_id,
@@ -91,10 +103,11 @@ async def list_notifications(
     List notifications for the current user.
 
     Returns paginated list of notifications, newest first.
-    Includes unread count for badge display.
+    Includes unread count for badge display (from the maintained counter).
     """
     user_id = current_user.id
     org_id = current_user.organization_id
+    total_count, unread_count = get_notification_counts(db, user_id, org_id)
 
     # Base query
     query = db.query(Notification).filter(
@@ -104,16 +117,7 @@ async def list_notifications(
 
     if unread_only:
         query = query.filter(Notification.is_read == False)
-
-    # Get total count
-    total_count = query.count()
-
-    # Get unread count (always)
-    unread_count = db.query(func.count(Notification.id)).filter(
-        Notification.user_id == user_id,
-        Notification.organization_id == org_id,
-        Notification.is_read == False
-    ).scalar() or 0
+        total_count = unread_count
 
     # Get paginated results
     notifications = query.order_by(
@@ -135,18 +139,67 @@ async def get_unread_count(
     """
     Get the count of unread notifications.
 
-    Use this for displaying a badge on the notification bell.
-    Lightweight endpoint for polling.
+    Use this for the initial badge on the notification bell; subscribe
+    to /stream for updates instead of polling.
     """
-    count = db.query(func.count(Notification.id)).filter(
-        Notification.user_id == current_user.id,
-        Notification.organization_id == current_user.organization_id,
-        Notification.is_read == False
-    ).scalar() or 0
-
+    _, count = get_notification_counts(db, current_user.id, current_user.organization_id)
     return {"count": count}
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/stream")
+async def stream_notifications(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent events for the notification bell.
+
+    Sends an `unread_count` event on connect, then a `notification` event
+    for each new notification and an `unread_count` event whenever the
+    count changes. Comment lines are sent as keepalives. The stream ends
+    after NOTIFICATION_STREAM_MAX_SECONDS; EventSource reconnects on its own.
+    """
+    user_id = current_user.id
+    org_id = current_user.organization_id
+    _, unread_count = get_notification_counts(db, user_id, org_id)
+    # Don't hold a pooled connection for the lifetime of the stream
+    db.close()
+
+    subscription = notification_broker.subscribe(user_id)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            yield _sse("unread_count", {"count": unread_count})
+            deadline = time.monotonic() + NOTIFICATION_STREAM_MAX_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        timeout=min(NOTIFICATION_STREAM_KEEPALIVE, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message.get("organization_id") == org_id:
+                    yield _sse(message["type"], message["data"])
+        finally:
+            notification_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/mark-read")
 async def mark_notifications_read(
     data: MarkNotificationsReadRequest,
@@ -185,6 +238,8 @@ async def mark_notifications_read(
     else:
         return {"marked_count": 0}
 
+    # Bulk UPDATE bypasses the session hooks
+    record_bulk_change(db, user_id, org_id, unread=-count)
     db.commit()
     return {"marked_count": count}
 
@@ -227,15 +282,23 @@ async def clear_all_notifications(
     By default, only clears read notifications.
     Set read_only=False to clear all notifications.
     """
-    query = db.query(Notification).filter(
+    stmt = delete(Notification).where(
         Notification.user_id == current_user.id,
         Notification.organization_id == current_user.organization_id
     )
 
     if read_only:
-        query = query.filter(Notification.is_read == True)
-
-    count = query.delete(synchronize_session=False)
+        stmt = stmt.where(Notification.is_read == True)
+
+    deleted = db.execute(
+        stmt.returning(Notification.is_read).execution_options(synchronize_session=False)
+    ).scalars().all()
+    count = len(deleted)
+    # Bulk DELETE bypasses the session hooks
+    record_bulk_change(
+        db, current_user.id, current_user.organization_id,
+        total=-count, unread=-sum(1 for is_read in deleted if not is_read)
+    )
     db.commit()
 
     return {"deleted_count": count}
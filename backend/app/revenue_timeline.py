@@ -0,0 +1,204 @@
+"""
+Daily MRR timeline for Stripe revenue charts.
+
+Each subscription contributes two events: its MRR starts counting on the
+day it was created and stops on the day it was canceled. Sorting those
+events once and sweeping them day by day yields the whole history (MRR,
+subscription and customer counts, and new/expansion/contraction/churn
+movements) in a single pass over the subscription table.
+
+The result is stored per organization in StripeMRRDaily and rebuilt after
+every sync, so charts of any range or granularity read a slice of
+precomputed rows instead of re-scanning subscriptions for every point.
+
+Points follow the original chart semantics: the state of a day is the
+state at midnight, so an event counts from the first midnight at or after
+its timestamp.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from .models import StripeCustomerSync, StripeMRRDaily, StripeSubscriptionSync
+
+
+MOVEMENT_FIELDS = ("new_mrr", "expansion_mrr", "contraction_mrr", "churned_mrr")
+
+
+def _effective_day(value: Optional[datetime]) -> Optional[date]:
+    """First day whose midnight is at or after the timestamp."""
+    if value is None:
+        return None
+    if value.time() == time.min:
+        return value.date()
+    return value.date() + timedelta(days=1)
+
+
+def _empty_point(day: date) -> dict:
+    return {
+        "day": day,
+        "mrr": 0.0,
+        "active_subscriptions": 0,
+        "paying_customers": 0,
+        "customers": 0,
+        **{field: 0.0 for field in MOVEMENT_FIELDS},
+    }
+
+
+def compute_mrr_timeline(db: Session, organization_id: int, until: Optional[date] = None) -> List[dict]:
+    """
+    Sweep subscription and customer events into one row per day.
+
+    Runs two queries (subscriptions and customer creation dates), whatever
+    the length of the history.
+
+    Returns:
+        List of daily points from the first event through `until` (today)
+    """
+    until = until or date.today()
+
+    # day -> list of (customer key, mrr delta, subscription delta)
+    sub_events: Dict[date, List[Tuple[str, float, int]]] = defaultdict(list)
+    for sub_id, customer_id, mrr, created_at, canceled_at in db.query(
+        StripeSubscriptionSync.stripe_subscription_id,
+        StripeSubscriptionSync.stripe_customer_id,
+        StripeSubscriptionSync.mrr,
+        StripeSubscriptionSync.subscription_created_at,
+        StripeSubscriptionSync.canceled_at,
+    ).filter(StripeSubscriptionSync.organization_id == organization_id).all():
+        start = _effective_day(created_at)
+        if start is None:
+            continue
+        end = _effective_day(canceled_at)
+        if end is not None and end <= start:
+            continue
+        key = customer_id or sub_id
+        sub_events[start].append((key, mrr or 0.0, 1))
+        if end is not None:
+            sub_events[end].append((key, -(mrr or 0.0), -1))
+
+    customer_events: Dict[date, int] = defaultdict(int)
+    for (created_at,) in db.query(StripeCustomerSync.customer_created_at).filter(
+        StripeCustomerSync.organization_id == organization_id,
+        StripeCustomerSync.customer_created_at != None
+    ).all():
+        customer_events[_effective_day(created_at)] += 1
+
+    event_days = sorted(set(sub_events) | set(customer_events))
+    if not event_days or event_days[0] > until:
+        return []
+
+    customer_mrr: Dict[str, float] = defaultdict(float)
+    mrr = 0.0
+    active_subscriptions = 0
+    paying_customers = 0
+    customers = 0
+
+    points = []
+    day = event_days[0]
+    while day <= until:
+        point = _empty_point(day)
+
+        if day in sub_events:
+            # Net each customer's changes for the day before classifying them
+            deltas: Dict[str, float] = defaultdict(float)
+            for key, delta, count in sub_events[day]:
+                deltas[key] += delta
+                active_subscriptions += count
+            for key, delta in deltas.items():
+                before = customer_mrr[key]
+                after = round(before + delta, 2)
+                customer_mrr[key] = after
+                if before <= 0 < after:
+                    point["new_mrr"] += after
+                    paying_customers += 1
+                elif after <= 0 < before:
+                    point["churned_mrr"] += before
+                    paying_customers -= 1
+                elif after > before:
+                    point["expansion_mrr"] += after - before
+                elif after < before:
+                    point["contraction_mrr"] += before - after
+                mrr += delta
+
+        customers += customer_events.get(day, 0)
+
+        point["mrr"] = round(mrr, 2)
+        point["active_subscriptions"] = active_subscriptions
+        point["paying_customers"] = paying_customers
+        point["customers"] = customers
+        for field in MOVEMENT_FIELDS:
+            point[field] = round(point[field], 2)
+        points.append(point)
+        day += timedelta(days=1)
+
+    return points
+
+
+def rebuild_mrr_timeline(db: Session, organization_id: int, points: Optional[List[dict]] = None) -> int:
+    """
+    Replace an organization's stored daily series. Not committed.
+
+    Returns:
+        Number of days stored
+    """
+    if points is None:
+        points = compute_mrr_timeline(db, organization_id)
+    db.execute(delete(StripeMRRDaily).where(StripeMRRDaily.organization_id == organization_id))
+    if points:
+        db.execute(
+            insert(StripeMRRDaily),
+            [{"organization_id": organization_id, **point} for point in points],
+        )
+    return len(points)
+
+
+def invalidate_mrr_timeline(db: Session, organization_id: int) -> None:
+    """Drop the stored series so the next read rebuilds it. Not committed."""
+    db.execute(delete(StripeMRRDaily).where(StripeMRRDaily.organization_id == organization_id))
+
+
+def get_mrr_series(db: Session, organization_id: int, start: date, end: date) -> List[dict]:
+    """
+    Daily points for [start, end], one per day.
+
+    Days past the last rebuild carry the last known state forward (with no
+    movements); days before the first event are zero. The series is built
+    on first use if it has never been stored.
+    """
+    def load():
+        return db.query(StripeMRRDaily).filter(
+            StripeMRRDaily.organization_id == organization_id,
+            StripeMRRDaily.day <= end
+        ).order_by(StripeMRRDaily.day.desc()).limit((end - start).days + 2).all()
+
+    rows = load()
+    if not rows:
+        points = compute_mrr_timeline(db, organization_id)
+        if points:
+            rebuild_mrr_timeline(db, organization_id, points)
+            db.commit()
+            rows = load()
+
+    by_day = {row.day: row for row in rows}
+    # Latest stored row at or before start seeds the carry-forward state
+    carry = next((row for row in rows if row.day <= start), None)
+
+    series = []
+    day = start
+    while day <= end:
+        row = by_day.get(day)
+        if row is not None:
+            carry = row
+            point = {field: getattr(row, field) for field in _empty_point(day)}
+        else:
+            point = _empty_point(day)
+            if carry is not None:
+                for field in ("mrr", "active_subscriptions", "paying_customers", "customers"):
+                    point[field] = getattr(carry, field)
+        series.append(point)
+        day += timedelta(days=1)
+    return series
@@ -8,12 +8,15 @@ Features:
 - Audit logging
 """
 import os
+import math
 import time
+import sqlite3
 import hashlib
 import logging
+import threading
 from datetime import datetime, UTC, UTC
-from typing import Callable, Dict, Optional
-from collections import defaultdict
+from typing import Callable, Optional, Tuple
+from collections import OrderedDict
 from functools import wraps
 
 from fastapi import Request, Response, HTTPException
@@ -90,34 +93,133 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 
-class RateLimiter:
+class MemoryRateLimitBackend:
     """
-    In-memory rate limiter with sliding window.
-    For production, use Redis-based rate limiting.
+    Per-process GCRA (generic cell rate algorithm) limiter.
+
+    Each key holds a single "theoretical arrival time" float, so memory
+    is O(1) per active key. Keys are kept in last-touched order and
+    expired ones are dropped from the front on each hit, so cleanup is
+    amortised O(1) instead of periodic full scans.
     """
 
     def __init__(self):
-        # Structure: {key: [(timestamp, count), ...]}
-        self._requests: Dict[str, list] = defaultdict(list)
-        self._cleanup_interval = 60  # seconds
-        self._last_cleanup = time.time()
+        self._lock = threading.Lock()
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
 
-    def _cleanup_old_requests(self, window_seconds: int = 60):
-        """Remove old request records."""
+    def hit(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int, float]:
+        interval = window_seconds / max_requests
         now = time.time()
-        if now - self._last_cleanup < self._cleanup_interval:
-            return
+        with self._lock:
+            while self._tats:
+                oldest_key, oldest_tat = next(iter(self._tats.items()))
+                if oldest_tat > now:
+                    break
+                del self._tats[oldest_key]
+
+            tat = max(self._tats.get(key, now), now) + interval
+            if tat - now > window_seconds:
+                return True, 0, tat - window_seconds - now
+            self._tats[key] = tat
+            self._tats.move_to_end(key)
+        return False, int((window_seconds - (tat - now)) / interval), tat - now
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tats.clear()
+
+
+class SQLiteRateLimitBackend:
+    """
+    GCRA limiter stored in a local SQLite file shared by every worker.
+
+    Each check is a single UPSERT ... RETURNING statement, so concurrent
+    workers can't both take the last slot. Expired rows are deleted every
+    PURGE_EVERY hits.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_tat ON rate_limits (tat)")
+
+    def hit(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int, float]:
+        interval = window_seconds / max_requests
+        now = time.time()
+        with self._lock:
+            self._hits += 1
+            if self._hits % self.PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+
+            row = self._conn.execute(
+                """
+                INSERT INTO rate_limits (key, tat) VALUES (:key, :now + :interval)
+                ON CONFLICT (key) DO UPDATE SET tat = max(tat, :now) + :interval
+                WHERE max(tat, :now) + :interval - :now <= :window
+                RETURNING tat
+                """,
+                {"key": key, "now": now, "interval": interval, "window": window_seconds}
+            ).fetchone()
+            if row is None:
+                (tat,) = self._conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+                return True, 0, tat + interval - window_seconds - now
+
+        tat = row[0]
+        return False, int((window_seconds - (tat - now)) / interval), tat - now
+
+    def reset(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limits")
+
+
+def _create_rate_limit_backend():
+    """Pick the backend from RATE_LIMIT_BACKEND ("memory" or "sqlite")."""
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteRateLimitBackend(os.getenv("RATE_LIMIT_DB_PATH", "./data/rate_limits.db"))
+    if backend != "memory":
+        security_logger.warning(f"Unknown RATE_LIMIT_BACKEND {backend!r}, using memory")
+    return MemoryRateLimitBackend()
+
+
+class RateLimiter:
+    """
+    Rate limiter with a pluggable storage backend.
+
+    The default backend is per-process. With several uvicorn workers set
+    RATE_LIMIT_BACKEND=sqlite so every worker on the host draws from the
+    same limits; a networked store (e.g. Redis) can be plugged in with
+    set_backend() as long as it implements hit() and reset().
+    """
 
-        cutoff = now - window_seconds
-        for key in list(self._requests.keys()):
-            self._requests[key] = [
-                (ts, count) for ts, count in self._requests[key]
-                if ts > cutoff
-            ]
-            if not self._requests[key]:
-                del self._requests[key]
+    def __init__(self, backend=None):
+        self._backend = backend or _create_rate_limit_backend()
 
-        self._last_cleanup = now
+    def set_backend(self, backend) -> None:
+        self._backend = backend
+
+    def reset(self) -> None:
+        """Forget all recorded requests."""
+        self._backend.reset()
+
+    def check(self, key: str, max_requests: int, window_seconds: int = 60) -> Tuple[bool, int, float]:
+        """
+        Record a request for key if it is within the limit.
+
+        Returns:
+            (is_limited, requests_remaining, seconds_until_reset)
+        """
+        return self._backend.hit(key, max_requests, window_seconds)
 
     def is_rate_limited(
         self,
@@ -131,26 +233,8 @@ class RateLimiter:
         Returns:
             (is_limited, requests_remaining)
         """
-        self._cleanup_old_requests(window_seconds)
-
-        now = time.time()
-        cutoff = now - window_seconds
-
-        # Count requests in window
-        request_count = sum(
-            count for ts, count in self._requests[key]
-            if ts > cutoff
-        )
-
-        remaining = max(0, max_requests - request_count)
-
-        if request_count >= max_requests:
-            return True, 0
-
-        # Record this request
-        self._requests[key].append((now, 1))
-
-        return False, remaining - 1
+        is_limited, remaining, _ = self.check(key, max_requests, window_seconds)
+        return is_limited, remaining
 
     def get_client_key(self, request: Request, endpoint: str = "") -> str:
         """Generate a rate limit key for a client.
@@ -225,7 +309,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 
         # Check rate limit
         key = rate_limiter.get_client_key(request, path)
-        is_limited, remaining = rate_limiter.is_rate_limited(
+        is_limited, remaining, reset_after = rate_limiter.check(
             key,
             config["max_requests"],
             config["window_seconds"]
@@ -240,10 +324,10 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 status_code=429,
                 content={"detail": "Too many requests. Please try again later."},
                 headers={
-                    "Retry-After": str(config["window_seconds"]),
+                    "Retry-After": str(max(1, math.ceil(reset_after))),
                     "X-RateLimit-Limit": str(config["max_requests"]),
                     "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(time.time() + config["window_seconds"]))
+                    "X-RateLimit-Reset": str(math.ceil(time.time() + reset_after))
                 }
             )
 
@@ -252,7 +336,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Add rate limit headers
         response.headers["X-RateLimit-Limit"] = str(config["max_requests"])
         response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int(time.time() + config["window_seconds"]))
+        response.headers["X-RateLimit-Reset"] = str(math.ceil(time.time() + reset_after))
 
         return response
 
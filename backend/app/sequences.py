@@ -0,0 +1,102 @@
+"""
+Atomic per-organization sequences.
+
+Human-readable identifiers (INV-2025-0042, challenge invite codes) are
+allocated from OrgSequence counters with a single
+UPDATE ... SET value = value + 1 RETURNING value. The row lock taken by the
+UPDATE serializes concurrent allocations, so every caller gets a distinct
+value in O(1) without counting or scanning existing rows.
+
+A sequence row is created on first use. Its starting point can be seeded
+(e.g. from invoice numbers issued before sequences existed). If two
+requests race to create the same row, the loser retries the UPDATE.
+"""
+import secrets
+import string
+from typing import Callable, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import OrgSequence
+
+# organization_id used for sequences that are unique across the whole app
+GLOBAL_SCOPE = 0
+
+INVITE_CODE_CHARS = string.ascii_uppercase + string.digits
+
+
+def next_value(
+    db: Session,
+    organization_id: int,
+    name: str,
+    seed: Optional[Callable[[], int]] = None,
+) -> int:
+    """
+    Allocate the next value of a sequence.
+
+    The allocation is part of the caller's transaction: if it rolls back,
+    the value is released with it.
+
+    Args:
+        organization_id: Owning organization (GLOBAL_SCOPE for app-wide)
+        name: Sequence name, e.g. "invoice:2025"
+        seed: Returns the last value already in use; only called when the
+            sequence is first created
+
+    Returns:
+        The allocated value (1 for a new, unseeded sequence)
+    """
+    advance = (
+        update(OrgSequence)
+        .where(OrgSequence.organization_id == organization_id, OrgSequence.name == name)
+        .values(value=OrgSequence.value + 1)
+        .returning(OrgSequence.value)
+        .execution_options(synchronize_session=False)
+    )
+
+    value = db.execute(advance).scalar()
+    if value is not None:
+        return value
+
+    start = (seed() if seed else 0) + 1
+    try:
+        with db.begin_nested():
+            db.execute(insert(OrgSequence).values(
+                organization_id=organization_id, name=name, value=start
+            ))
+        return start
+    except IntegrityError:
+        # Another request created the sequence first
+        return db.execute(advance).scalar_one()
+
+
+def _encode(value: int, width: int) -> str:
+    """Base-36 encode a non-negative integer, zero-padded to width."""
+    digits = []
+    while value:
+        value, remainder = divmod(value, len(INVITE_CODE_CHARS))
+        digits.append(INVITE_CODE_CHARS[remainder])
+    # INVITE_CODE_CHARS starts with letters, so index 0 is "A"
+    return "".join(reversed(digits)).rjust(width, INVITE_CODE_CHARS[0])
+
+
+INVITE_CODE_PREFIX_LENGTH = 5
+# Invite codes are join secrets; the sequential prefix is guessable, so all
+# of the entropy (~41 bits) comes from the random suffix
+INVITE_CODE_RANDOM_LENGTH = 8
+
+
+def allocate_invite_code(db: Session, name: str = "challenge_invite", random_length: int = INVITE_CODE_RANDOM_LENGTH) -> str:
+    """
+    Allocate an app-wide unique invite code.
+
+    The first part encodes a global sequence value, which makes codes
+    unique without a lookup. The random suffix keeps them unguessable.
+    Codes are 13+ characters, so they never collide with the 8-character
+    random codes issued before sequences existed.
+    """
+    prefix = _encode(next_value(db, GLOBAL_SCOPE, name), width=INVITE_CODE_PREFIX_LENGTH)
+    suffix = "".join(secrets.choice(INVITE_CODE_CHARS) for _ in range(random_length))
+    return prefix + suffix
@@ -4,34 +4,63 @@ Session management for tracking and revoking user sessions.
 Features:
 - Track active sessions with device/IP info
 - Token blacklist with in-memory cache + DB persistence
+- Short-TTL cache of authenticated principals
 - Session revocation (single, all, all-except-current)
 - Automatic cleanup of expired sessions
 """
+import os
+import time
 import threading
 from datetime import datetime, UTC, timedelta
 from typing import Optional, List, Dict
 
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 
 from .models import User, UserSession, TokenBlacklist
 
 
+# Revocations made by other workers are honored within this many seconds
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "5"))
+# Re-read entries this far behind the last sync, so rows committed late
+# (or stamped by a worker with a slightly slow clock) are not missed
+REVOCATION_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite returns naive datetimes; they are stored as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
 class TokenBlacklistCache:
     """
-    In-memory cache for revoked tokens.
-    Provides fast O(1) lookups while synced with database for persistence.
+    In-memory replica of the active token blacklist.
+
+    The replica holds every unexpired revoked token, so a token that is
+    not in it is known not to be revoked without asking the database.
+    It is brought up to date from entries revoked since the last sync at
+    most every REVOCATION_SYNC_INTERVAL seconds, which bounds how long a
+    revocation made by another worker can go unnoticed. Revocations made
+    in this process are added immediately.
     """
 
-    def __init__(self):
+    def __init__(self, sync_interval: float = REVOCATION_SYNC_INTERVAL):
         self._cache: Dict[str, datetime] = {}  # token_id -> expires_at
         self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._sync_interval = sync_interval
+        self._synced_at: Optional[float] = None  # monotonic time of last sync
+        self._watermark: Optional[datetime] = None  # wall-clock start of last sync
         self._last_cleanup = datetime.now(UTC)
         self._cleanup_interval = timedelta(minutes=5)
 
     def add(self, token_id: str, expires_at: datetime) -> None:
         """Add a token to the blacklist cache."""
         with self._lock:
-            self._cache[token_id] = expires_at
+            self._cache[token_id] = _as_utc(expires_at)
             self._cleanup_if_needed()
 
     def is_blacklisted(self, token_id: str) -> bool:
@@ -52,30 +81,193 @@ class TokenBlacklistCache:
         }
         self._last_cleanup = now
 
+    def needs_sync(self) -> bool:
+        """True if the replica is older than the sync interval."""
+        synced_at = self._synced_at
+        return synced_at is None or time.monotonic() - synced_at >= self._sync_interval
+
+    def sync(self, db: Session) -> int:
+        """
+        Pull entries revoked since the last sync (everything on first use).
+
+        Only one thread syncs at a time; others keep answering from the
+        replica, which is at most one interval old.
+
+        Returns:
+            Count of entries read
+        """
+        if not self._sync_lock.acquire(blocking=self._synced_at is None):
+            return 0
+        try:
+            if not self.needs_sync():
+                return 0
+            started = datetime.now(UTC)
+            query = db.query(TokenBlacklist.token_id, TokenBlacklist.expires_at).filter(
+                TokenBlacklist.expires_at > started
+            )
+            if self._watermark is not None:
+                query = query.filter(TokenBlacklist.revoked_at > self._watermark - REVOCATION_SYNC_OVERLAP)
+            entries = query.all()
+
+            with self._lock:
+                for token_id, expires_at in entries:
+                    self._cache[token_id] = _as_utc(expires_at)
+                self._cleanup_if_needed()
+            self._watermark = started
+            self._synced_at = time.monotonic()
+            return len(entries)
+        finally:
+            self._sync_lock.release()
+
     def load_from_db(self, db: Session) -> int:
         """
         Load active blacklisted tokens from database.
         Returns count of tokens loaded.
         """
-        now = datetime.now(UTC)
-        entries = db.query(TokenBlacklist).filter(
-            TokenBlacklist.expires_at > now
-        ).all()
+        self._synced_at = None
+        self._watermark = None
+        return self.sync(db)
+
+    def clear(self) -> None:
+        """Clear the cache (for testing)."""
+        with self._lock:
+            self._cache.clear()
+            self._synced_at = None
+            self._watermark = None
+
+
+# Global cache instance
+token_blacklist_cache = TokenBlacklistCache()
+
+
+# Cached principals are re-read after this many seconds, which bounds how
+# long a change made by another worker can go unnoticed
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+# Columns needed to authorize a request; everything else on User is
+# loaded from the database only if a handler reads it
+PRINCIPAL_FIELDS = ("id", "email", "organization_id", "role", "is_active", "is_org_owner", "mfa_enabled")
+
+
+class PrincipalCache:
+    """
+    Per-process cache of the authorization fields of authenticated users.
+
+    Lets get_current_user hand routes a User without a users query on
+    most requests. Entries are keyed by the token subject (email) and
+    dropped when the user is updated or deleted through the ORM in this
+    process (see the session hooks below), or after PRINCIPAL_CACHE_TTL.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple] = {}  # email -> (expires_at monotonic, fields)
+        self._emails: Dict[int, set] = {}  # user_id -> cached emails
+        self._generation = 0
 
+    @property
+    def generation(self) -> int:
+        """Bumped on every invalidation; see put()."""
+        return self._generation
+
+    def get(self, email: str) -> Optional[dict]:
         with self._lock:
-            for entry in entries:
-                self._cache[entry.token_id] = entry.expires_at
+            entry = self._entries.get(email)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(email)
+                return None
+            return entry[1]
+
+    def put(self, email: str, fields: dict, generation: int) -> None:
+        """
+        Cache fields read while the cache was at generation.
 
-        return len(entries)
+        Skipped if anything was invalidated since, so a read that raced
+        with an update can't put the old row back.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[email] = (time.monotonic() + self._ttl, fields)
+            self._emails.setdefault(fields["id"], set()).add(email)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            for email in self._emails.pop(user_id, ()):
+                self._entries.pop(email, None)
+
+    def _drop(self, email: str) -> None:
+        fields = self._entries.pop(email)[1]
+        emails = self._emails.get(fields["id"])
+        if emails is not None:
+            emails.discard(email)
+            if not emails:
+                del self._emails[fields["id"]]
 
     def clear(self) -> None:
         """Clear the cache (for testing)."""
         with self._lock:
-            self._cache.clear()
+            self._generation += 1
+            self._entries.clear()
+            self._emails.clear()
 
 
 # Global cache instance
-token_blacklist_cache = TokenBlacklistCache()
+principal_cache = PrincipalCache()
+
+
+def load_principal(db: Session, email: str) -> Optional[User]:
+    """
+    Get the user a token was issued to.
+
+    Served from principal_cache when possible: the returned User is
+    attached to db with only PRINCIPAL_FIELDS loaded, and any other
+    attribute is fetched on first access. Otherwise the row is queried
+    and cached.
+    """
+    fields = principal_cache.get(email)
+    if fields is None:
+        generation = principal_cache.generation
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            principal_cache.put(email, {name: getattr(user, name) for name in PRINCIPAL_FIELDS}, generation)
+        return user
+
+    user = db.identity_map.get(identity_key(User, fields["id"]))
+    if user is not None:
+        return user
+    user = User(**fields)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    changed = [
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    ]
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+        # Drop now as well, so this worker never serves the old fields
+        for user_id in changed:
+            principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop("changed_user_ids", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session) -> None:
+    session.info.pop("changed_user_ids", None)
 
 
 def create_session(
@@ -248,7 +440,9 @@ def get_session_by_id(db: Session, session_id: int, user_id: int) -> Optional[Us
 def is_token_revoked(db: Session, token_id: str) -> bool:
     """
     Check if a token has been revoked.
-    Uses cache for fast lookups, falls back to database.
+
+    Answered from the in-memory blacklist replica. The database is only
+    read when the replica is due for its periodic sync.
 
     Args:
         db: Database session
@@ -257,22 +451,9 @@ def is_token_revoked(db: Session, token_id: str) -> bool:
     Returns:
         True if token is revoked, False otherwise
     """
-    # Fast path: check in-memory cache
-    if token_blacklist_cache.is_blacklisted(token_id):
-        return True
-
-    # Slow path: check database
-    entry = db.query(TokenBlacklist).filter(
-        TokenBlacklist.token_id == token_id,
-        TokenBlacklist.expires_at > datetime.now(UTC)
-    ).first()
-
-    if entry:
-        # Add to cache for future lookups
-        token_blacklist_cache.add(entry.token_id, entry.expires_at)
-        return True
-
-    return False
+    if token_blacklist_cache.needs_sync():
+        token_blacklist_cache.sync(db)
+    return token_blacklist_cache.is_blacklisted(token_id)
 
 
 def cleanup_expired_sessions(db: Session) -> dict:
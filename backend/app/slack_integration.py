@@ -4,13 +4,18 @@ Notifications, alerts, and daily digest via Slack.
 """
 
 import os
+import time
+import asyncio
 import logging
 import secrets
+import threading
+from collections import defaultdict
 from datetime import datetime, UTC, timedelta, date
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from urllib.parse import urlencode
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Header
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import httpx
@@ -40,6 +45,14 @@ SLACK_REDIRECT_URI = os.getenv(
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 SCHEDULER_API_KEY = os.getenv("SCHEDULER_API_KEY", "")
 
+# Outbound posting: Slack allows about one message per second per channel
+# with short bursts, and answers 429 with Retry-After when exceeded.
+SLACK_RATE_PER_SECOND = float(os.getenv("SLACK_RATE_PER_SECOND", "1"))
+SLACK_RATE_BURST = int(os.getenv("SLACK_RATE_BURST", "3"))
+SLACK_DISPATCH_CONCURRENCY = int(os.getenv("SLACK_DISPATCH_CONCURRENCY", "10"))
+SLACK_MAX_RETRIES = 3
+SLACK_API_URL = "https://slack.com/api/chat.postMessage"
+
 # Slack OAuth scopes
 SLACK_SCOPES = [
     "chat:write",
@@ -400,7 +413,7 @@ async def send_deadline_alerts(
 ):
     """Send Slack alerts for upcoming deadlines."""
     today = date.today()
-    tomorrow = today + timedelta(days=1)
+    midnight = datetime.combine(today, datetime.min.time())
 
     # Get all active Slack connections with deadline notifications enabled
     connections = db.query(SlackConnection).filter(
@@ -408,60 +421,24 @@ async def send_deadline_alerts(
         SlackConnection.notify_deadlines == True
     ).all()
 
-    sent_count = 0
-
-    for connection in connections:
-        # Get upcoming deadlines
+    # Deadlines due today or tomorrow for every connected org, in one query
+    deadlines_by_org: Dict[int, List[Deadline]] = defaultdict(list)
+    if connections:
         deadlines = db.query(Deadline).filter(
-            Deadline.organization_id == connection.organization_id,
+            Deadline.organization_id.in_({c.organization_id for c in connections}),
             Deadline.is_completed == False,
-            Deadline.due_date >= today,
-            Deadline.due_date <= tomorrow
+            Deadline.due_date >= midnight,
+            Deadline.due_date < midnight + timedelta(days=2)
         ).order_by(Deadline.due_date).all()
-
-        if not deadlines:
-            continue
-
-        # Build message
-        blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": "Upcoming Deadlines",
-                    "emoji": True
-                }
-            }
-        ]
-
         for deadline in deadlines:
-            due_date = deadline.due_date.strftime("%b %d, %Y")
-            is_today = deadline.due_date.date() == today
-            emoji = "" if is_today else ""
-
-            blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"{emoji} *{deadline.title}*\nDue: {due_date}"
-                }
-            })
+            deadlines_by_org[deadline.organization_id].append(deadline)
 
-        blocks.append({
-            "type": "context",
-            "elements": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"<{FRONTEND_URL}/app/deadlines|View all deadlines in Made4Founders>"
-                }
-            ]
-        })
-
-        success = await send_slack_blocks(connection, blocks, db)
-        if success:
-            sent_count += 1
-
-    return {"sent_count": sent_count}
+    outbox = [
+        (connection, build_deadline_alert_blocks(deadlines_by_org[connection.organization_id], today))
+        for connection in connections
+        if deadlines_by_org.get(connection.organization_id)
+    ]
+    return await slack_dispatcher.dispatch(outbox)
 
 
 @router.post("/send-daily-digest")
@@ -471,7 +448,6 @@ async def send_daily_digest(
 ):
     """Send daily digest to all connected Slack workspaces."""
     today = date.today()
-    week_from_now = today + timedelta(days=7)
 
     # Get all active Slack connections with daily digest enabled
     connections = db.query(SlackConnection).filter(
@@ -479,117 +455,12 @@ async def send_daily_digest(
         SlackConnection.daily_digest == True
     ).all()
 
-    sent_count = 0
-
-    for connection in connections:
-        org_id = connection.organization_id
-
-        # Get upcoming deadlines
-        deadlines = db.query(Deadline).filter(
-            Deadline.organization_id == org_id,
-            Deadline.is_completed == False,
-            Deadline.due_date >= today,
-            Deadline.due_date <= week_from_now
-        ).order_by(Deadline.due_date).limit(5).all()
-
-        # Get pending tasks
-        tasks = db.query(Task).join(TaskBoard).filter(
-            TaskBoard.organization_id == org_id,
-            Task.status.in_(["todo", "in_progress"])
-        ).limit(5).all()
-
-        # Get cash position if Teller is connected
-        cash_total = 0.0
-        teller_accounts = db.query(TellerAccount).join(TellerEnrollment).filter(
-            TellerAccount.organization_id == org_id,
-            TellerAccount.is_active == True,
-            TellerEnrollment.is_active == True,
-            TellerAccount.account_type.in_(["depository", "investment"])
-        ).all()
-
-        if teller_accounts:
-            cash_total = sum(acc.balance_current or 0 for acc in teller_accounts)
-
-        # Get MRR if Stripe is connected
-        mrr = 0.0
-        active_subs = db.query(StripeSubscriptionSync).filter(
-            StripeSubscriptionSync.organization_id == org_id,
-            StripeSubscriptionSync.status == "active"
-        ).all()
-
-        if active_subs:
-            mrr = sum(sub.mrr or 0 for sub in active_subs)
-
-        # Build digest message
-        blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": f"Daily Digest - {today.strftime('%B %d, %Y')}",
-                    "emoji": True
-                }
-            }
-        ]
-
-        # Financial summary
-        if cash_total > 0 or mrr > 0:
-            financial_text = ""
-            if cash_total > 0:
-                financial_text += f"*Cash:* ${cash_total:,.0f}"
-            if mrr > 0:
-                if financial_text:
-                    financial_text += "  |  "
-                financial_text += f"*MRR:* ${mrr:,.0f}"
-
-            blocks.append({
-                "type": "section",
-                "text": {"type": "mrkdwn", "text": financial_text}
-            })
-            blocks.append({"type": "divider"})
-
-        # Deadlines section
-        if deadlines:
-            deadline_text = "*Upcoming Deadlines:*\n"
-            for d in deadlines:
-                due = d.due_date.strftime("%b %d")
-                deadline_text += f"• {d.title} (due {due})\n"
-            blocks.append({
-                "type": "section",
-                "text": {"type": "mrkdwn", "text": deadline_text}
-            })
-        else:
-            blocks.append({
-                "type": "section",
-                "text": {"type": "mrkdwn", "text": " No upcoming deadlines this week"}
-            })
-
-        # Tasks section
-        if tasks:
-            task_text = "*Active Tasks:*\n"
-            for t in tasks[:5]:
-                status_emoji = "" if t.status == "in_progress" else ""
-                task_text += f"• {status_emoji} {t.title}\n"
-            blocks.append({
-                "type": "section",
-                "text": {"type": "mrkdwn", "text": task_text}
-            })
-
-        blocks.append({
-            "type": "context",
-            "elements": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"<{FRONTEND_URL}/app/daily-brief|Open Made4Founders>"
-                }
-            ]
-        })
-
-        success = await send_slack_blocks(connection, blocks, db)
-        if success:
-            sent_count += 1
-
-    return {"sent_count": sent_count}
+    digests = prefetch_digest_inputs(db, {c.organization_id for c in connections}, today)
+    outbox = [
+        (connection, build_digest_blocks(digests[connection.organization_id], today))
+        for connection in connections
+    ]
+    return await slack_dispatcher.dispatch(outbox)
 
 
 @router.post("/send-alert")
@@ -640,6 +511,347 @@ def cleanup_expired_states():
         del oauth_states[key]
 
 
+def build_deadline_alert_blocks(deadlines: List[Deadline], today: date) -> List[Dict]:
+    """Block Kit message listing deadlines due today or tomorrow."""
+    blocks = [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": "Upcoming Deadlines",
+                "emoji": True
+            }
+        }
+    ]
+
+    for deadline in deadlines:
+        due_date = deadline.due_date.strftime("%b %d, %Y")
+        is_today = deadline.due_date.date() == today
+        emoji = "" if is_today else ""
+
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"{emoji} *{deadline.title}*\nDue: {due_date}"
+            }
+        })
+
+    blocks.append({
+        "type": "context",
+        "elements": [
+            {
+                "type": "mrkdwn",
+                "text": f"<{FRONTEND_URL}/app/deadlines|View all deadlines in Made4Founders>"
+            }
+        ]
+    })
+    return blocks
+
+
+def prefetch_digest_inputs(db: Session, org_ids: set, today: date, limit: int = 5) -> Dict[int, Dict[str, Any]]:
+    """
+    Load daily digest inputs for many organizations at once.
+
+    One grouped query per input (deadlines, tasks, cash, MRR) whatever the
+    number of organizations. Deadlines and tasks are capped at `limit` per
+    org with a window function.
+
+    Returns:
+        Dict of org_id -> {"deadlines", "tasks", "cash_total", "mrr"}
+    """
+    digests: Dict[int, Dict[str, Any]] = defaultdict(
+        lambda: {"deadlines": [], "tasks": [], "cash_total": 0.0, "mrr": 0.0}
+    )
+    if not org_ids:
+        return digests
+
+    midnight = datetime.combine(today, datetime.min.time())
+
+    # Upcoming deadlines (next 7 days), first `limit` per org
+    ranked = select(
+        Deadline.id,
+        func.row_number().over(
+            partition_by=Deadline.organization_id,
+            order_by=(Deadline.due_date, Deadline.id)
+        ).label("rank")
+    ).where(
+        Deadline.organization_id.in_(org_ids),
+        Deadline.is_completed == False,
+        Deadline.due_date >= midnight,
+        Deadline.due_date < midnight + timedelta(days=8)
+    ).subquery()
+    deadlines = db.query(Deadline).join(
+        ranked, ranked.c.id == Deadline.id
+    ).filter(ranked.c.rank <= limit).order_by(Deadline.due_date, Deadline.id).all()
+    for deadline in deadlines:
+        digests[deadline.organization_id]["deadlines"].append(deadline)
+
+    # Pending tasks, first `limit` per org
+    ranked = select(
+        Task.id,
+        TaskBoard.organization_id,
+        func.row_number().over(
+            partition_by=TaskBoard.organization_id,
+            order_by=Task.id
+        ).label("rank")
+    ).join(TaskBoard, Task.board_id == TaskBoard.id).where(
+        TaskBoard.organization_id.in_(org_ids),
+        Task.status.in_(["todo", "in_progress"])
+    ).subquery()
+    tasks = db.query(Task, ranked.c.organization_id).join(
+        ranked, ranked.c.id == Task.id
+    ).filter(ranked.c.rank <= limit).order_by(Task.id).all()
+    for task, org_id in tasks:
+        digests[org_id]["tasks"].append(task)
+
+    # Cash position from connected Teller accounts
+    cash = db.query(
+        TellerAccount.organization_id, func.sum(TellerAccount.balance_current)
+    ).join(TellerEnrollment).filter(
+        TellerAccount.organization_id.in_(org_ids),
+        TellerAccount.is_active == True,
+        TellerEnrollment.is_active == True,
+        TellerAccount.account_type.in_(["depository", "investment"])
+    ).group_by(TellerAccount.organization_id).all()
+    for org_id, total in cash:
+        digests[org_id]["cash_total"] = total or 0.0
+
+    # MRR from synced Stripe subscriptions
+    mrr = db.query(
+        StripeSubscriptionSync.organization_id, func.sum(StripeSubscriptionSync.mrr)
+    ).filter(
+        StripeSubscriptionSync.organization_id.in_(org_ids),
+        StripeSubscriptionSync.status == "active"
+    ).group_by(StripeSubscriptionSync.organization_id).all()
+    for org_id, total in mrr:
+        digests[org_id]["mrr"] = total or 0.0
+
+    return digests
+
+
+def build_digest_blocks(digest: Dict[str, Any], today: date) -> List[Dict]:
+    """Block Kit daily digest from prefetch_digest_inputs() output."""
+    cash_total = digest["cash_total"]
+    mrr = digest["mrr"]
+    deadlines = digest["deadlines"]
+    tasks = digest["tasks"]
+
+    blocks = [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f"Daily Digest - {today.strftime('%B %d, %Y')}",
+                "emoji": True
+            }
+        }
+    ]
+
+    # Financial summary
+    if cash_total > 0 or mrr > 0:
+        financial_text = ""
+        if cash_total > 0:
+            financial_text += f"*Cash:* ${cash_total:,.0f}"
+        if mrr > 0:
+            if financial_text:
+                financial_text += "  |  "
+            financial_text += f"*MRR:* ${mrr:,.0f}"
+
+        blocks.append({
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": financial_text}
+        })
+        blocks.append({"type": "divider"})
+
+    # Deadlines section
+    if deadlines:
+        deadline_text = "*Upcoming Deadlines:*\n"
+        for d in deadlines:
+            due = d.due_date.strftime("%b %d")
+            deadline_text += f"• {d.title} (due {due})\n"
+        blocks.append({
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": deadline_text}
+        })
+    else:
+        blocks.append({
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": " No upcoming deadlines this week"}
+        })
+
+    # Tasks section
+    if tasks:
+        task_text = "*Active Tasks:*\n"
+        for t in tasks[:5]:
+            status_emoji = "" if t.status == "in_progress" else ""
+            task_text += f"• {status_emoji} {t.title}\n"
+        blocks.append({
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": task_text}
+        })
+
+    blocks.append({
+        "type": "context",
+        "elements": [
+            {
+                "type": "mrkdwn",
+                "text": f"<{FRONTEND_URL}/app/daily-brief|Open Made4Founders>"
+            }
+        ]
+    })
+    return blocks
+
+
+class SlackRateLimiter:
+    """
+    Token bucket per Slack workspace.
+
+    Shared by every post from this process so digests, alerts and ad-hoc
+    notifications to the same workspace draw from one budget. A bucket can
+    go negative: each caller reserves a token and sleeps off its share of
+    the debt, which keeps concurrent posts to a workspace spaced out.
+    """
+
+    def __init__(self, rate: float = SLACK_RATE_PER_SECOND, burst: int = SLACK_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str) -> float:
+        """Take a token; returns the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated_at = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate) - 1
+            self._buckets[key] = (tokens, now)
+            return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def penalize(self, key: str, seconds: float):
+        """Empty a bucket so nothing is posted to it for `seconds` (after a 429)."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, _ = self._buckets.get(key, (0.0, now))
+            self._buckets[key] = (min(tokens, -seconds * self.rate), now)
+
+    async def acquire(self, key: str):
+        wait = self.reserve(key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+slack_rate_limiter = SlackRateLimiter()
+
+
+def _slack_client() -> httpx.AsyncClient:
+    """HTTP client for outbound Slack posts."""
+    return httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=SLACK_DISPATCH_CONCURRENCY)
+    )
+
+
+async def post_to_slack(
+    client: httpx.AsyncClient,
+    connection: SlackConnection,
+    payload: Dict[str, Any],
+    prefer_webhook: bool = False,
+) -> Tuple[bool, int]:
+    """
+    Post a message through the workspace's rate limit, retrying on 429.
+
+    Uses chat.postMessage when a bot token and channel are set, otherwise
+    the incoming webhook (or the webhook first if prefer_webhook).
+
+    Returns:
+        (success, attempts)
+    """
+    use_webhook = bool(connection.webhook_url) and (
+        prefer_webhook or not (connection.access_token and connection.channel_id)
+    )
+    if use_webhook:
+        request = {"url": connection.webhook_url, "json": payload}
+    elif connection.access_token and connection.channel_id:
+        request = {
+            "url": SLACK_API_URL,
+            "headers": {"Authorization": f"Bearer {connection.access_token}"},
+            "json": {"channel": connection.channel_id, **payload},
+        }
+    else:
+        return False, 0
+
+    for attempt in range(1, SLACK_MAX_RETRIES + 2):
+        await slack_rate_limiter.acquire(connection.team_id)
+        response = await client.post(**request)
+
+        if response.status_code == 429:
+            retry_after = float(response.headers.get("Retry-After", "1"))
+            slack_rate_limiter.penalize(connection.team_id, retry_after)
+            if attempt > SLACK_MAX_RETRIES:
+                break
+            logger.warning(f"Slack rate limited team {connection.team_id}, retrying in {retry_after}s")
+            continue
+
+        if use_webhook:
+            return response.status_code == 200, attempt
+        return response.json().get("ok", False), attempt
+
+    return False, SLACK_MAX_RETRIES + 1
+
+
+class SlackDispatcher:
+    """
+    Posts a batch of messages to many workspaces concurrently.
+
+    All posts share one pooled HTTP client; at most `concurrency` are in
+    flight at once, and each still waits on its workspace's token bucket.
+    """
+
+    def __init__(self, concurrency: int = SLACK_DISPATCH_CONCURRENCY):
+        self.concurrency = concurrency
+
+    async def dispatch(self, outbox: List[Tuple[SlackConnection, List[Dict]]]) -> Dict[str, Any]:
+        """
+        Send (connection, blocks) pairs.
+
+        Returns:
+            {"sent_count": n, "workspaces": [{team_id, organization_id, ok, attempts, duration_ms}]}
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with _slack_client() as client:
+            async def send(connection: SlackConnection, blocks: List[Dict]) -> Dict[str, Any]:
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        ok, attempts = await post_to_slack(client, connection, {"blocks": blocks})
+                    except Exception as e:
+                        logger.error(f"Failed to send Slack blocks to team {connection.team_id}: {e}")
+                        ok, attempts = False, 1
+                    return {
+                        "team_id": connection.team_id,
+                        "organization_id": connection.organization_id,
+                        "ok": ok,
+                        "attempts": attempts,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    }
+
+            workspaces = await asyncio.gather(*(send(c, b) for c, b in outbox))
+
+        return {
+            "sent_count": sum(1 for w in workspaces if w["ok"]),
+            "workspaces": list(workspaces),
+        }
+
+
+slack_dispatcher = SlackDispatcher()
+
+
 async def send_slack_message(
     connection: SlackConnection,
     message: str,
@@ -648,29 +860,9 @@ async def send_slack_message(
     """Send a simple text message to Slack."""
     try:
         # Try webhook first (faster)
-        if connection.webhook_url:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    connection.webhook_url,
-                    json={"text": message}
-                )
-                return response.status_code == 200
-
-        # Fall back to API
-        if connection.access_token and connection.channel_id:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://slack.com/api/chat.postMessage",
-                    headers={"Authorization": f"Bearer {connection.access_token}"},
-                    json={
-                        "channel": connection.channel_id,
-                        "text": message
-                    }
-                )
-                data = response.json()
-                return data.get("ok", False)
-
-        return False
+        async with _slack_client() as client:
+            ok, _ = await post_to_slack(client, connection, {"text": message}, prefer_webhook=True)
+            return ok
 
     except Exception as e:
         logger.error(f"Failed to send Slack message: {e}")
@@ -684,28 +876,9 @@ async def send_slack_blocks(
 ) -> bool:
     """Send a block-formatted message to Slack."""
     try:
-        if not connection.access_token or not connection.channel_id:
-            # Try webhook with text fallback
-            if connection.webhook_url:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        connection.webhook_url,
-                        json={"blocks": blocks}
-                    )
-                    return response.status_code == 200
-            return False
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://slack.com/api/chat.postMessage",
-                headers={"Authorization": f"Bearer {connection.access_token}"},
-                json={
-                    "channel": connection.channel_id,
-                    "blocks": blocks
-                }
-            )
-            data = response.json()
-            return data.get("ok", False)
+        async with _slack_client() as client:
+            ok, _ = await post_to_slack(client, connection, {"blocks": blocks})
+            return ok
 
     except Exception as e:
         logger.error(f"Failed to send Slack blocks: {e}")
@@ -5,11 +5,14 @@ Connect user's Stripe account to pull revenue metrics (MRR, ARR, churn).
 
 import os
 import logging
+import threading
 from datetime import datetime, UTC, timedelta, date
-from typing import Optional, List, Dict, Any
-from collections import defaultdict
+from typing import Optional, List, Dict
+from collections import OrderedDict
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Header
+from sqlalchemy import and_, case, delete, func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
@@ -19,6 +22,7 @@ from stripe.error import StripeError
 from .database import get_db
 from .models import User, StripeConnection, StripeCustomerSync, StripeSubscriptionSync
 from .auth import get_current_user
+from .revenue_timeline import get_mrr_series, invalidate_mrr_timeline, rebuild_mrr_timeline
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +35,35 @@ router = APIRouter(prefix="/api/stripe-revenue", tags=["stripe-revenue"])
 STRIPE_CLIENT_ID = os.getenv("STRIPE_CONNECT_CLIENT_ID", "")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
+STRIPE_CONNECT_WEBHOOK_SECRET = os.getenv("STRIPE_CONNECT_WEBHOOK_SECRET", "")
+SCHEDULER_API_KEY = os.getenv("SCHEDULER_API_KEY", "")
+
+# Incremental sync
+FULL_SYNC_INTERVAL = timedelta(days=int(os.getenv("STRIPE_FULL_SYNC_DAYS", "7")))
+EVENT_RETENTION = timedelta(days=29)  # Stripe keeps events for 30 days
+DELTA_SYNC_OVERLAP = timedelta(minutes=10)  # Re-read a little to cover clock skew
+SYNC_BATCH_SIZE = 500
+
+SYNC_EVENT_TYPES = {
+    "customer.created",
+    "customer.updated",
+    "customer.deleted",
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "customer.subscription.deleted",
+    "customer.subscription.paused",
+    "customer.subscription.resumed",
+}
+
+
+def verify_scheduler_key(x_api_key: str = Header(None)):
+    """Verify the scheduler API key using constant-time comparison."""
+    import secrets as sec
+    if not SCHEDULER_API_KEY:
+        raise HTTPException(status_code=500, detail="Scheduler API key not configured")
+    if not x_api_key or not sec.compare_digest(x_api_key, SCHEDULER_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    return True
 
 
 # ============================================================================
@@ -69,6 +102,11 @@ class RevenueChartData(BaseModel):
     mrr: List[float]
     revenue: List[float]
     customers: List[int]
+    # MRR movements since the previous point
+    new_mrr: List[float] = []
+    expansion_mrr: List[float] = []
+    contraction_mrr: List[float] = []
+    churned_mrr: List[float] = []
 
 
 class SubscriptionBreakdown(BaseModel):
@@ -153,10 +191,10 @@ async def oauth_callback(
 
     try:
         # Exchange code for access token
-        stripe.api_key = STRIPE_SECRET_KEY
         response = stripe.OAuth.token(
             grant_type="authorization_code",
             code=code,
+            api_key=STRIPE_SECRET_KEY,
         )
 
         stripe_account_id = response.get("stripe_user_id")
@@ -167,7 +205,7 @@ async def oauth_callback(
             raise HTTPException(status_code=400, detail="Failed to connect Stripe account")
 
         # Get account details
-        account = stripe.Account.retrieve(stripe_account_id)
+        account = stripe.Account.retrieve(stripe_account_id, api_key=STRIPE_SECRET_KEY)
         account_name = account.get("business_profile", {}).get("name") or account.get("email")
 
         # Check if this account is already connected
@@ -229,10 +267,10 @@ async def disconnect_stripe(
 
     # Revoke OAuth access (best effort)
     try:
-        stripe.api_key = STRIPE_SECRET_KEY
         stripe.OAuth.deauthorize(
             client_id=STRIPE_CLIENT_ID,
             stripe_user_id=connection.stripe_account_id,
+            api_key=STRIPE_SECRET_KEY,
         )
     except StripeError as e:
         logger.warning(f"Failed to revoke Stripe OAuth: {e}")
@@ -277,6 +315,7 @@ async def get_connection(
 @router.post("/sync")
 async def trigger_sync(
     background_tasks: BackgroundTasks,
+    full: bool = Query(default=False, description="Re-pull everything instead of only recent changes"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -292,13 +331,253 @@ async def trigger_sync(
     connection.sync_status = "syncing"
     db.commit()
 
-    background_tasks.add_task(sync_stripe_data, connection.id)
+    background_tasks.add_task(sync_stripe_data, connection.id, full)
 
     return {"status": "syncing"}
 
 
-def sync_stripe_data(connection_id: int):
-    """Sync Stripe data for a connection (runs in background)."""
+@router.post("/sync-all")
+async def sync_all_connections(
+    background_tasks: BackgroundTasks,
+    _: bool = Depends(verify_scheduler_key),
+    db: Session = Depends(get_db)
+):
+    """
+    Pull recent changes for every active connection.
+
+    Should be called periodically by a scheduler. Each connection only
+    fetches events since its last sync, with a full reconcile every
+    FULL_SYNC_INTERVAL.
+    """
+    connection_ids = [
+        row.id for row in db.query(StripeConnection.id).filter(StripeConnection.is_active == True).all()
+    ]
+    for connection_id in connection_ids:
+        background_tasks.add_task(sync_stripe_data, connection_id)
+
+    return {"status": "syncing", "connections": len(connection_ids)}
+
+
+@router.post("/webhook")
+async def stripe_connect_webhook(
+    request: Request,
+    stripe_signature: str = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Handle Stripe Connect webhooks from connected accounts.
+
+    Customer and subscription events are upserted as they arrive, so the
+    synced data stays current between scheduled delta pulls.
+    """
+    if not STRIPE_CONNECT_WEBHOOK_SECRET:
+        raise HTTPException(status_code=500, detail="Webhook secret not configured")
+
+    payload = await request.body()
+
+    try:
+        event = stripe.Webhook.construct_event(
+            payload, stripe_signature, STRIPE_CONNECT_WEBHOOK_SECRET
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    except stripe.error.SignatureVerificationError:
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+    if event["type"] not in SYNC_EVENT_TYPES:
+        return {"received": True}
+
+    connection = db.query(StripeConnection).filter(
+        StripeConnection.stripe_account_id == event.get("account"),
+        StripeConnection.is_active == True
+    ).first()
+    if not connection:
+        return {"received": True}
+
+    customers_changed, subscriptions_changed = apply_stripe_events(db, connection, [event])
+    if customers_changed or subscriptions_changed:
+        # Rebuilt lazily by the next chart read
+        invalidate_mrr_timeline(db, connection.organization_id)
+    connection.last_sync_at = datetime.now(UTC)
+    db.commit()
+
+    return {"received": True}
+
+
+# ---------- Sync internals ----------
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite hands back naive datetimes; stored values are UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def _from_timestamp(value: Optional[int]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if value else None
+
+
+def _subscription_mrr(sub_data) -> tuple:
+    """Monthly recurring revenue and plan name of a subscription."""
+    mrr = 0.0
+    plan_name = "Unknown"
+    items = (sub_data.get("items") or {}).get("data") or []
+    for item in items:
+        price = item.get("price")
+        if price:
+            plan_name = price.get("nickname") or price.get("product") or "Unknown"
+            amount = (price.get("unit_amount") or 0) * (item.get("quantity") or 1)
+            recurring = price.get("recurring") or {}
+            interval = recurring.get("interval") or "month"
+            interval_count = recurring.get("interval_count") or 1
+
+            # Normalize to monthly
+            if interval == "year":
+                mrr += (amount / 100) / 12
+            elif interval == "week":
+                mrr += (amount / 100) * 4.33
+            elif interval == "day":
+                mrr += (amount / 100) * 30
+            else:  # month
+                mrr += (amount / 100) / interval_count
+    return mrr, plan_name
+
+
+def _state_time(timestamp: int) -> datetime:
+    """UTC time of a Stripe event's (second-resolution) created timestamp."""
+    return datetime.fromtimestamp(timestamp, UTC)
+
+
+def _customer_row(connection: StripeConnection, customer_data, state_at: datetime) -> dict:
+    return {
+        "organization_id": connection.organization_id,
+        "stripe_connection_id": connection.id,
+        "stripe_customer_id": customer_data["id"],
+        "email": customer_data.get("email"),
+        "name": customer_data.get("name"),
+        "customer_created_at": _from_timestamp(customer_data.get("created")),
+        "stripe_state_at": state_at,
+    }
+
+
+def _subscription_row(connection: StripeConnection, sub_data, state_at: datetime) -> dict:
+    mrr, plan_name = _subscription_mrr(sub_data)
+    customer = sub_data.get("customer")
+    if isinstance(customer, dict):  # Expanded customer object
+        customer = customer.get("id")
+    return {
+        "organization_id": connection.organization_id,
+        "stripe_connection_id": connection.id,
+        "stripe_subscription_id": sub_data["id"],
+        "stripe_customer_id": customer,
+        "status": sub_data.get("status"),
+        "plan_name": plan_name,
+        "mrr": mrr,
+        "subscription_created_at": _from_timestamp(sub_data.get("created")),
+        "current_period_end": _from_timestamp(sub_data.get("current_period_end")),
+        "canceled_at": _from_timestamp(sub_data.get("canceled_at")),
+        "stripe_state_at": state_at,
+    }
+
+
+def _upsert(db: Session, model, key_column: str, rows: List[dict]) -> int:
+    """
+    Insert or update synced rows for one organization in bulk.
+
+    One INSERT ... ON CONFLICT (organization_id, key_column) DO UPDATE, so
+    a webhook and a sync writing the same object can't race into the
+    unique index. A row only replaces stored state that is not newer
+    (stripe_state_at), so late events never roll an object back. The
+    last row wins if a key repeats.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    by_key = {row[key_column]: row for row in rows}
+
+    stmt = sqlite_insert(table)
+    columns = [c for c in rows[0] if c not in ("organization_id", key_column)]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.organization_id, table.c[key_column]],
+        set_={**{c: stmt.excluded[c] for c in columns}, "updated_at": datetime.now(UTC)},
+        where=or_(
+            table.c.stripe_state_at == None,
+            stmt.excluded.stripe_state_at >= table.c.stripe_state_at,
+        ),
+    )
+    db.execute(stmt, list(by_key.values()))
+    return len(by_key)
+
+
+def _sync_list(db: Session, connection: StripeConnection, model, key_column: str, objects, to_row) -> int:
+    """Upsert a paged Stripe list in batches of SYNC_BATCH_SIZE."""
+    # Objects reflect at least the state at the start of the pull; events
+    # from the same second or later still apply on top
+    pulled_at = datetime.now(UTC).replace(microsecond=0)
+    total = 0
+    batch = []
+    for obj in objects:
+        batch.append(to_row(connection, obj, pulled_at))
+        if len(batch) >= SYNC_BATCH_SIZE:
+            total += _upsert(db, model, key_column, batch)
+            batch = []
+    total += _upsert(db, model, key_column, batch)
+    return total
+
+
+def apply_stripe_events(db: Session, connection: StripeConnection, events) -> tuple:
+    """
+    Apply customer and subscription events (newest state wins).
+
+    Events may come in any order; each object is written once with the
+    payload of its latest event, and only if that event is not older than
+    the state already stored. Not committed.
+
+    Returns:
+        (customers changed, subscriptions changed)
+    """
+    customers: Dict[str, tuple] = {}
+    subscriptions: Dict[str, tuple] = {}
+    for event in events:
+        if event["type"] not in SYNC_EVENT_TYPES:
+            continue
+        obj = event["data"]["object"]
+        target = subscriptions if event["type"].startswith("customer.subscription.") else customers
+        created = event.get("created") or 0
+        if obj["id"] not in target or created >= target[obj["id"]][0]:
+            target[obj["id"]] = (created, event["type"], obj)
+
+    for customer_id, (created, event_type, _) in customers.items():
+        if event_type == "customer.deleted":
+            db.execute(delete(StripeCustomerSync).where(
+                StripeCustomerSync.organization_id == connection.organization_id,
+                StripeCustomerSync.stripe_customer_id == customer_id,
+                or_(StripeCustomerSync.stripe_state_at == None,
+                    StripeCustomerSync.stripe_state_at <= _state_time(created))
+            ))
+
+    _upsert(db, StripeCustomerSync, "stripe_customer_id", [
+        _customer_row(connection, obj, _state_time(created)) for created, event_type, obj in customers.values()
+        if event_type != "customer.deleted"
+    ])
+    _upsert(db, StripeSubscriptionSync, "stripe_subscription_id", [
+        _subscription_row(connection, obj, _state_time(created)) for created, _, obj in subscriptions.values()
+    ])
+    return len(customers), len(subscriptions)
+
+
+def sync_stripe_data(connection_id: int, full: bool = False):
+    """
+    Sync Stripe data for a connection (runs in background).
+
+    Pulls only the customer and subscription events created since the last
+    sync, and falls back to a full pull on the first sync, when asked, every
+    FULL_SYNC_INTERVAL, or when the last sync is older than Stripe keeps
+    events for.
+
+    The connection's access token is passed per request, so concurrent
+    syncs for different organizations never share global Stripe state.
+    """
     from .database import SessionLocal
 
     db = SessionLocal()
@@ -311,24 +590,50 @@ def sync_stripe_data(connection_id: int):
         if not connection:
             return
 
-        stripe.api_key = connection.access_token
+        now = datetime.now(UTC)
+        last_sync = _as_utc(connection.last_sync_at)
+        last_full_sync = _as_utc(connection.last_full_sync_at)
+        full = (
+            full
+            or last_sync is None
+            or last_full_sync is None
+            or now - last_full_sync > FULL_SYNC_INTERVAL
+            or now - last_sync > EVENT_RETENTION
+        )
 
-        # Sync customers
-        sync_customers(connection, db)
+        if full:
+            customers_changed = sync_customers(connection, db)
+            subscriptions_changed = sync_subscriptions(connection, db)
+            connection.last_full_sync_at = now
+        else:
+            events = stripe.Event.list(
+                limit=100,
+                types=sorted(SYNC_EVENT_TYPES),
+                created={"gte": int((last_sync - DELTA_SYNC_OVERLAP).timestamp())},
+                api_key=connection.access_token,
+            )
+            customers_changed, subscriptions_changed = apply_stripe_events(
+                db, connection, events.auto_paging_iter()
+            )
 
-        # Sync subscriptions
-        sync_subscriptions(connection, db)
+        # Rebuild the daily MRR series used by the charts
+        if full or customers_changed or subscriptions_changed:
+            rebuild_mrr_timeline(db, connection.organization_id)
 
         # Update connection status
-        connection.last_sync_at = datetime.now(UTC)
+        connection.last_sync_at = now
         connection.sync_status = "synced"
         connection.sync_error = None
         db.commit()
 
-        logger.info(f"Synced Stripe data for connection {connection_id}")
+        logger.info(
+            f"Synced Stripe data for connection {connection_id} "
+            f"({'full' if full else 'delta'}: {customers_changed} customers, {subscriptions_changed} subscriptions)"
+        )
 
     except StripeError as e:
         logger.error(f"Stripe sync error for connection {connection_id}: {e}")
+        db.rollback()
         connection = db.query(StripeConnection).filter(
             StripeConnection.id == connection_id
         ).first()
@@ -340,116 +645,37 @@ def sync_stripe_data(connection_id: int):
         db.close()
 
 
-def sync_customers(connection: StripeConnection, db: Session):
-    """Sync customers from Stripe."""
-    org_id = connection.organization_id
-
-    # Fetch all customers
-    customers = stripe.Customer.list(limit=100)
-
-    for customer_data in customers.auto_paging_iter():
-        existing = db.query(StripeCustomerSync).filter(
-            StripeCustomerSync.stripe_customer_id == customer_data.id,
-            StripeCustomerSync.organization_id == org_id
-        ).first()
-
-        customer_created = datetime.fromtimestamp(customer_data.created) if customer_data.created else None
-
-        if existing:
-            existing.email = customer_data.email
-            existing.name = customer_data.name
-            existing.updated_at = datetime.now(UTC)
-        else:
-            new_customer = StripeCustomerSync(
-                organization_id=org_id,
-                stripe_connection_id=connection.id,
-                stripe_customer_id=customer_data.id,
-                email=customer_data.email,
-                name=customer_data.name,
-                customer_created_at=customer_created
-            )
-            db.add(new_customer)
-
+def sync_customers(connection: StripeConnection, db: Session) -> int:
+    """Sync all customers from Stripe."""
+    customers = stripe.Customer.list(limit=100, api_key=connection.access_token)
+    count = _sync_list(
+        db, connection, StripeCustomerSync, "stripe_customer_id",
+        customers.auto_paging_iter(), _customer_row
+    )
     db.commit()
+    return count
 
 
-def sync_subscriptions(connection: StripeConnection, db: Session):
-    """Sync subscriptions from Stripe."""
-    org_id = connection.organization_id
-
+def sync_subscriptions(connection: StripeConnection, db: Session) -> int:
+    """Sync all subscriptions from Stripe."""
     # Fetch all subscriptions (including canceled for churn calculation)
-    subscriptions = stripe.Subscription.list(limit=100, status="all")
-
-    for sub_data in subscriptions.auto_paging_iter():
-        existing = db.query(StripeSubscriptionSync).filter(
-            StripeSubscriptionSync.stripe_subscription_id == sub_data.id,
-            StripeSubscriptionSync.organization_id == org_id
-        ).first()
-
-        # Calculate MRR for this subscription
-        mrr = 0.0
-        plan_name = "Unknown"
-        if sub_data.items and sub_data.items.data:
-            for item in sub_data.items.data:
-                price = item.price
-                if price:
-                    plan_name = price.nickname or price.product or "Unknown"
-                    amount = price.unit_amount or 0
-                    interval = price.recurring.interval if price.recurring else "month"
-                    interval_count = price.recurring.interval_count if price.recurring else 1
-
-                    # Normalize to monthly
-                    if interval == "year":
-                        mrr += (amount / 100) / 12
-                    elif interval == "week":
-                        mrr += (amount / 100) * 4.33
-                    elif interval == "day":
-                        mrr += (amount / 100) * 30
-                    else:  # month
-                        mrr += (amount / 100) / interval_count
-
-        sub_created = datetime.fromtimestamp(sub_data.created) if sub_data.created else None
-        period_end = datetime.fromtimestamp(sub_data.current_period_end) if sub_data.current_period_end else None
-        canceled_at = datetime.fromtimestamp(sub_data.canceled_at) if sub_data.canceled_at else None
-
-        if existing:
-            existing.status = sub_data.status
-            existing.mrr = mrr
-            existing.plan_name = plan_name
-            existing.current_period_end = period_end
-            existing.canceled_at = canceled_at
-            existing.updated_at = datetime.now(UTC)
-        else:
-            new_sub = StripeSubscriptionSync(
-                organization_id=org_id,
-                stripe_connection_id=connection.id,
-                stripe_subscription_id=sub_data.id,
-                stripe_customer_id=sub_data.customer,
-                status=sub_data.status,
-                plan_name=plan_name,
-                mrr=mrr,
-                subscription_created_at=sub_created,
-                current_period_end=period_end,
-                canceled_at=canceled_at
-            )
-            db.add(new_sub)
-
+    subscriptions = stripe.Subscription.list(limit=100, status="all", api_key=connection.access_token)
+    count = _sync_list(
+        db, connection, StripeSubscriptionSync, "stripe_subscription_id",
+        subscriptions.auto_paging_iter(), _subscription_row
+    )
     db.commit()
+    return count
 
 
 # ============================================================================
 # METRICS ENDPOINTS
 # ============================================================================
 
-@router.get("/metrics", response_model=RevenueMetrics)
-async def get_revenue_metrics(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get revenue metrics (MRR, ARR, churn, etc.)."""
-    org_id = current_user.organization_id
+CHART_STEPS = {"day": 1, "week": 7, "month": 30}
+
 
-    # Check connection
+def _active_connection(db: Session, org_id: int) -> StripeConnection:
     connection = db.query(StripeConnection).filter(
         StripeConnection.organization_id == org_id,
         StripeConnection.is_active == True
@@ -457,62 +683,47 @@ async def get_revenue_metrics(
 
     if not connection:
         raise HTTPException(status_code=404, detail="No Stripe account connected")
-
-    # Get active subscriptions for MRR
-    active_subs = db.query(StripeSubscriptionSync).filter(
-        StripeSubscriptionSync.organization_id == org_id,
-        StripeSubscriptionSync.status == "active"
-    ).all()
-
-    mrr = sum(sub.mrr or 0 for sub in active_subs)
+    return connection
+
+
+def compute_revenue_metrics(db: Session, org_id: int) -> RevenueMetrics:
+    """Revenue metrics from two aggregate queries."""
+    now = datetime.now(UTC)
+    thirty_days_ago = now - timedelta(days=30)
+    subs = StripeSubscriptionSync
+    is_active = subs.status == "active"
+
+    # One pass over subscriptions for MRR, counts, churn and growth
+    mrr, active_count, churned_30d, total_subs, old_active_count = db.query(
+        func.coalesce(func.sum(case((is_active, subs.mrr), else_=0)), 0),
+        func.count(case((is_active, 1))),
+        func.count(case((and_(subs.status == "canceled", subs.canceled_at >= thirty_days_ago), 1))),
+        func.count(subs.id),
+        # Subscriptions that were active 30 days ago (growth proxy)
+        func.count(case((and_(
+            subs.subscription_created_at <= thirty_days_ago,
+            subs.status.in_(["active", "canceled"]),
+            or_(subs.canceled_at == None, subs.canceled_at > thirty_days_ago)
+        ), 1))),
+    ).filter(subs.organization_id == org_id).one()
+
+    total_customers, new_customers_30d = db.query(
+        func.count(StripeCustomerSync.id),
+        func.count(case((StripeCustomerSync.customer_created_at >= thirty_days_ago, 1))),
+    ).filter(StripeCustomerSync.organization_id == org_id).one()
+
+    mrr = mrr or 0.0
     arr = mrr * 12
-
-    # Get total customers
-    total_customers = db.query(StripeCustomerSync).filter(
-        StripeCustomerSync.organization_id == org_id
-    ).count()
-
-    # Get new customers in last 30 days
-    thirty_days_ago = datetime.now(UTC) - timedelta(days=30)
-    new_customers_30d = db.query(StripeCustomerSync).filter(
-        StripeCustomerSync.organization_id == org_id,
-        StripeCustomerSync.customer_created_at >= thirty_days_ago
-    ).count()
-
-    # Get churned subscriptions in last 30 days
-    churned_30d = db.query(StripeSubscriptionSync).filter(
-        StripeSubscriptionSync.organization_id == org_id,
-        StripeSubscriptionSync.status == "canceled",
-        StripeSubscriptionSync.canceled_at >= thirty_days_ago
-    ).count()
-
-    # Calculate churn rate
-    total_subs = db.query(StripeSubscriptionSync).filter(
-        StripeSubscriptionSync.organization_id == org_id
-    ).count()
     churn_rate = (churned_30d / total_subs * 100) if total_subs > 0 else 0
-
-    # Calculate ARPC
     arpc = mrr / total_customers if total_customers > 0 else 0
-
-    # Calculate MoM growth (compare current MRR to 30 days ago)
-    # For now, use subscription count growth as proxy
-    sixty_days_ago = datetime.now(UTC) - timedelta(days=60)
-    old_active_count = db.query(StripeSubscriptionSync).filter(
-        StripeSubscriptionSync.organization_id == org_id,
-        StripeSubscriptionSync.subscription_created_at <= thirty_days_ago,
-        StripeSubscriptionSync.status.in_(["active", "canceled"]),
-        (StripeSubscriptionSync.canceled_at == None) | (StripeSubscriptionSync.canceled_at > thirty_days_ago)
-    ).count()
-
-    growth_rate = ((len(active_subs) - old_active_count) / old_active_count * 100) if old_active_count > 0 else 0
+    growth_rate = ((active_count - old_active_count) / old_active_count * 100) if old_active_count > 0 else 0
 
     return RevenueMetrics(
         mrr=round(mrr, 2),
         arr=round(arr, 2),
         total_revenue_30d=0,  # Would need charge data
         total_revenue_90d=0,  # Would need charge data
-        active_subscriptions=len(active_subs),
+        active_subscriptions=active_count,
         total_customers=total_customers,
         new_customers_30d=new_customers_30d,
         churned_subscriptions_30d=churned_30d,
@@ -522,50 +733,154 @@ async def get_revenue_metrics(
     )
 
 
+def compute_revenue_chart(db: Session, org_id: int, days: int = 30, granularity: str = "week") -> RevenueChartData:
+    """Chart points sliced from the stored daily MRR series."""
+    step = CHART_STEPS[granularity]
+
+    today = date.today()
+    point_offsets = list(range(days, 0, -step))
+    # Include the bucket before the first point so its movements are complete
+    series = get_mrr_series(db, org_id, today - timedelta(days=days + step - 1), today)
+    by_day = {point["day"]: point for point in series}
+
+    chart = RevenueChartData(labels=[], mrr=[], revenue=[], customers=[])
+    for i in point_offsets:
+        point_date = today - timedelta(days=i)
+        point = by_day[point_date]
+        chart.labels.append(point_date.strftime("%b %d"))
+        chart.mrr.append(round(point["mrr"], 2))
+        chart.revenue.append(round(point["mrr"], 2))  # Simplified
+        chart.customers.append(point["customers"])
+
+        bucket = [by_day[point_date - timedelta(days=d)] for d in range(step)]
+        chart.new_mrr.append(round(sum(p["new_mrr"] for p in bucket), 2))
+        chart.expansion_mrr.append(round(sum(p["expansion_mrr"] for p in bucket), 2))
+        chart.contraction_mrr.append(round(sum(p["contraction_mrr"] for p in bucket), 2))
+        chart.churned_mrr.append(round(sum(p["churned_mrr"] for p in bucket), 2))
+
+    return chart
+
+
+def compute_subscription_breakdown(db: Session, org_id: int) -> List[SubscriptionBreakdown]:
+    """Active MRR grouped by plan in one query."""
+    plan = func.coalesce(StripeSubscriptionSync.plan_name, "Unknown")
+    plan_mrr = func.coalesce(func.sum(StripeSubscriptionSync.mrr), 0)
+    rows = db.query(
+        plan, func.count(StripeSubscriptionSync.id), plan_mrr
+    ).filter(
+        StripeSubscriptionSync.organization_id == org_id,
+        StripeSubscriptionSync.status == "active"
+    ).group_by(plan).order_by(plan_mrr.desc()).all()
+
+    total_mrr = sum(mrr for _, _, mrr in rows)
+    return [
+        SubscriptionBreakdown(
+            plan_name=plan_name,
+            count=count,
+            mrr=round(mrr, 2),
+            percentage=round((mrr / total_mrr * 100) if total_mrr > 0 else 0, 1)
+        )
+        for plan_name, count, mrr in rows
+    ]
+
+
+def compute_top_customers(db: Session, org_id: int, limit: int = 10) -> List[TopCustomer]:
+    """Customers ranked by active MRR, aggregated and limited in SQL."""
+    subs = StripeSubscriptionSync
+    is_active = subs.status == "active"
+    active_mrr = func.coalesce(func.sum(case((is_active, subs.mrr), else_=0)), 0)
+
+    rows = db.query(
+        StripeCustomerSync.stripe_customer_id,
+        StripeCustomerSync.email,
+        StripeCustomerSync.name,
+        active_mrr,
+        func.count(case((is_active, 1))),
+    ).join(
+        subs, and_(
+            subs.organization_id == StripeCustomerSync.organization_id,
+            subs.stripe_customer_id == StripeCustomerSync.stripe_customer_id
+        )
+    ).filter(
+        StripeCustomerSync.organization_id == org_id
+    ).group_by(
+        StripeCustomerSync.id
+    ).order_by(active_mrr.desc()).limit(limit).all()
+
+    return [
+        TopCustomer(
+            customer_id=customer_id,
+            email=email,
+            name=name,
+            total_revenue=round(total_mrr * 12, 2),  # Annualized
+            subscription_count=active_count,
+            status="active" if active_count else "churned"
+        )
+        for customer_id, email, name, total_mrr, active_count in rows
+    ]
+
+
+class RevenueDashboardCache:
+    """
+    Per-organization cache of the assembled dashboard.
+
+    Entries are keyed on the connection's last_sync_at (bumped by every sync
+    and webhook) and the current date (the 30-day windows move daily), so
+    repeat loads between syncs skip aggregation entirely.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    def get(self, org_id: int, version: tuple) -> Optional[RevenueDashboard]:
+        with self._lock:
+            entry = self._entries.get(org_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(org_id)
+            return entry[1]
+
+    def set(self, org_id: int, version: tuple, dashboard: RevenueDashboard) -> None:
+        with self._lock:
+            self._entries[org_id] = (version, dashboard)
+            self._entries.move_to_end(org_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, org_id: int) -> None:
+        with self._lock:
+            self._entries.pop(org_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Global dashboard cache instance
+revenue_dashboard_cache = RevenueDashboardCache()
+
+
+@router.get("/metrics", response_model=RevenueMetrics)
+async def get_revenue_metrics(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get revenue metrics (MRR, ARR, churn, etc.)."""
+    _active_connection(db, current_user.organization_id)
+    return compute_revenue_metrics(db, current_user.organization_id)
+
+
 @router.get("/chart", response_model=RevenueChartData)
 async def get_revenue_chart(
     days: int = Query(default=30, ge=7, le=365),
+    granularity: str = Query(default="week", pattern="^(day|week|month)$"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get revenue chart data for the specified period."""
-    org_id = current_user.organization_id
-
-    # Generate date labels
-    labels = []
-    mrr_data = []
-    revenue_data = []
-    customer_data = []
-
-    for i in range(days, 0, -7):  # Weekly intervals
-        point_date = date.today() - timedelta(days=i)
-        labels.append(point_date.strftime("%b %d"))
-
-        # Count active subscriptions at this point
-        active_at_point = db.query(StripeSubscriptionSync).filter(
-            StripeSubscriptionSync.organization_id == org_id,
-            StripeSubscriptionSync.subscription_created_at <= datetime.combine(point_date, datetime.min.time()),
-            (StripeSubscriptionSync.canceled_at == None) |
-            (StripeSubscriptionSync.canceled_at > datetime.combine(point_date, datetime.min.time()))
-        ).all()
-
-        point_mrr = sum(sub.mrr or 0 for sub in active_at_point)
-        mrr_data.append(round(point_mrr, 2))
-        revenue_data.append(round(point_mrr, 2))  # Simplified
-
-        # Count customers at this point
-        customers_at_point = db.query(StripeCustomerSync).filter(
-            StripeCustomerSync.organization_id == org_id,
-            StripeCustomerSync.customer_created_at <= datetime.combine(point_date, datetime.min.time())
-        ).count()
-        customer_data.append(customers_at_point)
-
-    return RevenueChartData(
-        labels=labels,
-        mrr=mrr_data,
-        revenue=revenue_data,
-        customers=customer_data
-    )
+    return compute_revenue_chart(db, current_user.organization_id, days, granularity)
 
 
 @router.get("/breakdown", response_model=List[SubscriptionBreakdown])
@@ -574,33 +889,7 @@ async def get_subscription_breakdown(
     db: Session = Depends(get_db)
 ):
     """Get breakdown of subscriptions by plan."""
-    org_id = current_user.organization_id
-
-    active_subs = db.query(StripeSubscriptionSync).filter(
-        StripeSubscriptionSync.organization_id == org_id,
-        StripeSubscriptionSync.status == "active"
-    ).all()
-
-    # Group by plan
-    by_plan: Dict[str, Dict] = defaultdict(lambda: {"count": 0, "mrr": 0.0})
-    total_mrr = 0.0
-
-    for sub in active_subs:
-        plan = sub.plan_name or "Unknown"
-        by_plan[plan]["count"] += 1
-        by_plan[plan]["mrr"] += sub.mrr or 0
-        total_mrr += sub.mrr or 0
-
-    breakdown = []
-    for plan_name, data in sorted(by_plan.items(), key=lambda x: x[1]["mrr"], reverse=True):
-        breakdown.append(SubscriptionBreakdown(
-            plan_name=plan_name,
-            count=data["count"],
-            mrr=round(data["mrr"], 2),
-            percentage=round((data["mrr"] / total_mrr * 100) if total_mrr > 0 else 0, 1)
-        ))
-
-    return breakdown
+    return compute_subscription_breakdown(db, current_user.organization_id)
 
 
 @router.get("/top-customers", response_model=List[TopCustomer])
@@ -610,37 +899,7 @@ async def get_top_customers(
     db: Session = Depends(get_db)
 ):
     """Get top customers by revenue."""
-    org_id = current_user.organization_id
-
-    # Get customers with their subscription totals
-    customers = db.query(StripeCustomerSync).filter(
-        StripeCustomerSync.organization_id == org_id
-    ).all()
-
-    customer_revenue = []
-
-    for customer in customers:
-        subs = db.query(StripeSubscriptionSync).filter(
-            StripeSubscriptionSync.organization_id == org_id,
-            StripeSubscriptionSync.stripe_customer_id == customer.stripe_customer_id
-        ).all()
-
-        active_subs = [s for s in subs if s.status == "active"]
-        total_mrr = sum(s.mrr or 0 for s in active_subs)
-
-        if total_mrr > 0 or len(subs) > 0:
-            customer_revenue.append(TopCustomer(
-                customer_id=customer.stripe_customer_id,
-                email=customer.email,
-                name=customer.name,
-                total_revenue=round(total_mrr * 12, 2),  # Annualized
-                subscription_count=len(active_subs),
-                status="active" if active_subs else "churned"
-            ))
-
-    # Sort by revenue and limit
-    customer_revenue.sort(key=lambda x: x.total_revenue, reverse=True)
-    return customer_revenue[:limit]
+    return compute_top_customers(db, current_user.organization_id, limit)
 
 
 @router.get("/dashboard", response_model=RevenueDashboard)
@@ -648,27 +907,24 @@ async def get_revenue_dashboard(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get complete revenue dashboard data."""
-    org_id = current_user.organization_id
-
-    connection = db.query(StripeConnection).filter(
-        StripeConnection.organization_id == org_id,
-        StripeConnection.is_active == True
-    ).first()
+    """
+    Get complete revenue dashboard data.
 
-    if not connection:
-        raise HTTPException(status_code=404, detail="No Stripe account connected")
+    Served from cache until the next sync or webhook.
+    """
+    org_id = current_user.organization_id
+    connection = _active_connection(db, org_id)
+
+    version = (connection.id, connection.last_sync_at, date.today())
+    dashboard = revenue_dashboard_cache.get(org_id, version)
+    if dashboard is None:
+        dashboard = RevenueDashboard(
+            metrics=compute_revenue_metrics(db, org_id),
+            chart_data=compute_revenue_chart(db, org_id, 30, "week"),
+            subscription_breakdown=compute_subscription_breakdown(db, org_id),
+            top_customers=compute_top_customers(db, org_id, 5),
+            last_updated=connection.last_sync_at
+        )
+        revenue_dashboard_cache.set(org_id, version, dashboard)
 
-    # Get all data
-    metrics = await get_revenue_metrics(current_user, db)
-    chart_data = await get_revenue_chart(30, current_user, db)
-    breakdown = await get_subscription_breakdown(current_user, db)
-    top_customers = await get_top_customers(5, current_user, db)
-
-    return RevenueDashboard(
-        metrics=metrics,
-        chart_data=chart_data,
-        subscription_breakdown=breakdown,
-        top_customers=top_customers,
-        last_updated=connection.last_sync_at
-    )
+    return dashboard
@@ -4,8 +4,9 @@ Document Templates API - Pre-built legal and business document templates.
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, date
+from functools import lru_cache
 import re
 
 from .database import get_db
@@ -712,6 +713,86 @@ Website: {{website_url}}
 }
 
 
+# ============ Compiled Templates ============
+
+RENDER_CACHE_SIZE = 256
+MAX_BATCH_DOCUMENTS = 500
+
+
+class CompiledTemplate:
+    """
+    A template split once into literal text and variable slots.
+
+    Rendering fills the slots and joins the pieces, so its cost is one
+    pass over the document however many variables there are. Only the
+    template's declared variables are placeholders; other {{...}} text
+    is left as written.
+    """
+
+    def __init__(self, content: str, variables: List[str]):
+        self.variables = list(variables)
+        self._segments: List[str] = [content]
+        self._slots: List[Tuple[int, int]] = []  # (segment position, variable index)
+        if not self.variables:
+            return
+
+        index = {var: i for i, var in enumerate(self.variables)}
+        names = sorted(self.variables, key=len, reverse=True)
+        pattern = re.compile(r"\{\{(" + "|".join(re.escape(name) for name in names) + r")\}\}")
+        # split() alternates literal text and captured variable names
+        self._segments = pattern.split(content)
+        self._slots = [(i, index[self._segments[i]]) for i in range(1, len(self._segments), 2)]
+
+    def render(self, values: Sequence[Optional[str]]) -> Tuple[str, Tuple[str, ...]]:
+        """
+        Fill the template with values, one per declared variable (None if missing).
+
+        Missing variables are rendered as [name] and returned in declaration order.
+        """
+        filled = []
+        missing = []
+        for var, value in zip(self.variables, values):
+            if value is None:
+                missing.append(var)
+                value = f"[{var}]"
+            filled.append(value)
+
+        parts = list(self._segments)
+        for position, var_index in self._slots:
+            parts[position] = filled[var_index]
+        return "".join(parts), tuple(missing)
+
+
+COMPILED_TEMPLATES: Dict[str, CompiledTemplate] = {
+    template_id: CompiledTemplate(template["content"], template["variables"])
+    for template_id, template in TEMPLATES.items()
+}
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render_cached(template_id: str, values: Tuple[Optional[str], ...]) -> Tuple[str, Tuple[str, ...]]:
+    return COMPILED_TEMPLATES[template_id].render(values)
+
+
+def render_document(template_id: str, variables: dict) -> Tuple[str, List[str]]:
+    """
+    Render a pre-built template.
+
+    Identical renders are served from an LRU cache keyed on the template
+    and the values of its declared variables.
+
+    Returns:
+        (rendered_content, missing_variables)
+    """
+    compiled = COMPILED_TEMPLATES[template_id]
+    values = tuple(
+        str(variables[var]) if var in variables else None
+        for var in compiled.variables
+    )
+    content, missing = _render_cached(template_id, values)
+    return content, list(missing)
+
+
 # ============ Pydantic Schemas ============
 
 class TemplateInfo(BaseModel):
@@ -728,6 +809,11 @@ class RenderTemplateRequest(BaseModel):
     template_id: str
     variables: dict
 
+class RenderBatchRequest(BaseModel):
+    template_id: str
+    variables: dict = {}  # Shared by every document
+    documents: List[dict]  # Per-document variables, overriding the shared ones
+
 class SavedTemplateCreate(BaseModel):
     template_id: str
     name: str
@@ -803,22 +889,40 @@ def render_template(request: RenderTemplateRequest):
         raise HTTPException(status_code=404, detail="Template not found")
 
     template = TEMPLATES[request.template_id]
-    content = template["content"]
-
-    # Replace variables
-    for var in template["variables"]:
-        placeholder = "{{" + var + "}}"
-        value = request.variables.get(var, f"[{var}]")
-        content = content.replace(placeholder, str(value))
+    content, missing = render_document(request.template_id, request.variables)
 
     return {
         "template_id": request.template_id,
         "name": template["name"],
         "rendered_content": content,
-        "missing_variables": [
-            var for var in template["variables"]
-            if var not in request.variables
-        ]
+        "missing_variables": missing
+    }
+
+
+@router.post("/render/batch")
+def render_template_batch(request: RenderBatchRequest):
+    """Render a template once per document, e.g. one NDA per counterparty."""
+    if request.template_id not in TEMPLATES:
+        raise HTTPException(status_code=404, detail="Template not found")
+    if len(request.documents) > MAX_BATCH_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_DOCUMENTS} documents can be rendered per request"
+        )
+
+    template = TEMPLATES[request.template_id]
+    documents = []
+    for document_variables in request.documents:
+        content, missing = render_document(request.template_id, {**request.variables, **document_variables})
+        documents.append({
+            "rendered_content": content,
+            "missing_variables": missing
+        })
+
+    return {
+        "template_id": request.template_id,
+        "name": template["name"],
+        "documents": documents
     }
 
 
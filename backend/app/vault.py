@@ -13,9 +13,14 @@ import os
 import base64
 import hashlib
 import hmac
+import heapq
+import logging
 import secrets
+import sqlite3
 import struct
-from typing import Optional, Tuple
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -29,6 +34,8 @@ try:
 except ImportError:
     ARGON2_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
 # Encryption version for future migration support
 ENCRYPTION_VERSION = 2  # Version 2 = AES-256-GCM with Argon2id
 KEY_SIZE = 32  # 256 bits
@@ -277,43 +284,190 @@ def get_app_encryption_key() -> bytes:
     return hashlib.sha256(app_secret.encode()).digest()
 
 
+class MemoryVaultSessionStore:
+    """
+    Unlocked session keys held in this process.
+
+    Expiry times are also pushed onto a min-heap, so expired sessions are
+    dropped by popping the heap instead of scanning every session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[bytes, float]] = {}  # session_id -> (key, expires_at)
+        self._expiry: List[Tuple[float, str]] = []  # heap of (expires_at, session_id)
+
+    def put(self, session_id: str, key: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._entries[session_id] = (key, expires_at)
+            heapq.heappush(self._expiry, (expires_at, session_id))
+
+    def get(self, session_id: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[session_id]
+                return None
+            return entry[0]
+
+    def touch(self, session_id: str, expires_at: float, now: float) -> bool:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[1] <= now:
+                return False
+            self._entries[session_id] = (entry[0], expires_at)
+            heapq.heappush(self._expiry, (expires_at, session_id))
+            return True
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def purge_expired(self, now: float) -> int:
+        removed = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, session_id = heapq.heappop(self._expiry)
+                entry = self._entries.get(session_id)
+                # Heap entries left behind by refresh/lock/re-unlock are skipped
+                if entry is not None and entry[1] == expires_at:
+                    del self._entries[session_id]
+                    removed += 1
+            if len(self._expiry) > 2 * len(self._entries) + 64:
+                self._expiry = [(exp, sid) for sid, (_, exp) in self._entries.items()]
+                heapq.heapify(self._expiry)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+
+
+class SQLiteVaultSessionStore:
+    """
+    Unlocked session keys in a local SQLite file shared by every worker.
+
+    A vault unlocked on one worker is unlocked on all of them, so the
+    Argon2id derivation runs once per unlock rather than once per worker.
+    Keys are stored AES-256-GCM encrypted under a key derived from the
+    application encryption key, bound to their session id. Expired rows
+    are deleted through the expires_at index.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._wrapping_key = hmac.new(get_app_encryption_key(), b"vault_session_store", hashlib.sha256).digest()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vault_sessions "
+            "(session_id TEXT PRIMARY KEY, encrypted_key TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_vault_sessions_expires_at ON vault_sessions (expires_at)")
+
+    def _associated_data(self, session_id: str) -> str:
+        return f"vault_session:{session_id}"
+
+    def put(self, session_id: str, key: bytes, expires_at: float) -> None:
+        encrypted = encrypt_value(
+            base64.b64encode(key).decode('ascii'), self._wrapping_key, self._associated_data(session_id)
+        )
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO vault_sessions (session_id, encrypted_key, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    encrypted_key = excluded.encrypted_key, expires_at = excluded.expires_at
+                """,
+                (session_id, encrypted, expires_at)
+            )
+
+    def get(self, session_id: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT encrypted_key FROM vault_sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, now)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return base64.b64decode(decrypt_value(row[0], self._wrapping_key, self._associated_data(session_id)))
+        except ValueError:
+            # Written under a different application key; treat as locked
+            return None
+
+    def touch(self, session_id: str, expires_at: float, now: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE vault_sessions SET expires_at = ? WHERE session_id = ? AND expires_at > ?",
+                (expires_at, session_id, now)
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM vault_sessions WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM vault_sessions WHERE expires_at <= ?", (now,))
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM vault_sessions")
+
+
+def _create_vault_session_store():
+    """Pick the store from VAULT_SESSION_BACKEND ("memory" or "sqlite")."""
+    backend = os.getenv("VAULT_SESSION_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteVaultSessionStore(os.getenv("VAULT_SESSION_DB_PATH", "./data/vault_sessions.db"))
+    if backend != "memory":
+        logger.warning(f"Unknown VAULT_SESSION_BACKEND {backend!r}, using memory")
+    return MemoryVaultSessionStore()
+
+
 class VaultSession:
     """
     Manages vault unlock state and encryption key.
-    In production, use Redis/Memcached with TTL for distributed sessions.
+
+    The default store is per-process. With several uvicorn workers set
+    VAULT_SESSION_BACKEND=sqlite so an unlock is shared by every worker
+    on the host; another store (e.g. Redis with TTLs) can be plugged in
+    with set_store().
     """
 
-    _sessions: dict[str, Tuple[bytes, float]] = {}  # session_id -> (encryption_key, unlock_time)
+    _sessions = _create_vault_session_store()
     SESSION_TIMEOUT = 3600  # 1 hour auto-lock
 
+    @classmethod
+    def set_store(cls, store) -> None:
+        cls._sessions = store
+
     @classmethod
     def unlock(cls, session_id: str, key: bytes) -> None:
         """Store encryption key for session."""
-        import time
-        cls._sessions[session_id] = (key, time.time())
+        now = time.time()
+        cls._sessions.purge_expired(now)
+        cls._sessions.put(session_id, key, now + cls.SESSION_TIMEOUT)
 
     @classmethod
     def lock(cls, session_id: str) -> None:
         """Remove encryption key from session (secure wipe)."""
-        if session_id in cls._sessions:
-            # In Python, we can't truly wipe memory, but we can remove the reference
-            del cls._sessions[session_id]
+        # In Python, we can't truly wipe memory, but we can remove the reference
+        cls._sessions.delete(session_id)
 
     @classmethod
     def get_key(cls, session_id: str) -> Optional[bytes]:
         """Get encryption key for session if unlocked and not timed out."""
-        import time
-        if session_id not in cls._sessions:
-            return None
-
-        key, unlock_time = cls._sessions[session_id]
-
-        # Check for timeout
-        if time.time() - unlock_time > cls.SESSION_TIMEOUT:
-            cls.lock(session_id)
-            return None
-
-        return key
+        return cls._sessions.get(session_id, time.time())
 
     @classmethod
     def is_unlocked(cls, session_id: str) -> bool:
@@ -323,22 +477,10 @@ class VaultSession:
     @classmethod
     def refresh(cls, session_id: str) -> bool:
         """Refresh the session timeout. Returns True if session exists."""
-        import time
-        if session_id in cls._sessions:
-            key, _ = cls._sessions[session_id]
-            cls._sessions[session_id] = (key, time.time())
-            return True
-        return False
+        now = time.time()
+        return cls._sessions.touch(session_id, now + cls.SESSION_TIMEOUT, now)
 
     @classmethod
     def cleanup_expired(cls) -> int:
         """Remove all expired sessions. Returns count removed."""
-        import time
-        now = time.time()
-        expired = [
-            sid for sid, (_, unlock_time) in cls._sessions.items()
-            if now - unlock_time > cls.SESSION_TIMEOUT
-        ]
-        for sid in expired:
-            del cls._sessions[sid]
-        return len(expired)
+        return cls._sessions.purge_expired(time.time())
@@ -0,0 +1,46 @@
+"""
+Streaming ZIP output shared by the data export and data room downloads.
+
+zipfile writes data descriptors when its file object can't seek, so an
+archive can be produced front to back and sent to the client as it is
+built instead of being assembled in memory or on disk first.
+"""
+from typing import List
+
+
+class ZipStream:
+    """
+    Write-only, non-seekable file object for zipfile.
+
+    Written bytes are collected until drained, so a generator can hand
+    them to the client and drop them, keeping memory bounded by how
+    often it drains.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._buffered = 0
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._buffered += len(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self._buffered = 0
+        return data
@@ -19,6 +19,9 @@ from app.models import User, Organization
 from app.security import get_password_hash, create_access_token, create_refresh_token
 from app.vault import VaultSession
 from app.security_middleware import rate_limiter
+from app.session_manager import principal_cache
+from app.mention_directory import mention_directory
+from app.data_room_buffer import data_room_access_buffer
 
 
 # Test database setup
@@ -63,13 +66,21 @@ def client(test_db):
     VaultSession._sessions.clear()
 
     # Clear rate limiter state
-    rate_limiter._requests.clear()
+    rate_limiter.reset()
+
+    # Cached principals refer to users of earlier test databases
+    principal_cache.clear()
+    mention_directory.clear()
+
+    # Drop buffered data room writes from other tests
+    data_room_access_buffer.clear()
 
     with TestClient(app) as test_client:
         yield test_client
+        data_room_access_buffer.clear()
 
     app.dependency_overrides.clear()
-    rate_limiter._requests.clear()
+    rate_limiter.reset()
 
 
 @pytest.fixture
@@ -158,6 +169,17 @@ def inactive_user(test_db):
     return user
 
 
+@pytest.fixture
+def test_org(test_db, test_user):
+    """Create an organization with test_user as a member."""
+    org = Organization(name="Acme", slug="acme")
+    test_db.add(org)
+    test_db.commit()
+    test_user.organization_id = org.id
+    test_db.commit()
+    return org
+
+
 @pytest.fixture
 def auth_headers(test_user):
     """Create authentication headers for test user."""
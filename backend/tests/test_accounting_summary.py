@@ -0,0 +1,95 @@
+"""
+Tests for cached accounting financial summaries.
+
+Uses shared fixtures from conftest.py.
+"""
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from app import accounting_oauth
+from app.accounting_oauth import FinancialSummary, summary_refresher
+from app.models import AccountingConnection, AccountingSummarySnapshot
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Fake provider APIs: per-provider summaries, with a call log."""
+    calls = []
+    figures = {
+        "xero": FinancialSummary(accounts_receivable=1200.0, overdue_invoices=200.0),
+        "zoho": FinancialSummary(outstanding_invoices=300.0, overdue_invoices=50.0),
+    }
+
+    async def fake_fetch(client, connection):
+        calls.append(connection.provider)
+        await asyncio.sleep(0.01)
+        if connection.provider not in figures:
+            raise RuntimeError("provider unavailable")
+        return figures[connection.provider]
+
+    monkeypatch.setattr(accounting_oauth, "fetch_provider_summary", fake_fetch)
+    return calls
+
+
+@pytest.fixture
+def accounting_org(test_db, test_user, test_org):
+    """test_user's organization with Xero and Zoho connected."""
+    org = test_org
+    for provider in ("xero", "zoho"):
+        test_db.add(AccountingConnection(
+            organization_id=org.id, user_id=test_user.id, provider=provider,
+            access_token="token", token_expires_at=datetime.now(UTC) + timedelta(hours=1),
+        ))
+    test_db.commit()
+    return org
+
+
+class TestCachedSummary:
+    """The summary endpoint serves snapshots; refreshes are coalesced."""
+
+    def test_summary_is_served_from_snapshots(self, client, test_db, accounting_org, providers, auth_headers):
+        response = client.get("/api/accounting/summary", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["is_stale"] is True
+        assert response.json()["as_of"] is None
+        assert providers == []
+
+        response = client.post("/api/accounting/summary/refresh", headers=auth_headers)
+        data = response.json()
+        assert sorted(providers) == ["xero", "zoho"]
+        assert data["accounts_receivable"] == 1200.0
+        assert data["overdue_invoices"] == 250.0
+        assert data["is_stale"] is False
+        assert {p["provider"] for p in data["providers"]} == {"xero", "zoho"}
+
+        # Reads and immediate re-refreshes don't call the providers again
+        assert client.get("/api/accounting/summary", headers=auth_headers).json() == data
+        client.post("/api/accounting/summary/refresh", headers=auth_headers)
+        assert len(providers) == 2
+
+    def test_concurrent_refreshes_share_one_pull(self, test_db, accounting_org, providers):
+        async def refresh_twice():
+            await asyncio.gather(
+                summary_refresher.refresh(test_db, accounting_org.id),
+                summary_refresher.refresh(test_db, accounting_org.id),
+            )
+
+        asyncio.run(refresh_twice())
+        assert sorted(providers) == ["xero", "zoho"]
+        assert test_db.query(AccountingSummarySnapshot).count() == 2
+
+    def test_failed_pull_keeps_last_figures(self, client, test_db, test_user, accounting_org, providers, auth_headers):
+        test_db.add(AccountingConnection(
+            organization_id=accounting_org.id, user_id=test_user.id, provider="freshbooks",
+            access_token="token", token_expires_at=datetime.now(UTC) + timedelta(hours=1),
+        ))
+        test_db.commit()
+
+        data = client.post("/api/accounting/summary/refresh", headers=auth_headers).json()
+        failed = next(p for p in data["providers"] if p["provider"] == "freshbooks")
+        assert failed["error"] == "provider unavailable"
+        # The aggregate is incomplete, so it is reported stale
+        assert data["is_stale"] is True
+        assert data["accounts_receivable"] == 1200.0
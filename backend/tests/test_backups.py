@@ -0,0 +1,166 @@
+"""
+Tests for incremental, content-addressed database backups.
+
+Uses a filesystem backup store and a paginating S3 stand-in.
+"""
+import io
+import sqlite3
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from app import backups
+from app.backups import (
+    LocalBackupStore, S3BackupStore, create_incremental_backup, restore_snapshot,
+    find_snapshot_at, list_backups_in_store, cleanup_store,
+)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(backups, "BACKUP_CHUNK_SIZE", 16 * 1024)
+    path = str(tmp_path / "app.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, body TEXT)")
+    conn.executemany("INSERT INTO items (body) VALUES (?)", [(f"item {i} " * 40,) for i in range(2000)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBackupStore(str(tmp_path / "store"))
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, body FROM items ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+T0 = datetime(2026, 3, 1, tzinfo=UTC)
+
+
+class TestIncrementalBackups:
+    """Snapshots share unchanged chunks and restore exactly."""
+
+    def test_incremental_uploads_only_changed_chunks(self, database, store, tmp_path):
+        first = create_incremental_backup(store, database, now=T0)
+        assert first.kind == "full"
+        assert first.chunks_uploaded == first.chunks_total > 10
+        # Repetitive rows compress well
+        assert first.uploaded_bytes < first.backup_size / 2
+
+        conn = sqlite3.connect(database)
+        conn.execute("UPDATE items SET body = 'changed' WHERE id = 1500")
+        conn.commit()
+        conn.close()
+
+        second = create_incremental_backup(store, database, now=T0 + timedelta(hours=1))
+        assert second.kind == "incremental"
+        assert 1 <= second.chunks_uploaded <= 3
+
+        restored = str(tmp_path / "restored.db")
+        restore_snapshot(store, first.backup_key, restored)
+        assert _rows(restored)[1499][1].startswith("item 1499")
+        restore_snapshot(store, second.backup_key, restored)
+        assert _rows(restored) == _rows(database)
+
+    def test_full_snapshot_after_interval(self, database, store):
+        create_incremental_backup(store, database, now=T0)
+        later = T0 + timedelta(days=backups.BACKUP_FULL_INTERVAL_DAYS)
+        result = create_incremental_backup(store, database, now=later)
+        assert result.kind == "full"
+        assert result.chunks_uploaded == result.chunks_total
+
+    def test_point_in_time_lookup(self, database, store):
+        keys = [create_incremental_backup(store, database, now=T0 + timedelta(hours=h)).backup_key
+                for h in range(3)]
+        assert find_snapshot_at(store, T0 + timedelta(hours=1, minutes=30)) == keys[1]
+        assert find_snapshot_at(store, T0 - timedelta(minutes=1)) is None
+        assert [b.key for b in list_backups_in_store(store)] == keys[::-1]
+
+    def test_corrupt_chunk_is_rejected(self, database, store, tmp_path):
+        result = create_incremental_backup(store, database, now=T0)
+        chunk = next(store.list(f"{backups.BACKUP_PREFIX}{backups.CHUNK_DIR}"))
+        store.put(chunk.key, backups.gzip.compress(b"garbage"))
+        with pytest.raises(Exception) as exc:
+            restore_snapshot(store, result.backup_key, str(tmp_path / "restored.db"))
+        assert "corrupt" in str(exc.value.detail)
+
+
+class TestRetention:
+    """Expired snapshots and their unshared chunks are removed."""
+
+    def test_cleanup_removes_expired_snapshots_and_chunks(self, database, store):
+        now = datetime.now(UTC)
+        old = create_incremental_backup(store, database, now=now - timedelta(days=60))
+        conn = sqlite3.connect(database)
+        conn.execute("DELETE FROM items WHERE id > 1000")
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        new = create_incremental_backup(store, database, now=now)
+
+        # Chunks are only collected once past the in-progress grace period
+        deleted, chunks_deleted = cleanup_store(store, now=now + backups.CHUNK_GC_GRACE * 2)
+        assert deleted == 1
+        assert chunks_deleted > 0
+        assert [b.key for b in list_backups_in_store(store)] == [new.backup_key]
+        assert not store.exists(old.backup_key)
+
+
+class FakeS3:
+    """In-memory S3 client with two-object list pages."""
+
+    def __init__(self):
+        self.objects = {}
+        self.pages_served = 0
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = (Body, datetime.now(UTC))
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key][0])}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            error = Exception("Not Found")
+            error.response = {"ResponseMetadata": {"HTTPStatusCode": 404}}
+            raise error
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(k for k in fake.objects if k.startswith(Prefix))
+                for i in range(0, len(keys), 2):
+                    fake.pages_served += 1
+                    yield {"Contents": [
+                        {"Key": k, "Size": len(fake.objects[k][0]), "LastModified": fake.objects[k][1]}
+                        for k in keys[i:i + 2]
+                    ]}
+
+        return Paginator()
+
+
+class TestS3Store:
+    """S3 listings follow every page."""
+
+    def test_listing_is_paginated(self, database):
+        s3 = FakeS3()
+        store = S3BackupStore(s3, "bucket")
+        for h in range(5):
+            create_incremental_backup(store, database, now=T0 + timedelta(hours=h))
+
+        assert len(list_backups_in_store(store)) == 5
+        assert s3.pages_served > 1
@@ -0,0 +1,162 @@
+"""
+Tests for comment thread loading and batch comment counts.
+
+Uses shared fixtures from conftest.py.
+"""
+import pytest
+from sqlalchemy import event
+
+from app.security import get_password_hash
+from app.models import Organization, User, Comment
+
+
+@pytest.fixture
+def teammates(test_db, test_org, test_user):
+    users = [
+        User(email=f"member{i}@example.com", name=f"Member {i}", hashed_password=get_password_hash("TestPass123!"),
+             organization_id=test_user.organization_id)
+        for i in range(3)
+    ]
+    test_db.add_all(users)
+    test_db.commit()
+    return users
+
+
+def _thread(db, user, teammates, size, entity_id=1):
+    authors = [user] + teammates
+    parents = []
+    for i in range(size):
+        author = authors[i % len(authors)]
+        comment = Comment(
+            organization_id=user.organization_id, entity_type="task", entity_id=entity_id,
+            user_id=author.id, content=f"Comment {i}",
+            mentioned_user_ids=[teammates[i % len(teammates)].id],
+            parent_id=parents[i % len(parents)].id if i % 3 == 2 and parents else None,
+        )
+        db.add(comment)
+        db.flush()
+        if comment.parent_id is None:
+            parents.append(comment)
+    db.commit()
+
+
+def _count_queries(db, fn):
+    engine = db.get_bind()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements
+
+
+class TestThreadLoading:
+    """A thread is loaded in a fixed number of queries."""
+
+    def test_query_count_does_not_grow_with_thread(self, client, test_db, test_org, test_user, teammates, auth_headers):
+        _thread(test_db, test_user, teammates, 5, entity_id=1)
+        _thread(test_db, test_user, teammates, 50, entity_id=2)
+        # Auth lookups (principal, revocation sync) vary with cache state, so
+        # only the queries loading the thread and its users are compared
+        thread_queries = lambda queries: [q for q in queries if "FROM comments" in q or "users.id IN" in q]
+
+        small, small_queries = _count_queries(
+            test_db, lambda: client.get("/api/comments?entity_type=task&entity_id=1", headers=auth_headers))
+        large, large_queries = _count_queries(
+            test_db, lambda: client.get("/api/comments?entity_type=task&entity_id=2", headers=auth_headers))
+
+        assert len(small.json()) == 5
+        assert len(large.json()) == 50
+        assert len(thread_queries(large_queries)) == len(thread_queries(small_queries)) == 4
+
+    def test_thread_is_hydrated(self, client, test_db, test_org, test_user, teammates, auth_headers):
+        _thread(test_db, test_user, teammates, 6)
+
+        comments = client.get("/api/comments?entity_type=task&entity_id=1", headers=auth_headers).json()
+        by_id = {c["id"]: c for c in comments}
+        for comment in comments:
+            assert comment["user"]["id"] == comment["user_id"]
+            assert [u["id"] for u in comment["mentioned_users"]] == comment["mentioned_user_ids"]
+            expected = sum(1 for c in comments if c["parent_id"] == comment["id"])
+            assert comment["reply_count"] == expected
+        assert sum(c["reply_count"] for c in by_id.values()) == 2
+
+
+class TestCommentCounts:
+    """Batch counts are one grouped query."""
+
+    def test_counts_in_one_query(self, client, test_db, test_org, test_user, teammates, auth_headers):
+        _thread(test_db, test_user, teammates, 4, entity_id=1)
+        _thread(test_db, test_user, teammates, 2, entity_id=2)
+        entities = [{"entity_type": "task", "entity_id": i} for i in (1, 2, 3)]
+        entities.append({"entity_type": "deadline", "entity_id": 1})
+
+        response, queries = _count_queries(
+            test_db, lambda: client.post("/api/comments/counts", json={"entities": entities}, headers=auth_headers))
+
+        assert response.json()["counts"] == {"task:1": 4, "task:2": 2, "task:3": 0, "deadline:1": 0}
+        assert len([q for q in queries if "comments" in q]) == 1
+
+
+class TestMentions:
+    """Mentions and autocomplete are answered from the mention directory."""
+
+    def _user_queries(self, queries):
+        # Directory loads; the response's mentioned users are hydrated by id
+        return [q for q in queries if "FROM users" in q and "users.organization_id = ?" in q]
+
+    def test_mentions_resolve_in_one_lookup(self, client, test_db, test_org, test_user, teammates, auth_headers):
+        teammates[0].name = "Ada Lovelace"
+        teammates[1].name = "Grace Hopper"
+        test_db.commit()
+        body = {"entity_type": "task", "entity_id": 1,
+                "content": '@"Ada Lovelace" and @hopper, also @member2 and @nobody'}
+
+        response, queries = _count_queries(
+            test_db, lambda: client.post("/api/comments", json=body, headers=auth_headers))
+        assert response.status_code == 200
+        assert response.json()["mentioned_user_ids"] == [teammates[0].id, teammates[1].id, teammates[2].id]
+        assert len(self._user_queries(queries)) == 1
+
+        # The directory is reused by later comments
+        _, queries = _count_queries(
+            test_db, lambda: client.post("/api/comments", json=body, headers=auth_headers))
+        assert self._user_queries(queries) == []
+
+    def test_user_changes_invalidate_directory(self, client, test_db, test_org, test_user, teammates, auth_headers):
+        search = lambda q: [u["id"] for u in client.get(
+            f"/api/comments/users/search?q={q}", headers=auth_headers).json()]
+        assert search("member 1") == [teammates[1].id]
+
+        teammates[1].name = "Renamed"
+        test_db.commit()
+        assert search("member 1") == []
+        assert search("ren") == [teammates[1].id]
+
+        teammates[1].is_active = False
+        test_db.commit()
+        assert search("ren") == []
+
+    def test_search_prefers_prefix_matches(self, client, test_db, test_org, test_user, teammates, auth_headers):
+        other = Organization(name="Other", slug="other")
+        test_db.add(other)
+        test_db.commit()
+        test_db.add(User(email="member9@example.com", name="Member 9", hashed_password="x",
+                         organization_id=other.id))
+        teammates[0].name = "Tom Member"
+        test_db.commit()
+
+        results = client.get("/api/comments/users/search?q=mem&limit=10", headers=auth_headers).json()
+        emails = [u["email"] for u in results]
+        assert "member9@example.com" not in emails
+        assert set(emails) == {"member0@example.com", "member1@example.com", "member2@example.com"}
+
+        # "example" only appears mid-email, so it comes from the substring fallback
+        results = client.get("/api/comments/users/search?q=example&limit=2", headers=auth_headers).json()
+        assert len(results) == 2
@@ -0,0 +1,199 @@
+"""
+Tests for the streaming organization export.
+
+Uses shared fixtures from conftest.py.
+"""
+import io
+import json
+import os
+import zipfile
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import data_export
+from app.data_export import run_export_job
+from app.models import Contact, Task, TaskBoard, TaskColumn, Credential, DataExportJob
+
+
+@pytest.fixture
+def export_org(test_db, test_user, test_org):
+    org = test_org
+    board = TaskBoard(organization_id=org.id, name="Roadmap", created_by_id=test_user.id)
+    test_db.add(board)
+    test_db.commit()
+    column = TaskColumn(board_id=board.id, name="Doing")
+    test_db.add(column)
+    test_db.commit()
+    test_db.add_all([
+        Task(title="In a column", board_id=board.id, column_id=column.id, created_by_id=test_user.id),
+        Task(title="No column", board_id=board.id, created_by_id=test_user.id),
+        Credential(organization_id=org.id, name="Bank", encrypted_password="secret"),
+    ])
+    test_db.add_all([Contact(organization_id=org.id, name=f"Contact {i}") for i in range(1200)])
+    test_db.commit()
+    return org
+
+
+@pytest.fixture
+def stream_sessions(test_db, monkeypatch):
+    """Sessions opened by streaming responses, bound to the test database."""
+    opened = []
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+    def session_local():
+        session = factory()
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(data_export, "SessionLocal", session_local)
+    return opened
+
+
+def _ndjson(archive, name):
+    return [json.loads(line) for line in archive.read(name).decode().splitlines()]
+
+
+class TestStreamingExport:
+    """/all streams a ZIP of NDJSON files from batched queries."""
+
+    def test_export_archive_contents(self, client, test_db, export_org, auth_headers, stream_sessions):
+        engine = test_db.get_bind()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/api/export/all", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert json.loads(archive.read("export.json"))["user"]["email"] == "test@example.com"
+
+        assert len(_ndjson(archive, "contacts.ndjson")) == 1200
+        tasks = {t["title"]: t for t in _ndjson(archive, "tasks.ndjson")}
+        assert tasks["In a column"]["column_name"] == "Doing"
+        assert tasks["No column"]["board_name"] == "Roadmap"
+        (credential,) = _ndjson(archive, "credentials.ndjson")
+        assert credential["password"] == "********"
+        assert "secret" not in json.dumps(credential)
+
+        # One query per entity type, however many rows there are
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        assert len(selects) <= len(data_export.EXPORT_ENTITIES) + 2
+        # Rows were read on the stream's own session, closed afterwards
+        assert len(stream_sessions) == 1
+        assert not stream_sessions[0].in_transaction()
+
+    def test_csv_export_streams_on_own_session(self, client, export_org, auth_headers, stream_sessions):
+        response = client.get("/api/export/tasks", headers=auth_headers)
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0].startswith("board,column,title")
+        assert [line.split(",")[:3] for line in lines[1:]] == [
+            ["Roadmap", "Doing", "In a column"], ["Roadmap", "", "No column"]
+        ]
+        assert len(stream_sessions) == 1
+
+
+class TestExportJobs:
+    """Background exports resume from the last finished entity type."""
+
+    def test_failed_job_resumes(self, client, test_db, export_org, auth_headers, tmp_path, monkeypatch):
+        monkeypatch.setattr(data_export, "EXPORT_DIR", str(tmp_path))
+        scheduled = []
+        monkeypatch.setattr(data_export, "run_export_job", lambda job_id: scheduled.append(job_id))
+
+        calls = []
+        entities = dict(data_export.EXPORT_ENTITIES)
+
+        def counting(name, fail=False):
+            def rows(db, org_id):
+                calls.append(name)
+                if fail:
+                    raise RuntimeError("disk full")
+                return entities[name](db, org_id)
+            return rows
+
+        monkeypatch.setattr(data_export, "EXPORT_ENTITIES", [
+            (name, counting(name, fail=(name == "documents"))) for name, _ in data_export.EXPORT_ENTITIES
+        ])
+
+        job_id = client.post("/api/export/jobs", headers=auth_headers).json()["id"]
+        assert scheduled == [job_id]
+        run_export_job(job_id, test_db)
+
+        job = client.get(f"/api/export/jobs/{job_id}", headers=auth_headers).json()
+        assert job["status"] == "failed"
+        assert job["completed_entities"] == ["contacts", "deadlines", "tasks"]
+        assert client.get(f"/api/export/jobs/{job_id}/download", headers=auth_headers).status_code == 409
+
+        # Retrying picks up the same job and only redoes the remaining entities
+        monkeypatch.setattr(data_export, "EXPORT_ENTITIES", [
+            (name, counting(name)) for name, _ in data_export.EXPORT_ENTITIES
+        ])
+        calls.clear()
+        assert client.post("/api/export/jobs", headers=auth_headers).json()["id"] == job_id
+        run_export_job(job_id, test_db)
+        assert "contacts" not in calls
+
+        test_db.expire_all()
+        assert test_db.get(DataExportJob, job_id).status == "completed"
+        response = client.get(f"/api/export/jobs/{job_id}/download", headers=auth_headers)
+        assert response.status_code == 200
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert len(_ndjson(archive, "contacts.ndjson")) == 1200
+        assert len(_ndjson(archive, "tasks.ndjson")) == 2
+
+    def test_stalled_job_is_claimed_once(self, client, test_db, export_org, auth_headers, tmp_path, monkeypatch):
+        monkeypatch.setattr(data_export, "EXPORT_DIR", str(tmp_path))
+        scheduled = []
+        monkeypatch.setattr(data_export, "run_export_job", lambda job_id: scheduled.append(job_id))
+
+        job_id = client.post("/api/export/jobs", headers=auth_headers).json()["id"]
+        job = test_db.get(DataExportJob, job_id)
+        job.status = "running"
+        job.updated_at = datetime.now(UTC) - timedelta(hours=1)
+        test_db.commit()
+
+        # Still writing a part file: not stalled
+        job_dir = tmp_path / f"org_{export_org.id}" / f"job_{job_id}"
+        job_dir.mkdir(parents=True)
+        (job_dir / "contacts.ndjson.tmp").write_text("{}\n")
+        client.post("/api/export/jobs", headers=auth_headers)
+        assert scheduled == [job_id]
+
+        stale = (datetime.now(UTC) - timedelta(hours=1)).timestamp()
+        os.utime(job_dir / "contacts.ndjson.tmp", (stale, stale))
+        client.post("/api/export/jobs", headers=auth_headers)
+        client.post("/api/export/jobs", headers=auth_headers)
+        assert scheduled == [job_id, job_id]
+        test_db.expire_all()
+        assert test_db.get(DataExportJob, job_id).status == "running"
+
+    def test_expired_exports_are_removed(self, client, test_db, export_org, auth_headers, tmp_path, monkeypatch):
+        monkeypatch.setattr(data_export, "EXPORT_DIR", str(tmp_path))
+        monkeypatch.setattr(data_export, "run_export_job", lambda job_id: None)
+
+        job_id = client.post("/api/export/jobs", headers=auth_headers).json()["id"]
+        run_export_job(job_id, test_db)
+        job = test_db.get(DataExportJob, job_id)
+        job_dir = os.path.dirname(job.file_path)
+        assert client.get(f"/api/export/jobs/{job_id}/download", headers=auth_headers).status_code == 200
+
+        job.expires_at = datetime.now(UTC) - timedelta(minutes=1)
+        test_db.commit()
+        # Starting the next export clears out expired archives
+        new_job_id = client.post("/api/export/jobs", headers=auth_headers).json()["id"]
+        assert new_job_id != job_id
+        assert not os.path.exists(job_dir)
+        test_db.expire_all()
+        assert test_db.get(DataExportJob, job_id).status == "expired"
+        assert client.get(f"/api/export/jobs/{job_id}/download", headers=auth_headers).status_code == 410
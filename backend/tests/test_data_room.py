@@ -0,0 +1,159 @@
+"""
+Tests for public data room access tracking.
+
+Uses shared fixtures from conftest.py.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import data_room_buffer
+from app.models import (
+    Document, DataRoomFolder, DataRoomDocument, ShareableLink, DataRoomAccess
+)
+from app.data_room_buffer import DataRoomAccessBuffer, data_room_access_buffer
+
+
+@pytest.fixture
+def shared_folder(test_db, test_org):
+    """Create an organization with a folder of two documents."""
+    org = test_org
+    folder = DataRoomFolder(organization_id=org.id, name="Diligence")
+    test_db.add(folder)
+    test_db.commit()
+
+    for name in ("deck.pdf", "financials.xlsx"):
+        document = Document(organization_id=org.id, name=name, file_path=name)
+        test_db.add(document)
+        test_db.commit()
+        test_db.add(DataRoomDocument(
+            organization_id=org.id, document_id=document.id,
+            folder_id=folder.id, visibility="investors",
+        ))
+    test_db.commit()
+    return folder
+
+
+def _make_link(test_db, folder, token, access_limit=None):
+    link = ShareableLink(
+        organization_id=folder.organization_id, folder_id=folder.id,
+        token=token, access_limit=access_limit,
+    )
+    test_db.add(link)
+    test_db.commit()
+    return link
+
+
+class TestDataRoomAccessBuffer:
+    """Access logs and counters are written behind, limits stay exact."""
+
+    def test_views_are_buffered_and_coalesced(self, client, test_db, shared_folder, monkeypatch):
+        """Repeated views flush as one coalesced update per document."""
+        monkeypatch.setattr(data_room_access_buffer, "_flush_interval", 3600)
+        link = _make_link(test_db, shared_folder, "unlimited-token")
+
+        for _ in range(3):
+            response = client.get("/api/public/data-room/unlimited-token")
+            assert response.status_code == 200
+            assert len(response.json()["documents"]) == 2
+
+        # Nothing written yet
+        assert test_db.query(DataRoomAccess).count() == 0
+
+        assert data_room_access_buffer.flush(test_db) == 3
+        test_db.expire_all()
+
+        assert test_db.query(DataRoomAccess).count() == 3
+        docs = test_db.query(DataRoomDocument).all()
+        assert [doc.view_count for doc in docs] == [3, 3]
+        assert test_db.get(ShareableLink, link.id).current_accesses == 3
+
+    def test_access_limit_is_enforced_immediately(self, client, test_db, shared_folder, monkeypatch):
+        """Limited links are consumed atomically, not through the buffer."""
+        monkeypatch.setattr(data_room_access_buffer, "_flush_interval", 3600)
+        link = _make_link(test_db, shared_folder, "limited-token", access_limit=2)
+
+        assert client.get("/api/public/data-room/limited-token").status_code == 200
+        assert client.get("/api/public/data-room/limited-token").status_code == 200
+        assert client.get("/api/public/data-room/limited-token").status_code == 410
+
+        test_db.expire_all()
+        assert test_db.get(ShareableLink, link.id).current_accesses == 2
+
+    def test_full_buffer_wakes_the_single_flusher(self, test_db, shared_folder, monkeypatch):
+        monkeypatch.setattr(data_room_buffer, "SessionLocal", sessionmaker(bind=test_db.get_bind()))
+        buffer = DataRoomAccessBuffer(flush_interval=3600, max_pending=5)
+        try:
+            for _ in range(20):
+                buffer.record_access(shared_folder.organization_id, "view", folder_id=shared_folder.id)
+
+            deadline = time.monotonic() + 5
+            while test_db.query(DataRoomAccess).count() < 20 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert test_db.query(DataRoomAccess).count() == 20
+            flushers = [t for t in threading.enumerate() if t.name == "data-room-access-flush"]
+            assert flushers == [buffer._thread]
+        finally:
+            buffer.stop(test_db)
+
+    def test_failing_rows_are_dropped_after_a_retry(self, test_db, shared_folder):
+        buffer = DataRoomAccessBuffer(flush_interval=3600)
+        org_id = shared_folder.organization_id
+        buffer.record_access(org_id, "view", folder_id=shared_folder.id)
+        buffer.record_access(None, "view")  # violates NOT NULL
+        buffer.record_access(org_id, "download", folder_id=shared_folder.id)
+        try:
+            # The batch fails and is kept for the next flush
+            assert buffer.flush(test_db) == 0
+            assert test_db.query(DataRoomAccess).count() == 0
+
+            # Second failure: good rows are written, the bad one dropped
+            assert buffer.flush(test_db) == 2
+            assert test_db.query(DataRoomAccess).count() == 2
+            assert buffer.flush(test_db) == 0
+        finally:
+            buffer.stop(test_db)
+
+
+class TestDataRoomFolderZip:
+    """Folder links can be downloaded as one streamed ZIP."""
+
+    def test_download_all_streams_zip(self, client, test_db, shared_folder, tmp_path, monkeypatch):
+        """The archive holds every shared file and logs one access."""
+        import io
+        import zipfile
+        from app import data_room
+
+        monkeypatch.setattr(data_room, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(data_room, "ZIP_CHUNK_SIZE", 1024)
+        monkeypatch.setattr(data_room_access_buffer, "_flush_interval", 3600)
+        (tmp_path / "deck.pdf").write_bytes(b"%PDF" + b"x" * 5000)
+        (tmp_path / "financials.xlsx").write_bytes(b"revenue,100\n")
+        _make_link(test_db, shared_folder, "zip-token")
+
+        response = client.get("/api/public/data-room/zip-token/download-all")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert sorted(archive.namelist()) == ["deck.pdf", "financials.xlsx"]
+        assert archive.read("deck.pdf") == b"%PDF" + b"x" * 5000
+
+        data_room_access_buffer.flush(test_db)
+        logs = test_db.query(DataRoomAccess).all()
+        assert len(logs) == 1
+        assert logs[0].access_type == "download"
+        assert logs[0].folder_id == shared_folder.id
+
+    def test_download_all_rejects_document_links(self, client, test_db, shared_folder):
+        """Single-document links have no folder to archive."""
+        doc = test_db.query(DataRoomDocument).first()
+        test_db.add(ShareableLink(
+            organization_id=shared_folder.organization_id, document_id=doc.id, token="doc-token",
+        ))
+        test_db.commit()
+
+        response = client.get("/api/public/data-room/doc-token/download-all")
+        assert response.status_code == 400
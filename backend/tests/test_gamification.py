@@ -0,0 +1,164 @@
+"""
+Tests for the gamification event pipeline.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.gamification import GamificationPipeline
+from app.models import (
+    Business, Quest, BusinessQuest, Achievement, BusinessAchievement,
+    Challenge, ChallengeParticipant
+)
+
+
+@pytest.fixture
+def gamified_business(test_db, test_user, test_org):
+    """A business with one open quest, two locked achievements and an active challenge."""
+    org = test_org
+    business = Business(organization_id=org.id, name="Acme Labs", xp=0, level=1)
+    test_db.add(business)
+    test_db.commit()
+
+    quest = Quest(slug="three-tasks", name="Three tasks", description="Finish 3 tasks",
+                  quest_type="daily", action_type="task_complete", target_count=3, xp_reward=50)
+    first_task = Achievement(slug="first-task", name="First task", description="Finish a task",
+                             category="tasks", requirement_type="task_complete", requirement_count=1)
+    xp_100 = Achievement(slug="xp-100", name="100 XP", description="Earn 100 XP",
+                         category="xp", requirement_type="xp_total", requirement_count=100)
+    test_db.add_all([quest, first_task, xp_100])
+    test_db.commit()
+
+    test_db.add(BusinessQuest(business_id=business.id, quest_id=quest.id, target_count=3,
+                              xp_reward=50, assigned_date=date.today()))
+    for achievement in (first_task, xp_100):
+        test_db.add(BusinessAchievement(business_id=business.id, achievement_id=achievement.id,
+                                        target_count=achievement.requirement_count))
+
+    challenge = Challenge(name="Sprint", challenge_type="task_sprint", invite_code="SPRINT01",
+                          duration="1_week", status="active", created_by_id=test_user.id)
+    test_db.add(challenge)
+    test_db.commit()
+    test_db.add(ChallengeParticipant(challenge_id=challenge.id, business_id=business.id,
+                                     has_accepted=True, starting_count=0, current_count=0))
+    test_db.commit()
+    return business
+
+
+class TestGamificationPipeline:
+    """Events are applied in one flush."""
+
+    def test_events_update_xp_quests_achievements_and_challenges(self, test_db, gamified_business):
+        events = GamificationPipeline(test_db, gamified_business.organization_id)
+        events.emit(gamified_business.id, "task_complete", xp=60)
+        events.emit(gamified_business.id, "task_complete", xp=60)
+        results = events.flush()
+
+        assert results[gamified_business.id]["xp"] == 120
+        assert results[gamified_business.id]["xp_awarded"] == 120
+
+        bq = test_db.query(BusinessQuest).one()
+        assert bq.current_count == 2
+        assert not bq.is_completed
+
+        unlocked = {ba.achievement.slug: ba for ba in test_db.query(BusinessAchievement).all()}
+        assert unlocked["first-task"].is_unlocked
+        assert unlocked["xp-100"].is_unlocked
+        assert unlocked["xp-100"].current_count == 120
+
+        participant = test_db.query(ChallengeParticipant).one()
+        assert participant.progress == 2
+
+    def test_flush_query_count_is_independent_of_event_count(self, test_db, gamified_business):
+        engine = test_db.get_bind()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        events = GamificationPipeline(test_db, gamified_business.organization_id)
+        for _ in range(10):
+            events.emit(gamified_business.id, "task_complete", xp=5)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            events.flush()
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        # Business, quests, achievements, challenges
+        assert len(selects) == 4
+
+    def test_disabled_business_gets_progress_but_no_xp(self, test_db, gamified_business):
+        gamified_business.gamification_enabled = False
+        test_db.commit()
+
+        events = GamificationPipeline(test_db, gamified_business.organization_id)
+        events.emit(gamified_business.id, "task_complete", xp=60)
+        assert events.flush() == {}
+
+        test_db.refresh(gamified_business)
+        assert gamified_business.xp == 0
+        assert test_db.query(BusinessQuest).one().current_count == 1
+
+
+    def test_reaching_challenge_target_completes_in_the_same_transaction(self, test_db, test_user, gamified_business):
+        challenge = test_db.query(Challenge).one()
+        challenge.target_count = 2
+        rival = Business(organization_id=gamified_business.organization_id, name="Rival")
+        test_db.add(rival)
+        test_db.commit()
+        test_db.add(ChallengeParticipant(challenge_id=challenge.id, business_id=rival.id,
+                                         has_accepted=True, starting_count=0, current_count=0))
+        test_db.commit()
+
+        events = GamificationPipeline(test_db, gamified_business.organization_id)
+        events.emit(gamified_business.id, "task_complete", xp=5)
+        events.emit(gamified_business.id, "task_complete", xp=5)
+        engine = test_db.get_bind()
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            events.flush(commit=False)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert challenge.status == "completed"
+        assert challenge.winner_id == gamified_business.id
+        assert gamified_business.challenge_wins == 1
+        # Participants are loaded once; only the rival's business is fetched
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        assert len(selects) == 6
+
+        # Nothing was committed behind the caller's back
+        test_db.rollback()
+        assert test_db.get(Challenge, challenge.id).status == "active"
+
+
+class TestLeaderboard:
+    """Leaderboard reads denormalized counts straight from the XP index."""
+
+    def test_leaderboard_ranks_and_counts(self, client, test_db, test_user, gamified_business, auth_headers):
+        rival = Business(organization_id=gamified_business.organization_id, name="Rival", xp=500)
+        test_db.add(rival)
+        test_db.commit()
+
+        events = GamificationPipeline(test_db, gamified_business.organization_id)
+        events.emit(gamified_business.id, "task_complete", xp=120)
+        events.flush()
+
+        test_user.current_business_id = gamified_business.id
+        test_db.commit()
+
+        response = client.get("/api/leaderboard", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["total_count"] == 2
+        assert data["user_rank"] == 2
+        assert [e["business_name"] for e in data["entries"]] == ["Rival", "Acme Labs"]
+        assert data["entries"][1]["achievements_count"] == 2
+        assert data["entries"][0]["achievements_count"] == 0
@@ -0,0 +1,205 @@
+"""
+Tests for the Google Calendar event cache and incremental sync.
+
+Uses shared fixtures from conftest.py.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, UTC
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from app import calendar_sync, google_calendar
+from app.calendar_sync import calendar_sync_worker, pull_calendar_events
+from app.models import GoogleCalendarConnection, CalendarEventCache, Deadline
+
+
+class FakeGoogleCalendar:
+    """
+    Minimal in-memory Google Calendar: events.list with paging and sync
+    tokens, event inserts and updates, plus the OAuth token endpoint.
+    """
+
+    def __init__(self, page_size=2):
+        self.events = {}  # id -> (version, resource)
+        self.version = 0
+        self.page_size = page_size
+        self.requests = []
+        self.expired_tokens = set()
+
+    def put(self, event_id, title, start, status="confirmed", **extra):
+        self.version += 1
+        self.events[event_id] = (self.version, {
+            "id": event_id,
+            "status": status,
+            "summary": title,
+            "start": {"dateTime": start.isoformat() + "Z"},
+            "end": {"dateTime": (start + timedelta(hours=1)).isoformat() + "Z"},
+            **extra,
+        })
+
+    def cancel(self, event_id):
+        self.version += 1
+        self.events[event_id] = (self.version, {"id": event_id, "status": "cancelled"})
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path == "/token":
+            form = parse_qs(request.content.decode())
+            assert form["grant_type"] == ["refresh_token"]
+            return httpx.Response(200, json={"access_token": f"token-{len(self.requests)}", "expires_in": 3600})
+
+        if request.method in ("POST", "PUT"):
+            resource = json.loads(request.content)
+            event_id = request.url.path.rsplit("/", 1)[-1] if request.method == "PUT" else f"pushed{len(self.events)}"
+            if request.method == "PUT" and event_id not in self.events:
+                return httpx.Response(404, json={"error": {"code": 404}})
+            self.version += 1
+            self.events[event_id] = (self.version, {**resource, "id": event_id, "status": "confirmed"})
+            return httpx.Response(200 if request.method == "PUT" else 201, json=self.events[event_id][1])
+
+        params = dict(request.url.params)
+        since = 0
+        if "syncToken" in params:
+            if params["syncToken"] in self.expired_tokens:
+                return httpx.Response(410, json={"error": {"code": 410}})
+            since = int(params["syncToken"])
+        changed = sorted(
+            (resource for version, resource in self.events.values()
+             if version > since and (since or resource["status"] != "cancelled")),
+            key=lambda r: r["id"]
+        )
+        offset = int(params.get("pageToken", 0))
+        page = changed[offset:offset + self.page_size]
+        body = {"items": page}
+        if offset + self.page_size < len(changed):
+            body["nextPageToken"] = str(offset + self.page_size)
+        else:
+            body["nextSyncToken"] = str(self.version)
+        return httpx.Response(200, json=body)
+
+
+@pytest.fixture
+def google(monkeypatch):
+    fake = FakeGoogleCalendar()
+    client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+    monkeypatch.setattr(calendar_sync, "_google_client", client)
+    monkeypatch.setattr(google_calendar, "_google_client", client)
+    return fake
+
+
+@pytest.fixture
+def calendar_connection(test_db, test_user, test_org):
+    org = test_org
+    connection = GoogleCalendarConnection(
+        organization_id=org.id, user_id=test_user.id, access_token="token-0",
+        refresh_token="refresh", token_expires_at=datetime.now(UTC) + timedelta(hours=1),
+        calendar_id="primary",
+    )
+    test_db.add(connection)
+    test_db.commit()
+    return connection
+
+
+def _pull(connection, db):
+    async def run():
+        async with calendar_sync._google_client() as client:
+            return await pull_calendar_events(connection, db, client)
+    return asyncio.run(run())
+
+
+def _now():
+    return datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+
+
+class TestIncrementalSync:
+    """The cache follows Google through sync tokens."""
+
+    def test_full_then_incremental_pull(self, test_db, calendar_connection, google):
+        for i in range(5):
+            google.put(f"evt{i}", f"Event {i}", _now() + timedelta(days=i + 1))
+
+        assert _pull(calendar_connection, test_db) == 5
+        assert test_db.query(CalendarEventCache).count() == 5
+        assert calendar_connection.sync_token == "5"
+        assert len(google.requests) == 3  # three pages
+
+        google.put("evt1", "Renamed", _now() + timedelta(days=2))
+        google.cancel("evt2")
+        google.put("evt9", "New", _now() + timedelta(days=9),
+                   extendedProperties={"private": {"m4f_type": "deadline", "m4f_id": "7"}})
+
+        assert _pull(calendar_connection, test_db) == 3
+        assert google.requests[-1].url.params["syncToken"] == "5"
+        events = {e.google_event_id: e for e in test_db.query(CalendarEventCache).all()}
+        assert set(events) == {"evt0", "evt1", "evt3", "evt4", "evt9"}
+        assert events["evt1"].title == "Renamed"
+        assert (events["evt9"].m4f_type, events["evt9"].m4f_id) == ("deadline", 7)
+
+    def test_expired_sync_token_triggers_full_resync(self, test_db, calendar_connection, google):
+        google.put("evt0", "Event", _now() + timedelta(days=1))
+        _pull(calendar_connection, test_db)
+        google.expired_tokens.add(calendar_connection.sync_token)
+        google.put("evt1", "Later", _now() + timedelta(days=2))
+
+        assert _pull(calendar_connection, test_db) == 2
+        assert test_db.query(CalendarEventCache).count() == 2
+
+
+class TestCalendarViews:
+    """Views are served from the cache."""
+
+    def test_events_endpoint_makes_no_external_calls(self, client, test_db, calendar_connection, google, auth_headers):
+        google.put("past", "Past", _now() - timedelta(days=3))
+        google.put("soon", "Soon", _now() + timedelta(days=1))
+        google.put("later", "Later", _now() + timedelta(days=45))
+        _pull(calendar_connection, test_db)
+        calls = len(google.requests)
+
+        response = client.get("/api/google-calendar/events?days=30", headers=auth_headers)
+        assert response.status_code == 200
+        assert [e["id"] for e in response.json()] == ["soon"]
+        assert len(google.requests) == calls
+
+
+class TestPush:
+    """Pushed items are recorded in the cache and updated in place."""
+
+    def test_pushing_twice_updates_the_same_event(self, client, test_db, calendar_connection, google, auth_headers):
+        deadline = Deadline(organization_id=calendar_connection.organization_id, title="File taxes",
+                            due_date=_now() + timedelta(days=7))
+        test_db.add(deadline)
+        test_db.commit()
+
+        first = client.post(f"/api/google-calendar/push-deadline/{deadline.id}", headers=auth_headers)
+        assert first.status_code == 200
+        cached = test_db.query(CalendarEventCache).one()
+        assert (cached.m4f_type, cached.m4f_id, cached.all_day) == ("deadline", deadline.id, True)
+
+        deadline.title = "File taxes (extended)"
+        test_db.commit()
+        second = client.post(f"/api/google-calendar/push-deadline/{deadline.id}", headers=auth_headers)
+        assert second.json()["event_id"] == first.json()["event_id"]
+        assert [r.method for r in google.requests] == ["POST", "PUT"]
+        assert len(google.events) == 1
+
+        test_db.expire_all()
+        assert test_db.query(CalendarEventCache).one().title == "[Deadline] File taxes (extended)"
+
+
+class TestTokenRefresh:
+    """The worker refreshes tokens before they expire."""
+
+    def test_worker_refreshes_expiring_tokens(self, test_db, calendar_connection, google):
+        calendar_connection.token_expires_at = datetime.now(UTC) + timedelta(minutes=5)
+        test_db.commit()
+
+        stats = asyncio.run(calendar_sync_worker.run_once(test_db))
+        assert stats == {"refreshed": 1, "synced": 1, "errors": 0}
+        assert calendar_connection.access_token != "token-0"
+        assert google.requests[0].url.path == "/token"
+
+        stats = asyncio.run(calendar_sync_worker.run_once(test_db))
+        assert stats["refreshed"] == 0
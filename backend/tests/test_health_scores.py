@@ -0,0 +1,126 @@
+"""
+Tests for cached business health scores and the dirty flag.
+
+Uses shared fixtures from conftest.py.
+"""
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy import event
+
+from app.health_scores import refresh_health_scores
+from app.models import (
+    Business, ChecklistProgress, Metric, Task, TaskBoard, TaskColumn, Deadline
+)
+
+
+@pytest.fixture
+def board(test_db, admin_user, test_org):
+    """An organization with two businesses and a board with a Done column."""
+    org = test_org
+    admin_user.organization_id = org.id
+    alpha = Business(organization_id=org.id, name="Alpha")
+    beta = Business(organization_id=org.id, name="Beta")
+    test_db.add_all([alpha, beta])
+    test_db.commit()
+
+    task_board = TaskBoard(organization_id=org.id, name="Work", created_by_id=admin_user.id)
+    test_db.add(task_board)
+    test_db.commit()
+    todo = TaskColumn(board_id=task_board.id, name="To Do", position=0)
+    done = TaskColumn(board_id=task_board.id, name="Done", position=1)
+    test_db.add_all([todo, done])
+    test_db.commit()
+    test_db.add_all([
+        Task(title="Ship", board_id=task_board.id, column_id=done.id, business_id=alpha.id,
+             created_by_id=admin_user.id),
+        Task(title="Plan", board_id=task_board.id, column_id=todo.id, business_id=alpha.id,
+             created_by_id=admin_user.id),
+    ])
+    test_db.commit()
+
+    refresh_health_scores(test_db, org.id, [alpha, beta])
+    test_db.commit()
+    return {"org": org, "alpha": alpha, "beta": beta, "board": task_board, "todo": todo, "done": done}
+
+
+def _dirty(db, business):
+    db.expire(business)
+    return business.health_dirty
+
+
+class TestDirtyFlag:
+    """Writes to scoring inputs raise health_dirty for the businesses they affect."""
+
+    def test_task_writes_flag_their_business(self, test_db, admin_user, board):
+        assert not _dirty(test_db, board["alpha"])
+        test_db.add(Task(title="New", board_id=board["board"].id, column_id=board["todo"].id,
+                         business_id=board["beta"].id, created_by_id=admin_user.id))
+        test_db.commit()
+        assert _dirty(test_db, board["beta"])
+        assert not _dirty(test_db, board["alpha"])
+
+    def test_checklist_and_metric_writes(self, test_db, admin_user, board):
+        test_db.add(ChecklistProgress(organization_id=board["org"].id, business_id=board["alpha"].id,
+                                      item_id="ein", is_completed=True))
+        test_db.commit()
+        assert _dirty(test_db, board["alpha"])
+        assert not _dirty(test_db, board["beta"])
+
+        # Org-level metrics count toward every business
+        test_db.add(Metric(organization_id=board["org"].id, metric_type="mrr", name="MRR", value="100",
+                           date=datetime.now(UTC), created_by_id=admin_user.id))
+        test_db.commit()
+        assert _dirty(test_db, board["beta"])
+
+    def test_column_rename_flags_businesses_on_board(self, test_db, board):
+        board["done"].name = "Shipped"
+        test_db.commit()
+        assert _dirty(test_db, board["alpha"])
+
+    def test_deadlines_are_not_a_scoring_input(self, test_db, board):
+        test_db.add(Deadline(organization_id=board["org"].id, business_id=board["alpha"].id,
+                             title="File taxes", due_date=datetime.now(UTC) + timedelta(days=7)))
+        test_db.commit()
+        assert not _dirty(test_db, board["alpha"])
+
+    def test_deleting_done_column_refreshes_operations(self, client, test_db, board, admin_auth_headers):
+        assert board["alpha"].health_operations == 50
+
+        response = client.delete(f"/api/columns/{board['done'].id}", headers=admin_auth_headers)
+        assert response.status_code == 200
+        assert _dirty(test_db, board["alpha"])
+
+        response = client.get(f"/api/businesses/{board['alpha'].id}", headers=admin_auth_headers)
+        assert response.json()["health_operations"] == 0
+
+
+class TestRecompute:
+    """Scores are recomputed in batches and served from cache otherwise."""
+
+    def test_clean_scores_are_served_without_aggregates(self, client, test_db, board, admin_auth_headers):
+        cached = board["alpha"].health_score
+        engine = test_db.get_bind()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get(f"/api/businesses/{board['alpha'].id}", headers=admin_auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.json()["health_score"] == cached
+        assert not [s for s in statements if "count(" in s.lower()]
+
+    def test_batched_recompute_clears_flags(self, client, test_db, board, admin_auth_headers):
+        board["alpha"].health_dirty = True
+        board["beta"].health_dirty = True
+        test_db.commit()
+
+        response = client.post("/api/businesses/health/recompute", headers=admin_auth_headers)
+        assert response.json() == {"recomputed": 2}
+        assert not _dirty(test_db, board["alpha"])
+        assert not _dirty(test_db, board["beta"])
+        assert board["alpha"].health_operations == 50
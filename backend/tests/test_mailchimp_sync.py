@@ -0,0 +1,222 @@
+"""
+Tests for bulk Mailchimp audience sync through /batches.
+
+Uses shared fixtures from conftest.py.
+"""
+import asyncio
+import io
+import json
+import tarfile
+
+import httpx
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import mailchimp_api
+from app.mailchimp_api import MailchimpClient, sync_audience
+from app.marketing import encrypt_api_key
+from app.models import Contact, EmailIntegration, MailchimpMemberState
+
+
+class FakeMailchimp:
+    """
+    Minimal in-memory Mailchimp: /batches with status polling and a
+    gzipped tar of per-operation results, applied to one audience.
+    """
+
+    def __init__(self, polls_until_finished=1):
+        self.members = {}  # subscriber hash -> {"email_address", "merge_fields", "tags"}
+        self.batches = {}
+        self.requests = []
+        self.reject = set()  # emails whose member upsert fails
+        self.polls_until_finished = polls_until_finished
+
+    def _apply(self, operation):
+        path = operation["path"].split("/")
+        body = json.loads(operation["body"])
+        subscriber_hash = path[4]
+        if len(path) == 5:
+            if body["email_address"] in self.reject:
+                return 400, {"detail": "Invalid email"}
+            member = self.members.setdefault(subscriber_hash, {"tags": set()})
+            member.update(email_address=body["email_address"], merge_fields=body["merge_fields"])
+            return 200, {"id": subscriber_hash}
+        if subscriber_hash not in self.members:
+            return 404, {"detail": "Resource Not Found"}
+        for tag in body["tags"]:
+            if tag["status"] == "active":
+                self.members[subscriber_hash]["tags"].add(tag["name"])
+            else:
+                self.members[subscriber_hash]["tags"].discard(tag["name"])
+        return 204, {}
+
+    def _results_archive(self, batch_id):
+        results = []
+        for operation in self.batches[batch_id]["operations"]:
+            status, response = self._apply(operation)
+            results.append({"status_code": status, "operation_id": operation["operation_id"],
+                            "response": json.dumps(response)})
+        self.batches[batch_id]["results"] = results
+        data = json.dumps(results).encode()
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            info = tarfile.TarInfo(f"{batch_id}/0.json")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        return buffer.getvalue()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.host == "results.example.com":
+            assert "authorization" not in request.headers
+            batch_id = request.url.path.strip("/").split(".")[0]
+            return httpx.Response(200, content=self.batches[batch_id]["archive"])
+
+        assert request.headers["authorization"] == "Bearer key-us5"
+        if request.method == "POST" and request.url.path == "/3.0/batches":
+            batch_id = f"batch{len(self.batches) + 1}"
+            self.batches[batch_id] = {"operations": json.loads(request.content)["operations"], "polls": 0}
+            return httpx.Response(200, json={"id": batch_id, "status": "pending"})
+
+        batch_id = request.url.path.rsplit("/", 1)[-1]
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        if batch["polls"] < self.polls_until_finished:
+            return httpx.Response(200, json={"id": batch_id, "status": "started"})
+        if "archive" not in batch:
+            batch["archive"] = self._results_archive(batch_id)
+        errored = sum(1 for r in batch["results"] if r["status_code"] >= 400)
+        return httpx.Response(200, json={
+            "id": batch_id, "status": "finished",
+            "total_operations": len(batch["operations"]),
+            "finished_operations": len(batch["operations"]),
+            "errored_operations": errored,
+            "response_body_url": f"https://results.example.com/{batch_id}.tar.gz",
+        })
+
+    def member(self, email):
+        return self.members.get(MailchimpClient._get_subscriber_hash(email))
+
+
+@pytest.fixture
+def mailchimp(monkeypatch):
+    fake = FakeMailchimp(polls_until_finished=2)
+    created = []
+
+    def http_client(**kwargs):
+        created.append(kwargs)
+        return httpx.AsyncClient(transport=httpx.MockTransport(fake.handler), **kwargs)
+
+    monkeypatch.setattr(mailchimp_api, "_http_client", http_client)
+    monkeypatch.setattr(mailchimp_api, "MAILCHIMP_BATCH_POLL_INTERVAL", 0)
+    fake.clients_created = created
+    return fake
+
+
+@pytest.fixture
+def crm_org(test_db, test_org):
+    org = test_org
+    test_db.add_all([
+        Contact(organization_id=org.id, name="Ada Lovelace", email="ada@example.com", tags="vip, investor"),
+        Contact(organization_id=org.id, name="Grace Hopper", email="Grace@Example.com", phone="555-0100"),
+        Contact(organization_id=org.id, name="No Email"),
+    ])
+    test_db.commit()
+    return org
+
+
+def _sync(db, org):
+    async def run():
+        async with MailchimpClient("key-us5") as client:
+            return await sync_audience(db, client, org.id, "list1")
+    return asyncio.run(run())
+
+
+class TestAudienceSync:
+    """Contacts are diffed against the last synced state and sent in batches."""
+
+    def test_first_sync_sends_members_then_tags(self, test_db, crm_org, mailchimp):
+        result = _sync(test_db, crm_org)
+        assert result["contacts"] == 2
+        assert (result["changed"], result["synced"], result["failed"], result["pending"]) == (2, 2, 0, 0)
+        assert result["batch_ids"] == ["batch1", "batch2"]
+
+        # Member upserts finished before tags were sent
+        assert [op["method"] for op in mailchimp.batches["batch1"]["operations"]] == ["PUT", "PUT"]
+        assert [op["method"] for op in mailchimp.batches["batch2"]["operations"]] == ["POST"]
+        assert mailchimp.member("ada@example.com")["tags"] == {"investor", "vip"}
+        assert mailchimp.member("grace@example.com")["merge_fields"] == {
+            "FNAME": "Grace", "LNAME": "Hopper", "PHONE": "555-0100"
+        }
+        # One pooled API client (plus one per results download, which has no errors here)
+        assert len(mailchimp.clients_created) == 1
+
+    def test_unchanged_contacts_are_not_sent(self, test_db, crm_org, mailchimp):
+        _sync(test_db, crm_org)
+        requests = len(mailchimp.requests)
+
+        result = _sync(test_db, crm_org)
+        assert (result["changed"], result["operations"]) == (0, 0)
+        assert len(mailchimp.requests) == requests
+
+        ada = test_db.query(Contact).filter(Contact.email == "ada@example.com").one()
+        ada.tags = "vip, advisor"
+        test_db.commit()
+
+        result = _sync(test_db, crm_org)
+        assert (result["changed"], result["operations"]) == (1, 2)
+        tag_op = json.loads(mailchimp.batches["batch4"]["operations"][0]["body"])
+        assert tag_op["tags"] == [{"name": "advisor", "status": "active"}, {"name": "investor", "status": "inactive"}]
+        assert mailchimp.member("ada@example.com")["tags"] == {"advisor", "vip"}
+
+    def test_failed_members_are_retried(self, test_db, crm_org, mailchimp):
+        mailchimp.reject.add("ada@example.com")
+        result = _sync(test_db, crm_org)
+        assert (result["synced"], result["failed"]) == (1, 1)
+        # Ada's tags were never sent because her upsert failed
+        assert len(mailchimp.batches) == 1
+        assert test_db.query(MailchimpMemberState).count() == 1
+
+        mailchimp.reject.clear()
+        result = _sync(test_db, crm_org)
+        assert (result["changed"], result["synced"]) == (1, 1)
+        assert mailchimp.member("ada@example.com")["tags"] == {"investor", "vip"}
+
+    def test_unfinished_batches_are_reported_pending(self, test_db, crm_org, mailchimp):
+        mailchimp.polls_until_finished = 1000
+
+        async def run():
+            async with MailchimpClient("key-us5") as client:
+                return await sync_audience(test_db, client, crm_org.id, "list1", timeout=0)
+
+        result = asyncio.run(run())
+        assert (result["synced"], result["pending"]) == (0, 2)
+        assert test_db.query(MailchimpMemberState).count() == 0
+
+
+class TestSyncEndpoint:
+    """The sync endpoint uses the organization's stored Mailchimp key."""
+
+    def test_sync_endpoint(self, client, test_db, crm_org, mailchimp, auth_headers, monkeypatch):
+        """Batches are submitted inline and finished by a background task."""
+        monkeypatch.setattr(mailchimp_api, "SessionLocal", sessionmaker(bind=test_db.get_bind()))
+        test_db.add(EmailIntegration(
+            organization_id=crm_org.id, provider="mailchimp", api_key_encrypted=encrypt_api_key("key-us5")
+        ))
+        test_db.commit()
+
+        response = client.post("/api/mailchimp/lists/list1/sync", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["batch_ids"] == ["batch1"]
+        assert response.json()["changed"] == 2
+
+        # The test client runs background tasks before returning
+        assert test_db.query(MailchimpMemberState).count() == 2
+        assert mailchimp.member("ada@example.com")["tags"] == {"investor", "vip"}
+
+        integration = test_db.query(EmailIntegration).one()
+        test_db.refresh(integration)
+        assert integration.last_synced_at is not None
+
+        response = client.get("/api/mailchimp/batches/batch1", headers=auth_headers)
+        assert response.json()["status"] == "finished"
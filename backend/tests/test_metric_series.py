@@ -0,0 +1,82 @@
+"""
+Tests for the numeric metric time series.
+
+Uses shared fixtures from conftest.py.
+"""
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy import event
+
+from app.metric_series import latest_points, resample
+from app.models import Metric, MetricPoint
+
+
+@pytest.fixture
+def metrics_org(test_db, test_user, test_org):
+    """test_user's organization with three months of MRR and a few other metrics."""
+    org = test_org
+
+    now = datetime.now(UTC).replace(tzinfo=None)
+    for days_ago, value in [(75, "$1,000"), (45, "$1,200"), (10, "$1,500")]:
+        test_db.add(Metric(organization_id=org.id, metric_type="mrr", name="MRR", value=value,
+                           date=now - timedelta(days=days_ago), created_by_id=test_user.id))
+    for metric_type, value in [("cash", "250000"), ("churn", "2.5%"), ("customers", "42")]:
+        test_db.add(Metric(organization_id=org.id, metric_type=metric_type, name=metric_type.title(),
+                           value=value, date=now - timedelta(days=5), created_by_id=test_user.id))
+    test_db.commit()
+    return org
+
+
+class TestMetricPoints:
+    """Points mirror metrics and answer per-type queries in SQL."""
+
+    def test_points_follow_metric_writes(self, test_db, metrics_org):
+        assert test_db.query(MetricPoint).count() == 6
+
+        metric = test_db.query(Metric).filter_by(metric_type="cash").one()
+        metric.value = "$300,000"
+        test_db.commit()
+        assert metric.point.value == 300000.0
+
+        test_db.delete(metric)
+        test_db.commit()
+        assert test_db.query(MetricPoint).count() == 5
+
+    def test_latest_points_and_resample(self, test_db, metrics_org):
+        latest = latest_points(test_db, metrics_org.id, n=2)
+        assert [p.value for p in latest["mrr"]] == [1500.0, 1200.0]
+        assert latest["churn"][0].value == 2.5
+
+        buckets = resample(test_db, metrics_org.id, ["mrr"], bucket="day")["mrr"]
+        assert [b["value"] for b in buckets] == [1000.0, 1200.0, 1500.0]
+
+    def test_analytics_dashboard_query_count_is_constant(self, client, test_db, metrics_org, test_user, auth_headers):
+        now = datetime.now(UTC).replace(tzinfo=None)
+        for i in range(20):
+            test_db.add(Metric(organization_id=metrics_org.id, metric_type=f"custom_{i}", name=f"Custom {i}",
+                               value=str(i), date=now - timedelta(days=1), created_by_id=test_user.id))
+        test_db.commit()
+
+        engine = test_db.get_bind()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = client.get("/api/analytics/dashboard?period=30d", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["overview"]["total_metrics"] == 24
+        assert data["financial"]["mrr"] == 1500.0
+        assert data["financial"]["mrr_growth"] == 25.0
+        growth = {m["metric_type"]: m for m in data["growth_metrics"]}
+        assert growth["mrr"]["previous_value"] == 1200.0
+
+        metric_queries = [s for s in statements if "metric" in s]
+        assert len(metric_queries) <= 5
@@ -0,0 +1,129 @@
+"""
+Tests for notification unread counters and the notification stream.
+
+Uses shared fixtures from conftest.py.
+"""
+import asyncio
+import json
+
+from sqlalchemy import event
+
+from app import notifications_api
+from app.models import NotificationCounter
+from app.notification_events import notification_broker
+from app.notifications_api import create_notification
+
+
+def _notify(db, user, title="Hello"):
+    return create_notification(db, user.organization_id, user.id, "comment", title)
+
+
+def _counter(db, user):
+    db.expire_all()
+    return db.query(NotificationCounter).filter(NotificationCounter.user_id == user.id).one()
+
+
+class TestUnreadCounter:
+    """The counter follows ORM and API changes without COUNT queries."""
+
+    def test_counter_follows_orm_changes(self, test_db, test_org, test_user):
+        first = _notify(test_db, test_user)
+        _notify(test_db, test_user)
+        test_db.commit()
+        counter = _counter(test_db, test_user)
+        assert (counter.total_count, counter.unread_count) == (2, 2)
+
+        first.is_read = True
+        test_db.commit()
+        assert _counter(test_db, test_user).unread_count == 1
+
+        test_db.delete(first)
+        test_db.commit()
+        counter = _counter(test_db, test_user)
+        assert (counter.total_count, counter.unread_count) == (1, 1)
+
+    def test_rolled_back_notifications_are_not_counted(self, test_db, test_org, test_user):
+        _notify(test_db, test_user)
+        test_db.commit()
+        _notify(test_db, test_user)
+        test_db.flush()
+        test_db.rollback()
+        assert _counter(test_db, test_user).total_count == 1
+
+    def test_endpoints_use_counter(self, client, test_db, test_org, test_user, auth_headers):
+        for i in range(3):
+            _notify(test_db, test_user, f"N{i}")
+        test_db.commit()
+
+        engine = test_db.get_bind()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement.lower())
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            data = client.get("/api/notifications", headers=auth_headers).json()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert (data["total_count"], data["unread_count"]) == (3, 3)
+        assert not [s for s in statements if "count(" in s]
+
+        ids = [item["id"] for item in data["items"]][:2]
+        client.post("/api/notifications/mark-read", json={"notification_ids": ids}, headers=auth_headers)
+        assert client.get("/api/notifications/unread-count", headers=auth_headers).json() == {"count": 1}
+
+        client.delete("/api/notifications?read_only=false", headers=auth_headers)
+        counter = _counter(test_db, test_user)
+        assert (counter.total_count, counter.unread_count) == (0, 0)
+
+    def test_counter_is_seeded_from_existing_rows(self, client, test_db, test_org, test_user, auth_headers):
+        _notify(test_db, test_user)
+        test_db.commit()
+        test_db.query(NotificationCounter).delete()
+        test_db.commit()
+
+        assert client.get("/api/notifications/unread-count", headers=auth_headers).json() == {"count": 1}
+        _notify(test_db, test_user)
+        test_db.commit()
+        assert _counter(test_db, test_user).unread_count == 2
+
+
+class TestNotificationEvents:
+    """Events are published to subscribers after commit."""
+
+    def test_events_are_published_on_commit(self, test_db, test_org, test_user):
+        async def run():
+            subscription = notification_broker.subscribe(test_user.id)
+            try:
+                _notify(test_db, test_user, "Mentioned")
+                test_db.flush()
+                await asyncio.sleep(0)
+                assert subscription.queue.empty()
+
+                test_db.commit()
+                await asyncio.sleep(0)
+                messages = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+            finally:
+                notification_broker.unsubscribe(subscription)
+            return messages
+
+        messages = asyncio.run(run())
+        assert [m["type"] for m in messages] == ["notification", "unread_count"]
+        assert messages[0]["data"]["title"] == "Mentioned"
+        assert messages[0]["data"]["unread_count"] == 1
+        assert notification_broker.subscriber_count(test_user.id) == 0
+
+    def test_stream_starts_with_unread_count(self, client, test_db, test_org, test_user, auth_headers, monkeypatch):
+        monkeypatch.setattr(notifications_api, "NOTIFICATION_STREAM_MAX_SECONDS", 0.2)
+        _notify(test_db, test_user)
+        test_db.commit()
+
+        with client.stream("GET", "/api/notifications/stream", headers=auth_headers) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join(response.iter_text())
+
+        event_block = next(block for block in body.split("\n\n") if block.startswith("event:"))
+        name, data = event_block.split("\n")
+        assert name == "event: unread_count"
+        assert json.loads(data[len("data: "):]) == {"count": 1}
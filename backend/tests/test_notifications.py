@@ -0,0 +1,111 @@
+"""
+Tests for scheduled deadline reminders and weekly digests.
+
+Uses shared fixtures from conftest.py.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import email_service, notifications
+from app.models import Deadline, NotificationSendLog
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """Capture emails instead of calling SES."""
+    sent = []
+
+    def fake_send(to, subject, html):
+        sent.append((to, subject, html))
+        return True
+
+    monkeypatch.setattr(email_service, "_send_email", fake_send)
+    monkeypatch.setattr(notifications, "SCHEDULER_API_KEY", "scheduler-key")
+    return sent
+
+
+@pytest.fixture
+def team_org(test_db, test_org, admin_user, editor_user):
+    """An organization with three members and deadlines today and tomorrow."""
+    org = test_org
+    for user in (admin_user, editor_user):
+        user.organization_id = org.id
+
+    today = datetime.combine(date.today(), datetime.min.time())
+    test_db.add_all([
+        Deadline(organization_id=org.id, title="File taxes", deadline_type="tax", due_date=today + timedelta(hours=17)),
+        Deadline(organization_id=org.id, title="Renew domain", due_date=today + timedelta(days=1)),
+        Deadline(organization_id=org.id, title="Done already", due_date=today, is_completed=True),
+    ])
+    test_db.commit()
+    return org
+
+
+HEADERS = {"X-API-Key": "scheduler-key"}
+
+
+class TestDeadlineReminders:
+    """Reminders are rendered per org and recorded in a send ledger."""
+
+    def test_reminders_are_sent_once(self, client, test_db, team_org, outbox):
+        response = client.post("/api/notifications/send-deadline-reminders", headers=HEADERS)
+        assert response.status_code == 200
+        assert response.json()["sent"] == 6  # today + tomorrow for three members
+
+        today_emails = [m for m in outbox if "TODAY" in m[1]]
+        assert len(today_emails) == 3
+        assert all("File taxes" in html and "Done already" not in html for _, _, html in today_emails)
+        assert any("Hi Test User" in html for _, _, html in today_emails)
+        assert test_db.query(NotificationSendLog).count() == 6
+
+        # A rerun finds everything in the ledger
+        response = client.post("/api/notifications/send-deadline-reminders", headers=HEADERS)
+        assert response.json()["sent"] == 0
+        assert response.json()["skipped"] == 6
+        assert len(outbox) == 6
+
+    def test_failed_sends_are_retried(self, client, test_db, team_org, outbox, monkeypatch):
+        monkeypatch.setattr(email_service, "_send_email", lambda to, subject, html: False)
+        response = client.post("/api/notifications/send-deadline-reminders", headers=HEADERS)
+        assert response.json()["errors"] == 6
+        assert test_db.query(NotificationSendLog).count() == 0
+
+    def test_rows_claimed_by_an_overlapping_run_are_not_sent(self, test_db, test_user, admin_user, outbox):
+        today = date.today()
+        row = lambda user, deadline_id: {
+            "user_id": user.id, "deadline_id": deadline_id, "reminder_type": "today", "period": today
+        }
+        # Another run already claimed deadline 1 for test_user
+        test_db.add(NotificationSendLog(**row(test_user, 1)))
+        test_db.commit()
+
+        result = asyncio.run(notifications._deliver(test_db, [
+            (test_user.email, "Due", "<p>1, 2</p>", [row(test_user, 1), row(test_user, 2)]),
+            (admin_user.email, "Due", "<p>1</p>", [row(admin_user, 1)]),
+        ]))
+        assert result == {"sent": 1, "errors": 0, "skipped": 1}
+        assert [m[0] for m in outbox] == [admin_user.email]
+        # The partial claim was released for the next run
+        claimed = {(r.user_id, r.deadline_id) for r in test_db.query(NotificationSendLog).all()}
+        assert claimed == {(test_user.id, 1), (admin_user.id, 1)}
+
+    def test_requires_scheduler_key(self, client, team_org, outbox):
+        response = client.post("/api/notifications/send-deadline-reminders", headers={"X-API-Key": "wrong"})
+        assert response.status_code == 401
+        assert outbox == []
+
+
+class TestWeeklyDigest:
+    """Digests aggregate stats per org and go out once per week."""
+
+    def test_digest_is_sent_once_per_week(self, client, test_db, team_org, outbox):
+        response = client.post("/api/notifications/send-weekly-digest", headers=HEADERS)
+        assert response.json()["sent"] == 3
+        # Two open deadlines fall in the next week
+        assert all("#f59e0b;\">2</div>" in html for _, _, html in outbox)
+
+        response = client.post("/api/notifications/send-weekly-digest", headers=HEADERS)
+        assert response.json()["sent"] == 0
+        assert len(outbox) == 3
@@ -0,0 +1,63 @@
+"""
+Tests for the authenticated principal cache.
+
+Uses shared fixtures from conftest.py.
+"""
+from sqlalchemy import event
+
+from app.models import User
+
+
+def _statements(engine, fn):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements
+
+
+class TestPrincipalCache:
+    """get_current_user skips the users query once the principal is cached."""
+
+    def test_repeat_requests_skip_user_lookup(self, client, test_db, test_user, auth_headers):
+        assert client.get("/api/notifications/unread-count", headers=auth_headers).status_code == 200
+        test_db.expunge_all()
+
+        response, statements = _statements(
+            test_db.get_bind(),
+            lambda: client.get("/api/notifications/unread-count", headers=auth_headers)
+        )
+        assert response.status_code == 200
+        assert not [s for s in statements if "FROM users" in s]
+
+    def test_unloaded_fields_are_fetched_on_access(self, client, test_db, test_user, auth_headers):
+        client.get("/api/auth/me", headers=auth_headers)
+        test_db.expunge_all()
+
+        response = client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["name"] == test_user.name
+
+    def test_deactivation_invalidates_principal(self, client, test_db, test_user, auth_headers):
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+
+        user = test_db.query(User).filter(User.id == test_user.id).one()
+        user.is_active = False
+        test_db.commit()
+        test_db.expunge_all()
+
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 403
+
+    def test_role_change_invalidates_principal(self, client, test_db, test_user, auth_headers):
+        client.get("/api/auth/me", headers=auth_headers)
+        test_user.role = "admin"
+        test_db.commit()
+        test_db.expunge_all()
+
+        assert client.get("/api/auth/me", headers=auth_headers).json()["role"] == "admin"
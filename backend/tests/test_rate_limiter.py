@@ -0,0 +1,70 @@
+"""
+Tests for the rate limiter backends.
+
+Uses shared fixtures from conftest.py.
+"""
+import pytest
+
+from app import security_middleware
+from app.security_middleware import MemoryRateLimitBackend, SQLiteRateLimitBackend, RateLimiter
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteRateLimitBackend(str(tmp_path / "rate_limits.db"))
+    return MemoryRateLimitBackend()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(security_middleware.time, "time", lambda: now[0])
+    return now
+
+
+class TestRateLimitBackends:
+    """Both backends enforce the same GCRA limits."""
+
+    def test_burst_then_refill(self, backend, clock):
+        limiter = RateLimiter(backend)
+        results = [limiter.is_rate_limited("k", 5, 60) for _ in range(6)]
+        assert results == [(False, 4), (False, 3), (False, 2), (False, 1), (False, 0), (True, 0)]
+
+        limited, _, retry_after = limiter.check("k", 5, 60)
+        assert limited and retry_after == pytest.approx(12.0)
+
+        # One request's worth of capacity comes back every window / max_requests
+        clock[0] += 12
+        assert limiter.is_rate_limited("k", 5, 60) == (False, 0)
+        assert limiter.is_rate_limited("other", 5, 60) == (False, 4)
+
+        limiter.reset()
+        assert limiter.is_rate_limited("k", 5, 60) == (False, 4)
+
+    def test_memory_backend_drops_expired_keys(self, clock):
+        backend = MemoryRateLimitBackend()
+        for i in range(100):
+            backend.hit(f"client-{i}", 5, 60)
+        clock[0] += 61
+        backend.hit("fresh", 5, 60)
+        assert list(backend._tats) == ["fresh"]
+
+    def test_sqlite_backend_is_shared_between_instances(self, tmp_path, clock):
+        path = str(tmp_path / "rate_limits.db")
+        worker_a, worker_b = SQLiteRateLimitBackend(path), SQLiteRateLimitBackend(path)
+        assert worker_a.hit("k", 2, 60)[0] is False
+        assert worker_b.hit("k", 2, 60)[0] is False
+        assert worker_a.hit("k", 2, 60)[0] is True
+        assert worker_b.hit("k", 2, 60)[0] is True
+
+
+class TestRateLimitMiddleware:
+    """The middleware reports the backend's reset time."""
+
+    def test_login_is_limited_with_retry_after(self, client):
+        for _ in range(5):
+            client.post("/api/auth/login", json={"email": "x@example.com", "password": "wrong"})
+        response = client.post("/api/auth/login", json={"email": "x@example.com", "password": "wrong"})
+        assert response.status_code == 429
+        assert 1 <= int(response.headers["Retry-After"]) <= 12
@@ -0,0 +1,79 @@
+"""
+Tests for atomic per-organization sequences.
+
+Uses shared fixtures from conftest.py.
+"""
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.invoicing import generate_invoice_number
+from app.models import OrgSequence
+from app.sequences import (
+    allocate_invite_code, next_value, INVITE_CODE_PREFIX_LENGTH, INVITE_CODE_RANDOM_LENGTH
+)
+
+
+class TestOrgSequence:
+    """Sequences allocate distinct values without scanning rows."""
+
+    def test_values_are_per_organization_and_name(self, test_db):
+        assert [next_value(test_db, 1, "invoice:2025") for _ in range(3)] == [1, 2, 3]
+        assert next_value(test_db, 2, "invoice:2025") == 1
+        assert next_value(test_db, 1, "invoice:2026") == 1
+        assert test_db.query(OrgSequence).count() == 3
+
+    def test_seed_continues_existing_numbering(self, test_db):
+        assert next_value(test_db, 1, "invoice:2025", seed=lambda: 41) == 42
+        assert next_value(test_db, 1, "invoice:2025", seed=lambda: 1000) == 43
+
+    def test_invoice_numbers_and_invite_codes(self, test_db, test_org):
+        first = generate_invoice_number(test_db, test_org.id)
+        second = generate_invoice_number(test_db, test_org.id)
+        assert first.endswith("-0001")
+        assert second.endswith("-0002")
+
+        codes = {allocate_invite_code(test_db) for _ in range(50)}
+        assert len(codes) == 50
+        assert all(len(code) == INVITE_CODE_PREFIX_LENGTH + INVITE_CODE_RANDOM_LENGTH for code in codes)
+        # The random, unguessable part is at least 8 characters
+        assert INVITE_CODE_RANDOM_LENGTH >= 8
+        suffixes = {code[INVITE_CODE_PREFIX_LENGTH:] for code in codes}
+        assert len(suffixes) == 50
+
+    def test_concurrent_allocations_never_collide(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'sequences.db'}",
+            connect_args={"check_same_thread": False, "timeout": 30},
+        )
+        Base.metadata.create_all(bind=engine, tables=[OrgSequence.__table__])
+        SessionFactory = sessionmaker(bind=engine)
+
+        allocated = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(25):
+                db = SessionFactory()
+                try:
+                    value = next_value(db, 1, "invoice:2025")
+                    db.commit()
+                    with lock:
+                        allocated.append(value)
+                except Exception as e:  # pragma: no cover - reported below
+                    errors.append(e)
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+        assert errors == []
+        assert sorted(allocated) == list(range(1, 201))
@@ -0,0 +1,116 @@
+"""
+Tests for Slack digest and alert dispatch.
+
+Uses shared fixtures from conftest.py.
+"""
+import json
+from datetime import date, datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app import slack_integration
+from app.models import Organization, SlackConnection, Deadline, StripeSubscriptionSync, StripeConnection
+
+
+@pytest.fixture
+def slack_api(monkeypatch):
+    """Route outbound Slack posts to an in-memory handler."""
+    calls = []
+    responses = []  # queued (status, headers) overrides
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        if responses:
+            status, headers = responses.pop(0)
+            return httpx.Response(status, headers=headers, json={"ok": False})
+        return httpx.Response(200, json={"ok": True})
+
+    monkeypatch.setattr(slack_integration, "_slack_client",
+                        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(slack_integration, "SCHEDULER_API_KEY", "scheduler-key")
+    slack_integration.slack_rate_limiter.clear()
+    yield calls, responses
+    slack_integration.slack_rate_limiter.clear()
+
+
+@pytest.fixture
+def workspaces(test_db, test_user):
+    """Three organizations, each with a connected workspace and a deadline today."""
+    today = datetime.combine(date.today(), datetime.min.time())
+    orgs = []
+    for i in range(3):
+        org = Organization(name=f"Org {i}", slug=f"org-{i}")
+        test_db.add(org)
+        test_db.commit()
+        test_db.add(SlackConnection(organization_id=org.id, team_id=f"T{i}", access_token="xoxb-test",
+                                    channel_id=f"C{i}"))
+        test_db.add(Deadline(organization_id=org.id, title=f"Deadline {i}", due_date=today + timedelta(hours=12)))
+        orgs.append(org)
+    stripe = StripeConnection(organization_id=orgs[0].id, stripe_account_id="acct_1", access_token="sk_test")
+    test_db.add(stripe)
+    test_db.commit()
+    test_db.add(StripeSubscriptionSync(organization_id=orgs[0].id, stripe_connection_id=stripe.id,
+                                       stripe_subscription_id="sub_1", stripe_customer_id="cus_1",
+                                       status="active", mrr=1200.0))
+    test_db.commit()
+    return orgs
+
+
+HEADERS = {"X-API-Key": "scheduler-key"}
+
+
+class TestSlackDispatch:
+    """Digests are prefetched in bulk and posted through rate-limited workspaces."""
+
+    def test_daily_digest_uses_grouped_queries(self, client, test_db, workspaces, slack_api):
+        calls, _ = slack_api
+        engine = test_db.get_bind()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = client.post("/api/slack/send-daily-digest", headers=HEADERS)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sent_count"] == 3
+        assert {w["team_id"] for w in data["workspaces"]} == {"T0", "T1", "T2"}
+        assert all(w["duration_ms"] >= 0 for w in data["workspaces"])
+
+        # connections + deadlines + tasks + cash + MRR, independent of org count
+        assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) <= 5
+
+        by_channel = {c["channel"]: json.dumps(c["blocks"]) for c in calls}
+        assert "*MRR:* $1,200" in by_channel["C0"]
+        assert "Deadline 1" in by_channel["C1"]
+
+    def test_retries_after_rate_limit(self, client, workspaces, slack_api):
+        calls, responses = slack_api
+        responses.append((429, {"Retry-After": "0"}))
+
+        response = client.post("/api/slack/send-deadline-alerts", headers=HEADERS)
+        data = response.json()
+        assert data["sent_count"] == 3
+        assert sorted(w["attempts"] for w in data["workspaces"]) == [1, 1, 2]
+        assert len(calls) == 4
+
+
+class TestSlackRateLimiter:
+    """Token buckets are tracked per workspace."""
+
+    def test_bucket_spaces_out_bursts(self):
+        limiter = slack_integration.SlackRateLimiter(rate=1.0, burst=2)
+        assert limiter.reserve("T1") == 0
+        assert limiter.reserve("T1") == 0
+        assert limiter.reserve("T1") == pytest.approx(1.0, abs=0.05)
+        assert limiter.reserve("T2") == 0
+
+        limiter.penalize("T2", 5)
+        assert limiter.reserve("T2") == pytest.approx(6.0, abs=0.05)
@@ -0,0 +1,265 @@
+"""
+Tests for Stripe revenue analytics.
+
+Uses shared fixtures from conftest.py.
+"""
+import hashlib
+import hmac
+import json
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models import (
+    StripeConnection, StripeCustomerSync, StripeSubscriptionSync, StripeMRRDaily
+)
+from app.revenue_timeline import compute_mrr_timeline, rebuild_mrr_timeline
+from app import stripe_revenue
+
+
+def _midnight(days_ago: int) -> datetime:
+    return datetime.combine(date.today() - timedelta(days=days_ago), datetime.min.time())
+
+
+@pytest.fixture
+def stripe_org(test_db, test_org):
+    """An organization with a connected Stripe account, owned by test_user."""
+    org = test_org
+    connection = StripeConnection(
+        organization_id=org.id, stripe_account_id="acct_123", access_token="sk_test"
+    )
+    test_db.add(connection)
+    test_db.commit()
+    return org
+
+
+def _add_subscription(test_db, org, sub_id, customer_id, mrr, created_days_ago, canceled_days_ago=None):
+    test_db.add(StripeSubscriptionSync(
+        organization_id=org.id,
+        stripe_connection_id=org.stripe_connections[0].id,
+        stripe_subscription_id=sub_id,
+        stripe_customer_id=customer_id,
+        status="canceled" if canceled_days_ago is not None else "active",
+        plan_name="Pro",
+        mrr=mrr,
+        subscription_created_at=_midnight(created_days_ago),
+        canceled_at=_midnight(canceled_days_ago) if canceled_days_ago is not None else None,
+    ))
+
+
+class TestMRRTimeline:
+    """The daily series is swept from subscription events in one pass."""
+
+    def test_sweep_tracks_mrr_and_movements(self, test_db, stripe_org):
+        _add_subscription(test_db, stripe_org, "sub_a", "cus_a", 100.0, created_days_ago=10)
+        _add_subscription(test_db, stripe_org, "sub_b", "cus_b", 50.0, created_days_ago=8, canceled_days_ago=3)
+        # cus_a upgrades: a second subscription on an existing customer
+        _add_subscription(test_db, stripe_org, "sub_c", "cus_a", 25.0, created_days_ago=5)
+        test_db.commit()
+
+        points = {p["day"]: p for p in compute_mrr_timeline(test_db, stripe_org.id)}
+        day = lambda n: date.today() - timedelta(days=n)
+
+        assert points[day(10)]["mrr"] == 100.0
+        assert points[day(10)]["new_mrr"] == 100.0
+        assert points[day(8)]["mrr"] == 150.0
+        assert points[day(5)]["expansion_mrr"] == 25.0
+        assert points[day(5)]["paying_customers"] == 2
+        assert points[day(3)]["churned_mrr"] == 50.0
+        assert points[day(0)]["mrr"] == 125.0
+        assert points[day(0)]["active_subscriptions"] == 2
+        assert points[day(0)]["paying_customers"] == 1
+
+    def test_chart_reads_stored_series(self, client, test_db, stripe_org, auth_headers):
+        _add_subscription(test_db, stripe_org, "sub_a", "cus_a", 100.0, created_days_ago=20)
+        _add_subscription(test_db, stripe_org, "sub_b", "cus_b", 40.0, created_days_ago=9)
+        test_db.add(StripeCustomerSync(
+            organization_id=stripe_org.id, stripe_connection_id=stripe_org.stripe_connections[0].id,
+            stripe_customer_id="cus_a", customer_created_at=_midnight(20),
+        ))
+        test_db.commit()
+        rebuild_mrr_timeline(test_db, stripe_org.id)
+        test_db.commit()
+        assert test_db.query(StripeMRRDaily).count() == 21
+
+        response = client.get("/api/stripe-revenue/chart?days=30", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+
+        # Weekly points 30, 23, 16, 9 and 2 days ago
+        assert data["mrr"] == [0.0, 0.0, 100.0, 140.0, 140.0]
+        assert data["customers"] == [0, 0, 1, 1, 1]
+        assert data["new_mrr"] == [0.0, 0.0, 100.0, 40.0, 0.0]
+
+        response = client.get("/api/stripe-revenue/chart?days=7&granularity=day", headers=auth_headers)
+        assert len(response.json()["mrr"]) == 7
+        assert response.json()["mrr"][-1] == 140.0
+
+
+def _subscription_event(event_type, sub_id, customer_id, amount, created, status="active"):
+    return {
+        "id": f"evt_{sub_id}_{created}",
+        "type": event_type,
+        "created": created,
+        "account": "acct_123",
+        "data": {"object": {
+            "id": sub_id,
+            "object": "subscription",
+            "customer": customer_id,
+            "status": status,
+            "created": 1700000000,
+            "items": {"data": [{"quantity": 1, "price": {
+                "nickname": "Pro", "unit_amount": amount, "recurring": {"interval": "month", "interval_count": 1},
+            }}]},
+        }},
+    }
+
+
+def _signed(payload: str, secret: str) -> str:
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class TestIncrementalSync:
+    """Events are upserted in bulk, keyed on Stripe IDs."""
+
+    def test_events_upsert_latest_state(self, test_db, stripe_org):
+        connection = stripe_org.stripe_connections[0]
+        events = [
+            _subscription_event("customer.subscription.created", "sub_a", "cus_a", 1000, created=1),
+            _subscription_event("customer.subscription.created", "sub_b", "cus_b", 2000, created=1),
+            # Out of order: the later update must win
+            _subscription_event("customer.subscription.deleted", "sub_a", "cus_a", 1000, created=3, status="canceled"),
+            _subscription_event("customer.subscription.updated", "sub_a", "cus_a", 1500, created=2),
+        ]
+        assert stripe_revenue.apply_stripe_events(test_db, connection, events) == (0, 2)
+        test_db.commit()
+
+        subs = {s.stripe_subscription_id: s for s in test_db.query(StripeSubscriptionSync).all()}
+        assert subs["sub_a"].status == "canceled"
+        assert subs["sub_b"].mrr == 20.0
+
+        # Replaying updates existing rows instead of duplicating them
+        stripe_revenue.apply_stripe_events(test_db, connection, [
+            _subscription_event("customer.subscription.updated", "sub_b", "cus_b", 5000, created=4),
+        ])
+        test_db.commit()
+        test_db.expire_all()
+        assert test_db.query(StripeSubscriptionSync).count() == 2
+        assert test_db.query(StripeSubscriptionSync).filter_by(stripe_subscription_id="sub_b").one().mrr == 50.0
+
+    def test_late_events_do_not_overwrite_newer_state(self, test_db, stripe_org):
+        connection = stripe_org.stripe_connections[0]
+        stripe_revenue.apply_stripe_events(test_db, connection, [
+            _subscription_event("customer.subscription.updated", "sub_a", "cus_a", 3000, created=10),
+            {"type": "customer.updated", "created": 10, "data": {"object": {"id": "cus_a", "email": "a@example.com"}}},
+        ])
+        test_db.commit()
+
+        # Delivered in a later batch, but older than what is stored
+        stripe_revenue.apply_stripe_events(test_db, connection, [
+            _subscription_event("customer.subscription.updated", "sub_a", "cus_a", 1000, created=5),
+            {"type": "customer.deleted", "created": 5, "data": {"object": {"id": "cus_a"}}},
+        ])
+        test_db.commit()
+        test_db.expire_all()
+        assert test_db.query(StripeSubscriptionSync).one().mrr == 30.0
+        assert test_db.query(StripeCustomerSync).one().email == "a@example.com"
+
+    def test_full_pull_state_beats_older_events(self, test_db, stripe_org):
+        connection = stripe_org.stripe_connections[0]
+        pulled = _subscription_event("customer.subscription.updated", "sub_a", "cus_a", 4000, created=1)
+        stripe_revenue._sync_list(test_db, connection, StripeSubscriptionSync, "stripe_subscription_id",
+                                  [pulled["data"]["object"]], stripe_revenue._subscription_row)
+        test_db.commit()
+
+        stripe_revenue.apply_stripe_events(test_db, connection, [
+            _subscription_event("customer.subscription.updated", "sub_a", "cus_a", 1000, created=100),
+        ])
+        test_db.commit()
+        test_db.expire_all()
+        assert test_db.query(StripeSubscriptionSync).one().mrr == 40.0
+
+    def test_webhook_verifies_signature_and_applies_event(self, client, test_db, stripe_org, monkeypatch):
+        monkeypatch.setattr(stripe_revenue, "STRIPE_CONNECT_WEBHOOK_SECRET", "whsec_test")
+        payload = json.dumps(_subscription_event("customer.subscription.created", "sub_w", "cus_w", 900, created=1))
+
+        response = client.post("/api/stripe-revenue/webhook", content=payload,
+                               headers={"Stripe-Signature": _signed(payload, "whsec_wrong")})
+        assert response.status_code == 400
+        assert test_db.query(StripeSubscriptionSync).count() == 0
+
+        response = client.post("/api/stripe-revenue/webhook", content=payload,
+                               headers={"Stripe-Signature": _signed(payload, "whsec_test")})
+        assert response.status_code == 200
+        sub = test_db.query(StripeSubscriptionSync).one()
+        assert sub.stripe_subscription_id == "sub_w"
+        assert sub.mrr == 9.0
+
+    def test_customer_webhook_invalidates_timeline(self, client, test_db, stripe_org, monkeypatch):
+        monkeypatch.setattr(stripe_revenue, "STRIPE_CONNECT_WEBHOOK_SECRET", "whsec_test")
+        _add_subscription(test_db, stripe_org, "sub_a", "cus_a", 100.0, created_days_ago=5)
+        test_db.commit()
+        rebuild_mrr_timeline(test_db, stripe_org.id)
+        test_db.commit()
+        assert test_db.query(StripeMRRDaily).count() > 0
+
+        payload = json.dumps({
+            "id": "evt_cus_a", "type": "customer.updated", "created": 1, "account": "acct_123",
+            "data": {"object": {"id": "cus_a", "object": "customer", "email": "a@example.com"}},
+        })
+        response = client.post("/api/stripe-revenue/webhook", content=payload,
+                               headers={"Stripe-Signature": _signed(payload, "whsec_test")})
+        assert response.status_code == 200
+        assert test_db.query(StripeCustomerSync).one().email == "a@example.com"
+        assert test_db.query(StripeMRRDaily).count() == 0
+
+
+class TestRevenueDashboard:
+    """Dashboard is aggregated in SQL and cached until the next sync."""
+
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        stripe_revenue.revenue_dashboard_cache.clear()
+        yield
+        stripe_revenue.revenue_dashboard_cache.clear()
+
+    def test_dashboard_aggregates_and_caches(self, client, test_db, stripe_org, auth_headers):
+        connection_id = stripe_org.stripe_connections[0].id
+        for i, (customer, mrr) in enumerate([("cus_a", 100.0), ("cus_b", 300.0), ("cus_c", 50.0)]):
+            test_db.add(StripeCustomerSync(
+                organization_id=stripe_org.id, stripe_connection_id=connection_id,
+                stripe_customer_id=customer, email=f"{customer}@example.com",
+            ))
+            _add_subscription(test_db, stripe_org, f"sub_{i}", customer, mrr, created_days_ago=40)
+        _add_subscription(test_db, stripe_org, "sub_old", "cus_c", 80.0, created_days_ago=60, canceled_days_ago=10)
+        test_db.commit()
+
+        response = client.get("/api/stripe-revenue/dashboard", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["metrics"]["mrr"] == 450.0
+        assert data["metrics"]["active_subscriptions"] == 3
+        assert data["metrics"]["churned_subscriptions_30d"] == 1
+        assert data["subscription_breakdown"] == [{"plan_name": "Pro", "count": 3, "mrr": 450.0, "percentage": 100.0}]
+        assert [c["customer_id"] for c in data["top_customers"]] == ["cus_b", "cus_a", "cus_c"]
+        assert data["top_customers"][0]["total_revenue"] == 3600.0
+
+        engine = test_db.get_bind()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            cached = client.get("/api/stripe-revenue/dashboard", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert cached.json() == data
+        assert not any("stripe_subscriptions_sync" in s or "stripe_mrr_daily" in s for s in statements)
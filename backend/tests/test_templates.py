@@ -0,0 +1,69 @@
+"""
+Tests for document template rendering.
+
+Uses shared fixtures from conftest.py.
+"""
+from app import templates
+from app.templates import CompiledTemplate, TEMPLATES, render_document
+
+
+class TestCompiledTemplate:
+    """Templates are compiled into literal and variable segments."""
+
+    def test_render_fills_declared_variables_only(self):
+        compiled = CompiledTemplate("Hi {{name}}, {{name}}! {{other}} {{names}}", ["name", "names"])
+        content, missing = compiled.render(["Ada", None])
+        assert content == "Hi Ada, Ada! {{other}} [names]"
+        assert missing == ("names",)
+
+    def test_values_are_not_expanded_again(self):
+        compiled = CompiledTemplate("{{a}} {{b}}", ["a", "b"])
+        assert compiled.render(["{{b}}", "x"])[0] == "{{b}} x"
+
+    def test_renders_are_memoized(self):
+        templates._render_cached.cache_clear()
+        variables = {"party_a_name": "Acme", "party_b_name": "Globex"}
+        first = render_document("nda_mutual", variables)
+        second = render_document("nda_mutual", dict(variables))
+        assert first == second
+        assert templates._render_cached.cache_info().hits == 1
+        assert "Acme" in first[0] and "[governing_state]" in first[0]
+        assert first[1] == [v for v in TEMPLATES["nda_mutual"]["variables"] if v not in variables]
+
+
+class TestRenderEndpoints:
+    """Single and batch render endpoints."""
+
+    def test_render(self, client):
+        response = client.post("/api/templates/render", json={
+            "template_id": "nda_mutual", "variables": {"party_a_name": "Acme"}
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert "Party A: Acme" in data["rendered_content"]
+        assert "party_a_name" not in data["missing_variables"]
+
+    def test_batch_render_one_document_per_counterparty(self, client):
+        shared = {var: "x" for var in TEMPLATES["nda_mutual"]["variables"]}
+        shared["party_a_name"] = "Acme"
+        response = client.post("/api/templates/render/batch", json={
+            "template_id": "nda_mutual",
+            "variables": shared,
+            "documents": [{"party_b_name": "Globex"}, {"party_b_name": "Initech"}, {}],
+        })
+        assert response.status_code == 200
+        documents = response.json()["documents"]
+        assert len(documents) == 3
+        assert "Party B: Globex" in documents[0]["rendered_content"]
+        assert "Party B: Initech" in documents[1]["rendered_content"]
+        assert all("Party A: Acme" in d["rendered_content"] for d in documents)
+        assert all(d["missing_variables"] == [] for d in documents)
+
+    def test_batch_render_errors(self, client):
+        response = client.post("/api/templates/render/batch", json={"template_id": "missing", "documents": [{}]})
+        assert response.status_code == 404
+
+        response = client.post("/api/templates/render/batch", json={
+            "template_id": "nda_mutual", "documents": [{}] * (templates.MAX_BATCH_DOCUMENTS + 1)
+        })
+        assert response.status_code == 400
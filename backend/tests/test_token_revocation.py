@@ -0,0 +1,71 @@
+"""
+Tests for the in-memory token revocation replica.
+
+Uses shared fixtures from conftest.py.
+"""
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy import event
+
+from app import session_manager
+from app.models import TokenBlacklist
+from app.session_manager import is_token_revoked, token_blacklist_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_manager.time, "monotonic", lambda: now[0])
+    token_blacklist_cache.clear()
+    yield now
+    token_blacklist_cache.clear()
+
+
+def _revoke_elsewhere(db, user, token_id):
+    """Blacklist a token the way another worker would (DB only)."""
+    db.add(TokenBlacklist(token_id=token_id, user_id=user.id,
+                          expires_at=datetime.now(UTC) + timedelta(hours=1), reason="logout"))
+    db.commit()
+
+
+class TestRevocationReplica:
+    """Revocation checks are answered from memory between syncs."""
+
+    def test_checks_make_no_queries_between_syncs(self, test_db, test_user, clock):
+        _revoke_elsewhere(test_db, test_user, "revoked")
+        assert is_token_revoked(test_db, "revoked") is True
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = test_db.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            for _ in range(10):
+                assert is_token_revoked(test_db, "live") is False
+                assert is_token_revoked(test_db, "revoked") is True
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert statements == []
+
+    def test_other_workers_revocations_are_honored_after_interval(self, test_db, test_user, clock):
+        assert is_token_revoked(test_db, "token-1") is False
+        _revoke_elsewhere(test_db, test_user, "token-1")
+
+        clock[0] += session_manager.REVOCATION_SYNC_INTERVAL / 2
+        assert is_token_revoked(test_db, "token-1") is False
+
+        clock[0] += session_manager.REVOCATION_SYNC_INTERVAL
+        assert is_token_revoked(test_db, "token-1") is True
+
+    def test_local_revocation_is_immediate(self, client, test_db, test_user, clock):
+        response = client.post("/api/auth/login", json={"username": test_user.email, "password": "TestPass123!"})
+        assert response.status_code == 200
+        assert client.get("/api/auth/me").status_code == 200
+
+        client.post("/api/auth/logout")
+        token = response.cookies.get("access_token")
+        assert client.get("/api/auth/me", cookies={"access_token": token}).status_code == 401
@@ -6,7 +6,8 @@ Uses shared fixtures from conftest.py for authentication.
 import pytest
 from app.vault import (
     generate_salt, derive_key, hash_master_password, verify_master_password,
-    encrypt_value, decrypt_value, VaultSession
+    encrypt_value, decrypt_value, VaultSession,
+    MemoryVaultSessionStore, SQLiteVaultSessionStore
 )
 
 
@@ -142,6 +143,80 @@ class TestVaultSession:
         assert VaultSession.is_unlocked("session2")
 
 
+class TestVaultSessionStores:
+    """Test the session key stores behind VaultSession."""
+
+    def test_memory_store_expires_from_heap(self):
+        """Expired sessions are purged without touching live ones."""
+        store = MemoryVaultSessionStore()
+        store.put("old", b"k1", expires_at=100.0)
+        store.put("new", b"k2", expires_at=200.0)
+        store.put("refreshed", b"k3", expires_at=100.0)
+        assert store.touch("refreshed", expires_at=300.0, now=50.0)
+
+        assert store.get("old", now=150.0) is None
+        assert store.purge_expired(now=150.0) == 0  # already dropped by get
+        store.put("old", b"k1", expires_at=120.0)
+        assert store.purge_expired(now=150.0) == 1
+        assert store.get("new", now=150.0) == b"k2"
+        assert store.get("refreshed", now=250.0) == b"k3"
+        assert not store.touch("new", expires_at=400.0, now=250.0)
+
+    def test_sqlite_store_is_shared_between_workers(self, tmp_path):
+        """A key stored by one worker is visible to, and lockable by, another."""
+        path = str(tmp_path / "vault_sessions.db")
+        worker_a = SQLiteVaultSessionStore(path)
+        worker_b = SQLiteVaultSessionStore(path)
+        key = b"k" * 32
+
+        worker_a.put("session", key, expires_at=200.0)
+        assert worker_b.get("session", now=100.0) == key
+        assert worker_b.get("session", now=250.0) is None
+        assert worker_b.touch("session", expires_at=300.0, now=100.0)
+        assert worker_a.get("session", now=250.0) == key
+
+        worker_b.delete("session")
+        assert worker_a.get("session", now=100.0) is None
+
+    def test_sqlite_store_encrypts_keys_at_rest(self, tmp_path):
+        """Raw keys never reach the database file, and can't be moved between sessions."""
+        import base64
+        import sqlite3
+
+        path = str(tmp_path / "vault_sessions.db")
+        store = SQLiteVaultSessionStore(path)
+        key = b"secret-key-32-bytes-long-enough!"
+        store.put("session", key, expires_at=200.0)
+        store.put("other", b"o" * 32, expires_at=200.0)
+
+        conn = sqlite3.connect(path)
+        (encrypted,) = conn.execute(
+            "SELECT encrypted_key FROM vault_sessions WHERE session_id = 'session'"
+        ).fetchone()
+        assert key not in encrypted.encode()
+        assert base64.b64encode(key).decode() not in encrypted
+
+        conn.execute("UPDATE vault_sessions SET encrypted_key = ? WHERE session_id = 'other'", (encrypted,))
+        conn.commit()
+        assert store.get("other", now=100.0) is None
+        assert store.get("session", now=100.0) == key
+
+    def test_vault_session_uses_pluggable_store(self, tmp_path):
+        """An unlock through VaultSession is seen through another store instance."""
+        original = VaultSession._sessions
+        path = str(tmp_path / "vault_sessions.db")
+        try:
+            VaultSession.set_store(SQLiteVaultSessionStore(path))
+            VaultSession.unlock("session", b"k" * 32)
+            VaultSession.set_store(SQLiteVaultSessionStore(path))
+            assert VaultSession.get_key("session") == b"k" * 32
+            assert VaultSession.refresh("session")
+            VaultSession.lock("session")
+            assert not VaultSession.is_unlocked("session")
+        finally:
+            VaultSession.set_store(original)
+
+
 class TestVaultAPI:
     """Test vault API endpoints."""
 
@@ -2,7 +2,8 @@
  * NotificationBell - Header notification indicator with dropdown
  *
  * Displays unread notification count badge and dropdown list.
- * Polls for new notifications every 30 seconds.
+ * Updates are pushed over the notification stream (server-sent events);
+ * the unread count is only polled if the stream can't be opened.
  */
 
 import { useState, useEffect, useCallback, useRef } from 'react';
@@ -24,10 +25,11 @@ import {
   getNotifications,
   getUnreadNotificationCount,
   markNotificationsRead,
+  openNotificationStream,
   type Notification,
 } from '../lib/api';
 
-const POLL_INTERVAL = 30000; // 30 seconds
+const POLL_INTERVAL = 30000; // 30 seconds, only when the stream is unavailable
 
 // Notification type to icon mapping
 const NOTIFICATION_ICONS: Record<string, React.ElementType> = {
@@ -83,12 +85,35 @@ export default function NotificationBell() {
     }
   }, []);
 
-  // Initial load and polling
+  // Live updates; the stream sends the current unread count on connect
   useEffect(() => {
-    fetchUnreadCount();
+    let interval: ReturnType<typeof setInterval> | undefined;
+    const source = openNotificationStream();
 
-    const interval = setInterval(fetchUnreadCount, POLL_INTERVAL);
-    return () => clearInterval(interval);
+    source.addEventListener('unread_count', (event) => {
+      setUnreadCount(JSON.parse((event as MessageEvent).data).count);
+    });
+    source.addEventListener('notification', (event) => {
+      const { unread_count, ...notification } = JSON.parse((event as MessageEvent).data);
+      setNotifications((prev) =>
+        [{ ...notification, actor: null, is_read: false } as Notification, ...prev].slice(0, 10)
+      );
+      if (typeof unread_count === 'number') {
+        setUnreadCount(unread_count);
+      }
+    });
+    source.onerror = () => {
+      // EventSource reconnects by itself unless the stream was refused
+      if (source.readyState === EventSource.CLOSED && !interval) {
+        fetchUnreadCount();
+        interval = setInterval(fetchUnreadCount, POLL_INTERVAL);
+      }
+    };
+
+    return () => {
+      source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [fetchUnreadCount]);
 
   // Load full notifications when dropdown opens
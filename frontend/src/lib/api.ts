@@ -2045,7 +2045,7 @@ const downloadFile = async (endpoint: string, filename: string) => {
 };
 
 export const exportAllData = () =>
-  downloadFile('/export/all', `made4founders_export_${new Date().toISOString().slice(0, 10)}.json`);
+  downloadFile('/export/all', `made4founders_export_${new Date().toISOString().slice(0, 10)}.zip`);
 
 export const exportContactsCsv = () =>
   downloadFile('/export/contacts', `contacts_${new Date().toISOString().slice(0, 10)}.csv`);
@@ -4193,6 +4193,10 @@ export const getNotifications = (params?: { unread_only?: boolean; limit?: numbe
 export const getUnreadNotificationCount = () =>
   fetchApi<{ count: number }>('/notifications/unread-count');
 
+/** Server-sent `unread_count` and `notification` events for the current user. */
+export const openNotificationStream = () =>
+  new EventSource(`${API_BASE}/notifications/stream`, { withCredentials: true });
+
 export const markNotificationsRead = (notificationIds?: number[]) =>
   fetchApi<{ marked_count: number }>('/notifications/mark-read', {
     method: 'POST',
@@ -45,6 +45,9 @@ import type {
 } from '../lib/api';
 
 // Rarity colors and styles
+// Legacy 8-character codes, and 5-character sequence prefix + 8 random characters
+const INVITE_CODE_LENGTHS = [8, 13];
+
 const rarityStyles: Record<string, { bg: string; border: string; text: string; glow: string }> = {
   common: { bg: 'bg-white/50/20', border: 'border-gray-500/30', text: 'text-gray-400', glow: '' },
   uncommon: { bg: 'bg-green-500/20', border: 'border-green-500/30', text: 'text-green-400', glow: '' },
@@ -316,7 +319,7 @@ export default function Leaderboard() {
     if (!joinCode.trim()) return;
     setJoiningChallenge(true);
     try {
-      await joinChallengeByCode(joinCode, joinWager);
+      await joinChallengeByCode(joinCode.trim(), joinWager);
       setShowJoinModal(false);
       setJoinCode('');
       setJoinWager(0);
@@ -982,8 +985,8 @@ export default function Leaderboard() {
                   type="text"
                   value={joinCode}
                   onChange={(e) => setJoinCode(e.target.value.toUpperCase())}
-                  placeholder="Enter 8-character code"
-                  maxLength={8}
+                  placeholder="Enter invite code"
+                  maxLength={13}
                   className="w-full px-3 py-2 bg-[#1a1d24]/5 border border-white/10 rounded-lg text-white placeholder-gray-500 focus:outline-none focus:border-cyan-500/50 font-mono text-lg tracking-widest text-center"
                 />
               </div>
@@ -1010,7 +1013,7 @@ export default function Leaderboard() {
               </button>
               <button
                 onClick={handleJoinByCode}
-                disabled={joinCode.length !== 8 || joiningChallenge}
+                disabled={!INVITE_CODE_LENGTHS.includes(joinCode.trim().length) || joiningChallenge}
                 className="flex-1 px-4 py-2 bg-gradient-to-r from-cyan-500 to-blue-500 hover:from-cyan-600 hover:to-blue-600 text-white rounded-lg font-medium transition-all disabled:opacity-50 disabled:cursor-not-allowed"
               >
                 {joiningChallenge ? 'Joining...' : 'Join Challenge'}